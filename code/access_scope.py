@@ -0,0 +1,202 @@
+"""
+Access-level partitions and access-scoped query evaluation.
+
+Access control runs on the integer levels 1 (public), 2 (restricted)
+and 3 (sacred/elder-only): people have a :hasAccessLevel, cultural
+items a :requiresAccessLevel. Rather than every query re-checking these
+values in FILTER clauses (q12, q15, q17 ...), the levels are read once
+into partitions:
+
+    people      by :hasAccessLevel
+    items       by :requiresAccessLevel
+    recordings  by the highest level among their own :requiresAccessLevel
+                and that of every instrument they :usesInstrument, so a
+                recording of a restricted instrument is restricted too
+
+A node with several levels is placed by the highest. A level that is
+not an integer from 1 to 3 (which the SHACL shapes report) puts the
+node above every level, so it is hidden from everyone: the scope fails
+closed.
+
+A caller with level N sees the subgraph without the nodes of the
+partitions above N: every triple whose subject or object is one of them
+is left out. scope() wraps a Dataset in a read-only store that drops
+those triples as the query engine reads them, so any query, unchanged,
+sees only what level N may see. The hidden set of each level is built
+once and checking a triple costs two set lookups.
+
+Example:
+    partitions = AccessPartitions(dataset)
+    public = partitions.scope(dataset, 1)
+    print(sparql_engine.execute(public, query_text))
+"""
+
+from rdflib import ConjunctiveGraph, Dataset, Literal, Namespace
+from rdflib.store import Store
+
+NS = Namespace("http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/")
+
+LEVELS = (1, 2, 3)
+
+# Where nodes with an unreadable or out-of-range level go
+UNKNOWN_LEVEL = LEVELS[-1] + 1
+
+
+def access_level(term):
+    """Integer access level of a literal, or UNKNOWN_LEVEL"""
+    if isinstance(term, Literal):
+        value = term.toPython()
+        if isinstance(value, int) and not isinstance(value, bool) and value in LEVELS:
+            return value
+    return UNKNOWN_LEVEL
+
+
+def _pairs(graph, predicate):
+    """(subject, object) of every triple with predicate, in any named graph"""
+    if isinstance(graph, ConjunctiveGraph):
+        for s, _, o, _ in graph.quads((None, predicate, None, None)):
+            yield s, o
+    else:
+        yield from graph.subject_objects(predicate)
+
+
+def _highest(pairs):
+    levels = {}
+    for node, term in pairs:
+        level = access_level(term)
+        if level > levels.get(node, 0):
+            levels[node] = level
+    return levels
+
+
+class AccessPartitions:
+    """People, cultural items and recordings partitioned by access level"""
+
+    def __init__(self, graph):
+        self.person_level = _highest(_pairs(graph, NS.hasAccessLevel))
+        self.item_level = _highest(_pairs(graph, NS.requiresAccessLevel))
+
+        recording_level = {}
+        for recording, instrument in _pairs(graph, NS.usesInstrument):
+            level = self.item_level.get(instrument, 0)
+            if level > recording_level.get(recording, 0):
+                recording_level[recording] = level
+        for recording in recording_level:
+            own = self.item_level.get(recording, 0)
+            if own > recording_level[recording]:
+                recording_level[recording] = own
+        self.recording_level = {r: level for r, level in recording_level.items() if level}
+
+        self.people = self._partition(self.person_level)
+        self.items = self._partition(self.item_level)
+        self.recordings = self._partition(self.recording_level)
+        self.hidden = {}
+        for level in (0,) + LEVELS:
+            above = set()
+            for partition in (self.people, self.items, self.recordings):
+                for node_level, nodes in partition.items():
+                    if node_level > level:
+                        above |= nodes
+            self.hidden[level] = frozenset(above)
+        self._scopes = {}
+
+    @staticmethod
+    def _partition(levels):
+        partition = {level: set() for level in LEVELS + (UNKNOWN_LEVEL,)}
+        for node, level in levels.items():
+            partition[level].add(node)
+        return {level: frozenset(nodes) for level, nodes in partition.items()}
+
+    def required_level(self, node):
+        """Lowest caller level that may see node (1 if it is unrestricted)"""
+        return max(self.person_level.get(node, 1), self.item_level.get(node, 1),
+                   self.recording_level.get(node, 1))
+
+    def visible(self, node, level):
+        return node not in self.hidden_at(level)
+
+    def hidden_at(self, level):
+        """Nodes a caller with level may not see"""
+        level = max(min(int(level), LEVELS[-1]), 0)
+        return self.hidden[level]
+
+    def scope(self, dataset, level):
+        """
+        A read-only view of dataset for a caller with level.
+
+        The view shares the dataset's store, so it is cheap to make and
+        one is kept per (dataset, level).
+        """
+        key = (id(dataset), int(level))
+        if key not in self._scopes:
+            store = ScopedStore(dataset.store, self.hidden_at(level))
+            self._scopes[key] = Dataset(store=store, default_union=dataset.default_union)
+        return self._scopes[key]
+
+    def summary(self):
+        """Partition sizes: {"people": {level: count}, ...}"""
+        return {
+            name: {level: len(nodes) for level, nodes in partition.items() if nodes}
+            for name, partition in (("people", self.people), ("items", self.items),
+                                    ("recordings", self.recordings))
+        }
+
+
+class ScopedStore(Store):
+    """
+    Read-only store over another store that leaves out every triple
+    whose subject or object is in hidden.
+    """
+
+    context_aware = True
+    graph_aware = True
+    formula_aware = False
+    transaction_aware = False
+
+    def __init__(self, base, hidden):
+        super().__init__()
+        self.base = base
+        self.hidden = hidden
+
+    def triples(self, triple_pattern, context=None):
+        hidden = self.hidden
+        for (s, p, o), contexts in self.base.triples(triple_pattern, context):
+            if s in hidden or o in hidden:
+                continue
+            yield (s, p, o), contexts
+
+    def __len__(self, context=None):
+        return sum(1 for _ in self.triples((None, None, None), context))
+
+    def contexts(self, triple=None):
+        if triple is not None and (triple[0] in self.hidden or triple[2] in self.hidden):
+            return iter(())
+        return self.base.contexts(triple)
+
+    def bind(self, prefix, namespace, override=True):
+        # Prefixes come from the base store and are not changed through a scope
+        pass
+
+    def namespace(self, prefix):
+        return self.base.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.base.prefix(namespace)
+
+    def namespaces(self):
+        return self.base.namespaces()
+
+    def add(self, triple, context, quoted=False):
+        raise PermissionError("An access-scoped dataset is read-only")
+
+    def addN(self, quads):
+        raise PermissionError("An access-scoped dataset is read-only")
+
+    def remove(self, triple, context=None):
+        raise PermissionError("An access-scoped dataset is read-only")
+
+    def add_graph(self, graph):
+        raise PermissionError("An access-scoped dataset is read-only")
+
+    def remove_graph(self, graph):
+        raise PermissionError("An access-scoped dataset is read-only")
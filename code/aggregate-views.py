@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Materialized Aggregate Views
+Keeps the results of the analytical queries q16-q19, q22 and q23 as
+materialized views (see aggregate_views.py) and writes them as SPARQL
+JSON results, in the same files run-queries.py writes, so dashboards
+can read them without a query scanning the whole graph.
+
+Without --state the views are built from the data file. With --state
+the data graph and the views are kept in a state directory; later runs
+compare the data file with the stored graph (or take the change as
+--added/--removed Turtle files) and update only the rows the changed
+triples touch. Result files are rewritten only when their content
+changed.
+
+Usage:
+    python code/aggregate-views.py <data_file> [--output DIR] [--query NAME ...]
+    python code/aggregate-views.py <data_file> --state DIR [--output DIR]
+    python code/aggregate-views.py - --state DIR --added FILE [--removed FILE]
+
+Example:
+    python code/aggregate-views.py data/heritage_complete.ttl --state .views-state
+    python code/aggregate-views.py - --state .views-state --added edits.ttl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from rdflib import Graph
+
+import aggregate_views
+import graph_loader
+import instrumentation
+
+
+def write_results(views, out_dir, queries):
+    """Write one <query>.json per view, leaving unchanged files alone"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for query in queries:
+        text = json.dumps(views.result(query), indent=2, ensure_ascii=False) + "\n"
+        out_path = out_dir / f"{query}.json"
+        rows = len(views.result(query)["results"]["bindings"])
+        if out_path.exists() and out_path.read_text(encoding="utf-8") == text:
+            print(f"  ✓ Unchanged: {out_path} ({rows} rows)")
+            continue
+        tmp = out_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, out_path)
+        print(f"  ✓ Saved: {out_path} ({rows} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialized views of the analytical queries q16-q23")
+    parser.add_argument("data", help="data file (ignored with --added/--removed)")
+    parser.add_argument("--output", default="queries/results", metavar="DIR",
+                        help="directory for the result files (default: queries/results)")
+    parser.add_argument("--query", action="append", metavar="NAME",
+                        help="only write this view (query file stem); may be repeated")
+    parser.add_argument("--state", metavar="DIR", help="keep the graph and the views in DIR and update them incrementally")
+    parser.add_argument("--added", metavar="FILE", help="triples added since the stored state")
+    parser.add_argument("--removed", metavar="FILE", help="triples removed since the stored state")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    explicit_delta = args.added is not None or args.removed is not None
+    if explicit_delta and not args.state:
+        parser.error("--added/--removed need --state")
+    if not explicit_delta and not Path(args.data).exists():
+        print(f"ERROR: Data file not found: {args.data}")
+        return 1
+    known = [cls.query for cls in aggregate_views.VIEWS]
+    queries = args.query or known
+    unknown = [q for q in queries if q not in known]
+    if unknown:
+        parser.error(f"unknown views: {', '.join(unknown)} (choose from {', '.join(known)})")
+
+    views = None
+    if args.state and aggregate_views.MaterializedViews.exists(args.state):
+        print(f"Loading view state from: {args.state}")
+        views = aggregate_views.MaterializedViews.load(args.state)
+
+    if views is None:
+        if explicit_delta:
+            print("ERROR: --added/--removed need a stored state from a previous run")
+            return 1
+        print(f"Loading data from: {args.data}")
+        graph = graph_loader.load_graph(args.data, bind_namespaces="core")
+        print("Building views...")
+        start = time.perf_counter()
+        with instrumentation.stage("views", mode="build") as st:
+            views = aggregate_views.MaterializedViews(graph)
+            derived = views.build()
+            st.count(triples=len(graph), entities=derived)
+        print(f"Built {len(views.views)} views from {derived} entities in {time.perf_counter() - start:.2f}s")
+    else:
+        if explicit_delta:
+            added = graph_loader.load_graph(args.added) if args.added else Graph()
+            removed = graph_loader.load_graph(args.removed) if args.removed else Graph()
+        else:
+            print(f"Comparing {args.data} with the stored data graph")
+            new_graph = graph_loader.load_graph(args.data, bind_namespaces="core")
+            added = new_graph - views.graph
+            removed = views.graph - new_graph
+        print(f"Delta: +{len(added)} / -{len(removed)} triples")
+        start = time.perf_counter()
+        with instrumentation.stage("views", mode="incremental") as st:
+            derived = views.apply(added, removed)
+            st.count(added=len(added), removed=len(removed), entities=derived)
+        print(f"Re-derived {derived} entities in {time.perf_counter() - start:.3f}s")
+
+    print(f"Writing results to: {args.output}")
+    write_results(views, args.output, queries)
+    if args.state:
+        views.save(args.state)
+        print(f"View state saved to: {args.state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+"""
+Materialized aggregate views for the analytical queries q16-q23.
+
+q16 (statistics overview), q17 (access levels), q18 (communities), q19
+(recordings per year), q22 (instrument usage) and q23 (location
+density) each scan the whole graph to build a handful of GROUP BY rows.
+Here every query is kept as a materialized view that is built once and
+then updated from triple deltas.
+
+Every aggregate in these queries is a COUNT(DISTINCT ...), a
+GROUP_CONCAT(DISTINCT ...) or a MIN, so a view only has to know which
+distinct values each group has. It stores them as facts
+
+    (group, measure, value)
+
+derived per entity: a member contributes to the q18 row of each of its
+communities, a recording to the q19 row of its year, and so on. A
+value's count is the number of entities that derive it, so removing one
+entity's facts never loses a value another entity still gives. A
+triple delta only re-derives the entities whose facts can depend on it:
+the triple's subject, plus, for a few lookups (the label of a role a
+q18 member has, the location of a community a q23 person belongs to),
+the subjects that point at it. The group's own label and type are read
+when its row is rendered, so relabelling a community or location
+touches one row.
+
+Results come back as SPARQL JSON in the head variables and ORDER BY of
+the original queries. Rows are re-rendered only for groups that
+changed. Differences from running the query text:
+
+    - GROUP_CONCAT values are sorted (SPARQL leaves their order open)
+      and ties in ORDER BY are broken by the row's labels
+    - q16 gives each class count on its own; the query's cross product
+      of nine subqueries is empty (all zeros) if any class is
+    - unbound labels are skipped by GROUP_CONCAT as the standard says;
+      rdflib instead raises NotBoundError on q18 and q22, and cannot
+      GROUP BY (YEAR(?recordingDate)) in q19
+    - a q19 date YEAR() cannot read is grouped under an unbound year
+
+Example:
+    views = MaterializedViews(load_graph("data/heritage_complete.ttl"))
+    views.build()
+    views.apply(added=[(person, NS.hasAccessLevel, Literal(3))], removed=[])
+    print(views.result("q17_access_level_distribution"))
+"""
+
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from pathlib import Path
+
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.util import from_n3
+
+from sparql_engine import term_to_json
+
+NS = Namespace("http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/")
+
+
+def labels(graph, node):
+    """Labels that pass FILTER(LANG(?label) = "en" || LANG(?label) = "")"""
+    return [l for l in graph.objects(node, RDFS.label) if isinstance(l, Literal) and l.language in (None, "en")]
+
+
+def count(values):
+    return Literal(len(values))
+
+
+def concat(values, separator):
+    return Literal(separator.join(sorted(str(v) for v in values)))
+
+
+def order_key(term):
+    """SPARQL ORDER BY key: unbound first, then numbers by value, then by string"""
+    if term is None:
+        return (0, 0, "")
+    if isinstance(term, Literal):
+        value = term.toPython()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return (1, value, "")
+    return (2, 0, str(term))
+
+
+def year(term):
+    """YEAR() of an xsd:date or xsd:dateTime literal, or None (an error)"""
+    if isinstance(term, Literal) and term.datatype in (XSD.date, XSD.dateTime):
+        value = term.toPython()
+        if isinstance(value, (date, datetime)):
+            return Literal(value.year)
+    return None
+
+
+class AggregateView:
+    """
+    One materialized GROUP BY query.
+
+    Subclasses describe the query:
+
+        query       stem of the .rq file the view stands for
+        variables   head variables of its results
+        sources     (predicate, object) patterns whose subjects can
+                    contribute facts (object None = any)
+        predicates  a change to (s, p, o) with p in predicates re-derives
+                    s and re-renders the group s, if there is one
+        lookups     predicate -> predicates q: a change to (s, p, o)
+                    also re-derives the subjects of (?, q, s)
+
+    and implement contribute() and render().
+    """
+
+    query = None
+    variables = ()
+    sources = ()
+    predicates = frozenset()
+    lookups = {}
+
+    def __init__(self):
+        self.groups = defaultdict(lambda: defaultdict(Counter))  # group -> measure -> value -> entities
+        self.facts = {}                                           # entity -> frozenset of facts
+        self.rows = {}                                            # group -> rendered rows
+        self.dirty = set()
+        self._result = None
+
+    def entities(self, graph):
+        """Every entity that may contribute facts (for a full build)"""
+        found = set()
+        for p, o in self.sources:
+            found.update(graph.subjects(p, o))
+        return found
+
+    def affected(self, graph, triple):
+        """Entities whose facts may depend on triple"""
+        s, p, _ = triple
+        if p not in self.predicates:
+            return set()
+        found = {s}
+        for q in self.lookups.get(p, ()):
+            found.update(graph.subjects(q, s))
+        return found
+
+    def contribute(self, graph, entity):
+        """Yield the (group, measure, value) facts of entity"""
+        raise NotImplementedError
+
+    def render(self, graph, group, measures):
+        """Result rows (dicts of variable -> term) of one group"""
+        raise NotImplementedError
+
+    def sort_key(self, row):
+        raise NotImplementedError
+
+    def _add(self, facts, delta):
+        for group, measure, value in facts:
+            counter = self.groups[group][measure]
+            counter[value] += delta
+            if not counter[value]:
+                del counter[value]
+                if not counter:
+                    del self.groups[group][measure]
+                    if not self.groups[group]:
+                        del self.groups[group]
+            self.dirty.add(group)
+
+    def derive(self, graph, entity):
+        """Replace the facts of entity with the ones the graph gives now"""
+        new = frozenset(self.contribute(graph, entity))
+        old = self.facts.pop(entity, frozenset())
+        if new:
+            self.facts[entity] = new
+        if new != old:
+            self._add(old - new, -1)
+            self._add(new - old, 1)
+
+    def touch(self, group):
+        self.dirty.add(group)
+
+    def result(self, graph):
+        """SPARQL JSON results, re-rendering the groups changed since the last call"""
+        if self.dirty or self._result is None:
+            for group in self.dirty:
+                measures = self.groups.get(group)
+                rows = self.render(graph, group, measures) if measures else []
+                if rows:
+                    self.rows[group] = rows
+                else:
+                    self.rows.pop(group, None)
+            self.dirty.clear()
+            ordered = sorted((row for rows in self.rows.values() for row in rows), key=self.sort_key)
+            self._result = {
+                "head": {"vars": list(self.variables)},
+                "results": {"bindings": [
+                    {name: term_to_json(row[name]) for name in self.variables if row.get(name) is not None}
+                    for row in ordered
+                ]},
+            }
+        return self._result
+
+
+class StatisticsOverview(AggregateView):
+    """q16: distinct instances of nine classes"""
+
+    query = "q16_statistics_overview"
+    CLASSES = {
+        "totalPeople": NS.Person,
+        "totalLocations": NS.Location,
+        "totalCommunities": NS.Community,
+        "totalInstruments": NS.Instrument,
+        "totalMusicalWorks": NS.MusicalWork,
+        "totalRecordings": NS.Recording,
+        "totalRituals": NS.Ritual,
+        "totalStories": NS.Story,
+        "totalSacredItems": NS.SacredItem,
+    }
+    variables = tuple(CLASSES)
+    sources = tuple((RDF.type, cls) for cls in CLASSES.values())
+    predicates = frozenset({RDF.type})
+
+    def __init__(self):
+        super().__init__()
+        # An aggregate without GROUP BY has one row even over no solutions
+        self.dirty.add(None)
+
+    def contribute(self, graph, entity):
+        for name, cls in self.CLASSES.items():
+            if (entity, RDF.type, cls) in graph:
+                yield None, name, entity
+
+    def render(self, graph, group, measures):
+        return [{name: count(measures.get(name, ())) for name in self.CLASSES}]
+
+    def result(self, graph):
+        if None in self.dirty and None not in self.groups:
+            self.dirty.discard(None)
+            self.rows[None] = self.render(graph, None, {})
+            self._result = None
+        return super().result(graph)
+
+    def sort_key(self, row):
+        return 0
+
+
+class AccessLevelDistribution(AggregateView):
+    """q17: people (with labels) and cultural items per access level"""
+
+    query = "q17_access_level_distribution"
+    variables = ("accessLevel", "peopleCount", "itemsCount", "people")
+    sources = ((RDF.type, NS.Person), (RDF.type, NS.CulturalItem))
+    predicates = frozenset({RDF.type, RDFS.label, NS.hasAccessLevel, NS.requiresAccessLevel})
+
+    def contribute(self, graph, entity):
+        if (entity, RDF.type, NS.Person) in graph:
+            person_labels = labels(graph, entity)
+            if person_labels:
+                for level in graph.objects(entity, NS.hasAccessLevel):
+                    yield level, "person", entity
+                    for label in person_labels:
+                        yield level, "personLabel", label
+        if (entity, RDF.type, NS.CulturalItem) in graph:
+            for level in graph.objects(entity, NS.requiresAccessLevel):
+                yield level, "item", entity
+
+    def render(self, graph, group, measures):
+        return [{
+            "accessLevel": group,
+            "peopleCount": count(measures.get("person", ())),
+            "itemsCount": count(measures.get("item", ())),
+            "people": concat(measures.get("personLabel", ()), ", "),
+        }]
+
+    def sort_key(self, row):
+        return order_key(row["accessLevel"])
+
+
+class CommunityAnalysis(AggregateView):
+    """q18: members, roles, instruments and works per community"""
+
+    query = "q18_community_analysis"
+    variables = ("community", "communityLabel", "memberCount", "roleTypes",
+                 "instrumentsUsed", "musicalWorksKnown", "roles")
+    sources = ((NS.memberOfCommunity, None),)
+    predicates = frozenset({RDF.type, RDFS.label, NS.memberOfCommunity, NS.hasRole,
+                            NS.playsInstrument, NS.knowsMusicalWork})
+    lookups = {RDFS.label: (NS.hasRole,)}
+
+    def contribute(self, graph, entity):
+        communities = list(graph.objects(entity, NS.memberOfCommunity))
+        if not communities:
+            return
+        roles = [(role, labels(graph, role)) for role in graph.objects(entity, NS.hasRole)]
+        instruments = list(graph.objects(entity, NS.playsInstrument))
+        works = list(graph.objects(entity, NS.knowsMusicalWork))
+        for community in communities:
+            yield community, "member", entity
+            for role, role_labels in roles:
+                if role_labels:
+                    yield community, "role", role
+                    for label in role_labels:
+                        yield community, "roleLabel", label
+            for instrument in instruments:
+                yield community, "instrument", instrument
+            for work in works:
+                yield community, "work", work
+
+    def render(self, graph, group, measures):
+        if (group, RDF.type, NS.Community) not in graph:
+            return []
+        values = {
+            "memberCount": count(measures.get("member", ())),
+            "roleTypes": count(measures.get("role", ())),
+            "instrumentsUsed": count(measures.get("instrument", ())),
+            "musicalWorksKnown": count(measures.get("work", ())),
+            "roles": concat(measures.get("roleLabel", ()), ", "),
+        }
+        return [{"community": group, "communityLabel": label, **values} for label in labels(graph, group)]
+
+    def sort_key(self, row):
+        return (-int(row["memberCount"]), str(row["communityLabel"]), str(row["community"]))
+
+
+class TemporalAnalysis(AggregateView):
+    """q19: recordings, performers and locations per recording year"""
+
+    query = "q19_temporal_analysis"
+    variables = ("year", "recordingsCount", "uniquePerformers", "locationsRecorded", "recordings")
+    sources = ((RDF.type, NS.Recording),)
+    predicates = frozenset({RDF.type, RDFS.label, NS.recordingDate, NS.performedBy, NS.recordedAt})
+
+    def contribute(self, graph, entity):
+        if (entity, RDF.type, NS.Recording) not in graph:
+            return
+        dates = list(graph.objects(entity, NS.recordingDate))
+        performers = list(graph.objects(entity, NS.performedBy))
+        locations = list(graph.objects(entity, NS.recordedAt))
+        recording_labels = labels(graph, entity)
+        if not (dates and performers and locations and recording_labels):
+            return
+        for group in {year(d) for d in dates}:
+            yield group, "recording", entity
+            for performer in performers:
+                yield group, "performer", performer
+            for location in locations:
+                yield group, "location", location
+            for label in recording_labels:
+                yield group, "label", label
+
+    def render(self, graph, group, measures):
+        return [{
+            "year": group,
+            "recordingsCount": count(measures.get("recording", ())),
+            "uniquePerformers": count(measures.get("performer", ())),
+            "locationsRecorded": count(measures.get("location", ())),
+            "recordings": concat(measures.get("label", ()), "; "),
+        }]
+
+    def sort_key(self, row):
+        return order_key(row["year"])
+
+
+class InstrumentUsage(AggregateView):
+    """q22: performers and recordings per instrument"""
+
+    query = "q22_instrument_usage_analysis"
+    variables = ("instrument", "instrumentLabel", "performersCount", "recordingsCount",
+                 "minAccessRequired", "performers", "recordings")
+    sources = ((NS.playsInstrument, None), (NS.usesInstrument, None))
+    predicates = frozenset({RDFS.label, NS.playsInstrument, NS.usesInstrument, NS.requiresAccessLevel})
+
+    def contribute(self, graph, entity):
+        entity_labels = labels(graph, entity)
+        if not entity_labels:
+            return
+        for instrument in graph.objects(entity, NS.playsInstrument):
+            yield instrument, "performer", entity
+            for label in entity_labels:
+                yield instrument, "performerLabel", label
+        for instrument in graph.objects(entity, NS.usesInstrument):
+            yield instrument, "recording", entity
+            for label in entity_labels:
+                yield instrument, "recordingLabel", label
+
+    def render(self, graph, group, measures):
+        access = list(graph.objects(group, NS.requiresAccessLevel))
+        values = {
+            "performersCount": count(measures.get("performer", ())),
+            "recordingsCount": count(measures.get("recording", ())),
+            "minAccessRequired": min(access, key=order_key) if access else None,
+            "performers": concat(measures.get("performerLabel", ()), ", "),
+            "recordings": concat(measures.get("recordingLabel", ()), "; "),
+        }
+        return [{"instrument": group, "instrumentLabel": label, **values} for label in labels(graph, group)]
+
+    def sort_key(self, row):
+        return (-int(row["performersCount"]), -int(row["recordingsCount"]),
+                str(row["instrumentLabel"]), str(row["instrument"]))
+
+
+class LocationDensity(AggregateView):
+    """q23: cultural items, instruments, works, recordings, people and sacred items per location"""
+
+    query = "q23_location_cultural_density"
+    variables = ("location", "locationLabel", "totalItems", "instruments", "musicalWorks",
+                 "recordings", "people", "sacredItems")
+    LOCATED = {
+        "totalItems": NS.CulturalItem,
+        "instruments": NS.Instrument,
+        "musicalWorks": NS.MusicalWork,
+        "sacredItems": NS.SacredItem,
+    }
+    sources = ((RDF.type, NS.Location), (NS.locatedIn, None), (NS.recordedAt, None),
+               (NS.memberOfCommunity, None))
+    predicates = frozenset({RDF.type, RDFS.label, NS.locatedIn, NS.recordedAt, NS.memberOfCommunity})
+    lookups = {NS.locatedIn: (NS.memberOfCommunity,)}
+
+    def contribute(self, graph, entity):
+        if (entity, RDF.type, NS.Location) in graph:
+            yield entity, "location", entity
+        locations = list(graph.objects(entity, NS.locatedIn))
+        if locations:
+            for measure, cls in self.LOCATED.items():
+                if (entity, RDF.type, cls) in graph:
+                    for location in locations:
+                        yield location, measure, entity
+        if (entity, RDF.type, NS.Recording) in graph:
+            for location in graph.objects(entity, NS.recordedAt):
+                yield location, "recordings", entity
+        for community in graph.objects(entity, NS.memberOfCommunity):
+            for location in graph.objects(community, NS.locatedIn):
+                yield location, "people", entity
+
+    def render(self, graph, group, measures):
+        if not measures.get("location"):
+            return []
+        values = {name: count(measures.get(name, ()))
+                  for name in ("totalItems", "instruments", "musicalWorks", "recordings", "people", "sacredItems")}
+        return [{"location": group, "locationLabel": label, **values} for label in labels(graph, group)]
+
+    def sort_key(self, row):
+        return (-int(row["totalItems"]), str(row["locationLabel"]), str(row["location"]))
+
+
+VIEWS = [
+    StatisticsOverview,
+    AccessLevelDistribution,
+    CommunityAnalysis,
+    TemporalAnalysis,
+    InstrumentUsage,
+    LocationDensity,
+]
+
+
+def _encode(term):
+    return term.n3() if term is not None else None
+
+
+def _decode(text):
+    return from_n3(text) if text is not None else None
+
+
+class MaterializedViews:
+    """The aggregate views of one data graph, kept up to date with it"""
+
+    def __init__(self, graph, views=None):
+        self.graph = graph
+        self.views = {view.query: view for view in (views or [cls() for cls in VIEWS])}
+
+    def build(self):
+        """Derive every view from the whole graph; returns the number of entities"""
+        derived = 0
+        for view in self.views.values():
+            for entity in view.entities(self.graph):
+                view.derive(self.graph, entity)
+                derived += 1
+        return derived
+
+    def apply(self, added, removed):
+        """
+        Apply a triple delta to the graph and the views.
+
+        added and removed are iterables of triples; the graph is updated
+        in place. Returns the number of entities re-derived.
+        """
+        graph = self.graph
+        added = [t for t in added if t not in graph]
+        removed = [t for t in removed if t in graph]
+        changed = added + removed
+        affected = {name: set() for name in self.views}
+        for name, view in self.views.items():
+            for triple in changed:
+                affected[name] |= view.affected(graph, triple)
+        for triple in removed:
+            graph.remove(triple)
+        for triple in added:
+            graph.add(triple)
+
+        derived = 0
+        for name, view in self.views.items():
+            for triple in changed:
+                affected[name] |= view.affected(graph, triple)
+                if triple[1] in view.predicates:
+                    view.touch(triple[0])
+            for entity in affected[name]:
+                view.derive(graph, entity)
+            derived += len(affected[name])
+        return derived
+
+    def result(self, query):
+        """SPARQL JSON results of the view for a query file stem"""
+        return self.views[query].result(self.graph)
+
+    def results(self):
+        return {name: view.result(self.graph) for name, view in self.views.items()}
+
+    # Persistence
+
+    @staticmethod
+    def exists(state_dir):
+        return (Path(state_dir) / "state.json").exists()
+
+    def save(self, state_dir):
+        """Write the data graph and every entity's facts to state_dir"""
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.graph.serialize(state_dir / "data.nt", format="nt", encoding="utf-8")
+        facts = {
+            name: [[entity.n3(), [[_encode(g), m, v.n3()] for g, m, v in sorted(entity_facts, key=str)]]
+                   for entity, entity_facts in view.facts.items()]
+            for name, view in self.views.items()
+        }
+        (state_dir / "views.json").write_text(json.dumps(facts, ensure_ascii=False), encoding="utf-8")
+        meta = {
+            "views": sorted(self.views),
+            "namespaces": {p: str(n) for p, n in self.graph.namespace_manager.namespaces()},
+        }
+        # state.json last: a state directory without it is incomplete
+        tmp = state_dir / f"state.json.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(tmp, state_dir / "state.json")
+
+    @classmethod
+    def load(cls, state_dir):
+        """
+        Load a saved state. The views are rebuilt from the saved facts,
+        without going over the graph; views missing from the state
+        (added to VIEWS since) are built from the graph.
+        """
+        state_dir = Path(state_dir)
+        meta = json.loads((state_dir / "state.json").read_text(encoding="utf-8"))
+        graph = Graph(bind_namespaces="core")
+        for prefix, namespace in meta["namespaces"].items():
+            graph.bind(prefix, namespace, override=True, replace=True)
+        graph.parse(state_dir / "data.nt", format="nt")
+        views = cls(graph)
+        saved = json.loads((state_dir / "views.json").read_text(encoding="utf-8"))
+        for name, view in views.views.items():
+            if name not in saved:
+                for entity in view.entities(graph):
+                    view.derive(graph, entity)
+                continue
+            for entity, entity_facts in saved[name]:
+                facts = frozenset((_decode(g), m, from_n3(v)) for g, m, v in entity_facts)
+                view.facts[from_n3(entity)] = facts
+                view._add(facts, 1)
+        return views
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the node/edge extraction step of export-to-gephi.py
+
+Compares the old per-node lookup path (get_label/get_type/... plus one
+graph scan per object property) with the single-pass extract_graph()
+on synthetic heritage graphs of growing size.
+
+Usage:
+    python code/benchmark-gexf-extraction.py [max_triples]
+
+Example:
+    python code/benchmark-gexf-extraction.py 200000
+"""
+
+import sys
+import time
+import random
+import importlib.util
+from pathlib import Path
+
+from rdflib import Graph, Literal, RDF, RDFS, URIRef
+from rdflib.namespace import XSD
+
+
+def load_script(name):
+    """Import one of the hyphenated scripts in code/ as a module."""
+    path = Path(__file__).resolve().parent / name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+gephi = load_script("export-to-gephi.py")
+NS = gephi.NS
+
+
+def synthetic_graph(n_triples, seed=42):
+    """Build a heritage-shaped graph with roughly n_triples triples."""
+    rnd = random.Random(seed)
+    g = Graph()
+    n_people = max(n_triples // 12, 10)
+    n_items = max(n_people // 4, 5)
+    n_locations = max(n_people // 50, 3)
+    n_communities = max(n_people // 40, 2)
+
+    locations = [NS[f"Location{i}"] for i in range(n_locations)]
+    communities = [NS[f"Community{i}"] for i in range(n_communities)]
+    instruments = [NS[f"Instrument{i}"] for i in range(n_items)]
+    people = [NS[f"Person{i}"] for i in range(n_people)]
+
+    for i, loc in enumerate(locations):
+        g.add((loc, RDF.type, NS.Location))
+        g.add((loc, RDFS.label, Literal(f"Location {i}", lang="en")))
+    for i, com in enumerate(communities):
+        g.add((com, RDF.type, NS.Community))
+        g.add((com, RDFS.label, Literal(f"Community {i}", lang="en")))
+    for i, ins in enumerate(instruments):
+        g.add((ins, RDF.type, NS.Instrument))
+        g.add((ins, RDFS.label, Literal(f"Instrument {i}", lang="en")))
+        g.add((ins, NS.locatedIn, rnd.choice(locations)))
+        g.add((ins, NS.requiresAccessLevel, Literal(rnd.randint(1, 3), datatype=XSD.integer)))
+    for i, p in enumerate(people):
+        elder = rnd.random() < 0.05
+        g.add((p, RDF.type, NS.TribalElder if elder else NS.Person))
+        g.add((p, RDFS.label, Literal(f"Person {i}", lang="en")))
+        g.add((p, RDFS.label, Literal(f"Şəxs {i}", lang="az")))
+        g.add((p, NS.hasAccessLevel, Literal(3 if elder else rnd.randint(1, 3), datatype=XSD.integer)))
+        g.add((p, NS.memberOfCommunity, rnd.choice(communities)))
+        g.add((p, NS.playsInstrument, rnd.choice(instruments)))
+        if i:
+            g.add((p, NS.mentoredBy, people[rnd.randrange(i)]))
+            g.add((p, NS.approvedBy, people[rnd.randrange(i)]))
+        rec = NS[f"Recording{i}"]
+        g.add((rec, RDF.type, NS.Recording))
+        g.add((rec, NS.performedBy, p))
+        g.add((rec, NS.recordedAt, rnd.choice(locations)))
+    return g
+
+
+# The per-node lookups export-to-gephi.py used before extract_graph()
+
+def get_label(graph, uri):
+    """Get English label for a URI, or use the local name."""
+    labels = list(graph.objects(uri, RDFS.label))
+    for label in labels:
+        if hasattr(label, 'language') and (label.language == 'en' or label.language == ''):
+            return str(label)
+    # Fallback to local name
+    return str(uri).split('#')[-1].split('/')[-1]
+
+
+def get_type(graph, uri):
+    """Get the type(s) of an entity."""
+    types = []
+    for obj in graph.objects(uri, RDF.type):
+        if str(obj).startswith(str(NS)):
+            types.append(str(obj).split('/')[-1])
+    return types
+
+
+def get_access_level(graph, uri):
+    """Get access level if it's a Person."""
+    access = list(graph.objects(uri, NS.hasAccessLevel))
+    if access:
+        return int(access[0])
+    return None
+
+
+def is_elder(graph, uri):
+    """Check if entity is a TribalElder."""
+    return (uri, RDF.type, NS.TribalElder) in graph
+
+
+def legacy_collect(g):
+    """The pre-extract_graph collection path: per-node lookups, one scan per property."""
+    nodes = {}
+    edges = []
+    node_id_map = {}
+    all_subjects = set(g.subjects())
+    all_objects = set()
+    for prop in gephi.OBJECT_PROPERTIES:
+        for obj in g.objects(None, prop):
+            if isinstance(obj, URIRef) and str(obj).startswith(str(NS)):
+                all_objects.add(obj)
+    for uri in all_subjects | all_objects:
+        if str(uri).startswith(str(NS)):
+            node_id_map[uri] = f"n{len(node_id_map)}"
+            types = get_type(g, uri)
+            node_data = {'label': get_label(g, uri), 'types': types}
+            if 'Person' in types or 'TribalElder' in types:
+                node_data['access_level'] = get_access_level(g, uri)
+                node_data['is_elder'] = is_elder(g, uri)
+            nodes[uri] = node_data
+    for prop in gephi.OBJECT_PROPERTIES:
+        for s, o in g.subject_objects(prop):
+            if s in node_id_map and o in node_id_map:
+                edges.append((node_id_map[s], node_id_map[o], prop))
+    return len(nodes), len(edges)
+
+
+def single_pass_collect(g):
+    ex = gephi.extract_graph(g)
+    return len(ex), ex.edge_count
+
+
+def best_of(fn, g, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(g)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == "__main__":
+    max_triples = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    sizes = []
+    size = 1000
+    while size <= max_triples:
+        sizes.append(size)
+        size *= 4
+
+    print("=" * 72)
+    print("GEXF node/edge extraction benchmark (best of 3)")
+    print("=" * 72)
+    print(f"{'triples':>10} {'nodes':>8} {'edges':>8} {'legacy s':>10} {'1-pass s':>10} {'speedup':>8}")
+    print("-" * 72)
+
+    for size in sizes:
+        g = synthetic_graph(size)
+        legacy_time, legacy_counts = best_of(legacy_collect, g)
+        new_time, new_counts = best_of(single_pass_collect, g)
+        if legacy_counts != new_counts:
+            print(f"ERROR: results differ: legacy {legacy_counts} vs single pass {new_counts}")
+            sys.exit(1)
+        print(f"{len(g):>10} {new_counts[0]:>8} {new_counts[1]:>8} "
+              f"{legacy_time:>10.3f} {new_time:>10.3f} {legacy_time / new_time:>7.1f}x")
+
+    print("=" * 72)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for parallel SHACL validation (shacl_parallel.py)
+
+Validates a synthetic heritage graph against the shapes on 1, 2, 4 and 8
+worker processes, in both shard modes, and checks that every run gives
+the same report text as the single-process run.
+
+Usage:
+    python code/benchmark-shacl-parallel.py [triples] [shapes.ttl]
+
+Example:
+    python code/benchmark-shacl-parallel.py 5000 shapes/validation_shapes.ttl
+"""
+
+import sys
+import time
+import importlib.util
+from pathlib import Path
+
+from rdflib import Graph
+
+from graph_loader import load_graph
+import shacl_parallel
+import shacl_report
+
+
+def load_script(name):
+    """Import one of the hyphenated scripts in code/ as a module."""
+    path = Path(__file__).resolve().parent / name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+OPTIONS = dict(allow_infos=True, allow_warnings=True, meta_shacl=False, advanced=True, debug=False)
+
+
+def copy_graph(g):
+    copy = Graph(bind_namespaces="core")
+    for prefix, namespace in g.namespace_manager.namespaces():
+        copy.bind(prefix, namespace, override=True, replace=True)
+    copy.addN((s, p, o, copy) for s, p, o in g)
+    return copy
+
+
+def timed_run(g, shapes_graph, workers, mode):
+    data = copy_graph(g)
+    start = time.perf_counter()
+    conforms, _, text = shacl_parallel.validate_parallel(
+        data, shapes_graph, workers=workers, mode=mode, inference="rdfs", **OPTIONS
+    )
+    return time.perf_counter() - start, conforms, text
+
+
+if __name__ == "__main__":
+    n_triples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    shapes_path = sys.argv[2] if len(sys.argv) > 2 else "shapes/validation_shapes.ttl"
+
+    bench = load_script("benchmark-gexf-extraction.py")
+    g = bench.synthetic_graph(n_triples)
+    g.bind("", bench.NS)
+    shapes_graph = load_graph(shapes_path, format="turtle")
+
+    print("=" * 64)
+    print(f"Parallel SHACL validation: {len(g)} triples, {shapes_path}")
+    print("=" * 64)
+    print(f"{'shard':>8} {'workers':>8} {'seconds':>10} {'speedup':>8} {'results':>8}  same")
+    print("-" * 64)
+
+    baseline_time, baseline_conforms, baseline_text = timed_run(g, shapes_graph, 1, "shapes")
+    for mode in shacl_parallel.SHARD_MODES:
+        for workers in WORKER_COUNTS:
+            if workers == 1:
+                elapsed, conforms, text = baseline_time, baseline_conforms, baseline_text
+            else:
+                elapsed, conforms, text = timed_run(g, shapes_graph, workers, mode)
+            same = conforms == baseline_conforms and text == baseline_text
+            print(f"{mode:>8} {workers:>8} {elapsed:>10.2f} {baseline_time / elapsed:>7.1f}x "
+                  f"{len(shacl_report.split_text(text)):>8}  "
+                  f"{'✓' if same else '✗'}")
+            if not same:
+                print("ERROR: report differs from the single-process run")
+                sys.exit(1)
+
+    print("=" * 64)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite
+
+Generates synthetic heritage datasets of growing size (see
+heritage_generator.py) and times the main pipeline stages on each:
+
+    parse    parsing the main data file with rdflib
+    gexf     extracting the network and streaming it to GEXF
+    shacl    pyshacl validation against each shapes file
+    queries  the whole queries/ suite, in process (sparql_engine.py)
+
+Every stage runs in its own process, so its peak RSS is its own, and
+with the parse cache off (GRAPH_CACHE=0), so parse times are real.
+The results go to a JSON file. With --compare, they are checked against
+an earlier results file, and stages that got slower or bigger by more
+than --threshold are reported as regressions (exit status 1).
+
+Usage:
+    python code/benchmark-suite.py [--sizes N ...] [--violations RATE] [--seed N]
+                                   [--stages parse,gexf,shacl,queries] [--timeout SECONDS]
+                                   [--query-timeout SECONDS]
+                                   [--data-dir DIR] [--output FILE]
+                                   [--compare OLD.json] [--threshold FRACTION]
+
+Example:
+    python code/benchmark-suite.py --sizes 1e3 1e4 1e5 --stages parse,gexf,queries
+    python code/benchmark-suite.py --sizes 1e3 1e4 --compare benchmarks/baseline.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+STAGES = ("parse", "gexf", "shacl", "queries")
+
+SHAPES_FILES = ("shapes/validation_shapes.ttl", "validation/temporal-constraints.shacl")
+
+# Figures compared by --compare, per stage
+TRACKED = ("seconds", "peak_rss_mb")
+
+
+def load_script(name):
+    """Import one of the hyphenated scripts in code/ as a module."""
+    path = Path(__file__).resolve().parent / name
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# Stages, each run in a child process; each returns a dict of figures
+
+def stage_parse(data_dir, manifest):
+    from rdflib import Graph
+
+    start = time.perf_counter()
+    g = Graph().parse(data_dir / manifest["data_file"])
+    return {"seconds": time.perf_counter() - start, "triples": len(g)}
+
+
+def stage_gexf(data_dir, manifest):
+    from rdflib import Graph
+
+    gephi = load_script("export-to-gephi.py")
+    start = time.perf_counter()
+    g = Graph().parse(data_dir / manifest["data_file"])
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ex = gephi.extract_graph(g)
+    with tempfile.TemporaryDirectory() as tmp:
+        nodes, edges = gephi.write_gexf_stream(gephi.iter_nodes(ex), gephi.iter_edges(ex),
+                                               os.path.join(tmp, "network.gexf"))
+    return {"seconds": time.perf_counter() - start, "load_seconds": load_seconds,
+            "nodes": nodes, "edges": edges}
+
+
+def stage_shacl(data_dir, manifest):
+    from pyshacl import validate
+    from rdflib import Graph
+    from rdflib.namespace import RDF, SH
+
+    start = time.perf_counter()
+    data_graph = Graph(bind_namespaces="core").parse(data_dir / manifest["data_file"])
+    load_seconds = time.perf_counter() - start
+
+    total = 0.0
+    per_shapes = {}
+    for shapes_path in SHAPES_FILES:
+        shapes_graph = Graph().parse(ROOT / shapes_path, format="turtle")
+        start = time.perf_counter()
+        conforms, report_graph, _ = validate(
+            data_graph, shacl_graph=shapes_graph, inference="rdfs", abort_on_first=False,
+            allow_infos=True, allow_warnings=True, meta_shacl=False, advanced=True, debug=False,
+        )
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        per_shapes[Path(shapes_path).name] = {
+            "seconds": round(elapsed, 4),
+            "conforms": conforms,
+            "results": len(set(report_graph.subjects(RDF.type, SH.ValidationResult))),
+        }
+    return {"seconds": total, "load_seconds": load_seconds, "shapes": per_shapes}
+
+
+def stage_queries(data_dir, manifest):
+    import sparql_engine
+
+    # Some queries (q16's cross product of nine subqueries, for one) grow
+    # much faster than the data; a per-query limit keeps them from eating
+    # the whole stage budget
+    query_timeout = float(os.environ.get("BENCHMARK_QUERY_TIMEOUT", "0")) or None
+
+    start = time.perf_counter()
+    dataset = sparql_engine.load_dataset(data_dir)
+    load_seconds = time.perf_counter() - start
+
+    cache = sparql_engine.QueryCache()
+    total = 0.0
+    per_query = {}
+    failed = timed_out = 0
+    for rq_file in sorted((ROOT / "queries").glob("*.rq")):
+        status = "ok"
+        rows = None
+        start = time.perf_counter()
+        try:
+            with sparql_engine.evaluation_deadline(query_timeout):
+                result = sparql_engine.execute(dataset, rq_file.read_text(encoding="utf-8"), cache)
+            rows = len(result.get("results", {}).get("bindings", []))
+        except sparql_engine.QueryTimeout:
+            status = "timeout"
+            timed_out += 1
+        except Exception as e:
+            status = "error"
+            failed += 1
+            print(f"ERROR in {rq_file.name}: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        per_query[rq_file.stem] = {"status": status, "seconds": round(elapsed, 4), "rows": rows}
+    return {"seconds": total, "load_seconds": load_seconds, "failed": failed,
+            "timed_out": timed_out, "queries": per_query}
+
+
+STAGE_FUNCTIONS = {
+    "parse": stage_parse,
+    "gexf": stage_gexf,
+    "shacl": stage_shacl,
+    "queries": stage_queries,
+}
+
+
+def child_main(stage, data_dir):
+    """Run one stage in this process and print its figures as JSON"""
+    data_dir = Path(data_dir)
+    manifest = json.loads((data_dir / "manifest.json").read_text(encoding="utf-8"))
+    base_rss = peak_rss_mb()
+    cpu_start = time.process_time()
+    figures = STAGE_FUNCTIONS[stage](data_dir, manifest)
+    figures["cpu_seconds"] = time.process_time() - cpu_start
+    figures["base_rss_mb"] = base_rss
+    figures["peak_rss_mb"] = peak_rss_mb()
+    for key in ("seconds", "load_seconds", "cpu_seconds"):
+        if key in figures:
+            figures[key] = round(figures[key], 4)
+    print(json.dumps(figures))
+
+
+def run_stage(stage, data_dir, timeout, query_timeout):
+    """Run a stage in a child process; returns its figures with a status"""
+    env = dict(os.environ, GRAPH_CACHE="0", BENCHMARK_QUERY_TIMEOUT=str(query_timeout))
+    try:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", stage, str(data_dir)],
+            capture_output=True, text=True, timeout=timeout, env=env, cwd=ROOT,
+        )
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout", "timeout_s": timeout}
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        return {"status": "error", "error": error[0]}
+    figures = json.loads(proc.stdout.strip().splitlines()[-1])
+    figures["status"] = "ok"
+    return figures
+
+
+def dataset_for(size, violations, seed, data_root):
+    """Directory of a generated dataset, generating it if needed"""
+    from heritage_generator import HeritageGenerator
+
+    data_dir = Path(data_root) / f"{size}-v{violations}-s{seed}"
+    manifest_path = data_dir / "manifest.json"
+    if manifest_path.exists():
+        return data_dir, json.loads(manifest_path.read_text(encoding="utf-8")), 0.0
+    start = time.perf_counter()
+    manifest = HeritageGenerator(size, violations, seed).write(data_dir)
+    return data_dir, manifest, time.perf_counter() - start
+
+
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    for package in ("rdflib", "pyshacl", "numpy"):
+        try:
+            info[package] = __import__(package).__version__
+        except ImportError:
+            info[package] = None
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                        capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        info["commit"] = None
+    return info
+
+
+def compare(results, baseline, threshold):
+    """Print regressions of results against baseline; returns their number"""
+    old = {(run["size"], stage): figures
+           for run in baseline["runs"] for stage, figures in run["stages"].items()}
+    regressions = 0
+    print(f"Comparing with {baseline.get('created', 'baseline')} "
+          f"(commit {baseline.get('environment', {}).get('commit')}), threshold {threshold:.0%}")
+    for run in results["runs"]:
+        for stage, figures in run["stages"].items():
+            before = old.get((run["size"], stage))
+            if not before or before.get("status") != "ok" or figures.get("status") != "ok":
+                continue
+            for key in TRACKED:
+                a, b = before.get(key), figures.get(key)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a
+                if change > threshold:
+                    regressions += 1
+                    print(f"  ✗ {run['size']:>10} {stage:<8} {key}: {a} -> {b} ({change:+.0%})")
+    if not regressions:
+        print("  ✓ No regressions")
+    return regressions
+
+
+def print_row(size, stage, figures):
+    if figures["status"] != "ok":
+        print(f"{size:>10} {stage:<8} {figures['status']}: {figures.get('error', '')}")
+        return
+    extra = ""
+    if stage == "parse":
+        extra = f"{figures['triples']} triples"
+    elif stage == "gexf":
+        extra = f"{figures['nodes']} nodes, {figures['edges']} edges"
+    elif stage == "shacl":
+        extra = ", ".join(f"{name}: {s['results']} results" for name, s in figures["shapes"].items())
+    elif stage == "queries":
+        extra = (f"{len(figures['queries'])} queries, {figures['failed']} failed, "
+                 f"{figures['timed_out']} timed out")
+    load = f"{figures['load_seconds']:>8.2f}" if "load_seconds" in figures else f"{'':>8}"
+    print(f"{size:>10} {stage:<8} {figures['seconds']:>9.3f} {load} {figures['peak_rss_mb']:>9.1f}  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic datasets")
+    parser.add_argument("--sizes", nargs="+", default=["1e3", "1e4"],
+                        help="dataset sizes in triples (default: 1e3 1e4)")
+    parser.add_argument("--violations", type=float, default=0.05, help="violation rate (default: 0.05)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"comma-separated stages to run (default: {','.join(STAGES)})")
+    parser.add_argument("--timeout", type=float, default=1800, help="per-stage timeout in seconds")
+    parser.add_argument("--query-timeout", type=float, default=60,
+                        help="per-query timeout in seconds for the queries stage (default: 60, 0 for none)")
+    parser.add_argument("--data-dir", default="benchmarks/data", help="where generated datasets are kept")
+    parser.add_argument("--output", help="results file (default: benchmarks/results-<time>.json)")
+    parser.add_argument("--compare", metavar="OLD", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown or growth counted as a regression (default: 0.2)")
+    parser.add_argument("--child", nargs=2, metavar=("STAGE", "DATA_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(*args.child)
+        return 0
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    generate = load_script("generate-dataset.py")
+    sizes = [generate.triple_count(s) for s in args.sizes]
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "violation_rate": args.violations,
+        "seed": args.seed,
+        "runs": [],
+    }
+
+    print("=" * 78)
+    print(f"Benchmark suite: sizes {', '.join(map(str, sizes))}; stages {', '.join(stages)}")
+    print("=" * 78)
+    print(f"{'triples':>10} {'stage':<8} {'seconds':>9} {'load s':>8} {'peak MB':>9}")
+    print("-" * 78)
+    for size in sizes:
+        data_dir, manifest, generate_seconds = dataset_for(size, args.violations, args.seed, args.data_dir)
+        run = {
+            "size": size,
+            "triples": manifest["triples"],
+            "claims": manifest["claims"]["claims"],
+            "violations_injected": manifest["violations_total"],
+            "generate_seconds": round(generate_seconds, 3),
+            "stages": {},
+        }
+        for stage in stages:
+            figures = run_stage(stage, data_dir, args.timeout, args.query_timeout)
+            run["stages"][stage] = figures
+            print_row(size, stage, figures)
+        results["runs"].append(run)
+    print("=" * 78)
+
+    output = Path(args.output or f"benchmarks/results-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"Results saved to: {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
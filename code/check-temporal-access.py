@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Temporal Access Check
+Finds recordings made after their instrument's restriction date by a
+performer whose access level is below the instrument's, using the
+vectorized engine in temporal_access.py instead of a SPARQL join.
+
+The result is either a SHACL validation report for
+:RecordingTemporalAccessShape (text, Turtle or JSON), identical to the
+one pyshacl gives for that shape, or a SPARQL JSON result set.
+
+Usage:
+    python code/check-temporal-access.py <data.ttl> [--format text|turtle|json|sparql-json]
+                                         [--shapes <shapes.shacl>] [--inference none|rdfs]
+                                         [--output <file>] [--verify]
+
+Example:
+    python code/check-temporal-access.py data/heritage_complete.ttl
+    python code/check-temporal-access.py data/heritage_complete.ttl --format sparql-json --output temporal.json --verify
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+try:
+    from rdflib.namespace import SH
+except ImportError:
+    print("ERROR: rdflib not installed!")
+    print("Install it with: pip install rdflib pyshacl numpy")
+    sys.exit(1)
+
+from graph_loader import load_graph
+import shacl_parallel
+import shacl_report
+import temporal_access
+
+FORMATS = ("text", "turtle", "json", "sparql-json")
+
+
+def sparql_rows(data_graph, shapes_graph):
+    """The shape's own SPARQL, run once over all recordings, for comparison"""
+    constraint = shapes_graph.value(temporal_access.TEMPORAL_SHAPE, SH.sparql)
+    select = str(shapes_graph.value(constraint, SH.select)).replace("$this", "?recording")
+    select = select.replace("WHERE {", "WHERE {\n?recording a :Recording .", 1)
+    prefixes = "".join(f"PREFIX {p}: <{n}>\n" for p, n in shapes_graph.namespace_manager.namespaces())
+    return {tuple(row) for row in data_graph.query(prefixes + select)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized temporal access check")
+    parser.add_argument("data", help="data file")
+    parser.add_argument("--format", choices=FORMATS, default="text")
+    parser.add_argument("--shapes", default="validation/temporal-constraints.shacl",
+                        help="shapes file holding :RecordingTemporalAccessShape (for report formats)")
+    parser.add_argument("--inference", choices=["none", "rdfs"], default="rdfs",
+                        help="RDFS inference before the check, as run-shacl-validation.py does (default)")
+    parser.add_argument("--output", help="write the result here instead of stdout")
+    parser.add_argument("--verify", action="store_true",
+                        help="also run the shape's SPARQL with rdflib and compare the rows")
+    args = parser.parse_args()
+
+    for path in (args.data, args.shapes):
+        if not Path(path).exists():
+            print(f"ERROR: File not found: {path}")
+            sys.exit(1)
+
+    print(f"Loading data from: {args.data}", file=sys.stderr)
+    data_graph = load_graph(args.data, bind_namespaces="core")
+    shapes_graph = load_graph(args.shapes, format="turtle")
+    if (temporal_access.TEMPORAL_SHAPE, None, None) not in shapes_graph:
+        print(f"ERROR: {args.shapes} does not define :RecordingTemporalAccessShape")
+        sys.exit(1)
+    shacl_parallel.run_inference(data_graph, args.inference)
+
+    start = time.perf_counter()
+    rows = temporal_access.find_violations(data_graph)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(rows)} violating rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+    if args.format == "sparql-json":
+        output = json.dumps(temporal_access.to_sparql_json(rows), indent=2, ensure_ascii=False)
+    else:
+        part = temporal_access.shacl_report(rows, data_graph, shapes_graph)
+        conforms, report_graph, report_text = shacl_report.merge([part])
+        if args.format == "text":
+            output = report_text
+        elif args.format == "turtle":
+            output = report_graph.serialize(format="turtle")
+        else:
+            output = json.dumps(shacl_report.report_to_json(report_graph), indent=2, ensure_ascii=False)
+
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+        print(f"Result saved to: {args.output}", file=sys.stderr)
+    else:
+        sys.stdout.write(output if output.endswith("\n") else output + "\n")
+
+    if args.verify:
+        start = time.perf_counter()
+        expected = sparql_rows(data_graph, shapes_graph)
+        sparql_elapsed = time.perf_counter() - start
+        same = expected == set(rows)
+        print(f"{'✓' if same else '✗'} SPARQL gives {len(expected)} rows in {sparql_elapsed * 1000:.1f} ms"
+              f"{'' if same else ' (different rows!)'}", file=sys.stderr)
+        if not same:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
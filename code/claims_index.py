@@ -0,0 +1,290 @@
+"""
+Index of contested claims across the three Question 2 representations.
+
+The conflict queries (q1-reification, q2-named-graphs, q3-rdfstar) find
+disagreeing claims by joining the claim set with itself, which is
+quadratic in the number of claims per ritual. This module instead reads
+claims from any of the three representations into one normalized table
+of rows (subject, predicate, object, source, confidence, date) and
+groups them by (subject, predicate) as they are added:
+
+    reification    a rdf:Statement with rdf:subject/predicate/object
+    named-graph    each triple in a named graph; the graph's :source,
+                   :confidence and :dateRecorded describe it
+    rdf-star       << s p o >> annotated with :source etc.; every
+                   annotation block is a claim of its own
+
+A (subject, predicate) pair is contested when its claims name more than
+one object. Adding or removing a claim touches only its own group, so
+the conflict set is kept up to date in constant time per claim and a
+full report is linear in the number of claims.
+
+Files are indexed by content hash. Adding a file again is a no-op while
+it is unchanged; if it changed, its old rows are replaced. The whole
+index can be saved to and loaded from a JSON file.
+
+Example:
+    index = ClaimIndex()
+    index.add_file("data/contested-claims-reification.ttl")
+    for conflict in index.conflicts():
+        print(conflict["subject_label"], [p["object_label"] for p in conflict["positions"]])
+"""
+
+import json
+import os
+from collections import Counter, defaultdict, namedtuple
+from pathlib import Path
+
+from rdflib import Dataset, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import RDF, RDFS
+from rdflib.util import from_n3
+
+import graph_loader
+import rdfstar
+
+NS = Namespace("http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/")
+
+REPRESENTATIONS = ("reification", "named-graph", "rdf-star")
+
+Claim = namedtuple("Claim", "subject predicate object source confidence date representation id")
+
+
+def _number(term):
+    try:
+        return float(term.toPython()) if term is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(term):
+    return str(term) if term is not None else None
+
+
+def reified_claims(graph):
+    """Claims made with rdf:subject/predicate/object (reification, lowered RDF-star)"""
+    for node in set(graph.subjects(RDF.subject, None)):
+        s = graph.value(node, RDF.subject)
+        p = graph.value(node, RDF.predicate)
+        o = graph.value(node, RDF.object)
+        if s is None or p is None or o is None:
+            continue
+        if (node, RDF.type, RDF.Statement) in graph:
+            representation, claim_id = "reification", str(node)
+        else:
+            # A lowered quoted triple is a fresh blank node on every parse
+            representation, claim_id = "rdf-star", None
+        confidence = graph.value(node, NS.confidence)
+        date = graph.value(node, NS.dateRecorded)
+        for source in sorted(graph.objects(node, NS.source)) or [None]:
+            yield Claim(s, p, o, source, _number(confidence), _text(date), representation,
+                        claim_id or f"<< {s.n3()} {p.n3()} {o.n3()} >> {source} {date}")
+
+
+def named_graph_claims(dataset):
+    """Claims made by putting a triple in a named graph described by :source"""
+    default = dataset.default_graph
+    for graph in dataset.graphs():
+        name = graph.identifier
+        if graph is default or name == default.identifier:
+            continue
+
+        def describe(p):
+            value = graph.value(name, p)
+            return value if value is not None else default.value(name, p)
+
+        source = describe(NS.source)
+        if source is None:
+            continue
+        triples = sorted((s, p, o) for s, p, o in graph if s != name)
+        for i, (s, p, o) in enumerate(triples):
+            yield Claim(s, p, o, source, _number(describe(NS.confidence)), _text(describe(NS.dateRecorded)),
+                        "named-graph", str(name) if len(triples) == 1 else f"{name}#{i}")
+
+
+def read_file(path):
+    """(claims, labels) of one RDF file, whichever representation it uses"""
+    path = Path(path)
+    format = graph_loader.guess_format(path)
+    graphs = []
+    claims = []
+    if format in ("trig", "nquads"):
+        dataset = graph_loader.parse_file(Dataset(), path, format)
+        claims.extend(named_graph_claims(dataset))
+        graphs.extend(dataset.graphs())
+    else:
+        text = path.read_text(encoding="utf-8") if format == "turtle" else ""
+        if rdfstar.has_rdf_star(text):
+            graph = Graph().parse(data=rdfstar.lower_turtle(text, per_occurrence=True), format="turtle",
+                                  publicID=path.resolve().as_uri())
+        else:
+            graph = graph_loader.load_graph(path, format=format)
+        graphs.append(graph)
+    for graph in graphs:
+        claims.extend(reified_claims(graph))
+
+    wanted = {t for c in claims for t in (c.subject, c.predicate, c.object, c.source) if t is not None}
+    labels = {}
+    for graph in graphs:
+        for s, label in graph.subject_objects(RDFS.label):
+            if s in wanted and label.language in ("en", None) and (s not in labels or label.language == "en"):
+                labels[s] = str(label)
+    return claims, labels
+
+
+class ClaimIndex:
+    """Claims grouped by (subject, predicate), with the contested groups tracked"""
+
+    def __init__(self):
+        self.rows = {}                                      # (file, claim id) -> Claim
+        self.files = {}                                     # file -> {"sha256", "ids"}
+        self.groups = defaultdict(lambda: defaultdict(set))  # (s, p) -> object -> row keys
+        self.contested = set()                              # (s, p) with more than one object
+        self.labels = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, file, claim):
+        """Add (or replace) one claim; returns its (subject, predicate) key"""
+        row = (file, claim.id)
+        if row in self.rows:
+            self.remove(row)
+        self.rows[row] = claim
+        key = (claim.subject, claim.predicate)
+        self.groups[key][claim.object].add(row)
+        if len(self.groups[key]) > 1:
+            self.contested.add(key)
+        return key
+
+    def remove(self, row):
+        """Remove one claim by its (file, claim id); returns its key"""
+        claim = self.rows.pop(row)
+        key = (claim.subject, claim.predicate)
+        group = self.groups[key]
+        group[claim.object].discard(row)
+        if not group[claim.object]:
+            del group[claim.object]
+        if len(group) < 2:
+            self.contested.discard(key)
+        if not group:
+            del self.groups[key]
+        return key
+
+    def add_file(self, path, force=False):
+        """
+        Index the claims of an RDF file.
+
+        Returns the set of (subject, predicate) keys whose claims from
+        this file differ from those of the last time it was added (all
+        of its keys the first time), or None if the file is unchanged.
+        Claims are compared without their ids, which for blank nodes
+        differ on every parse.
+        """
+        path = str(Path(path).resolve())
+        digest = graph_loader.file_hash(path)
+        known = self.files.get(path)
+        if known and known["sha256"] == digest and not force:
+            return None
+        old = defaultdict(Counter)
+        if known:
+            for claim_id in known["ids"]:
+                row = (path, claim_id)
+                if row in self.rows:
+                    claim = self.rows[row]
+                    old[self.remove(row)][claim[:-1]] += 1
+        claims, labels = read_file(path)
+        new = defaultdict(Counter)
+        for claim in claims:
+            new[self.add(path, claim)][claim[:-1]] += 1
+        self.labels.update(labels)
+        self.files[path] = {"sha256": digest, "ids": [c.id for c in claims]}
+        return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+    def label(self, term):
+        if term is None:
+            return None
+        return self.labels.get(term) or str(term).rsplit("/", 1)[-1].rsplit("#", 1)[-1]
+
+    def conflicts(self, keys=None):
+        """Contested groups (all, or those among keys) as report dicts, sorted by label"""
+        keys = self.contested if keys is None else [k for k in keys if k in self.contested]
+        report = []
+        for key in keys:
+            subject, predicate = key
+            positions = []
+            for obj, rows in self.groups[key].items():
+                claims = sorted((self.rows[row] for row in rows),
+                                key=lambda c: (-(c.confidence or 0), str(c.source), c.representation))
+                positions.append({
+                    "object": str(obj),
+                    "object_label": self.label(obj),
+                    "sources": sorted({self.label(c.source) for c in claims if c.source is not None}),
+                    "max_confidence": max((c.confidence for c in claims if c.confidence is not None), default=None),
+                    "claims": [{
+                        "source": _text(c.source),
+                        "source_label": self.label(c.source),
+                        "confidence": c.confidence,
+                        "date": c.date,
+                        "representation": c.representation,
+                        "id": c.id,
+                    } for c in claims],
+                })
+            positions.sort(key=lambda p: (-(p["max_confidence"] or 0), p["object_label"]))
+            report.append({
+                "subject": str(subject),
+                "subject_label": self.label(subject),
+                "predicate": str(predicate),
+                "predicate_label": self.label(predicate),
+                "positions": positions,
+            })
+        report.sort(key=lambda c: (c["subject_label"], c["predicate_label"]))
+        return report
+
+    def by_source(self):
+        """Claim count and confidence range per source and representation"""
+        stats = {}
+        for claim in self.rows.values():
+            entry = stats.setdefault((claim.source, claim.representation), {
+                "source": _text(claim.source), "source_label": self.label(claim.source),
+                "representation": claim.representation, "claims": 0,
+                "confidences": [],
+            })
+            entry["claims"] += 1
+            if claim.confidence is not None:
+                entry["confidences"].append(claim.confidence)
+        result = []
+        for entry in stats.values():
+            values = entry.pop("confidences")
+            entry["avg_confidence"] = round(sum(values) / len(values), 4) if values else None
+            entry["min_confidence"] = min(values, default=None)
+            entry["max_confidence"] = max(values, default=None)
+            result.append(entry)
+        result.sort(key=lambda e: (-e["claims"], str(e["source_label"]), e["representation"]))
+        return result
+
+    # Persistence
+
+    def save(self, path):
+        rows = [[file] + [t.n3() if isinstance(t, (URIRef, Literal)) else t for t in claim]
+                for (file, _), claim in self.rows.items()]
+        data = {
+            "files": self.files,
+            "rows": rows,
+            "labels": {term.n3(): label for term, label in self.labels.items()},
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        index = cls()
+        index.files = data["files"]
+        index.labels = {from_n3(term): label for term, label in data["labels"].items()}
+        for file, s, p, o, source, confidence, date, representation, claim_id in data["rows"]:
+            index.add(file, Claim(from_n3(s), from_n3(p), from_n3(o), from_n3(source) if source else None,
+                                  confidence, date, representation, claim_id))
+        return index
@@ -4,229 +4,526 @@ Export RDF data to GEXF format for Gephi visualization.
 
 This script converts the heritage knowledge base to a graph format
 that can be imported into Gephi for network visualization.
+
+By default the GEXF document is streamed straight to the output file,
+one node/edge element at a time, so memory use does not grow with the
+size of the XML. Use --dom for the old ElementTree + minidom writer.
+
+The data may also be a snapshot directory made by build-snapshot.py,
+which is read through its memory-mapped indexes instead of parsed.
+
+Large networks can be cut down before they are written: to some object
+properties (--property), to some node types (--type), to the k-hop
+neighbourhood of seed entities (--seed, --hops) and to a connected
+sample of a given number of nodes (--sample). With --layout the nodes
+also get viz:position coordinates from a force-directed layout (see
+graph_layout.py), so Gephi can show the network without running a
+layout of its own.
+
+With --format the same network is written as GraphML, or as node and
+edge tables in Parquet, Arrow or CSV for pandas, DuckDB and other
+analytics tools (see graph_tables.py).
 """
 
 import sys
-from rdflib import Graph, Namespace, RDF, RDFS, URIRef
+import argparse
+from array import array
+from rdflib import Namespace, RDF, RDFS, URIRef
 from rdflib.namespace import XSD
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+import graph_analytics
+import graph_layout
+import graph_snapshot
+import graph_tables
+import instrumentation
+from graph_loader import load_graph
+from label_index import LabelIndex
 
 # Namespace
 NS = Namespace("http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/")
 
-def get_label(graph, uri):
-    """Get English label for a URI, or use the local name."""
-    labels = list(graph.objects(uri, RDFS.label))
-    for label in labels:
-        if hasattr(label, 'language') and (label.language == 'en' or label.language == ''):
-            return str(label)
-    # Fallback to local name
-    return str(uri).split('#')[-1].split('/')[-1]
-
-def get_type(graph, uri):
-    """Get the type(s) of an entity."""
-    types = []
-    for obj in graph.objects(uri, RDF.type):
-        if str(obj).startswith(str(NS)):
-            types.append(str(obj).split('/')[-1])
-    return types
-
-def get_access_level(graph, uri):
-    """Get access level if it's a Person."""
-    access = list(graph.objects(uri, NS.hasAccessLevel))
-    if access:
-        return int(access[0])
-    return None
-
-def is_elder(graph, uri):
-    """Check if entity is a TribalElder."""
-    return (uri, RDF.type, NS.TribalElder) in graph
-
-def export_to_gexf(data_file, output_file, include_properties=None):
+GEXF_NS = "http://www.gexf.net/1.3"
+VIZ_NS = "http://www.gexf.net/1.3/viz"
+
+# Object properties to include (relationships)
+OBJECT_PROPERTIES = [
+    NS.hasRole,
+    NS.memberOfCommunity,
+    NS.playsInstrument,
+    NS.knowsMusicalWork,
+    NS.knowsStory,
+    NS.performedInRitual,
+    NS.caresFor,
+    NS.hasCompetency,
+    NS.mentoredBy,
+    NS.approvedBy,
+    NS.performedBy,
+    NS.usesInstrument,
+    NS.recordedAt,
+    NS.locatedIn,
+]
+
+def viz_size(node_data):
+    """Node size for Gephi, based on type."""
+    if node_data['type'] == 'Person':
+        return '15'
+    elif node_data['type'] == 'TribalElder':
+        return '20'
+    elif node_data['type'] == 'Location':
+        return '12'
+    elif node_data['type'] == 'Community':
+        return '14'
+    return '10'
+
+def viz_color(node_data):
+    """Node (r, g, b) color for Gephi, based on type."""
+    if node_data['type'] == 'Person' or node_data['type'] == 'TribalElder':
+        return ('100', '150', '200')
+    elif node_data['type'] == 'Location':
+        return ('200', '100', '100')
+    elif node_data['type'] == 'Community':
+        return ('150', '200', '100')
+    elif node_data['type'] == 'Instrument' or 'Instrument' in node_data['types']:
+        return ('200', '200', '100')
+    return ('180', '180', '180')
+
+class GraphExtract:
     """
-    Export RDF data to GEXF format.
-    
-    Args:
-        data_file: Path to RDF data file (TTL format)
-        output_file: Path to output GEXF file
-        include_properties: List of property URIs to include as edges (None = all object properties)
+    Nodes and edges of the heritage graph in compact form.
+
+    Nodes are numbered 0..n-1 as they are added; extract_graph() then
+    renumbers them in URI order, so a node gets the same number in every
+    export of the same data, whatever rdflib's hash order. Per-node
+    attributes live in parallel lists/arrays indexed by node number and
+    edges are stored as three integer columns (source, target, property
+    index into object_properties).
     """
-    print(f"Loading RDF data from: {data_file}")
-    g = Graph()
-    g.parse(data_file, format="turtle")
-    print(f"Loaded {len(g)} triples")
-    
-    # Collect all nodes and edges
-    nodes = {}
-    edges = []
-    node_id_map = {}
-    next_id = 0
-    
-    # Object properties to include (relationships)
-    object_properties = [
-        NS.hasRole,
-        NS.memberOfCommunity,
-        NS.playsInstrument,
-        NS.knowsMusicalWork,
-        NS.knowsStory,
-        NS.performedInRitual,
-        NS.caresFor,
-        NS.hasCompetency,
-        NS.mentoredBy,
-        NS.approvedBy,
-        NS.performedBy,
-        NS.usesInstrument,
-        NS.recordedAt,
-        NS.locatedIn,
-    ]
-    
-    # Collect all entities (nodes)
-    print("Collecting nodes...")
-    all_subjects = set(g.subjects())
-    all_objects = set()
-    
-    for prop in object_properties:
-        for obj in g.objects(None, prop):
-            if isinstance(obj, URIRef) and str(obj).startswith(str(NS)):
-                all_objects.add(obj)
-    
-    all_nodes = all_subjects | all_objects
-    
-    for uri in all_nodes:
-        if str(uri).startswith(str(NS)):
-            node_id = f"n{next_id}"
-            node_id_map[uri] = node_id
-            next_id += 1
-            
-            label = get_label(g, uri)
-            types = get_type(g, uri)
-            node_type = types[0] if types else "Entity"
-            
-            node_data = {
-                'id': node_id,
-                'label': label,
-                'uri': str(uri),
-                'type': node_type,
-                'types': types,
-            }
-            
-            # Add Person-specific attributes
-            if NS.Person in types or NS.TribalElder in types:
-                access_level = get_access_level(g, uri)
-                if access_level is not None:
-                    node_data['access_level'] = access_level
-                if is_elder(g, uri):
-                    node_data['is_elder'] = True
-            
-            nodes[uri] = node_data
-    
-    print(f"Found {len(nodes)} nodes")
-    
-    # Collect edges (relationships)
-    print("Collecting edges...")
-    for prop in object_properties:
-        prop_name = str(prop).split('/')[-1]
-        for s, o in g.subject_objects(prop):
-            if s in node_id_map and o in node_id_map:
-                edges.append({
-                    'source': node_id_map[s],
-                    'target': node_id_map[o],
-                    'type': prop_name,
-                    'label': prop_name
-                })
-    
-    print(f"Found {len(edges)} edges")
-    
-    # Create GEXF XML
-    print("Creating GEXF file...")
+
+    def __init__(self, object_properties):
+        self.object_properties = list(object_properties)
+        self.prop_names = [str(p).split('/')[-1] for p in self.object_properties]
+        self.index = {}                       # URI -> node number
+        self.uris = []
+        self.labels = []                      # preferred label or None
+        self.label_index = LabelIndex()
+        self.types = []                       # list of local type names
+        self.access_level = array('q')        # -1 = no access level
+        self.is_elder = bytearray()
+        self.edge_source = array('l')
+        self.edge_target = array('l')
+        self.edge_prop = array('B')
+
+    def node(self, uri):
+        """Return the node number for uri, adding the node if needed."""
+        i = self.index.get(uri)
+        if i is None:
+            i = len(self.uris)
+            self.index[uri] = i
+            self.uris.append(uri)
+            self.labels.append(None)
+            self.types.append([])
+            self.access_level.append(-1)
+            self.is_elder.append(0)
+        return i
+
+    def __len__(self):
+        return len(self.uris)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_source)
+
+    def subgraph(self, nodes):
+        """
+        A new GraphExtract of the given node numbers (in that order) and
+        the edges between them.
+        """
+        sub = GraphExtract(self.object_properties)
+        sub.label_index = self.label_index
+        for i in nodes:
+            sub.node(self.uris[i])
+            sub.labels[-1] = self.labels[i]
+            sub.types[-1] = self.types[i]
+            sub.access_level[-1] = self.access_level[i]
+            sub.is_elder[-1] = self.is_elder[i]
+        new = np.full(len(self), -1, dtype=np.int64)
+        new[np.asarray(nodes, dtype=np.int64)] = np.arange(len(nodes))
+        source = new[np.asarray(self.edge_source, dtype=np.int64)]
+        target = new[np.asarray(self.edge_target, dtype=np.int64)]
+        keep = (source >= 0) & (target >= 0)
+        sub.edge_source = array('l', source[keep].tolist())
+        sub.edge_target = array('l', target[keep].tolist())
+        sub.edge_prop = array('B', np.asarray(self.edge_prop, dtype=np.uint8)[keep].tolist())
+        return sub
+
+def extract_graph(g, object_properties=OBJECT_PROPERTIES):
+    """
+    Build a GraphExtract from a single pass over the triples of g.
+
+    Every heritage (NS) subject becomes a node, as does every NS object
+    of one of object_properties. Labels, types, access levels and the
+    TribalElder flag are picked up on the way, so no per-node lookups
+    are needed afterwards. Labels go into ex.label_index, and each node
+    gets its preferred one (English, untagged, then Azerbaijani). Nodes
+    are numbered in URI order, each node's types are sorted (the first
+    is its primary type) and edges are sorted by source, target and
+    property, so the result does not depend on the order of the triples.
+    """
+    ns = str(NS)
+    ex = GraphExtract(object_properties)
+    prop_index = {p: i for i, p in enumerate(ex.object_properties)}
+    node = ex.node
+    add_label = ex.label_index.add
+    label_p, type_p, access_p, elder = RDFS.label, RDF.type, NS.hasAccessLevel, NS.TribalElder
+
+    for s, p, o in g.triples((None, None, None)):
+        if not (isinstance(s, URIRef) and s.startswith(ns)):
+            continue
+        i = node(s)
+        if p == label_p:
+            add_label(s, o)
+        elif p == type_p:
+            if o.startswith(ns):
+                ex.types[i].append(o.split('/')[-1])
+                if o == elder:
+                    ex.is_elder[i] = 1
+        elif p == access_p:
+            if ex.access_level[i] == -1:
+                try:
+                    ex.access_level[i] = int(o)
+                except (ValueError, TypeError, OverflowError):
+                    # Not an integer ("high", a URI, 2**70): the node keeps no access level
+                    pass
+        else:
+            k = prop_index.get(p)
+            if k is not None and isinstance(o, URIRef) and o.startswith(ns):
+                ex.edge_source.append(i)
+                ex.edge_target.append(node(o))
+                ex.edge_prop.append(k)
+    ex.labels = [ex.label_index.preferred(uri) for uri in ex.uris]
+    for types in ex.types:
+        types.sort()
+    order = sorted(range(len(ex)), key=ex.uris.__getitem__)
+    if order != list(range(len(ex))):
+        ex = ex.subgraph(order)
+    source = np.asarray(ex.edge_source, dtype=np.int64)
+    target = np.asarray(ex.edge_target, dtype=np.int64)
+    prop = np.asarray(ex.edge_prop, dtype=np.uint8)
+    edges = np.lexsort((prop, target, source))
+    ex.edge_source = array('l', source[edges].tolist())
+    ex.edge_target = array('l', target[edges].tolist())
+    ex.edge_prop = array('B', prop[edges].tolist())
+    return ex
+
+def resolve_node(ex, name):
+    """Node number of a full URI or a local name in the heritage namespace"""
+    for uri in (URIRef(name), NS[name]):
+        if uri in ex.index:
+            return ex.index[uri]
+    raise ValueError(f"Unknown entity: {name}")
+
+def neighborhood(adj, seeds, hops):
+    """Nodes within hops edges of any seed, following edges both ways"""
+    reverse = adj.transpose()
+    seen = np.zeros(adj.n, dtype=bool)
+    frontier = np.unique(np.asarray(seeds, dtype=np.int64))
+    seen[frontier] = True
+    for _ in range(hops):
+        reached = np.concatenate([adj.neighbors(frontier), reverse.neighbors(frontier)])
+        frontier = np.unique(reached[~seen[reached]])
+        if not len(frontier):
+            break
+        seen[frontier] = True
+    return np.nonzero(seen)[0]
+
+def snowball_sample(adj, size, seed=0):
+    """
+    size nodes grown breadth-first from random start nodes, so the
+    sample keeps whole neighbourhoods instead of scattered nodes. A new
+    start is drawn when a component runs out; the last layer is cut
+    down at random to hit size exactly.
+    """
+    rng = np.random.default_rng(seed)
+    reverse = adj.transpose()
+    seen = np.zeros(adj.n, dtype=bool)
+    taken = 0
+    for start in rng.permutation(adj.n):
+        if taken >= size:
+            break
+        if seen[start]:
+            continue
+        frontier = np.array([start])
+        while len(frontier) and taken < size:
+            if len(frontier) > size - taken:
+                frontier = rng.choice(frontier, size - taken, replace=False)
+            seen[frontier] = True
+            taken += len(frontier)
+            reached = np.concatenate([adj.neighbors(frontier), reverse.neighbors(frontier)])
+            frontier = np.unique(reached[~seen[reached]])
+    return np.nonzero(seen)[0]
+
+def scope_graph(ex, types=None, seeds=None, hops=1, sample=None, seed=0, connected=False):
+    """
+    Cut a GraphExtract down to the nodes with edges (with connected),
+    then to the nodes of some types, then to the k-hop neighbourhood of
+    seed entities (URIs or local names), then to a connected sample of
+    sample nodes; each step works on what the previous one left. Seeds
+    are kept by the first two steps. Returns ex itself when nothing is
+    asked for.
+    """
+    if connected:
+        keep = np.zeros(len(ex), dtype=bool)
+        keep[np.asarray(ex.edge_source, dtype=np.int64)] = True
+        keep[np.asarray(ex.edge_target, dtype=np.int64)] = True
+        for name in seeds or ():
+            keep[resolve_node(ex, name)] = True
+        if not keep.all():
+            ex = ex.subgraph(np.nonzero(keep)[0])
+    if types:
+        wanted = set(types)
+        unknown = wanted.difference(*ex.types)
+        if unknown:
+            raise ValueError(f"No nodes of type: {', '.join(sorted(unknown))}")
+        nodes = [i for i, node_types in enumerate(ex.types) if wanted.intersection(node_types)]
+        if seeds:
+            # Seeds stay in even when they are of another type
+            nodes = sorted(set(nodes) | {resolve_node(ex, name) for name in seeds})
+        ex = ex.subgraph(nodes)
+    if seeds:
+        start = [resolve_node(ex, name) for name in seeds]
+        ex = ex.subgraph(neighborhood(graph_analytics.adjacency(ex), start, hops))
+    if sample is not None and sample < len(ex):
+        ex = ex.subgraph(snowball_sample(graph_analytics.adjacency(ex), sample, seed))
+    return ex
+
+def iter_nodes(ex, metrics=None, positions=None):
+    """
+    Yield node records (dicts) from a GraphExtract.
+
+    metrics: optional per-node arrays from graph_analytics.network_metrics,
+    added to every record under their own names.
+    positions: optional (n, 2) array of layout coordinates, added as x and y.
+    """
+    columns = {name: values.tolist() for name, values in (metrics or {}).items()}
+    coordinates = positions.tolist() if positions is not None else None
+    for i, uri in enumerate(ex.uris):
+        types = ex.types[i]
+        label = ex.labels[i]
+        if label is None:
+            # Fallback to local name
+            label = uri.split('#')[-1].split('/')[-1]
+
+        node_data = {
+            'id': f"n{i}",
+            'label': label,
+            'uri': str(uri),
+            'type': types[0] if types else "Entity",
+            'types': types,
+        }
+
+        # Add Person-specific attributes
+        if 'Person' in types or 'TribalElder' in types:
+            if ex.access_level[i] != -1:
+                node_data['access_level'] = ex.access_level[i]
+            if ex.is_elder[i]:
+                node_data['is_elder'] = True
+
+        for name, values in columns.items():
+            value = values[i]
+            if name == 'lineage':
+                if value < 0:
+                    continue
+                value = graph_analytics.node_label(ex, value)
+            elif isinstance(value, float):
+                value = round(value, 8)
+            node_data[name] = value
+
+        if coordinates is not None:
+            node_data['x'], node_data['y'] = coordinates[i]
+
+        yield node_data
+
+def iter_edges(ex):
+    """Yield edge records (dicts) from a GraphExtract."""
+    names = ex.prop_names
+    for s, o, k in zip(ex.edge_source, ex.edge_target, ex.edge_prop):
+        yield {
+            'source': f"n{s}",
+            'target': f"n{o}",
+            'type': names[k],
+            'label': names[k]
+        }
+
+class GexfStreamWriter:
+    """
+    Write a GEXF 1.3 document element by element.
+
+    Nothing is buffered apart from the file object's own write buffer,
+    so nodes and edges can be written as soon as they are produced.
+    Call start(), then write_node() for every node, start_edges(),
+    write_edge() for every edge and finally close().
+
+    attributes: extra node attributes as (id, title, GEXF type) tuples;
+    a node gets a value for each one its record has a key for.
+    """
+
+    def __init__(self, out, attributes=()):
+        self.out = out
+        self.attributes = list(attributes)
+        self.node_count = 0
+        self.edge_count = 0
+
+    def start(self):
+        w = self.out.write
+        w('<?xml version="1.0" encoding="UTF-8"?>\n')
+        w(f'<gexf xmlns="{GEXF_NS}" xmlns:viz="{VIZ_NS}" version="1.3">\n')
+        w('  <meta lastmodifieddate="2026-01-19">\n')
+        w('    <creator>Heritage Knowledge System Export</creator>\n')
+        w('    <description>Cultural Heritage Knowledge Base Network</description>\n')
+        w('  </meta>\n')
+        w('  <graph mode="static" defaultedgetype="directed">\n')
+        w('    <attributes class="node">\n')
+        w('      <attribute id="type" title="Type" type="string"/>\n')
+        w('      <attribute id="access_level" title="Access Level" type="integer"/>\n')
+        for attr_id, title, attr_type in self.attributes:
+            w(f'      <attribute id={quoteattr(attr_id)} title={quoteattr(title)} type="{attr_type}"/>\n')
+        w('    </attributes>\n')
+        w('    <nodes>\n')
+
+    def write_node(self, node_data):
+        r, g, b = viz_color(node_data)
+        parts = [
+            f'      <node id={quoteattr(node_data["id"])} label={quoteattr(node_data["label"])}>\n',
+            '        <attvalues>\n',
+            f'          <attvalue for="type" value={quoteattr(node_data["type"])}/>\n',
+        ]
+        if 'access_level' in node_data:
+            parts.append(f'          <attvalue for="access_level" value="{node_data["access_level"]}"/>\n')
+        for attr_id, _, _ in self.attributes:
+            if attr_id in node_data:
+                parts.append(f'          <attvalue for={quoteattr(attr_id)} value={quoteattr(str(node_data[attr_id]))}/>\n')
+        parts.append('        </attvalues>\n')
+        if 'x' in node_data:
+            parts.append(f'        <viz:position x="{node_data["x"]:.3f}" y="{node_data["y"]:.3f}" z="0.0"/>\n')
+        parts.append(f'        <viz:size value="{viz_size(node_data)}"/>\n')
+        parts.append(f'        <viz:color r="{r}" g="{g}" b="{b}"/>\n')
+        parts.append('      </node>\n')
+        self.out.write(''.join(parts))
+        self.node_count += 1
+
+    def start_edges(self):
+        self.out.write('    </nodes>\n    <edges>\n')
+
+    def write_edge(self, edge):
+        self.out.write(
+            f'      <edge id="e{self.edge_count}" source={quoteattr(edge["source"])} '
+            f'target={quoteattr(edge["target"])} label={quoteattr(edge["label"])} weight="1.0"/>\n'
+        )
+        self.edge_count += 1
+
+    def close(self):
+        self.out.write('    </edges>\n  </graph>\n</gexf>\n')
+
+def write_gexf_stream(nodes, edges, output_file, attributes=()):
+    """Stream nodes and edges (any iterables) into a GEXF file."""
+    with open(output_file, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        writer = GexfStreamWriter(f, attributes)
+        writer.start()
+        for node_data in nodes:
+            writer.write_node(node_data)
+        writer.start_edges()
+        for edge in edges:
+            writer.write_edge(edge)
+        writer.close()
+    return writer.node_count, writer.edge_count
+
+def write_gexf_dom(nodes, edges, output_file, attributes=()):
+    """Build the whole GEXF tree in memory and pretty-print it (legacy writer)."""
     gexf = ET.Element('gexf')
-    gexf.set('xmlns', 'http://www.gexf.net/1.3')
+    gexf.set('xmlns', GEXF_NS)
     gexf.set('version', '1.3')
-    gexf.set('xmlns:viz', 'http://www.gexf.net/1.3/viz')
-    
+    gexf.set('xmlns:viz', VIZ_NS)
+
     meta = ET.SubElement(gexf, 'meta')
     meta.set('lastmodifieddate', '2026-01-19')
     creator = ET.SubElement(meta, 'creator')
     creator.text = 'Heritage Knowledge System Export'
     description = ET.SubElement(meta, 'description')
     description.text = 'Cultural Heritage Knowledge Base Network'
-    
+
     graph = ET.SubElement(gexf, 'graph')
     graph.set('mode', 'static')
     graph.set('defaultedgetype', 'directed')
-    
+
     # Attributes
-    attributes = ET.SubElement(graph, 'attributes')
-    attributes.set('class', 'node')
-    
-    attr_type = ET.SubElement(attributes, 'attribute')
+    attributes_elem = ET.SubElement(graph, 'attributes')
+    attributes_elem.set('class', 'node')
+
+    attr_type = ET.SubElement(attributes_elem, 'attribute')
     attr_type.set('id', 'type')
     attr_type.set('title', 'Type')
     attr_type.set('type', 'string')
-    
-    attr_access = ET.SubElement(attributes, 'attribute')
+
+    attr_access = ET.SubElement(attributes_elem, 'attribute')
     attr_access.set('id', 'access_level')
     attr_access.set('title', 'Access Level')
     attr_access.set('type', 'integer')
-    
+
+    for attr_id, title, attr_type in attributes:
+        attr = ET.SubElement(attributes_elem, 'attribute')
+        attr.set('id', attr_id)
+        attr.set('title', title)
+        attr.set('type', attr_type)
+
     # Nodes
     nodes_elem = ET.SubElement(graph, 'nodes')
-    for uri, node_data in nodes.items():
+    for node_data in nodes:
         node = ET.SubElement(nodes_elem, 'node')
         node.set('id', node_data['id'])
         node.set('label', node_data['label'])
-        
+
         # Attributes
         attvalues = ET.SubElement(node, 'attvalues')
-        
+
         attvalue_type = ET.SubElement(attvalues, 'attvalue')
         attvalue_type.set('for', 'type')
         attvalue_type.set('value', node_data['type'])
-        
+
         if 'access_level' in node_data:
             attvalue_access = ET.SubElement(attvalues, 'attvalue')
             attvalue_access.set('for', 'access_level')
             attvalue_access.set('value', str(node_data['access_level']))
-        
-        # Visualization attributes (size based on type)
-        viz_size = ET.SubElement(node, '{http://www.gexf.net/1.3/viz}size')
-        if node_data['type'] == 'Person':
-            viz_size.set('value', '15')
-        elif node_data['type'] == 'TribalElder':
-            viz_size.set('value', '20')
-        elif node_data['type'] == 'Location':
-            viz_size.set('value', '12')
-        elif node_data['type'] == 'Community':
-            viz_size.set('value', '14')
-        else:
-            viz_size.set('value', '10')
-        
-        # Color based on type
-        viz_color = ET.SubElement(node, '{http://www.gexf.net/1.3/viz}color')
-        if node_data['type'] == 'Person' or node_data['type'] == 'TribalElder':
-            viz_color.set('r', '100')
-            viz_color.set('g', '150')
-            viz_color.set('b', '200')
-        elif node_data['type'] == 'Location':
-            viz_color.set('r', '200')
-            viz_color.set('g', '100')
-            viz_color.set('b', '100')
-        elif node_data['type'] == 'Community':
-            viz_color.set('r', '150')
-            viz_color.set('g', '200')
-            viz_color.set('b', '100')
-        elif node_data['type'] == 'Instrument' or 'Instrument' in node_data['types']:
-            viz_color.set('r', '200')
-            viz_color.set('g', '200')
-            viz_color.set('b', '100')
-        else:
-            viz_color.set('r', '180')
-            viz_color.set('g', '180')
-            viz_color.set('b', '180')
-    
+
+        for attr_id, _, _ in attributes:
+            if attr_id in node_data:
+                attvalue = ET.SubElement(attvalues, 'attvalue')
+                attvalue.set('for', attr_id)
+                attvalue.set('value', str(node_data[attr_id]))
+
+        # Visualization attributes (position from the layout, size and color based on type)
+        if 'x' in node_data:
+            position_elem = ET.SubElement(node, f'{{{VIZ_NS}}}position')
+            position_elem.set('x', f"{node_data['x']:.3f}")
+            position_elem.set('y', f"{node_data['y']:.3f}")
+            position_elem.set('z', '0.0')
+
+        size_elem = ET.SubElement(node, f'{{{VIZ_NS}}}size')
+        size_elem.set('value', viz_size(node_data))
+
+        r, g, b = viz_color(node_data)
+        color_elem = ET.SubElement(node, f'{{{VIZ_NS}}}color')
+        color_elem.set('r', r)
+        color_elem.set('g', g)
+        color_elem.set('b', b)
+
     # Edges
     edges_elem = ET.SubElement(graph, 'edges')
+    edge_count = 0
     for i, edge in enumerate(edges):
         edge_elem = ET.SubElement(edges_elem, 'edge')
         edge_elem.set('id', f"e{i}")
@@ -234,30 +531,206 @@ def export_to_gexf(data_file, output_file, include_properties=None):
         edge_elem.set('target', edge['target'])
         edge_elem.set('label', edge['label'])
         edge_elem.set('weight', '1.0')
-    
+        edge_count += 1
+
     # Write to file
     xml_str = minidom.parseString(ET.tostring(gexf)).toprettyxml(indent="  ")
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(xml_str)
-    
+    return len(nodes_elem), edge_count
+
+def load_extract(data_file, include_properties=None, analytics=False, types=None, seeds=None, hops=1,
+                 sample=None, layout=False, layout_iterations=50, seed=0):
+    """
+    Load RDF data and extract the network to export.
+
+    Args:
+        data_file: Path to RDF data file (TTL format) or snapshot directory
+        include_properties: List of property URIs to include as edges (None = all object
+            properties); nodes left without any of these edges are dropped
+        analytics: Compute the network metrics of graph_analytics
+        types: Only keep nodes with one of these local type names (e.g. "Person")
+        seeds: Only keep the neighbourhood of these entities (URIs or local names)
+        hops: Size of that neighbourhood in edges
+        sample: Only keep a connected sample of this many nodes
+        layout: Compute node positions with graph_layout.force_layout
+        layout_iterations: Layout steps per level of the multilevel layout
+        seed: Random seed for the sample and the layout
+
+    Returns (GraphExtract, metrics or None, positions or None).
+    """
+    properties = OBJECT_PROPERTIES if include_properties is None else list(include_properties)
+    unknown = [p for p in properties if p not in OBJECT_PROPERTIES]
+    if unknown:
+        raise ValueError(f"Not an exported object property: {', '.join(str(p) for p in unknown)}")
+
+    print(f"Loading RDF data from: {data_file}")
+    if graph_snapshot.is_snapshot(data_file):
+        g = graph_snapshot.Snapshot(data_file)
+    else:
+        g = load_graph(data_file, format="turtle")
+    print(f"Loaded {len(g)} triples")
+
+    print("Extracting nodes and edges...")
+    # Nodes and edges are collected in the same pass over the triples
+    with instrumentation.stage("extract") as st:
+        ex = extract_graph(g, properties)
+        st.count(triples=len(g), nodes=len(ex), edges=ex.edge_count)
+    print(f"Found {len(ex)} nodes and {ex.edge_count} edges")
+    connected = include_properties is not None
+    if types or seeds or sample is not None or connected:
+        with instrumentation.stage("scope") as st:
+            ex = scope_graph(ex, types, seeds, hops, sample, seed, connected)
+            st.count(nodes=len(ex), edges=ex.edge_count)
+        print(f"Scoped to {len(ex)} nodes and {ex.edge_count} edges")
+    metrics = None
+    if analytics:
+        print("Computing network metrics...")
+        with instrumentation.stage("analytics") as st:
+            metrics = graph_analytics.network_metrics(ex)
+            st.count(nodes=len(ex), edges=ex.edge_count)
+    positions = None
+    if layout:
+        print("Computing layout...")
+        with instrumentation.stage("layout") as st:
+            positions = graph_layout.force_layout(len(ex), ex.edge_source, ex.edge_target,
+                                                  iterations=layout_iterations, seed=seed)
+            st.count(nodes=len(ex), edges=ex.edge_count)
+    return ex, metrics, positions
+
+def export_to_gexf(data_file, output_file, include_properties=None, stream=True, analytics=False, **options):
+    """
+    Export RDF data to GEXF format.
+
+    Args:
+        data_file: Path to RDF data file (TTL format) or snapshot directory
+        output_file: Path to output GEXF file
+        include_properties: List of property URIs to include as edges (None = all object properties)
+        stream: Write elements straight to the file (False = legacy DOM writer)
+        analytics: Add the network metrics of graph_analytics as node attributes
+        options: Scope and layout options of load_extract (types, seeds, hops, sample,
+            layout, layout_iterations, seed)
+    """
+    ex, metrics, positions = load_extract(data_file, include_properties, analytics, **options)
+    attributes = []
+    if metrics is not None:
+        attributes = [(name, title, attr_type)
+                      for name, (title, attr_type) in graph_analytics.METRIC_ATTRIBUTES.items()]
+    nodes = iter_nodes(ex, metrics, positions)
+    edges = iter_edges(ex)
+
+    with instrumentation.stage("write_gexf", writer="stream" if stream else "dom") as st:
+        if stream:
+            print("Streaming nodes and edges to GEXF file...")
+            node_count, edge_count = write_gexf_stream(nodes, edges, output_file, attributes)
+        else:
+            print("Creating GEXF file...")
+            node_count, edge_count = write_gexf_dom(nodes, edges, output_file, attributes)
+        st.count(nodes=node_count, edges=edge_count)
+
     print(f"\n✓ GEXF file created: {output_file}")
-    print(f"  Nodes: {len(nodes)}")
-    print(f"  Edges: {len(edges)}")
+    print(f"  Nodes: {node_count}")
+    print(f"  Edges: {edge_count}")
     print(f"\nImport this file into Gephi to visualize the network!")
 
+def export_to_tables(data_file, output, fmt, include_properties=None, analytics=False,
+                     batch_size=graph_tables.BATCH_SIZE, **options):
+    """
+    Export RDF data as node and edge tables (see graph_tables.py).
+
+    Args:
+        data_file: Path to RDF data file (TTL format) or snapshot directory
+        output: Output directory for "parquet", "arrow" and "csv"; output file for "graphml"
+        fmt: One of graph_tables.FORMATS
+        include_properties: List of property URIs to include as edges (None = all object properties)
+        analytics: Add the network metrics of graph_analytics as node columns
+        batch_size: Rows per written batch
+        options: Scope and layout options of load_extract
+    """
+    if fmt in ("parquet", "arrow"):
+        # Fail before the data is loaded
+        graph_tables.require_pyarrow(fmt)
+    ex, metrics, positions = load_extract(data_file, include_properties, analytics, **options)
+
+    with instrumentation.stage("write_tables", format=fmt) as st:
+        print(f"Writing {fmt} ...")
+        if fmt == "graphml":
+            graph_tables.write_graphml(ex, output, metrics, positions, batch_size)
+            paths = [output]
+        else:
+            paths = graph_tables.write_tables(ex, output, fmt, metrics, positions, batch_size)
+        st.count(nodes=len(ex), edges=ex.edge_count)
+
+    print(f"\n✓ {fmt} export created:")
+    for path in paths:
+        print(f"  {path}")
+    print(f"  Nodes: {len(ex)}")
+    print(f"  Edges: {ex.edge_count}")
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python code/export-to-gephi.py <data_file> [output_file]")
-        print("Example: python code/export-to-gephi.py data/heritage_base_dataset.ttl visualizations/heritage_network.gexf")
-        sys.exit(1)
-    
-    data_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "visualizations/heritage_network.gexf"
-    
+    parser = argparse.ArgumentParser(
+        description="Export RDF data to GEXF format for Gephi visualization, or to GraphML and node/edge tables.",
+        epilog="Example: python code/export-to-gephi.py data/heritage_base_dataset.ttl visualizations/heritage_network.gexf",
+    )
+    parser.add_argument("data_file", help="RDF data file (Turtle) or snapshot directory")
+    parser.add_argument("output_file", nargs="?",
+                        help="output file, or directory for parquet, arrow and csv "
+                             "(default: visualizations/heritage_network.gexf, .graphml or /)")
+    parser.add_argument("--format", choices=["gexf", *graph_tables.FORMATS], default="gexf",
+                        help="gexf (default), graphml, or node and edge tables in parquet, arrow or csv")
+    parser.add_argument("--batch-size", type=int, default=graph_tables.BATCH_SIZE,
+                        help=f"rows per batch for table and GraphML output (default: {graph_tables.BATCH_SIZE})")
+    parser.add_argument("--dom", action="store_true",
+                        help="build the document in memory and pretty-print it (legacy writer)")
+    parser.add_argument("--analytics", action="store_true",
+                        help="add mentorship, approval, PageRank and component metrics as node attributes")
+    parser.add_argument("--property", action="append", metavar="NAME",
+                        help="only export edges of this object property (e.g. mentoredBy); may be repeated")
+    parser.add_argument("--type", action="append", metavar="NAME",
+                        help="only export nodes of this type (e.g. Person); may be repeated")
+    parser.add_argument("--seed", action="append", metavar="URI",
+                        help="only export the neighbourhood of this entity (URI or local name); may be repeated")
+    parser.add_argument("--hops", type=int,
+                        help="size of the --seed neighbourhood in edges (default: 1)")
+    parser.add_argument("--sample", type=int, metavar="N",
+                        help="only export a connected sample of N nodes")
+    parser.add_argument("--layout", action="store_true",
+                        help="add node positions from a force-directed layout")
+    parser.add_argument("--layout-iterations", type=int, default=50,
+                        help="layout steps per coarsening level (default: 50)")
+    parser.add_argument("--random-seed", type=int, default=0,
+                        help="random seed for --sample and --layout (default: 0)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.hops is not None and not args.seed:
+        parser.error("--hops needs --seed")
+    if args.hops is not None and args.hops < 1:
+        parser.error("--hops must be at least 1")
+    if args.sample is not None and args.sample < 1:
+        parser.error("--sample must be at least 1")
+    instrumentation.configure(args)
+
+    options = dict(include_properties=[NS[name] for name in args.property] if args.property else None,
+                   analytics=args.analytics, types=args.type, seeds=args.seed, hops=args.hops or 1,
+                   sample=args.sample, layout=args.layout, layout_iterations=args.layout_iterations,
+                   seed=args.random_seed)
     try:
-        export_to_gexf(data_file, output_file)
+        if args.format == "gexf":
+            output = args.output_file or "visualizations/heritage_network.gexf"
+            export_to_gexf(args.data_file, output, stream=not args.dom, **options)
+        else:
+            default = "visualizations/heritage_network" + (".graphml" if args.format == "graphml" else "")
+            export_to_tables(args.data_file, args.output_file or default, args.format,
+                             batch_size=args.batch_size, **options)
     except ImportError as e:
-        print(f"Error: Missing required library. Install with: pip install rdflib")
+        if e.name == "pyarrow":
+            print(f"Error: {e}")
+        else:
+            print(f"Error: Missing required library. Install with: pip install rdflib")
+        sys.exit(1)
+    except ValueError as e:
+        # Unknown --property, --type or --seed, or data pyarrow cannot write (ArrowInvalid)
+        print(f"Error: {e}")
         sys.exit(1)
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Contested Claims Conflict Finder
+Reads contested claims from any of the three Question 2 representations
+(reification, named graphs, RDF-star) into one claims index and reports
+every subject/predicate pair that different sources give different
+values for (see claims_index.py).
+
+Unlike q1-q3 this does not join the claims with themselves, so it stays
+linear in the number of claims and sources. With --state the index is
+kept between runs: unchanged files are skipped, changed ones have their
+claims replaced, and only the conflicts touched by new claims are
+reported with --changed.
+
+Usage:
+    python code/find-conflicts.py [files ...] [--state FILE] [--changed]
+                                  [--sources] [--json] [--output FILE]
+
+Example:
+    python code/find-conflicts.py data/contested-claims-reification.ttl data/contested-claims-named.trig data/contested-claims-rdfstar.ttl
+    python code/find-conflicts.py --state .claims-index.json --changed data/generated/100000/claims-*.ttl
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import sparql_engine
+from claims_index import ClaimIndex
+
+# RDF files only: build-snapshot.py writes contested-claims-*.snap directories next to them
+DEFAULT_FILES = sorted(str(p) for p in Path("data").glob("contested-claims-*")
+                       if p.is_file() and p.suffix in sparql_engine.FORMATS)
+
+
+def print_conflicts(conflicts):
+    for conflict in conflicts:
+        print(f"✗ {conflict['subject_label']} {conflict['predicate_label']}:")
+        for position in conflict["positions"]:
+            # The same claim in several representations is listed once
+            merged = {}
+            for c in position["claims"]:
+                merged.setdefault((c["source_label"], c["confidence"]), []).append(c["representation"])
+            claims = ", ".join(
+                f"{source} {confidence if confidence is not None else '?'} ({', '.join(representations)})"
+                for (source, confidence), representations in merged.items()
+            )
+            print(f"    {position['object_label']}: {claims}")
+
+
+def print_sources(sources):
+    print(f"{'source':<36} {'representation':<14} {'claims':>7} {'avg':>6} {'min':>6} {'max':>6}")
+    print("-" * 80)
+    fmt = lambda v: f"{v:.2f}" if v is not None else "-"
+    for s in sources:
+        print(f"{str(s['source_label']):<36} {s['representation']:<14} {s['claims']:>7} "
+              f"{fmt(s['avg_confidence']):>6} {fmt(s['min_confidence']):>6} {fmt(s['max_confidence']):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find conflicting contested claims across representations")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES,
+                        help="claims files (default: data/contested-claims-*)")
+    parser.add_argument("--state", metavar="FILE", help="keep the claims index in FILE between runs")
+    parser.add_argument("--changed", action="store_true",
+                        help="only report conflicts touched by the files added in this run")
+    parser.add_argument("--sources", action="store_true", help="also print claim counts per source")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--output", metavar="FILE", help="write the JSON report to FILE")
+    args = parser.parse_args()
+
+    for path in args.files:
+        if not Path(path).exists():
+            print(f"ERROR: File not found: {path}")
+            sys.exit(1)
+
+    index = ClaimIndex.load(args.state) if args.state and Path(args.state).exists() else ClaimIndex()
+    log = sys.stderr if args.json else sys.stdout
+
+    start = time.perf_counter()
+    touched = set()
+    for path in args.files:
+        keys = index.add_file(path)
+        if keys is None:
+            print(f"  ✓ Unchanged: {path}", file=log)
+        else:
+            touched |= keys
+            print(f"  ✓ Indexed: {path}", file=log)
+    conflicts = index.conflicts(touched if args.changed else None)
+    elapsed = time.perf_counter() - start
+    print(f"{len(index)} claims, {len(index.groups)} subject/predicate pairs, "
+          f"{len(index.contested)} contested ({elapsed:.2f}s)", file=log)
+    if args.state:
+        index.save(args.state)
+        print(f"Index saved to: {args.state}", file=log)
+
+    report = {"conflicts": conflicts}
+    if args.sources:
+        report["sources"] = index.by_source()
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Report saved to: {args.output}", file=log)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    print()
+    if conflicts:
+        print_conflicts(conflicts)
+    else:
+        print("No conflicting claims ✓")
+    if args.sources:
+        print()
+        print_sources(report["sources"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Graph Parse Cache Tool
+Shows what the shared parse cache (graph_loader.py) holds and how much
+parsing it has saved, and clears it.
+
+With GRAPH_CACHE_STATS=1 set, every script that loads RDF through
+graph_loader appends its hit/miss counts and parse/load times to
+stats.jsonl in the cache directory, so --stats after a pipeline run
+shows the time spent parsing versus the time spent reading cached
+graphs, per script and in total.
+
+Usage:
+    python code/graph-cache.py [--stats] [--entries] [--reset-stats] [--clear]
+
+Example:
+    python code/graph-cache.py --reset-stats
+    export GRAPH_CACHE_STATS=1
+    python code/run-shacl-validation.py data/heritage_complete.ttl shapes/validation_shapes.ttl validation/report.txt
+    python code/export-to-gephi.py data/heritage_complete.ttl
+    python code/graph-cache.py --stats
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+import graph_loader
+import graph_snapshot
+
+
+def read_stats(cache):
+    path = cache.cache_dir / "stats.jsonl"
+    if not path.exists():
+        return []
+    lines = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            lines.append(json.loads(line))
+        except ValueError:
+            continue
+    return lines
+
+
+def print_stats(cache):
+    runs = read_stats(cache)
+    if not runs:
+        print("No cache statistics recorded yet")
+        return
+    per_script = defaultdict(lambda: {"runs": 0, "hits": 0, "misses": 0, "parse_s": 0.0, "load_s": 0.0})
+    for run in runs:
+        totals = per_script[run.get("script") or "?"]
+        totals["runs"] += 1
+        for field in ("hits", "misses", "parse_s", "load_s"):
+            totals[field] += run.get(field, 0)
+
+    print(f"{'script':<32} {'runs':>5} {'hits':>6} {'misses':>7} {'parse s':>9} {'load s':>8}")
+    print("-" * 72)
+    for script, t in sorted(per_script.items()):
+        print(f"{script:<32} {t['runs']:>5} {t['hits']:>6} {t['misses']:>7} {t['parse_s']:>9.2f} {t['load_s']:>8.2f}")
+    total = {field: sum(t[field] for t in per_script.values())
+             for field in ("runs", "hits", "misses", "parse_s", "load_s")}
+    print("-" * 72)
+    print(f"{'total':<32} {total['runs']:>5} {total['hits']:>6} {total['misses']:>7} "
+          f"{total['parse_s']:>9.2f} {total['load_s']:>8.2f}")
+    lookups = total["hits"] + total["misses"]
+    if lookups:
+        print(f"Hit rate: {100 * total['hits'] / lookups:.0f}%")
+
+
+def print_entries(cache):
+    entries = sorted(cache.cache_dir.glob(f"*{graph_snapshot.SUFFIX}"),
+                     key=lambda e: (e / "meta.json").stat().st_mtime, reverse=True)
+    total = 0
+    for entry in entries:
+        with graph_snapshot.Snapshot(entry) as snap:
+            sources = ", ".join(s["path"] for s in snap.meta["sources"])
+            size = cache._size(entry)
+            total += size
+            print(f"{size / 1024:>10.1f} KiB {len(snap):>9} triples  {sources}")
+    print(f"{len(entries)} entries, {total / (1024 * 1024):.1f} MiB of {cache.max_bytes / (1024 * 1024):.0f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the graph parse cache")
+    parser.add_argument("--stats", action="store_true", help="hit/miss counts and parse time per script")
+    parser.add_argument("--entries", action="store_true", help="list cached graphs, most recent first")
+    parser.add_argument("--reset-stats", action="store_true", help="forget the recorded statistics")
+    parser.add_argument("--clear", action="store_true", help="delete the whole cache")
+    args = parser.parse_args()
+
+    cache = graph_loader.ParseCache()
+    print(f"Cache directory: {cache.cache_dir}")
+    if args.clear:
+        cache.clear()
+        print("✓ Cache cleared")
+        return 0
+    if args.reset_stats:
+        (cache.cache_dir / "stats.jsonl").unlink(missing_ok=True)
+        print("✓ Statistics reset")
+    if args.entries:
+        print_entries(cache)
+    if args.stats or not (args.entries or args.reset_stats):
+        print_stats(cache)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
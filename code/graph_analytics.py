@@ -0,0 +1,298 @@
+"""
+Network metrics of the heritage graph on sparse adjacency matrices.
+
+q21 and q24 count mentees per mentor and approvals per elder, one hop
+deep. Following :mentoredBy or :approvedBy transitively in SPARQL needs
+property paths that re-walk the same chains for every person, so the
+metrics here are computed on compressed sparse row (CSR) adjacency
+matrices built from the edge columns of a GraphExtract (see
+export-to-gephi.py), with whole-frontier NumPy operations instead of
+per-node loops:
+
+    generation      length of the longest :mentoredBy chain above a
+                    person (0 = no mentor); levels are peeled off from
+                    the founders down, as in a topological sort
+    lineage         the founder at the top of that chain; each person
+                    hangs under the mentor on their longest chain, and
+                    the roots are found by pointer jumping
+    lineage_mentees everyone below a person in that lineage tree
+    approval_depth  the same longest-chain depth over :approvedBy
+    pagerank        PageRank over all object properties, by power
+                    iteration
+    component       weakly connected component over all object
+                    properties (0 = largest), by min-label hooking and
+                    pointer jumping
+
+Each pass is linear in the number of edges, and the number of passes
+grows with the chain depth (generations) or its logarithm (lineage
+roots, components) rather than with the number of nodes. People on a
+mentorship cycle have no generation or lineage (-1); the SHACL shapes
+report such data separately.
+
+With several mentors a person is counted in one lineage only (the one
+on their longest chain), so lineage_mentees is a tree count, not the
+number of distinct transitive mentees in the full mentorship DAG.
+
+Example:
+    ex = extract_graph(load_graph("data/heritage_complete.ttl"))
+    metrics = network_metrics(ex)
+    deepest = metrics["generation"].argmax()
+    print(ex.uris[deepest], metrics["generation"][deepest])
+"""
+
+import numpy as np
+
+MENTORSHIP = "mentoredBy"
+APPROVAL = "approvedBy"
+
+# Metric -> (GEXF attribute title, GEXF attribute type)
+METRIC_ATTRIBUTES = {
+    "generation": ("Mentorship Generation", "integer"),
+    "mentees": ("Direct Mentees", "integer"),
+    "lineage": ("Mentorship Lineage", "string"),
+    "lineage_mentees": ("Mentees in Lineage", "integer"),
+    "approvals": ("Approvals Given", "integer"),
+    "approval_depth": ("Approval Depth", "integer"),
+    "degree": ("Degree", "integer"),
+    "pagerank": ("PageRank", "double"),
+    "component": ("Component", "integer"),
+    "component_size": ("Component Size", "integer"),
+}
+
+
+class CSR:
+    """
+    Compressed sparse row adjacency matrix of a directed graph.
+
+    Row i lists the targets of the edges leaving node i in
+    indices[indptr[i]:indptr[i + 1]], in the order the edges were given.
+    """
+
+    def __init__(self, n, source, target):
+        source = np.asarray(source, dtype=np.int64)
+        target = np.asarray(target, dtype=np.int64)
+        order = np.argsort(source, kind="stable")
+        self.n = n
+        self.indices = target[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=n), out=self.indptr[1:])
+        self._rows = source[order]
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def rows(self):
+        """Source node of every stored edge (the COO row column)"""
+        return self._rows
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.indices, minlength=self.n)
+
+    def transpose(self):
+        return CSR(self.n, self.indices, self._rows)
+
+    def neighbors(self, nodes):
+        """Targets of all edges leaving any of nodes (with repeats)"""
+        starts = self.indptr[nodes]
+        counts = self.indptr[nodes + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # Position of every wanted entry: its row start plus its offset in the row
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.indices[np.repeat(starts, counts) + offsets]
+
+    def matvec(self, x):
+        """y = A x, with y[i] the sum of x over row i"""
+        return np.bincount(self._rows, weights=x[self.indices], minlength=self.n)
+
+    def rmatvec(self, x):
+        """y = A^T x, with y[j] the sum of x over the edges into j"""
+        return np.bincount(self.indices, weights=x[self._rows], minlength=self.n)
+
+
+def adjacency(ex, properties=None):
+    """
+    CSR matrix of the edges of a GraphExtract.
+
+    properties: local names (e.g. "mentoredBy") of the edges to keep,
+    or None for all of them.
+    """
+    source = np.asarray(ex.edge_source, dtype=np.int64)
+    target = np.asarray(ex.edge_target, dtype=np.int64)
+    if properties is not None:
+        wanted = [k for k, name in enumerate(ex.prop_names) if name in set(properties)]
+        keep = np.isin(np.asarray(ex.edge_prop, dtype=np.int64), wanted)
+        source, target = source[keep], target[keep]
+    return CSR(len(ex), source, target)
+
+
+def generations(child_to_parent):
+    """
+    Longest chain length above every node (-1 on or below a cycle).
+
+    Edges point from a node to its parent (mentee -> mentor). Nodes
+    without parents are generation 0; a node is placed one level below
+    the last of its parents once all of them are placed.
+    """
+    n = child_to_parent.n
+    parent_to_child = child_to_parent.transpose()
+    waiting = child_to_parent.out_degree().copy()
+    depth = np.full(n, -1, dtype=np.int64)
+    frontier = np.flatnonzero(waiting == 0)
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        children = parent_to_child.neighbors(frontier)
+        waiting -= np.bincount(children, minlength=n)
+        candidates = np.unique(children)
+        frontier = candidates[waiting[candidates] == 0]
+        level += 1
+    return depth
+
+
+def lineage_tree(child_to_parent, depth):
+    """
+    (parent, root, subtree size) of the lineage tree.
+
+    Every node with a parent hangs under one parent on its longest chain
+    (one generation above it); roots are their own parent. Nodes with no
+    generation get root -1.
+    """
+    n = child_to_parent.n
+    child = child_to_parent.rows()
+    parent_of = child_to_parent.indices
+    on_chain = (depth[child] > 0) & (depth[parent_of] == depth[child] - 1)
+    parent = np.arange(n, dtype=np.int64)
+    parent[child[on_chain]] = parent_of[on_chain]
+
+    root = parent.copy()
+    while True:
+        jumped = root[root]
+        if np.array_equal(jumped, root):
+            break
+        root = jumped
+    root[depth < 0] = -1
+
+    size = np.ones(n, dtype=np.int64)
+    order = np.argsort(-depth, kind="stable")
+    levels = depth[order]
+    # Deepest level first, so a subtree is complete before it is added to its parent
+    bounds = np.flatnonzero(np.diff(levels)) + 1
+    for nodes in np.split(order, bounds):
+        if not nodes.size or depth[nodes[0]] <= 0:
+            break
+        size += np.bincount(parent[nodes], weights=size[nodes], minlength=n).astype(np.int64)
+    return parent, root, size
+
+
+def pagerank(adj, damping=0.85, tol=1e-10, max_iter=100):
+    """PageRank by power iteration; rank of dangling nodes is spread evenly"""
+    n = adj.n
+    if not n:
+        return np.empty(0)
+    out = adj.out_degree()
+    dangling = out == 0
+    inv_out = np.divide(1.0, out, out=np.zeros(n), where=~dangling)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = adj.rmatvec(rank * inv_out)
+        new = (1.0 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        delta = np.abs(new - rank).sum()
+        rank = new
+        if delta < n * tol:
+            break
+    return rank
+
+
+def components(adj):
+    """
+    Weakly connected components, numbered by size (0 = largest).
+
+    Every node starts as its own label. Each round hooks the larger label
+    of every edge's endpoints onto the smaller one, then shortens the
+    label chains by pointer jumping, until no edge joins two labels.
+    """
+    n = adj.n
+    u, v = adj.rows(), adj.indices
+    label = np.arange(n, dtype=np.int64)
+    while True:
+        lu, lv = label[u], label[v]
+        joined = lu != lv
+        if not joined.any():
+            break
+        lu, lv = lu[joined], lv[joined]
+        low = np.minimum(lu, lv)
+        np.minimum.at(label, np.maximum(lu, lv), low)
+        while True:
+            jumped = label[label]
+            if np.array_equal(jumped, label):
+                break
+            label = jumped
+    roots, component, sizes = np.unique(label, return_inverse=True, return_counts=True)
+    # Renumber so that component 0 is the largest
+    rank = np.empty(len(roots), dtype=np.int64)
+    rank[np.argsort(-sizes, kind="stable")] = np.arange(len(roots))
+    return rank[component], sizes[component]
+
+
+def network_metrics(ex):
+    """
+    Per-node metrics of a GraphExtract, as a dict of NumPy arrays.
+
+    The keys are those of METRIC_ATTRIBUTES; "lineage" holds the node
+    number of each node's founder (-1 for none, or for nodes outside the
+    mentorship network).
+    """
+    mentorship = adjacency(ex, [MENTORSHIP])
+    approval = adjacency(ex, [APPROVAL])
+    network = adjacency(ex)
+
+    generation = generations(mentorship)
+    _, lineage, subtree = lineage_tree(mentorship, generation)
+    mentees = mentorship.in_degree()
+    # Only people with a mentor or mentees belong to a lineage
+    lineage[(mentorship.out_degree() == 0) & (mentees == 0)] = -1
+    component, component_size = components(network)
+    return {
+        "generation": generation,
+        "mentees": mentees,
+        "lineage": lineage,
+        "lineage_mentees": np.where(generation >= 0, subtree - 1, 0),
+        "approvals": approval.in_degree(),
+        "approval_depth": generations(approval),
+        "degree": network.in_degree() + network.out_degree(),
+        "pagerank": pagerank(network),
+        "component": component,
+        "component_size": component_size,
+    }
+
+
+def node_label(ex, i):
+    """Preferred label of node i, or the local name of its URI"""
+    label = ex.labels[i]
+    return label if label is not None else str(ex.uris[i]).split('#')[-1].split('/')[-1]
+
+
+def metric_rows(ex, metrics, nodes=None):
+    """
+    One dict per node (all, or those in nodes) with its URI, label,
+    type and metrics; lineage is given as the founder's label.
+    """
+    columns = {name: values.tolist() for name, values in metrics.items()}
+    for i in (range(len(ex)) if nodes is None else nodes):
+        types = ex.types[i]
+        row = {"uri": str(ex.uris[i]), "label": node_label(ex, i),
+               "type": types[0] if types else "Entity"}
+        for name, values in columns.items():
+            value = values[i]
+            if name == "lineage":
+                value = node_label(ex, value) if value >= 0 else None
+            elif name == "pagerank":
+                value = round(value, 8)
+            row[name] = value
+        yield row
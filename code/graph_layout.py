@@ -0,0 +1,272 @@
+"""
+Force-directed layout of the heritage graph with NumPy.
+
+Gephi lays a network out itself (ForceAtlas 2), but on a few hundred
+thousand nodes that takes longer than opening the file. The layout here
+runs before the export instead, so the GEXF carries viz:position
+coordinates and opens ready to view.
+
+The forces are those of Fruchterman and Reingold: connected nodes pull
+each other together with d^2 / k, every pair of nodes pushes apart with
+k^2 / d, and a weak gravity keeps separate components near the middle.
+Every step moves each node along its total force by at most the current
+temperature, which cools to zero over the iterations.
+
+Two things keep this near linear in the size of the graph:
+
+    multilevel      the graph is coarsened first: an independent set
+                    of nodes is picked and every other node is merged
+                    into a neighbour from it, level by level, down to a
+                    few hundred nodes. The coarsest graph is laid out
+                    from random positions, and every finer level starts
+                    from the position of its coarse node, so a level
+                    only needs local adjustment
+    grid repulsion  all-pairs repulsion costs n^2. Nodes are binned
+                    into a quadtree of grid cells instead, as in
+                    Barnes-Hut: a node is pushed exactly by the nodes in
+                    its own and the adjacent finest cells, and by far
+                    away cells as a whole (their node count at their
+                    centre of mass), each cell pair counted at the
+                    coarsest level where the two are not adjacent
+
+All work is whole-array NumPy operations over nodes, edges or cells.
+
+Example:
+    ex = extract_graph(load_graph("data/heritage_complete.ttl"))
+    pos = force_layout(len(ex), ex.edge_source, ex.edge_target)
+    print(ex.uris[0], pos[0])
+"""
+
+import math
+
+import numpy as np
+
+# Graphs up to this size get exact all-pairs repulsion
+EXACT_LIMIT = 400
+
+# Target number of nodes per finest grid cell
+LEAF_SIZE = 8
+
+# Deepest grid level (cells of 1/2^MAX_DEPTH of the drawing)
+MAX_DEPTH = 16
+
+# Coarsening stops at this many nodes, or when a level shrinks by less than 10%
+COARSEST = 200
+
+# Ideal edge length of a level, relative to the next finer one (Walshaw)
+LEVEL_SCALE = math.sqrt(7 / 4)
+
+GRAVITY = 0.02
+
+
+def _undirected_edges(n, source, target):
+    """Unique undirected edges (u < v) without self-loops"""
+    source = np.asarray(source, dtype=np.int64)
+    target = np.asarray(target, dtype=np.int64)
+    u, v = np.minimum(source, target), np.maximum(source, target)
+    keep = u != v
+    key = np.unique(u[keep] * n + v[keep])
+    return key // n, key % n
+
+
+def _coarsen(n, u, v, rng):
+    """
+    Cluster number of every node for the next coarser level.
+
+    A maximal independent set of "suns" is picked by random priority
+    (Luby's algorithm), and every other node joins an adjacent sun, so
+    a hub takes its leaves along and coarsening does not stall on
+    star-shaped parts of the graph. Isolated nodes are paired up.
+    """
+    priority = rng.random(n)
+    state = np.zeros(n, dtype=np.int8)          # 0 undecided, 1 sun, 2 planet
+    degree = np.bincount(u, minlength=n) + np.bincount(v, minlength=n)
+    while True:
+        open_u, open_v = state[u] == 0, state[v] == 0
+        both = open_u & open_v
+        # Highest priority among undecided neighbours
+        best = np.full(n, -1.0)
+        np.maximum.at(best, u[both], priority[v[both]])
+        np.maximum.at(best, v[both], priority[u[both]])
+        suns = (state == 0) & (priority > best)
+        if not suns.any():
+            break
+        state[suns] = 1
+        near = np.zeros(n, dtype=bool)
+        near[v[suns[u]]] = True
+        near[u[suns[v]]] = True
+        state[near & (state == 0)] = 2
+    # Planets join the adjacent sun with the highest priority
+    sun = np.where(state == 1, np.arange(n), -1)
+    pick = np.full(n, -1.0)
+    to_v, to_u = state[v] == 1, state[u] == 1
+    np.maximum.at(pick, u[to_v], priority[v[to_v]])
+    np.maximum.at(pick, v[to_u], priority[u[to_u]])
+    hit = to_v & (priority[v] == pick[u])
+    sun[u[hit]] = v[hit]
+    hit = to_u & (priority[u] == pick[v])
+    sun[v[hit]] = u[hit]
+    isolated = np.nonzero(degree == 0)[0]
+    sun[isolated] = isolated[np.arange(len(isolated)) // 2 * 2]
+    _, cluster = np.unique(sun, return_inverse=True)
+    return cluster
+
+
+# Offsets (dx, dy) of the cells at one level whose parents are adjacent
+# to the parent of a cell but which are not adjacent to the cell itself,
+# for each parity (x % 2, y % 2) of the cell
+_FAR = {}
+for _px in (0, 1):
+    for _py in (0, 1):
+        _FAR[_px, _py] = [(dx, dy) for dx in range(-3, 4) for dy in range(-3, 4)
+                          if abs((_px + dx) // 2) <= 1 and abs((_py + dy) // 2) <= 1
+                          and not (abs(dx) <= 1 and abs(dy) <= 1)]
+_FAR_OFFSETS = sorted({offset for offsets in _FAR.values() for offset in offsets})
+# Half of the adjacent cells: each neighbouring pair of cells is visited once
+_NEAR_OFFSETS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def _exact_repulsion(pos, k2, chunk=512):
+    """All-pairs k^2 / d repulsion"""
+    force = np.zeros_like(pos)
+    for start in range(0, len(pos), chunk):
+        diff = pos[start:start + chunk, None, :] - pos[None, :, :]
+        d2 = (diff ** 2).sum(axis=2)
+        d2[d2 == 0] = np.inf
+        force[start:start + chunk] = k2 * (diff / d2[:, :, None]).sum(axis=1)
+    return force
+
+
+def _grid_repulsion(pos, k2, leaf_size=LEAF_SIZE):
+    """k^2 / d repulsion, exact between nearby nodes and by cells further away"""
+    n = len(pos)
+    lo = pos.min(axis=0)
+    span = float((pos.max(axis=0) - lo).max()) or 1.0
+    unit = (pos - lo) / (span * (1 + 1e-9))
+    # Deep enough that crowded cells do not make the exact part quadratic
+    depth = max(2, math.ceil(math.log(max(n / leaf_size, 1), 4)))
+    while depth < MAX_DEPTH:
+        size = 1 << depth
+        xy = (unit * size).astype(np.int64)
+        count = np.unique(xy[:, 0] * size + xy[:, 1], return_counts=True)[1]
+        if (count.astype(np.float64) ** 2).sum() <= 4 * leaf_size * n:
+            break
+        depth += 1
+    force = np.zeros_like(pos)
+
+    for level in range(2, depth + 1):
+        size = 1 << level
+        xy = (unit * size).astype(np.int64)
+        cells, member, count = np.unique(xy[:, 0] * size + xy[:, 1], return_inverse=True, return_counts=True)
+        centre = np.stack([np.bincount(member, weights=pos[:, 0]),
+                           np.bincount(member, weights=pos[:, 1])], axis=1) / count[:, None]
+        cx, cy = cells // size, cells % size
+        parity = (cx % 2) * 2 + (cy % 2)
+        cell_force = np.zeros((len(cells), 2))
+        for dx, dy in _FAR_OFFSETS:
+            allowed = [p * 2 + q for (p, q), offsets in _FAR.items() if (dx, dy) in offsets]
+            nx, ny = cx + dx, cy + dy
+            ok = np.isin(parity, allowed) & (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            want = nx * size + ny
+            at = np.minimum(np.searchsorted(cells, want), len(cells) - 1)
+            ok &= cells[at] == want
+            src, dst = np.nonzero(ok)[0], at[ok]
+            diff = centre[src] - centre[dst]
+            d2 = np.maximum((diff ** 2).sum(axis=1), 1e-12)
+            cell_force[src] += k2 * count[dst][:, None] * diff / d2[:, None]
+        force += cell_force[member]
+
+    # Exact forces between nodes in the same or adjacent finest cells
+    size = 1 << depth
+    xy = (unit * size).astype(np.int64)
+    key = xy[:, 0] * size + xy[:, 1]
+    order = np.argsort(key, kind="stable")
+    cells, starts, count = np.unique(key[order], return_index=True, return_counts=True)
+    cx, cy = cells // size, cells % size
+    for dx, dy in _NEAR_OFFSETS:
+        nx, ny = cx + dx, cy + dy
+        want = nx * size + ny
+        at = np.minimum(np.searchsorted(cells, want), len(cells) - 1)
+        ok = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size) & (cells[at] == want)
+        a, b = np.nonzero(ok)[0], at[ok]
+        pairs = count[a] * count[b]
+        total = int(pairs.sum())
+        if not total:
+            continue
+        offset = np.arange(total) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+        width = np.repeat(count[b], pairs)
+        first = np.repeat(starts[a], pairs)
+        second = np.repeat(starts[b], pairs)
+        row, col = offset // width, offset % width
+        if dx == dy == 0:
+            # Within a cell every unordered pair once
+            keep = row < col
+            first, second, row, col = first[keep], second[keep], row[keep], col[keep]
+        i, j = order[first + row], order[second + col]
+        diff = pos[i] - pos[j]
+        d2 = np.maximum((diff ** 2).sum(axis=1), 1e-12)
+        push = k2 * diff / d2[:, None]
+        for axis in (0, 1):
+            force[:, axis] += np.bincount(i, weights=push[:, axis], minlength=n)
+            force[:, axis] -= np.bincount(j, weights=push[:, axis], minlength=n)
+    return force
+
+
+def _relax(pos, u, v, k, iterations, temperature, rng):
+    """Fruchterman-Reingold steps on one level, cooling linearly from temperature"""
+    n = len(pos)
+    k2 = k * k
+    repulsion = _exact_repulsion if n <= EXACT_LIMIT else _grid_repulsion
+    for step in range(iterations):
+        force = repulsion(pos, k2)
+        diff = pos[u] - pos[v]
+        dist = np.sqrt((diff ** 2).sum(axis=1))
+        pull = diff * (dist / k)[:, None]
+        for axis in (0, 1):
+            force[:, axis] -= np.bincount(u, weights=pull[:, axis], minlength=n)
+            force[:, axis] += np.bincount(v, weights=pull[:, axis], minlength=n)
+        force -= GRAVITY * (pos - pos.mean(axis=0)) * (math.sqrt(n) / k)
+        length = np.sqrt((force ** 2).sum(axis=1))
+        stuck = length == 0
+        if stuck.any():
+            force[stuck] = rng.normal(size=(int(stuck.sum()), 2))
+            length[stuck] = np.sqrt((force[stuck] ** 2).sum(axis=1))
+        t = temperature * (1 - step / iterations)
+        pos += force * (np.minimum(length, t) / length)[:, None]
+    return pos
+
+
+def force_layout(n, source, target, iterations=50, seed=0, scale=10.0):
+    """
+    2D positions of n nodes connected by edges source[i] -> target[i],
+    as an (n, 2) float array. Edge direction and repeated edges are
+    ignored; scale is the ideal edge length in the output.
+    """
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, 2))
+    u, v = _undirected_edges(n, source, target)
+
+    # Coarsen down to a small graph
+    levels = [(n, u, v)]
+    clusters = []
+    while levels[-1][0] > COARSEST:
+        m, cu, cv = levels[-1]
+        cluster = _coarsen(m, cu, cv, rng)
+        size = int(cluster.max()) + 1
+        if size > 0.9 * m:
+            break
+        clusters.append(cluster)
+        levels.append((size, *_undirected_edges(size, cluster[cu], cluster[cv])))
+
+    # Lay out the coarsest level, then refine level by level
+    k = LEVEL_SCALE ** (len(levels) - 1)
+    m, cu, cv = levels[-1]
+    pos = rng.uniform(-1, 1, size=(m, 2)) * k * math.sqrt(m)
+    pos = _relax(pos, cu, cv, k, iterations * 2, k * math.sqrt(m) / 2, rng)
+    for level in range(len(levels) - 2, -1, -1):
+        k /= LEVEL_SCALE
+        m, cu, cv = levels[level]
+        pos = pos[clusters[level]] + rng.uniform(-0.5, 0.5, size=(m, 2)) * k
+        pos = _relax(pos, cu, cv, k, iterations, 2 * k, rng)
+    return (pos - pos.mean(axis=0)) * scale
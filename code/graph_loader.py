@@ -0,0 +1,291 @@
+"""
+Shared graph loading with an on-disk parse cache.
+
+Scripts load RDF files through load_graph() instead of Graph().parse().
+The first time a file is loaded it is parsed as usual and its triples
+and prefixes are written to the cache as a graph snapshot (see
+graph_snapshot.py); later loads of the same content, from any script,
+read the snapshot back instead of parsing.
+
+Cache entries are keyed on a SHA-256 of the file contents plus the
+parser format, so an edited file misses and a copied or renamed one
+hits. The hash of each path is remembered together with its mtime and
+size, so an unchanged file is not even re-read. Reading an entry
+refreshes its mtime, and the least recently used entries are evicted
+once the cache grows past its size budget.
+
+Every process counts its hits and misses and the time spent parsing
+and loading. With GRAPH_CACHE_STATS=1 the counts are printed to stderr
+at exit and appended to stats.jsonl in the cache directory, which
+graph-cache.py sums over a whole pipeline run. Without it nothing is
+written, so the file does not grow with every script run.
+
+Environment:
+    GRAPH_CACHE=0            disable the cache (always parse)
+    GRAPH_CACHE_DIR=<dir>    cache directory (default: .graph-cache at the repository root)
+    GRAPH_CACHE_SIZE_MB=<n>  size budget (default: 512)
+    GRAPH_CACHE_STATS=1      print hit/miss counts at exit and record them in stats.jsonl
+
+Example:
+    from graph_loader import load_graph
+    g = load_graph("data/heritage_base_dataset.ttl")
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.util import guess_format as guess_rdf_format
+
+import graph_snapshot
+import instrumentation
+import rdfstar
+import sparql_engine
+
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / ".graph-cache"
+
+DEFAULT_SIZE_MB = 512
+
+# Formats parsed into a single graph, and so cacheable as one snapshot
+TRIPLE_FORMATS = {"turtle", "nt", "xml", "n3", "json-ld"}
+
+
+def _env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("", "0", "no", "off", "false")
+
+
+def guess_format(path):
+    """rdflib parser format for a file, from its suffix"""
+    return sparql_engine.FORMATS.get(Path(path).suffix) or guess_rdf_format(str(path)) or "turtle"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_file(graph, path, format):
+    """Parse one file into graph, lowering RDF-star Turtle if needed"""
+    path = Path(path)
+    if format in ("turtle", "trig"):
+        text = path.read_text(encoding="utf-8")
+        if rdfstar.has_rdf_star(text):
+            text = rdfstar.lower_turtle(text)
+        graph.parse(data=text, format=format, publicID=path.resolve().as_uri())
+    else:
+        graph.parse(str(path), format=format)
+    return graph
+
+
+class ParseCache:
+    """Size-bounded, LRU-evicted on-disk store of parsed graphs"""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = Path(cache_dir or os.environ.get("GRAPH_CACHE_DIR") or DEFAULT_DIR)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("GRAPH_CACHE_SIZE_MB", DEFAULT_SIZE_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.parse_seconds = 0.0
+        self.load_seconds = 0.0
+
+    def _entry(self, digest, format):
+        return self.cache_dir / f"{digest}-{format}{graph_snapshot.SUFFIX}"
+
+    def _path_record(self, path):
+        key = hashlib.sha256(str(path).encode("utf-8")).hexdigest()
+        return self.cache_dir / "paths" / f"{key}.json"
+
+    def content_hash(self, path):
+        """SHA-256 of a file, reusing the stored one while mtime and size match"""
+        path = Path(path).resolve()
+        st = path.stat()
+        record = self._path_record(path)
+        try:
+            known = json.loads(record.read_text(encoding="utf-8"))
+            if known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size:
+                return known["sha256"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        digest = file_hash(path)
+        record.parent.mkdir(parents=True, exist_ok=True)
+        tmp = record.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"path": str(path), "mtime_ns": st.st_mtime_ns,
+                                   "size": st.st_size, "sha256": digest}), encoding="utf-8")
+        os.replace(tmp, record)
+        return digest
+
+    def load(self, path, format, graph):
+        """Fill graph with the triples of path, from the cache when possible"""
+        entry = self._entry(self.content_hash(path), format)
+        start = time.perf_counter()
+        if graph_snapshot.is_snapshot(entry):
+            try:
+                with graph_snapshot.Snapshot(entry) as snap:
+                    snap.to_graph(graph)
+                os.utime(entry / "meta.json")
+                with self.lock:
+                    self.hits += 1
+                    self.load_seconds += time.perf_counter() - start
+                return graph
+            except (OSError, ValueError):
+                shutil.rmtree(entry, ignore_errors=True)
+
+        # Parsed straight into graph. The prefixes the parser binds are
+        # replayed on an empty graph so the snapshot gets the file's own,
+        # and the file's triples are collected only if graph had some already
+        prefixes = Graph(bind_namespaces="none")
+        added = [] if len(graph) else None
+        bind, add = graph.bind, graph.add
+
+        def record_bind(*args, **kwargs):
+            prefixes.bind(*args, **kwargs)
+            return bind(*args, **kwargs)
+
+        def record_add(triple):
+            added.append(triple)
+            return add(triple)
+
+        graph.bind = record_bind
+        if added is not None:
+            graph.add = record_add
+        try:
+            parse_file(graph, path, format)
+        finally:
+            del graph.bind
+            if added is not None:
+                del graph.add
+        with self.lock:
+            self.misses += 1
+            self.parse_seconds += time.perf_counter() - start
+        try:
+            graph_snapshot.write_snapshot(graph if added is None else added, entry,
+                                          prefixes.namespace_manager.namespaces(), [Path(path).resolve()])
+            self.evict()
+        except OSError as e:
+            print(f"Warning: could not cache {path}: {e}", file=sys.stderr)
+        return graph
+
+    @staticmethod
+    def _size(entry):
+        return sum(f.stat().st_size for f in entry.iterdir())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.glob(f"*{graph_snapshot.SUFFIX}"):
+            try:
+                mtime = (entry / "meta.json").stat().st_mtime
+                size = self._size(entry)
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, size, entry))
+            total += size
+        entries.sort()
+        for mtime, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+        return total
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "parse_s": round(self.parse_seconds, 3),
+            "load_s": round(self.load_seconds, 3),
+        }
+
+    def summary(self):
+        return (f"Graph cache: {self.hits} hits ({self.load_seconds:.2f}s loading), "
+                f"{self.misses} misses ({self.parse_seconds:.2f}s parsing)")
+
+    def record_stats(self):
+        """Append this process's counts to stats.jsonl in the cache directory"""
+        if not (self.hits or self.misses):
+            return
+        line = dict(self.stats(), time=time.strftime("%Y-%m-%dT%H:%M:%S"), pid=os.getpid(),
+                    script=Path(sys.argv[0]).name if sys.argv and sys.argv[0] else "")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_dir / "stats.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(line) + "\n")
+        except OSError:
+            pass
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process-wide ParseCache, or None when GRAPH_CACHE=0"""
+    global _cache
+    if not _env_flag("GRAPH_CACHE", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache()
+            atexit.register(_at_exit, _cache)
+        return _cache
+
+
+def _at_exit(cache):
+    if _env_flag("GRAPH_CACHE_STATS", False) and (cache.hits or cache.misses):
+        cache.record_stats()
+        print(cache.summary(), file=sys.stderr)
+
+
+def load_into(graph, path, format=None):
+    """
+    Add the triples of an RDF file (or snapshot directory) to graph.
+
+    Formats that carry named graphs (TriG, N-Quads) are parsed directly,
+    without the cache.
+    """
+    with instrumentation.stage("parse", file=Path(path).name) as st:
+        if st.active:
+            before = len(graph)
+        if graph_snapshot.is_snapshot(path):
+            with graph_snapshot.Snapshot(path) as snap:
+                snap.to_graph(graph)
+        else:
+            format = format or guess_format(path)
+            cache = get_cache()
+            if cache is None or format not in TRIPLE_FORMATS:
+                parse_file(graph, path, format)
+            else:
+                cache.load(path, format, graph)
+        if st.active:
+            st.count(triples=len(graph) - before)
+        return graph
+
+
+def load_graph(path, format=None, bind_namespaces="rdflib"):
+    """
+    An rdflib Graph of an RDF file or snapshot directory.
+
+    Drop-in for Graph(bind_namespaces=...).parse(path, format=format):
+    the graph has the same triples and prefixes either way.
+    """
+    return load_into(Graph(bind_namespaces=bind_namespaces), path, format)
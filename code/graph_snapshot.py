@@ -0,0 +1,362 @@
+"""
+Dictionary-encoded, memory-mapped snapshots of RDF graphs.
+
+A snapshot is a directory holding a graph in an HDT-like binary form:
+
+    meta.json     counts, id width, namespace prefixes, source files
+    terms.bin     every distinct term, encoded as UTF-8 and sorted bytewise
+    terms.off.npy offsets of each term in terms.bin (terms + 1 entries)
+    spo.npy       the triples as term ids, sorted by subject, predicate, object
+    pos.npy       ... by predicate, object, subject
+    osp.npy       ... by object, subject, predicate
+
+Each index is a (3, n) array whose rows are its three key columns, so
+each column is contiguous on disk. Term ids are positions in the sorted
+dictionary. Opening a snapshot maps these files into memory, which takes
+milliseconds however large the graph, and pages are read only when a
+lookup touches them.
+
+A term is encoded as a kind letter followed by its text: "U" + IRI,
+"B" + blank node id, or "L" + lexical form, a NUL and then "@" + language
+tag or "^" + datatype IRI (nothing for a plain string).
+
+Snapshots hold the union of all graphs in the sources; named graphs from
+TriG files are merged and RDF-star Turtle is lowered to reification, as
+sparql_engine.load_dataset() does.
+
+Example:
+    from graph_snapshot import Snapshot
+    snap = Snapshot("data/heritage_complete.snap")
+    ids = snap.triple_ids((None, snap.id_of(RDF.type), snap.id_of(NS.Recording)))
+    recordings = [snap.term(i) for i in ids[0]]
+"""
+
+import json
+import mmap
+import os
+import shutil
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from rdflib import BNode, Graph, Literal, URIRef
+
+import sparql_engine
+
+FORMAT_VERSION = 1
+
+SUFFIX = ".snap"
+
+# Index name -> the order of (s, p, o) columns it is sorted on
+INDEXES = {"spo": (0, 1, 2), "pos": (1, 2, 0), "osp": (2, 0, 1)}
+
+
+def encode_term(term):
+    """The dictionary encoding of an RDF term, as bytes"""
+    if isinstance(term, URIRef):
+        text = "U" + term
+    elif isinstance(term, BNode):
+        text = "B" + term
+    elif isinstance(term, Literal):
+        if term.language:
+            text = f"L{term}\x00@{term.language}"
+        elif term.datatype:
+            text = f"L{term}\x00^{term.datatype}"
+        else:
+            text = f"L{term}\x00"
+    else:
+        raise TypeError(f"Cannot encode {type(term).__name__}: {term!r}")
+    return text.encode("utf-8")
+
+
+def decode_term(data):
+    """The RDF term for an encoded dictionary entry"""
+    text = data.decode("utf-8")
+    kind, value = text[0], text[1:]
+    if kind == "U":
+        return URIRef(value)
+    if kind == "B":
+        return BNode(value)
+    lexical, _, tag = value.rpartition("\x00")
+    if tag.startswith("@"):
+        return Literal(lexical, lang=tag[1:])
+    if tag.startswith("^"):
+        return Literal(lexical, datatype=tag[1:])
+    return Literal(lexical)
+
+
+def is_snapshot(path):
+    """Whether path is a snapshot directory"""
+    return (Path(path) / "meta.json").is_file()
+
+
+def _id_dtype(n_terms):
+    return np.uint32 if n_terms < 2 ** 32 else np.uint64
+
+
+def write_snapshot(triples, out_dir, namespaces=(), sources=()):
+    """
+    Encode triples into a snapshot directory at out_dir.
+
+    triples is any iterable of (s, p, o) rdflib terms; duplicates are
+    dropped. The snapshot is built next to out_dir and moved into place
+    when complete, replacing an older snapshot there. Returns the
+    number of distinct triples.
+    """
+    out_dir = Path(out_dir)
+    ids = {}
+    columns = ([], [], [])
+    for triple in triples:
+        for column, term in zip(columns, triple):
+            i = ids.get(term)
+            if i is None:
+                i = ids[term] = len(ids)
+            column.append(i)
+
+    # Number terms by their sorted encoding so ids can be found by bisection
+    encoded = [encode_term(term) for term in ids]
+    order = sorted(range(len(encoded)), key=encoded.__getitem__)
+    dtype = _id_dtype(len(encoded))
+    remap = np.empty(len(encoded), dtype=dtype)
+    remap[order] = np.arange(len(encoded), dtype=dtype)
+    spo = np.stack([remap[np.asarray(c, dtype=np.int64)] for c in columns]) if columns[0] \
+        else np.empty((3, 0), dtype=dtype)
+
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.{os.getpid()}.tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    with open(tmp_dir / "terms.bin", "wb") as f:
+        position = 0
+        for k, i in enumerate(order):
+            f.write(encoded[i])
+            position += len(encoded[i])
+            offsets[k + 1] = position
+    np.save(tmp_dir / "terms.off.npy", offsets)
+
+    n_triples = 0
+    for name, key in INDEXES.items():
+        rows = spo[list(key)]
+        rows = rows[:, np.lexsort(rows[::-1])]
+        if rows.shape[1]:
+            keep = np.ones(rows.shape[1], dtype=bool)
+            keep[1:] = (rows[:, 1:] != rows[:, :-1]).any(axis=0)
+            rows = rows[:, keep]
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(rows))
+        n_triples = rows.shape[1]
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "triples": n_triples,
+        "terms": len(encoded),
+        "id_dtype": np.dtype(dtype).name,
+        "namespaces": {prefix: str(ns) for prefix, ns in namespaces},
+        "sources": [
+            {"path": str(p), "size": Path(p).stat().st_size, "mtime": Path(p).stat().st_mtime}
+            for p in sources
+        ],
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    tmp_dir.rename(out_dir)
+    return n_triples
+
+
+def build_snapshot(path, out_dir=None):
+    """
+    Parse a data file or directory of files and write its snapshot.
+
+    Accepts every format sparql_engine.data_files() does, including TriG
+    and RDF-star Turtle. out_dir defaults to the input path with a .snap
+    suffix. Returns (out_dir, number of triples).
+    """
+    path = Path(path)
+    files = sparql_engine.data_files(path)
+    if not files:
+        raise ValueError(f"No RDF data files found in: {path}")
+    dataset = sparql_engine.load_dataset(path)
+    out_dir = Path(out_dir) if out_dir else path.with_suffix(SUFFIX)
+    triples = ((s, p, o) for s, p, o, _ in dataset.quads((None, None, None, None)))
+    n = write_snapshot(triples, out_dir, dataset.namespace_manager.namespaces(), files)
+    return out_dir, n
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot directory.
+
+    Lookups work on integer term ids: id_of() finds the id of a term,
+    triple_ids() returns the matching triples as a (3, k) array of ids
+    (rows s, p, o) and term() decodes an id. triples(), objects(),
+    subjects(), value() and friends follow the rdflib Graph methods of
+    the same name for code written against a Graph, decoding only the
+    terms they return.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version in {self.path}: {self.meta.get('version')}")
+        self.offsets = np.load(self.path / "terms.off.npy", mmap_mode="r")
+        self._file = open(self.path / "terms.bin", "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._terms = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.indexes = {name: np.load(self.path / f"{name}.npy", mmap_mode="r") for name in INDEXES}
+        self.term = lru_cache(maxsize=65536)(self._decode)
+
+    def close(self):
+        if isinstance(self._terms, mmap.mmap):
+            self._terms.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.meta["triples"]
+
+    @property
+    def term_count(self):
+        return self.meta["terms"]
+
+    def namespaces(self):
+        return iter(self.meta["namespaces"].items())
+
+    # Dictionary
+
+    def encoded(self, i):
+        """The encoded bytes of term id i"""
+        return self._terms[int(self.offsets[i]):int(self.offsets[i + 1])]
+
+    def _decode(self, i):
+        return decode_term(self.encoded(i))
+
+    def id_of(self, term):
+        """The id of term, or None if the snapshot does not contain it"""
+        key = encode_term(term)
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.encoded(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.term_count and self.encoded(lo) == key else None
+
+    # Triple lookups
+
+    def _index_for(self, pattern):
+        """The index whose key starts with the bound positions of pattern"""
+        s, p, o = (x is not None for x in pattern)
+        if s and (p or not o):
+            return "spo"
+        if p:
+            return "pos"
+        return "osp"
+
+    def triple_ids(self, pattern=(None, None, None)):
+        """
+        The triples matching a pattern of term ids (None = any).
+
+        Returns a (3, k) array with rows subject, predicate, object, a
+        view of the mapped index wherever possible.
+        """
+        name = self._index_for(pattern)
+        key = INDEXES[name]
+        rows = self.indexes[name]
+        lo, hi = 0, rows.shape[1]
+        for column, position in enumerate(key):
+            value = pattern[position]
+            if value is None:
+                break
+            keys = rows[column, lo:hi]
+            start = lo + int(np.searchsorted(keys, value, "left"))
+            hi = lo + int(np.searchsorted(keys, value, "right"))
+            lo = start
+        found = rows[:, lo:hi]
+        # Rows back in s, p, o order
+        return found[[key.index(0), key.index(1), key.index(2)]] if name != "spo" else found
+
+    def count(self, pattern=(None, None, None)):
+        return self.triple_ids(pattern).shape[1]
+
+    def _pattern_ids(self, pattern):
+        """Term pattern -> id pattern, or None if a bound term is not in the dictionary"""
+        ids = []
+        for term in pattern:
+            if term is None:
+                ids.append(None)
+                continue
+            i = self.id_of(term)
+            if i is None:
+                return None
+            ids.append(i)
+        return tuple(ids)
+
+    def triples(self, pattern):
+        ids = self._pattern_ids(pattern)
+        if ids is None:
+            return
+        found = self.triple_ids(ids)
+        term = self.term
+        for s, p, o in zip(*(found[k].tolist() for k in range(3))):
+            yield term(s), term(p), term(o)
+
+    def __iter__(self):
+        return self.triples((None, None, None))
+
+    def __contains__(self, triple):
+        ids = self._pattern_ids(triple)
+        return ids is not None and self.count(ids) > 0
+
+    def _column(self, pattern, position):
+        ids = self._pattern_ids(pattern)
+        if ids is None:
+            return
+        for i in self.triple_ids(ids)[position].tolist():
+            yield self.term(i)
+
+    def subjects(self, predicate=None, object=None):
+        return self._column((None, predicate, object), 0)
+
+    def predicates(self, subject=None, object=None):
+        return self._column((subject, None, object), 1)
+
+    def objects(self, subject=None, predicate=None):
+        return self._column((subject, predicate, None), 2)
+
+    def subject_objects(self, predicate=None):
+        ids = self._pattern_ids((None, predicate, None))
+        if ids is None:
+            return
+        found = self.triple_ids(ids)
+        for s, o in zip(found[0].tolist(), found[2].tolist()):
+            yield self.term(s), self.term(o)
+
+    def value(self, subject=None, predicate=None, object=None):
+        """One term matching the pattern, like Graph.value()"""
+        position = 2 if object is None else 0 if subject is None else 1
+        return next(self._column((subject, predicate, object), position), None)
+
+    def to_graph(self, graph=None):
+        """Copy the triples into an rdflib Graph (a new one by default)"""
+        graph = Graph(bind_namespaces="core") if graph is None else graph
+        for prefix, namespace in self.namespaces():
+            graph.bind(prefix, namespace)
+        # Every term is needed, so decode the dictionary once in order
+        data, offsets = self._terms, self.offsets.tolist()
+        terms = [decode_term(data[a:b]) for a, b in zip(offsets, offsets[1:])]
+        spo = self.indexes["spo"]
+        graph.addN((terms[s], terms[p], terms[o], graph)
+                   for s, p, o in zip(spo[0].tolist(), spo[1].tolist(), spo[2].tolist()))
+        return graph
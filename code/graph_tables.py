@@ -0,0 +1,329 @@
+"""
+Node and edge tables of the heritage graph, for tools other than Gephi.
+
+GEXF is XML: slow to write and slow to read back into pandas, DuckDB or
+a graph library. The writers here take the columns of a GraphExtract
+(see export-to-gephi.py) as they are and write them in batches of rows,
+without building any XML for the table formats:
+
+    parquet     nodes.parquet and edges.parquet in an output directory
+                (needs pyarrow)
+    arrow       nodes.arrow and edges.arrow, Arrow IPC files that can be
+                memory-mapped (needs pyarrow)
+    csv         nodes.csv and edges.csv
+    graphml     one GraphML file, for networkx, igraph, yEd and Cytoscape
+
+Node table: id, uri, label, type, types, access_level, is_elder, then
+the network metrics and x, y when they were computed. Edge table:
+source, target, property. id is the node number, and source, target
+and the lineage metric refer to it. Nodes are numbered in URI order, so
+two exports of the same data have the same ids. In GraphML nodes are "n<id>" as in
+the GEXF export, and lineage is the founder's label.
+
+In Parquet and Arrow the columns are typed: type and property are
+dictionary encoded, types is a list of strings, and access_level and
+lineage are null where a node has none. In CSV, types are separated by
+"|" and missing values are left empty.
+
+Example:
+    ex = extract_graph(load_graph("data/heritage_complete.ttl"))
+    write_tables(ex, "visualizations/heritage_network", "parquet")
+    # duckdb: SELECT type, count(*) FROM 'visualizations/heritage_network/nodes.parquet' GROUP BY type
+"""
+
+import csv
+import os
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+import graph_analytics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# format -> file suffix
+FORMATS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+    "csv": ".csv",
+    "graphml": ".graphml",
+}
+
+BATCH_SIZE = 1 << 16
+
+GRAPHML_NS = "http://graphml.graphdrawing.org/xmlns"
+
+# GEXF attribute type -> (GraphML attr.type, Arrow type name)
+_TYPES = {
+    "integer": ("long", "int64"),
+    "double": ("double", "float64"),
+    "string": ("string", "string"),
+}
+
+
+def require_pyarrow(fmt):
+    if pa is None:
+        raise ImportError(f"pyarrow is needed for {fmt} output. Install it with: pip install pyarrow",
+                          name="pyarrow")
+
+
+def _local_name(uri):
+    return str(uri).split('#')[-1].split('/')[-1]
+
+
+def node_types(ex):
+    """Primary type of every node ("Entity" without one) and the sorted distinct types"""
+    primary = [types[0] if types else "Entity" for types in ex.types]
+    return primary, sorted(set(primary))
+
+
+def node_batches(ex, metrics=None, positions=None, batch_size=BATCH_SIZE):
+    """
+    Yield the node table in batches of up to batch_size rows, each a
+    dict of column name -> list or NumPy array.
+    """
+    primary, _ = node_types(ex)
+    access = np.asarray(ex.access_level, dtype=np.int64)
+    elder = np.frombuffer(bytes(ex.is_elder), dtype=np.uint8).astype(bool)
+    for start in range(0, len(ex), batch_size):
+        end = min(start + batch_size, len(ex))
+        labels = ex.labels[start:end]
+        uris = ex.uris[start:end]
+        batch = {
+            "id": np.arange(start, end, dtype=np.int64),
+            "uri": [str(uri) for uri in uris],
+            "label": [label if label is not None else _local_name(uri) for label, uri in zip(labels, uris)],
+            "type": primary[start:end],
+            "types": ex.types[start:end],
+            "access_level": access[start:end],
+            "is_elder": elder[start:end],
+        }
+        for name, values in (metrics or {}).items():
+            batch[name] = values[start:end]
+        if positions is not None:
+            batch["x"] = positions[start:end, 0]
+            batch["y"] = positions[start:end, 1]
+        yield batch
+
+
+def edge_batches(ex, batch_size=BATCH_SIZE):
+    """
+    Yield the edge table in batches: source and target node numbers and
+    property, an index into ex.prop_names.
+    """
+    source = np.asarray(ex.edge_source, dtype=np.int64)
+    target = np.asarray(ex.edge_target, dtype=np.int64)
+    prop = np.asarray(ex.edge_prop, dtype=np.int32)
+    for start in range(0, len(source), batch_size):
+        end = start + batch_size
+        yield {"source": source[start:end], "target": target[start:end], "property": prop[start:end]}
+
+
+def _metric_types(metrics):
+    return {name: graph_analytics.METRIC_ATTRIBUTES[name][1] for name in (metrics or {})}
+
+
+def _arrow_schemas(ex, metrics, positions):
+    string_dict = pa.dictionary(pa.int32(), pa.string())
+    node_fields = [
+        pa.field("id", pa.int64(), nullable=False),
+        pa.field("uri", pa.string(), nullable=False),
+        pa.field("label", pa.string(), nullable=False),
+        pa.field("type", string_dict, nullable=False),
+        pa.field("types", pa.list_(pa.string()), nullable=False),
+        pa.field("access_level", pa.int64()),
+        pa.field("is_elder", pa.bool_(), nullable=False),
+    ]
+    for name, attr_type in _metric_types(metrics).items():
+        # lineage is a node number in the tables
+        arrow_type = "int64" if name == "lineage" else _TYPES[attr_type][1]
+        node_fields.append(pa.field(name, getattr(pa, arrow_type)()))
+    if positions is not None:
+        node_fields += [pa.field("x", pa.float64()), pa.field("y", pa.float64())]
+    edge_fields = [
+        pa.field("source", pa.int64(), nullable=False),
+        pa.field("target", pa.int64(), nullable=False),
+        pa.field("property", string_dict, nullable=False),
+    ]
+    return pa.schema(node_fields), pa.schema(edge_fields)
+
+
+def _arrow_node_batch(batch, schema, type_names):
+    # Every batch carries the whole dictionary, as Arrow IPC files require
+    type_index = {name: i for i, name in enumerate(type_names)}
+    dictionary = pa.array(type_names, type=pa.string())
+    columns = []
+    for field in schema:
+        values = batch[field.name]
+        if field.name == "type":
+            indices = pa.array(np.fromiter((type_index[t] for t in values), dtype=np.int32, count=len(values)))
+            columns.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+        elif field.name in ("access_level", "lineage"):
+            columns.append(pa.array(values, type=field.type, mask=values < 0))
+        else:
+            columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _arrow_edge_batch(batch, schema, prop_names):
+    dictionary = pa.array(prop_names, type=pa.string())
+    return pa.RecordBatch.from_arrays([
+        pa.array(batch["source"], type=pa.int64()),
+        pa.array(batch["target"], type=pa.int64()),
+        pa.DictionaryArray.from_arrays(pa.array(batch["property"], type=pa.int32()), dictionary),
+    ], schema=schema)
+
+
+class _ParquetSink:
+    def __init__(self, path, schema):
+        self.writer = pq.ParquetWriter(str(path), schema)
+
+    def write(self, batch):
+        self.writer.write_table(pa.Table.from_batches([batch]))
+
+    def close(self):
+        self.writer.close()
+
+
+class _ArrowSink:
+    def __init__(self, path, schema):
+        self.file = pa.OSFile(str(path), "wb")
+        self.writer = pa.ipc.new_file(self.file, schema)
+
+    def write(self, batch):
+        self.writer.write_batch(batch)
+
+    def close(self):
+        self.writer.close()
+        self.file.close()
+
+
+def _write_arrow_tables(ex, out_dir, fmt, metrics, positions, batch_size):
+    require_pyarrow(fmt)
+    node_schema, edge_schema = _arrow_schemas(ex, metrics, positions)
+    _, type_names = node_types(ex)
+    sink_class = _ParquetSink if fmt == "parquet" else _ArrowSink
+    suffix = FORMATS[fmt]
+
+    nodes = sink_class(out_dir / f"nodes{suffix}.tmp", node_schema)
+    try:
+        for batch in node_batches(ex, metrics, positions, batch_size):
+            nodes.write(_arrow_node_batch(batch, node_schema, type_names))
+    finally:
+        nodes.close()
+    edges = sink_class(out_dir / f"edges{suffix}.tmp", edge_schema)
+    try:
+        for batch in edge_batches(ex, batch_size):
+            edges.write(_arrow_edge_batch(batch, edge_schema, ex.prop_names))
+    finally:
+        edges.close()
+
+
+def _write_csv_tables(ex, out_dir, metrics, positions, batch_size):
+    names = ex.prop_names
+    with open(out_dir / "nodes.csv.tmp", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        header = None
+        for batch in node_batches(ex, metrics, positions, batch_size):
+            if header is None:
+                header = list(batch)
+                writer.writerow(header)
+            columns = []
+            for name in header:
+                values = batch[name]
+                if name == "types":
+                    values = ["|".join(types) for types in values]
+                elif name in ("access_level", "lineage"):
+                    values = ["" if v < 0 else v for v in values.tolist()]
+                elif name == "is_elder":
+                    values = ["true" if v else "false" for v in values.tolist()]
+                elif isinstance(values, np.ndarray):
+                    values = values.tolist()
+                columns.append(values)
+            writer.writerows(zip(*columns))
+        if header is None:
+            writer.writerow(["id", "uri", "label", "type", "types", "access_level", "is_elder"])
+    with open(out_dir / "edges.csv.tmp", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "target", "property"])
+        for batch in edge_batches(ex, batch_size):
+            writer.writerows(zip(batch["source"].tolist(), batch["target"].tolist(),
+                                 [names[k] for k in batch["property"].tolist()]))
+
+
+def write_tables(ex, out_dir, fmt, metrics=None, positions=None, batch_size=BATCH_SIZE):
+    """
+    Write the node and edge tables of a GraphExtract into out_dir as
+    nodes.<suffix> and edges.<suffix> in fmt ("parquet", "arrow" or
+    "csv"). Both files are written under temporary names and renamed
+    when complete. Returns the two paths.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    suffix = FORMATS[fmt]
+    if fmt == "csv":
+        _write_csv_tables(ex, out_dir, metrics, positions, batch_size)
+    else:
+        _write_arrow_tables(ex, out_dir, fmt, metrics, positions, batch_size)
+    paths = []
+    for table in ("nodes", "edges"):
+        path = out_dir / f"{table}{suffix}"
+        os.replace(out_dir / f"{table}{suffix}.tmp", path)
+        paths.append(path)
+    return paths
+
+
+def write_graphml(ex, output_file, metrics=None, positions=None, batch_size=BATCH_SIZE):
+    """Write a GraphExtract as a GraphML file, one batch of elements at a time"""
+    names = ex.prop_names
+    metric_types = _metric_types(metrics)
+    keys = [("uri", "string"), ("label", "string"), ("type", "string"), ("types", "string"),
+            ("access_level", "long"), ("is_elder", "boolean")]
+    keys += [(name, _TYPES[attr_type][0]) for name, attr_type in metric_types.items()]
+    if positions is not None:
+        keys += [("x", "double"), ("y", "double")]
+
+    with open(output_file, "w", encoding="utf-8", buffering=1 << 16) as f:
+        w = f.write
+        w('<?xml version="1.0" encoding="UTF-8"?>\n')
+        w(f'<graphml xmlns="{GRAPHML_NS}">\n')
+        for name, attr_type in keys:
+            w(f'  <key id="{name}" for="node" attr.name="{name}" attr.type="{attr_type}"/>\n')
+        w('  <key id="property" for="edge" attr.name="property" attr.type="string"/>\n')
+        w('  <graph id="heritage" edgedefault="directed">\n')
+
+        for batch in node_batches(ex, metrics, positions, batch_size):
+            columns = {name: (values.tolist() if isinstance(values, np.ndarray) else values)
+                       for name, values in batch.items()}
+            parts = []
+            for row in range(len(columns["id"])):
+                parts.append(f'    <node id="n{columns["id"][row]}">\n')
+                for name, _ in keys:
+                    value = columns[name][row]
+                    if name == "types":
+                        value = "|".join(value)
+                    elif name in ("access_level", "lineage") and value < 0:
+                        continue
+                    elif name == "lineage":
+                        value = graph_analytics.node_label(ex, value)
+                    elif name == "is_elder":
+                        value = "true" if value else "false"
+                    parts.append(f'      <data key="{name}">{escape(str(value))}</data>\n')
+                parts.append('    </node>\n')
+            w(''.join(parts))
+
+        edge_id = 0
+        for batch in edge_batches(ex, batch_size):
+            parts = []
+            for s, t, k in zip(batch["source"].tolist(), batch["target"].tolist(), batch["property"].tolist()):
+                parts.append(f'    <edge id="e{edge_id}" source="n{s}" target="n{t}">'
+                             f'<data key="property">{names[k]}</data></edge>\n')
+                edge_id += 1
+            w(''.join(parts))
+        w('  </graph>\n</graphml>\n')
+    return len(ex), edge_id
@@ -0,0 +1,578 @@
+"""
+Synthetic heritage datasets at any scale.
+
+Generates data that follows ontology/s2024700102heritage.ttl the way the
+hand-written datasets do: locations, communities, roles and
+competencies, instruments (some sacred, some under a restriction date),
+musical works, stories, rituals, people and tribal elders with
+mentorship and approval chains, and one recording per performer. The
+contested ritual cycle claims of Question 2 are generated alongside, in
+all three representations (reification, named graphs and RDF-star).
+
+Without violations the data conforms to shapes/validation_shapes.ttl
+and validation/temporal-constraints.shacl. With violation_rate r, each
+person, recording and instrument independently gets, with probability
+r, one defect drawn from VIOLATION_KINDS, each aimed at one of the
+shapes. Injected defects are counted per kind. Some defects also trip
+a second shape (an access level of 4 also breaks the mentorship rule,
+for instance), so a validation report can hold more results than
+defects were injected.
+
+Triples are produced as strings in N-Triples syntax and written line by
+line, so 10^7 triples need no more memory than 10^3. The main dataset
+gets about n_triples triples; the claims files add roughly 6% on top,
+spread over the three representations.
+
+Example:
+    from heritage_generator import HeritageGenerator
+    gen = HeritageGenerator(100000, violation_rate=0.05, seed=1)
+    manifest = gen.write("benchmarks/data/100000")
+"""
+
+import io
+import json
+import random
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+from rdflib import Graph
+
+NS = "http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/"
+CLAIM_NS = NS + "claim/"
+
+PREFIXES = {
+    "": NS,
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+}
+
+RDF = PREFIXES["rdf"]
+RDFS = PREFIXES["rdfs"]
+XSD = PREFIXES["xsd"]
+
+TYPE = f"<{RDF}type>"
+LABEL = f"<{RDFS}label>"
+
+# Triples per performer, all entity kinds included, measured on the
+# generated output; used to turn a triple budget into a head count
+TRIPLES_PER_PERSON = 20.6
+
+VIOLATION_KINDS = {
+    "person": [
+        "access-level-out-of-range",        # ValidationShape
+        "approval-not-boolean",             # ValidationShape
+        "missing-role",                     # PersonWithRoleShape
+        "missing-community",                # CommunityMemberShape
+        "mentor-lower-access",              # MentorshipShape
+        "approved-without-human-approval",  # ApprovalConsistencyShape
+        "level-3-without-approval",         # AccessLevelHierarchyShape
+        "ashiq-without-instrument-skill",   # CompetencyRoleShape
+    ],
+    "elder": [
+        "elder-access-level",               # TribalElderShape
+        "elder-without-approval",           # TribalElderShape
+    ],
+    "recording": [
+        "missing-recording-date",           # RecordingShape
+        "missing-location",                 # RecordingShape
+        "bad-date-format",                  # DateFormatShape
+        "temporal-access",                  # RecordingAccessLevelShape, RecordingTemporalAccessShape
+        "instrument-not-played",            # RecordingInstrumentShape
+    ],
+    "instrument": [
+        "instrument-without-location",      # InstrumentShape
+        "sacred-without-guardian",          # SacredItemShape
+        "sacred-low-access-level",          # SacredItemShape
+    ],
+}
+
+ROLES = [
+    ("RoleAshiq", "AshiqRole", "Ashiq Role", "Aşıq Rolu"),
+    ("RoleOzan", "OzanRole", "Ozan Role", "Ozan Rolu"),
+    ("RoleDede", "DedeRole", "Dede Role", "Dədə Rolu"),
+    ("RoleShaman", "ShamanRole", "Shaman Role", "Şaman Rolu"),
+    ("RolePerformer", "PerformerRole", "Performer Role", "İfaçı Rolu"),
+    ("RoleResearcher", "ResearcherRole", "Researcher Role", "Tədqiqatçı Rolu"),
+    ("RoleGuardian", "GuardianRole", "Guardian Role", "Qoruyucu Rolu"),
+]
+
+INSTRUMENT_SKILLS = ["SkillBaglamaPlaying", "SkillDombraPlaying", "SkillQopuzPlaying"]
+COMPETENCIES = [
+    ("SkillBaglamaPlaying", "InstrumentSkill"),
+    ("SkillDombraPlaying", "InstrumentSkill"),
+    ("SkillQopuzPlaying", "InstrumentSkill"),
+    ("SkillTraditionalPoetry", "PoeticSkill"),
+    ("KnowledgeClassicalRepertoire", "RepertoireKnowledge"),
+    ("KnowledgeShamanRitual", "RitualKnowledge"),
+    ("KnowledgeEpicStorytelling", "StorytellingKnowledge"),
+]
+
+INSTRUMENT_CLASSES = ["Baglama", "Dombra", "Qopuz", "ShamanSaz"]
+
+CYCLES = [("LunarCycle", "Lunar Cycle", "Ay Dövrü"), ("SolarCycle", "Solar Cycle", "Günəş Dövrü")]
+
+FIRST_DATE = date(2000, 1, 1)
+LAST_DATE = date(2025, 12, 31)
+
+
+def iri(local):
+    return f"<{NS}{local}>"
+
+
+def integer(n):
+    return f'"{n}"^^<{XSD}integer>'
+
+
+def boolean(b):
+    return f'"{"true" if b else "false"}"^^<{XSD}boolean>'
+
+
+def xsd_date(d):
+    return f'"{d.isoformat()}"^^<{XSD}date>'
+
+
+def decimal(x):
+    return f'"{x}"^^<{XSD}decimal>'
+
+
+def text(value, lang=None):
+    return f'"{value}"@{lang}' if lang else f'"{value}"'
+
+
+def to_turtle(term):
+    """Shorten an N-Triples term with the PREFIXES where that gives a valid name"""
+    if term.startswith("<"):
+        for prefix, namespace in PREFIXES.items():
+            if term.startswith(namespace, 1):
+                local = term[len(namespace) + 1:-1]
+                if local.replace("_", "").isalnum():
+                    return f"{prefix}:{local}"
+        return term
+    if term.startswith('"') and term.endswith(">"):
+        value, _, datatype = term.rpartition("^^")
+        return f"{value}^^{to_turtle(datatype)}"
+    return term
+
+
+class HeritageGenerator:
+    """Plans a dataset of about n_triples triples and writes it out"""
+
+    def __init__(self, n_triples, violation_rate=0.0, seed=42):
+        self.n_triples = n_triples
+        self.violation_rate = violation_rate
+        self.seed = seed
+        self.rnd = random.Random(seed)
+        self.violations = Counter()
+
+        self.n_people = max(int(n_triples / TRIPLES_PER_PERSON), 20)
+        self.n_elders = max(self.n_people // 20, 2)
+        self.n_instruments = max(self.n_people // 4, 4)
+        self.n_works = max(self.n_people // 10, 3)
+        self.n_stories = max(self.n_people // 10, 3)
+        self.n_rituals = max(self.n_people // 10, 3)
+        self.n_locations = max(self.n_people // 100, 3)
+        self.n_communities = max(self.n_people // 80, 3)
+        self._plan_instruments()
+        self._plan_people()
+
+    # Planning: attributes other entities depend on, fixed up front
+
+    def _chance(self):
+        return self.rnd.random() < self.violation_rate
+
+    def _random_date(self, first=FIRST_DATE, last=LAST_DATE):
+        return first + timedelta(days=self.rnd.randrange((last - first).days + 1))
+
+    def _plan_instruments(self):
+        rnd = self.rnd
+        self.instrument_sacred = [rnd.random() < 0.1 for _ in range(self.n_instruments)]
+        self.instrument_level = [
+            rnd.randint(2, 3) if sacred else rnd.randint(1, 3) for sacred in self.instrument_sacred
+        ]
+        self.instrument_restriction = [
+            self._random_date(date(2015, 1, 1)) if rnd.random() < 0.3 else None
+            for _ in range(self.n_instruments)
+        ]
+
+    def _plan_people(self):
+        """Access levels, with elders first; person i < n_elders is an elder"""
+        rnd = self.rnd
+        self.person_level = [3] * self.n_elders + [
+            rnd.choices((1, 2, 3), (5, 4, 1))[0] for _ in range(self.n_people - self.n_elders)
+        ]
+        self.by_level = {1: [], 2: [], 3: []}
+        for i in range(self.n_elders, self.n_people):
+            self.by_level[self.person_level[i]].append(i)
+        self.person_instrument = [rnd.randrange(self.n_instruments) for _ in range(self.n_people)]
+
+    # Entities
+
+    def _vocabulary(self):
+        for i in range(self.n_locations):
+            s = iri(f"Location{i}")
+            yield s, TYPE, iri("Location")
+            yield s, LABEL, text(f"Location {i}", "en")
+            yield s, LABEL, text(f"Məkan {i}", "az")
+        for i in range(self.n_communities):
+            s = iri(f"Community{i}")
+            yield s, TYPE, iri("Community")
+            yield s, LABEL, text(f"Community {i}", "en")
+            yield s, LABEL, text(f"İcma {i}", "az")
+        for local, cls, en, az in ROLES:
+            yield iri(local), TYPE, iri(cls)
+            yield iri(local), LABEL, text(en, "en")
+            yield iri(local), LABEL, text(az, "az")
+        for local, cls in COMPETENCIES:
+            yield iri(local), TYPE, iri(cls)
+
+    def _location(self):
+        return iri(f"Location{self.rnd.randrange(self.n_locations)}")
+
+    def _instruments(self):
+        rnd = self.rnd
+        for i in range(self.n_instruments):
+            s = iri(f"Instrument{i}")
+            cls = INSTRUMENT_CLASSES[i % len(INSTRUMENT_CLASSES)]
+            sacred = self.instrument_sacred[i]
+            level = self.instrument_level[i]
+            yield s, TYPE, iri(cls)
+            yield s, TYPE, iri("Instrument")
+            yield s, LABEL, text(f"{cls} {i}", "en")
+            yield s, LABEL, text(f"{cls} {i}", "az")
+
+            defect = None
+            if self._chance():
+                kinds = VIOLATION_KINDS["instrument"] if sacred else VIOLATION_KINDS["instrument"][:1]
+                defect = rnd.choice(kinds)
+                self.violations[defect] += 1
+            if defect != "instrument-without-location":
+                yield s, iri("locatedIn"), self._location()
+            if defect == "sacred-low-access-level":
+                level = self.instrument_level[i] = 1
+            yield s, iri("requiresAccessLevel"), integer(level)
+            if self.instrument_restriction[i]:
+                yield s, iri("restrictionEffectiveDate"), xsd_date(self.instrument_restriction[i])
+            if sacred:
+                yield s, TYPE, iri("SacredItem")
+                if defect != "sacred-without-guardian":
+                    yield iri(f"Person{rnd.randrange(self.n_elders)}"), iri("caresFor"), s
+
+    def _works(self):
+        rnd = self.rnd
+        for cls, count, en, az in (("MusicalWork", self.n_works, "Work", "Əsər"),
+                                   ("Story", self.n_stories, "Story", "Dastan"),
+                                   ("Ritual", self.n_rituals, "Ritual", "Mərasim")):
+            for i in range(count):
+                s = iri(f"{cls}{i}")
+                yield s, TYPE, iri(cls)
+                yield s, LABEL, text(f"{en} {i}", "en")
+                yield s, LABEL, text(f"{az} {i}", "az")
+                yield s, iri("locatedIn"), self._location()
+                yield s, iri("requiresAccessLevel"), integer(rnd.randint(1, 3))
+                if cls == "Ritual" and rnd.random() < 0.2:
+                    yield s, iri("restrictionEffectiveDate"), xsd_date(self._random_date(date(2015, 1, 1)))
+
+    def _elder(self, i):
+        rnd = self.rnd
+        s = iri(f"Person{i}")
+        level, approval = 3, True
+        if self._chance():
+            defect = rnd.choice(VIOLATION_KINDS["elder"])
+            self.violations[defect] += 1
+            if defect == "elder-access-level":
+                level = self.person_level[i] = 2
+            else:
+                approval = False
+        yield s, TYPE, iri("TribalElder")
+        yield s, LABEL, text(f"Elder {i}", "en")
+        yield s, LABEL, text(f"Ağsaqqal {i}", "az")
+        yield s, iri("hasRole"), iri("RoleDede")
+        yield s, iri("memberOfCommunity"), iri(f"Community{rnd.randrange(self.n_communities)}")
+        yield s, iri("hasAccessLevel"), integer(level)
+        yield s, iri("humanApproval"), boolean(approval)
+        yield s, iri("playsInstrument"), iri(f"Instrument{self.person_instrument[i]}")
+        yield s, iri("knowsStory"), iri(f"Story{rnd.randrange(self.n_stories)}")
+
+    def _mentor(self, i, level):
+        """An earlier person allowed to mentor someone at level, or None"""
+        rnd = self.rnd
+        if rnd.random() < 0.4:
+            return rnd.randrange(self.n_elders)
+        for _ in range(4):
+            candidates = self.by_level[rnd.randint(level, 3)]
+            if candidates:
+                j = rnd.choice(candidates)
+                if j < i:
+                    return j
+        return None
+
+    def _person(self, i):
+        rnd = self.rnd
+        s = iri(f"Person{i}")
+        level = self.person_level[i]
+        role = rnd.randrange(len(ROLES))
+        defect = None
+        if self._chance():
+            defect = rnd.choice(VIOLATION_KINDS["person"])
+            self.violations[defect] += 1
+
+        approver = rnd.randrange(self.n_elders) if rnd.random() < 0.3 else None
+        approval = level == 3 or approver is not None or rnd.random() < 0.5
+        mentor = self._mentor(i, level)
+        if defect == "access-level-out-of-range":
+            level = 4
+        elif defect == "mentor-lower-access" and self.by_level[1] and self.by_level[1][0] < i:
+            level = 2
+            mentor = self.by_level[1][0]
+        elif defect == "approved-without-human-approval":
+            approver = rnd.randrange(self.n_elders)
+            approval = False
+        elif defect == "level-3-without-approval":
+            level, approver, approval = 3, None, False
+        elif defect == "ashiq-without-instrument-skill":
+            role = 0
+        self.person_level[i] = level
+
+        yield s, TYPE, iri("Person")
+        yield s, LABEL, text(f"Performer {i}", "en")
+        yield s, LABEL, text(f"İfaçı {i}", "az")
+        if defect != "missing-role":
+            yield s, iri("hasRole"), iri(ROLES[role][0])
+        if defect != "missing-community":
+            yield s, iri("memberOfCommunity"), iri(f"Community{rnd.randrange(self.n_communities)}")
+        yield s, iri("hasAccessLevel"), integer(level)
+        if defect == "approval-not-boolean":
+            yield s, iri("humanApproval"), text("yes")
+        else:
+            yield s, iri("humanApproval"), boolean(approval)
+        if approver is not None:
+            yield s, iri("approvedBy"), iri(f"Person{approver}")
+        if mentor is not None:
+            yield s, iri("mentoredBy"), iri(f"Person{mentor}")
+        yield s, iri("playsInstrument"), iri(f"Instrument{self.person_instrument[i]}")
+        if role == 0 and defect != "ashiq-without-instrument-skill":
+            yield s, iri("hasCompetency"), iri(rnd.choice(INSTRUMENT_SKILLS))
+        elif role != 0:
+            yield s, iri("hasCompetency"), iri(rnd.choice(COMPETENCIES)[0])
+        yield s, iri("knowsMusicalWork"), iri(f"MusicalWork{rnd.randrange(self.n_works)}")
+        if ROLES[role][1] == "GuardianRole" and any(self.instrument_sacred):
+            yield s, iri("caresFor"), iri(f"Instrument{self.instrument_sacred.index(True)}")
+        if rnd.random() < 0.2:
+            yield s, iri("performedInRitual"), iri(f"Ritual{rnd.randrange(self.n_rituals)}")
+
+    def _recording(self, i):
+        rnd = self.rnd
+        s = iri(f"Recording{i}")
+        performer = iri(f"Person{i}")
+        instrument = self.person_instrument[i]
+        defect = None
+        if self._chance():
+            defect = rnd.choice(VIOLATION_KINDS["recording"])
+            if defect == "temporal-access":
+                restricted = [j for j in rnd.sample(range(self.n_instruments), min(8, self.n_instruments))
+                              if self.instrument_restriction[j]
+                              and self.instrument_level[j] > self.person_level[i]]
+                if restricted:
+                    instrument = restricted[0]
+                    yield performer, iri("playsInstrument"), iri(f"Instrument{instrument}")
+                else:
+                    defect = "missing-location"
+            elif defect == "instrument-not-played" and self.n_instruments > 1:
+                instrument = (instrument + 1 + rnd.randrange(self.n_instruments - 1)) % self.n_instruments
+            self.violations[defect] += 1
+
+        restriction = self.instrument_restriction[instrument]
+        if defect == "temporal-access":
+            recorded = self._random_date(restriction + timedelta(days=1), max(restriction + timedelta(days=1), LAST_DATE))
+        elif restriction and self.person_level[i] < self.instrument_level[instrument]:
+            recorded = self._random_date(FIRST_DATE, restriction)
+        else:
+            recorded = self._random_date()
+
+        yield s, TYPE, iri("Recording")
+        yield s, LABEL, text(f"Recording {i}", "en")
+        yield s, iri("performedBy"), performer
+        if defect != "missing-location":
+            yield s, iri("recordedAt"), self._location()
+        if defect == "bad-date-format":
+            yield s, iri("recordingDate"), text(recorded.strftime("%d/%m/%Y"))
+        elif defect != "missing-recording-date":
+            yield s, iri("recordingDate"), xsd_date(recorded)
+        yield s, iri("usesInstrument"), iri(f"Instrument{instrument}")
+
+    def triples(self):
+        """The main dataset, as (s, p, o) strings in N-Triples syntax"""
+        yield from self._vocabulary()
+        yield from self._instruments()
+        yield from self._works()
+        for i in range(self.n_people):
+            yield from self._elder(i) if i < self.n_elders else self._person(i)
+            yield from self._recording(i)
+
+    # Contested claims
+
+    def claims(self):
+        """
+        Claims about which cycle each ritual belongs to, as dicts.
+
+        Most rituals are contested: two communities claim different
+        cycles. A ritual never has two claims about the same cycle, so
+        every claim is a distinct triple in the RDF-star form as well.
+        """
+        rnd = random.Random(self.seed + 1)
+        n = 0
+        for r in range(self.n_rituals):
+            cycles = rnd.sample(range(len(CYCLES)), 2 if rnd.random() < 0.7 else 1)
+            sources = rnd.sample(range(self.n_communities), len(cycles))
+            for cycle, source in zip(cycles, sources):
+                n += 1
+                yield {
+                    "id": n,
+                    "ritual": iri(f"Ritual{r}"),
+                    "cycle": iri(CYCLES[cycle][0]),
+                    "source": iri(f"Community{source}"),
+                    "source_name": f"community{source}",
+                    "confidence": decimal(rnd.randint(50, 99) / 100),
+                    "date": xsd_date(self._random_date(date(2020, 1, 1))),
+                }
+
+    @staticmethod
+    def _claim_vocabulary():
+        for local, en, az in CYCLES:
+            yield iri(local), TYPE, f"<{RDFS}Class>"
+            yield iri(local), LABEL, text(en, "en")
+            yield iri(local), LABEL, text(az, "az")
+
+    # Output
+
+    @staticmethod
+    def _prefix_lines():
+        return "".join(f"@prefix {p}: <{ns}> .\n" for p, ns in PREFIXES.items()) + "\n"
+
+    @staticmethod
+    def _write_lines(path, header, triples, fmt):
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header)
+            for s, p, o in triples:
+                if fmt == "nt":
+                    f.write(f"{s} {p} {o} .\n")
+                else:
+                    f.write(f"{to_turtle(s)} {to_turtle(p)} {to_turtle(o)} .\n")
+                count += 1
+        return count
+
+    def write_data(self, path, fmt="ttl"):
+        """Write the main dataset as Turtle or N-Triples; returns the triple count"""
+        header = self._prefix_lines() if fmt == "ttl" else ""
+        return self._write_lines(path, header, self.triples(), fmt)
+
+    def write_claims(self, out_dir):
+        """Write the claims in all three representations; returns triple counts"""
+        out_dir = Path(out_dir)
+        claims = list(self.claims())
+        header = self._prefix_lines()
+        belongs = to_turtle(iri("belongsTo"))
+        counts = {}
+
+        def reified():
+            yield from self._claim_vocabulary()
+            for c in claims:
+                s = iri(f"claim{c['id']}")
+                yield s, TYPE, f"<{RDF}Statement>"
+                yield s, f"<{RDF}subject>", c["ritual"]
+                yield s, f"<{RDF}predicate>", iri("belongsTo")
+                yield s, f"<{RDF}object>", c["cycle"]
+                yield s, iri("source"), c["source"]
+                yield s, iri("confidence"), c["confidence"]
+                yield s, iri("dateRecorded"), c["date"]
+
+        counts["reification"] = self._write_lines(
+            out_dir / "claims-reification.ttl", header, reified(), "ttl")
+
+        path = out_dir / "claims-named.trig"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header)
+            n = 0
+            for s, p, o in self._claim_vocabulary():
+                f.write(f"{to_turtle(s)} {to_turtle(p)} {to_turtle(o)} .\n")
+                n += 1
+            for c in claims:
+                g = f"<{CLAIM_NS}{c['source_name']}/{c['id']:03d}>"
+                f.write(f"{g} {{\n"
+                        f"    {to_turtle(c['ritual'])} {belongs} {to_turtle(c['cycle'])} .\n"
+                        f"    {g} :source {to_turtle(c['source'])} ;\n"
+                        f"        :confidence {to_turtle(c['confidence'])} ;\n"
+                        f"        :dateRecorded {to_turtle(c['date'])} .\n"
+                        f"}}\n")
+                n += 4
+        counts["named-graphs"] = n
+
+        path = out_dir / "claims-rdfstar.ttl"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header)
+            n = 0
+            for s, p, o in self._claim_vocabulary():
+                f.write(f"{to_turtle(s)} {to_turtle(p)} {to_turtle(o)} .\n")
+                n += 1
+            for c in claims:
+                f.write(f"<< {to_turtle(c['ritual'])} {belongs} {to_turtle(c['cycle'])} >>\n"
+                        f"    :source {to_turtle(c['source'])} ;\n"
+                        f"    :confidence {to_turtle(c['confidence'])} ;\n"
+                        f"    :dateRecorded {to_turtle(c['date'])} .\n")
+                n += 3
+        counts["rdf-star"] = n
+        counts["claims"] = len(claims)
+        return counts
+
+    def write(self, out_dir, fmt="ttl"):
+        """
+        Write heritage.<fmt>, the three claims files and manifest.json.
+
+        Returns the manifest: the parameters, entity and triple counts
+        and the injected violations per kind.
+        """
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        data_triples = self.write_data(out_dir / f"heritage.{fmt}", fmt)
+        claim_counts = self.write_claims(out_dir)
+        manifest = {
+            "target_triples": self.n_triples,
+            "violation_rate": self.violation_rate,
+            "seed": self.seed,
+            "format": fmt,
+            "data_file": f"heritage.{fmt}",
+            "triples": data_triples,
+            "claims": claim_counts,
+            "entities": {
+                "people": self.n_people,
+                "elders": self.n_elders,
+                "recordings": self.n_people,
+                "instruments": self.n_instruments,
+                "musical_works": self.n_works,
+                "stories": self.n_stories,
+                "rituals": self.n_rituals,
+                "locations": self.n_locations,
+                "communities": self.n_communities,
+            },
+            "violations": dict(sorted(self.violations.items())),
+            "violations_total": sum(self.violations.values()),
+        }
+        (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        return manifest
+
+
+def generate_graph(n_triples, violation_rate=0.0, seed=42):
+    """The main dataset as an rdflib Graph, for in-process benchmarks"""
+    gen = HeritageGenerator(n_triples, violation_rate, seed)
+    buffer = io.StringIO()
+    for s, p, o in gen.triples():
+        buffer.write(f"{s} {p} {o} .\n")
+    g = Graph()
+    g.parse(data=buffer.getvalue(), format="nt")
+    for prefix, namespace in PREFIXES.items():
+        g.bind(prefix, namespace)
+    return g
@@ -0,0 +1,463 @@
+"""
+Per-stage timing and memory instrumentation for the pipeline scripts.
+
+Scripts wrap their stages (parsing, extraction, validation, each query,
+each upload) in stage():
+
+    with instrumentation.stage("query", query=name) as st:
+        result = run(query)
+        st.count(rows=len(result))
+
+When instrumentation is off, stage() hands back a shared no-op object
+and costs next to nothing. When it is on, every stage records its wall
+time, CPU time (process_time), peak RSS and item counts. Peak RSS is
+per stage on Linux, where the kernel's high-water mark can be reset
+(/proc/self/clear_refs); an enclosing stage still sees the peaks of
+the stages nested in it. The mark belongs to the whole process, so it
+is only reset while no other thread is inside a stage: stages that
+overlap with one on another thread report the process peak since the
+earliest of them started, and their JSON records say so with
+"peak_rss_shared": true. Elsewhere every stage reports the process
+peak so far.
+
+Output is either one JSON line per finished stage, appended as the
+stage ends, or Prometheus text format with the totals per stage,
+written at exit (for node_exporter's textfile collector, for example).
+Every process merges its totals into the existing .prom file under a
+file lock rather than replacing it, so child processes and later runs
+add to the counters, and the peak RSS gauge keeps the highest value;
+delete the file to start from zero.
+
+One named stage can also be profiled: with cProfile, every run of the
+stage is added to one profile, which is dumped as a .prof file at exit
+(open it with `python -m pstats` or snakeviz). With tracemalloc, the
+top allocation sites of each run are printed to stderr and included in
+its JSON record.
+
+Environment (scripts with argparse also take --metrics, --metrics-format,
+--profile-stage and --profile-mode, which set these):
+    PIPELINE_METRICS=<file>|-          enable; append records to file ("-" for stderr)
+    PIPELINE_METRICS_FORMAT=jsonl|prometheus
+                                       default: prometheus for *.prom files, else jsonl
+    PIPELINE_PROFILE=<stage>           profile every run of that stage
+    PIPELINE_PROFILE_MODE=cprofile|tracemalloc   (default: cprofile)
+    PIPELINE_PROFILE_OUT=<file>        cProfile output (default: <stage>-<pid>.prof)
+
+Example:
+    PIPELINE_METRICS=metrics.jsonl python code/export-to-gephi.py data/heritage_complete.ttl
+    python code/run-queries.py --metrics queries.prom --profile-stage query
+"""
+
+import atexit
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FORMATS = ("jsonl", "prometheus")
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+_HWM = re.compile(r"VmHWM:\s+(\d+) kB")
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$")
+
+
+def _read_hwm():
+    """Peak RSS in bytes since the last reset (Linux), else since start"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            match = _HWM.search(f.read())
+        if match:
+            return int(match.group(1)) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _reset_hwm():
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(round(value, 6))
+
+
+def _parse_prometheus(text):
+    """{name: [help, type, {labels: value}]} of Prometheus text, in order"""
+    metrics = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP ") or line.startswith("# TYPE "):
+            parts = line.split(" ", 3)
+            entry = metrics.setdefault(parts[2], ["", "untyped", {}])
+            entry[0 if parts[1] == "HELP" else 1] = parts[3] if len(parts) > 3 else ""
+            continue
+        match = _SAMPLE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            value = float(value) if any(c in value for c in ".eEn") else int(value)
+            metrics.setdefault(name, ["", "untyped", {}])[2][labels or ""] = value
+    return metrics
+
+
+def _format_prometheus(metrics):
+    lines = []
+    for name, (help_text, kind, samples) in metrics.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples.items():
+            lines.append(f"{name}{labels} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _merge_prometheus(old, new):
+    """Prometheus text of new added to old: counters add up, gauges keep the highest"""
+    merged = _parse_prometheus(old)
+    for name, (help_text, kind, samples) in _parse_prometheus(new).items():
+        entry = merged.setdefault(name, [help_text, kind, {}])
+        for labels, value in samples.items():
+            if labels not in entry[2]:
+                entry[2][labels] = value
+            elif kind == "gauge":
+                entry[2][labels] = max(entry[2][labels], value)
+            else:
+                entry[2][labels] += value
+    return _format_prometheus(merged)
+
+
+def _script_name():
+    return Path(sys.argv[0]).name if sys.argv and sys.argv[0] else ""
+
+
+class _NullStage:
+    """What stage() returns while instrumentation is off"""
+
+    active = False
+    status = "ok"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, **items):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """One timed run of a named stage; use through stage()"""
+
+    active = True
+
+    def __init__(self, recorder, name, labels):
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+        self.counts = {}
+        self.peak = 0
+        self.extra = {}
+        # Set to "error" for failures that are handled inside the stage
+        self.status = "ok"
+
+    def count(self, **items):
+        """Add to the stage's item counts (triples=..., rows=...)"""
+        for key, value in items.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.recorder._push(self)
+        self.profiler = self.recorder._start_profile(self)
+        self.cpu_start = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu_start
+        self.recorder._stop_profile(self, self.profiler)
+        self.recorder._pop(self)
+        self.recorder._record(self, wall, cpu, "error" if exc_type else self.status)
+        return False
+
+
+class Recorder:
+    """Collects stage records and writes them out"""
+
+    def __init__(self, target, format=None, profile_stage=None, profile_mode="cprofile", profile_out=None):
+        self.target = target
+        if format is None:
+            format = "prometheus" if str(target).endswith(".prom") else "jsonl"
+        if format not in FORMATS:
+            raise ValueError(f"unknown metrics format {format!r} (use {' or '.join(FORMATS)})")
+        if profile_mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode {profile_mode!r} (use {' or '.join(PROFILE_MODES)})")
+        self.format = format
+        self.profile_stage = profile_stage
+        self.profile_mode = profile_mode
+        self.profile_out = profile_out
+        self.profile = None
+        self.profiling = False
+        self.script = _script_name()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # Stages currently open on any thread, to tell when the RSS mark is shared
+        self.running = []
+        self.totals = {}
+
+    # Stage nesting, per thread; RSS peaks are carried up to the parents
+
+    def _stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _push(self, stage):
+        stack = self._stack()
+        with self.lock:
+            if stack:
+                hwm = _read_hwm()
+                for parent in stack:
+                    parent.peak = max(parent.peak, hwm)
+            others = [s for s in self.running if s not in stack]
+            if others:
+                # Resetting would wipe the peaks the other threads' stages are measuring
+                for s in others + [stage]:
+                    s.extra["peak_rss_shared"] = True
+            else:
+                _reset_hwm()
+            self.running.append(stage)
+        stack.append(stage)
+
+    def _pop(self, stage):
+        stack = self._stack()
+        with self.lock:
+            stage.peak = max(stage.peak, _read_hwm())
+            self.running.remove(stage)
+        stack.remove(stage)
+        for parent in stack:
+            parent.peak = max(parent.peak, stage.peak)
+
+    # Profiling of the one named stage
+
+    def _start_profile(self, stage):
+        if stage.name != self.profile_stage or self.profiling:
+            return None
+        self.profiling = True
+        if self.profile_mode == "tracemalloc":
+            import tracemalloc
+            tracemalloc.start(10)
+            return "tracemalloc"
+        import cProfile
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+        self.profile.enable()
+        return "cprofile"
+
+    def _stop_profile(self, stage, profiler):
+        if profiler is None:
+            return
+        self.profiling = False
+        if profiler == "cprofile":
+            self.profile.disable()
+            return
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        top = snapshot.statistics("lineno")[:10]
+        stage.extra["tracemalloc_peak_mb"] = round(peak / (1024 * 1024), 2)
+        stage.extra["tracemalloc_top"] = [
+            {"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+             "kib": round(s.size / 1024, 1), "blocks": s.count}
+            for s in top
+        ]
+        print(f"tracemalloc {stage.name} {stage.labels or ''}: peak {peak / (1024 * 1024):.1f} MiB", file=sys.stderr)
+        for s in top:
+            print(f"  {s.size / 1024:>10.1f} KiB {s.count:>8} blocks  {s.traceback[0]}", file=sys.stderr)
+
+    # Output
+
+    def _record(self, stage, wall, cpu, status):
+        if self.format == "jsonl":
+            line = {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "script": self.script,
+                "pid": os.getpid(),
+                "stage": stage.name,
+                "labels": stage.labels,
+                "status": status,
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "peak_rss_mb": round(stage.peak / (1024 * 1024), 1),
+                "counts": stage.counts,
+            }
+            line.update(stage.extra)
+            self._write(json.dumps(line, default=str) + "\n")
+            return
+        key = (stage.name, tuple(sorted((k, str(v)) for k, v in stage.labels.items())))
+        with self.lock:
+            total = self.totals.setdefault(key, {"runs": 0, "errors": 0, "wall": 0.0, "cpu": 0.0,
+                                                 "peak": 0, "counts": {}})
+            total["runs"] += 1
+            total["errors"] += status == "error"
+            total["wall"] += wall
+            total["cpu"] += cpu
+            total["peak"] = max(total["peak"], stage.peak)
+            for item, n in stage.counts.items():
+                total["counts"][item] = total["counts"].get(item, 0) + n
+
+    def _write(self, text):
+        if self.target == "-":
+            sys.stderr.write(text)
+            return
+        with self.lock, open(self.target, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def prometheus_text(self):
+        """The totals so far in Prometheus text exposition format"""
+        metrics = [
+            ("pipeline_stage_runs_total", "counter", "Runs of a pipeline stage", lambda t: t["runs"]),
+            ("pipeline_stage_errors_total", "counter", "Runs that raised an exception", lambda t: t["errors"]),
+            ("pipeline_stage_seconds_total", "counter", "Wall time spent in a stage", lambda t: t["wall"]),
+            ("pipeline_stage_cpu_seconds_total", "counter", "CPU time spent in a stage", lambda t: t["cpu"]),
+            ("pipeline_stage_peak_rss_bytes", "gauge", "Highest peak RSS of any run of a stage", lambda t: t["peak"]),
+        ]
+        lines = []
+        for name, kind, help_text, value in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, total in sorted(self.totals.items()):
+                lines.append(f"{name}{{{self._labels(key)}}} {_number(value(total))}")
+        lines.append("# HELP pipeline_stage_items_total Items processed by a stage")
+        lines.append("# TYPE pipeline_stage_items_total counter")
+        for key, total in sorted(self.totals.items()):
+            for item, n in sorted(total["counts"].items()):
+                lines.append(f"pipeline_stage_items_total{{{self._labels(key, item=item)}}} {_number(n)}")
+        return "\n".join(lines) + "\n"
+
+    def _labels(self, key, **more):
+        stage, labels = key
+        pairs = [("script", self.script), ("stage", stage)] + list(labels) + list(more.items())
+        escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return ",".join(f'{re.sub(r"[^a-zA-Z0-9_]", "_", k)}="{escape(v)}"' for k, v in pairs)
+
+    def close(self):
+        if self.profile is not None:
+            out = self.profile_out or f"{self.profile_stage}-{os.getpid()}.prof"
+            self.profile.dump_stats(out)
+            print(f"cProfile of stage {self.profile_stage!r} saved to: {out}", file=sys.stderr)
+        if self.format == "prometheus" and self.totals:
+            self._merge(self.prometheus_text())
+
+    def _merge(self, text):
+        """Merge text into the Prometheus file, which other processes may share"""
+        if self.target == "-":
+            sys.stderr.write(text)
+            return
+        with self.lock, open(self.target, "a+", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            merged = _merge_prometheus(f.read(), text)
+            f.seek(0)
+            f.truncate()
+            f.write(merged)
+
+
+_recorder = None
+_configured = False
+_lock = threading.Lock()
+
+
+def get_recorder():
+    """The process-wide Recorder, or None while instrumentation is off"""
+    global _recorder, _configured
+    if _configured:
+        return _recorder
+    with _lock:
+        if not _configured:
+            target = os.environ.get("PIPELINE_METRICS")
+            if target:
+                _recorder = Recorder(
+                    target,
+                    os.environ.get("PIPELINE_METRICS_FORMAT") or None,
+                    os.environ.get("PIPELINE_PROFILE") or None,
+                    os.environ.get("PIPELINE_PROFILE_MODE") or "cprofile",
+                    os.environ.get("PIPELINE_PROFILE_OUT") or None,
+                )
+                atexit.register(_recorder.close)
+            _configured = True
+    return _recorder
+
+
+def stage(name, **labels):
+    """Context manager timing one run of a stage (see the module docstring)"""
+    recorder = _recorder if _configured else get_recorder()
+    if recorder is None:
+        return NULL_STAGE
+    return Stage(recorder, name, labels)
+
+
+def add_arguments(parser):
+    """Add the --metrics/--profile-* options to an argparse parser"""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--metrics", metavar="FILE",
+                       help="record time, CPU and peak RSS per stage to FILE ('-' for stderr)")
+    group.add_argument("--metrics-format", choices=FORMATS,
+                       help="jsonl (default) or prometheus (default for *.prom files)")
+    group.add_argument("--profile-stage", metavar="STAGE", help="profile every run of this stage")
+    group.add_argument("--profile-mode", choices=PROFILE_MODES, default=None,
+                       help="cprofile (default) or tracemalloc")
+
+
+def configure(args):
+    """
+    Apply the options added by add_arguments().
+
+    They are passed on through the environment, so worker and child
+    processes record their stages too.
+    """
+    global _recorder, _configured
+    settings = {
+        "PIPELINE_METRICS": getattr(args, "metrics", None),
+        "PIPELINE_METRICS_FORMAT": getattr(args, "metrics_format", None),
+        "PIPELINE_PROFILE": getattr(args, "profile_stage", None),
+        "PIPELINE_PROFILE_MODE": getattr(args, "profile_mode", None),
+    }
+    if not any(settings.values()):
+        return get_recorder()
+    for name, value in settings.items():
+        if value:
+            os.environ[name] = value
+    if settings["PIPELINE_PROFILE"] and not os.environ.get("PIPELINE_METRICS"):
+        # Profiling without metrics still needs a recorder; records go to stderr
+        os.environ["PIPELINE_METRICS"] = "-"
+    with _lock:
+        if _recorder is not None:
+            atexit.unregister(_recorder.close)
+        _recorder = None
+        _configured = False
+    return get_recorder()
@@ -0,0 +1,428 @@
+"""
+Index of the rdfs:label literals of the heritage graph, for preferred
+label lookup and label search.
+
+Almost every query and the Gephi export resolve labels the same way:
+read the rdfs:label values of a node and keep the English (or untagged)
+one. This module reads the labels once into a table node -> language ->
+labels, so that:
+
+    preferred(node)   the label in the first language of the fallback
+                      order that the node has a label in (English, then
+                      untagged, then Azerbaijani by default) is one dict
+                      lookup; it is kept per node as labels come and go
+    prefix(text)      labels with a word starting with text, by binary
+                      search in a sorted list of label keys
+    search(text)      labels matching text word by word with a few
+                      typing errors allowed: candidate words come from a
+                      trigram index and are confirmed by a bounded edit
+                      distance (with transpositions)
+
+Keys are folded before they are compared: case is folded and accents are
+dropped, and the Azerbaijani letters without a decomposition are mapped
+too (ə -> e, ı -> i), so "Susa", "şuşa" and "SUŞA" all find "Şuşa", and
+"Gence" finds "Gəncə".
+
+Adding or removing a label updates only its own node and search keys.
+The search structures are built on the first prefix()/search() call, so
+code that only needs preferred labels (the export) does not pay for
+them. Files are indexed by content hash: adding a file again is a no-op
+while it is unchanged; if it changed, only the labels that differ are
+added or removed. The index can be saved to and loaded from a JSON file.
+
+Example:
+    index = LabelIndex()
+    index.add_file("data/heritage_complete.ttl")
+    print(index.preferred(NS.Shusha))
+    for match in index.search("susa"):
+        print(match.label, match.lang, match.distance)
+"""
+
+import json
+import os
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, namedtuple
+from pathlib import Path
+
+from rdflib import Literal, URIRef
+from rdflib.namespace import RDFS
+
+import graph_loader
+
+# Fallback order of preferred labels; "" is a label without a language tag
+DEFAULT_LANGUAGES = ("en", "", "az")
+
+# Letters that casefold() and NFKD leave alone but a search should not tell apart
+_LETTERS = str.maketrans({"ə": "e", "ı": "i", "ø": "o", "ß": "ss", "æ": "ae", "œ": "oe", "đ": "d", "ł": "l"})
+
+_WORD = re.compile(r"\w+")
+
+Match = namedtuple("Match", "node label lang distance")
+
+
+def fold(text):
+    """Search key of text: case folded, without accents or diacritics"""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.casefold().translate(_LETTERS))
+    return "".join(c for c in text if not unicodedata.combining(c)).translate(_LETTERS)
+
+
+def words(text):
+    """Folded words of text"""
+    return _WORD.findall(fold(text))
+
+
+def language(literal):
+    """Primary language subtag of a literal ("" if it has none)"""
+    lang = getattr(literal, "language", None) or ""
+    return lang.split("-")[0].lower()
+
+
+def max_edits(word):
+    """Typing errors allowed in a query word of this length"""
+    if len(word) <= 3:
+        return 0
+    return 1 if len(word) <= 6 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Edit distance of a and b (insertions, deletions, substitutions and
+    swaps of adjacent letters), or limit + 1 if it is above limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, row = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = current[j - 1] + 1
+            if row[j] + 1 < cost:
+                cost = row[j] + 1
+            if row[j - 1] + (ca != cb) < cost:
+                cost = row[j - 1] + (ca != cb)
+            if previous is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, previous[j - 2] + 1)
+            current[j] = cost
+        if min(current) > limit:
+            return limit + 1
+        previous, row = row, current
+    return row[-1] if row[-1] <= limit else limit + 1
+
+
+def _grams(word, end=True):
+    padded = "^" + word + ("$" if end else "")
+    return {padded[i:i + 3] for i in range(max(len(padded) - 2, 1))}
+
+
+def _local_name(node):
+    return str(node).split('#')[-1].split('/')[-1]
+
+
+class LabelIndex:
+    """Labels by node and language, with preferred-label lookup and label search"""
+
+    def __init__(self, languages=DEFAULT_LANGUAGES):
+        self.languages = tuple(languages)
+        self.labels = {}        # node -> lang -> set of labels
+        self.files = {}         # file -> {"sha256", "labels": [[node, lang, label], ...]}
+        self._count = {}        # (node, lang, label) -> number of times it was added
+        self._preferred = {}    # node -> preferred label
+        self._searchable = False
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, node):
+        return node in self.labels
+
+    # Preferred labels
+
+    def preferred(self, node, languages=None):
+        """
+        Label of node in the first of languages (default: the index's
+        fallback order) that it has a label in, or None.
+        """
+        if languages is None:
+            return self._preferred.get(node)
+        by_lang = self.labels.get(node)
+        if by_lang:
+            for lang in languages:
+                if by_lang.get(lang):
+                    return min(by_lang[lang])
+        return None
+
+    def label(self, node, languages=None):
+        """Preferred label of node, or the local name of its URI"""
+        label = self.preferred(node, languages)
+        return label if label is not None else _local_name(node)
+
+    def _refresh(self, node):
+        label = self.preferred(node, self.languages)
+        if label is None:
+            self._preferred.pop(node, None)
+        else:
+            self._preferred[node] = label
+
+    # Changes
+
+    def add(self, node, literal):
+        """Add one label of node; returns True if it is new to the index"""
+        lang = getattr(literal, "language", None) or ""
+        if lang not in self.languages:
+            lang = language(literal)
+            if lang not in self.languages:
+                return False
+        key = (node, lang, str(literal))
+        count = self._count.get(key, 0)
+        self._count[key] = count + 1
+        if count:
+            return False
+        by_lang = self.labels.get(node)
+        if by_lang is None:
+            # Most nodes have one label, which is then the preferred one
+            self.labels[node] = {lang: {key[2]}}
+            self._preferred[node] = key[2]
+        else:
+            by_lang.setdefault(lang, set()).add(key[2])
+            self._refresh(node)
+        if self._searchable:
+            self._index_entry(key)
+        return True
+
+    def remove(self, node, literal):
+        """Remove one label of node; returns True if it left the index"""
+        key = (node, language(literal), str(literal))
+        count = self._count.get(key)
+        if not count:
+            return False
+        if count > 1:
+            self._count[key] = count - 1
+            return False
+        del self._count[key]
+        by_lang = self.labels[node]
+        by_lang[key[1]].discard(key[2])
+        if not by_lang[key[1]]:
+            del by_lang[key[1]]
+        if not by_lang:
+            del self.labels[node]
+        self._refresh(node)
+        if self._searchable:
+            self._unindex_entry(key)
+        return True
+
+    def update(self, added=(), removed=()):
+        """
+        Apply a change given as triples (graphs or iterables); only the
+        rdfs:label triples are used. Returns the set of nodes whose
+        labels changed.
+        """
+        touched = set()
+        for s, p, o in removed:
+            if p == RDFS.label and self.remove(s, o):
+                touched.add(s)
+        for s, p, o in added:
+            if p == RDFS.label and isinstance(o, Literal) and self.add(s, o):
+                touched.add(s)
+        return touched
+
+    def add_graph(self, graph):
+        """Index every label of graph; returns the nodes that changed"""
+        return self.update(graph.triples((None, RDFS.label, None)))
+
+    def add_file(self, path, force=False):
+        """
+        Index the labels of an RDF file.
+
+        Returns the set of nodes whose labels changed, or None if the
+        file is unchanged since it was last added.
+        """
+        path = str(Path(path).resolve())
+        digest = graph_loader.file_hash(path)
+        known = self.files.get(path)
+        if known and known["sha256"] == digest and not force:
+            return None
+        graph = graph_loader.load_graph(path)
+        new = {(s, language(o), str(o)) for s, o in graph.subject_objects(RDFS.label)
+               if isinstance(s, URIRef) and isinstance(o, Literal) and language(o) in self.languages}
+        old = {(URIRef(node), lang, label) for node, lang, label in known["labels"]} if known else set()
+        touched = set()
+        for node, lang, label in old - new:
+            if self.remove(node, Literal(label, lang=lang or None)):
+                touched.add(node)
+        for node, lang, label in new - old:
+            if self.add(node, Literal(label, lang=lang or None)):
+                touched.add(node)
+        self.files[path] = {"sha256": digest, "labels": sorted([str(n), lang, label] for n, lang, label in new)}
+        return touched
+
+    # Search
+
+    def _index_entry(self, entry, add=insort):
+        node, lang, label = entry
+        keys = self._keys
+        folded = words(label)
+        for k in range(len(folded)):
+            add(keys, (" ".join(folded[k:]), node, lang, label))
+        for word in folded:
+            entries = self._words.get(word)
+            if entries is None:
+                entries = self._words[word] = set()
+                add(self._vocabulary, word)
+                for gram in _grams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            entries.add(entry)
+
+    def _unindex_entry(self, entry):
+        node, lang, label = entry
+        keys = self._keys
+        folded = words(label)
+        for k in range(len(folded)):
+            i = bisect_left(keys, (" ".join(folded[k:]), node, lang, label))
+            if i < len(keys) and keys[i] == (" ".join(folded[k:]), node, lang, label):
+                del keys[i]
+        for word in set(folded):
+            entries = self._words[word]
+            entries.discard(entry)
+            if entries:
+                continue
+            del self._words[word]
+            del self._vocabulary[bisect_left(self._vocabulary, word)]
+            for gram in _grams(word):
+                self._grams[gram].discard(word)
+                if not self._grams[gram]:
+                    del self._grams[gram]
+
+    def _ensure_search(self):
+        if self._searchable:
+            return
+        self._keys = []         # sorted (key from a word start, node, lang, label)
+        self._words = {}        # folded word -> set of (node, lang, label)
+        self._vocabulary = []   # sorted folded words
+        self._grams = {}        # trigram -> folded words containing it
+        self._searchable = True
+        for node, by_lang in self.labels.items():
+            for lang, labels in by_lang.items():
+                for label in labels:
+                    self._index_entry((node, lang, label), list.append)
+        # Appended while building, so sorted once at the end
+        self._keys.sort()
+        self._vocabulary.sort()
+
+    def _rank(self, scored, limit):
+        """Best entry per node, ordered by distance, then by how preferred it is"""
+        order = {lang: k for k, lang in enumerate(self.languages)}
+        best = {}
+        for (node, lang, label), distance in scored.items():
+            rank = (distance, label != self._preferred.get(node), order.get(lang, len(order)), len(label), label)
+            if node not in best or rank < best[node][0]:
+                best[node] = (rank, Match(node, label, lang, distance))
+        ranked = sorted(best.values(), key=lambda item: (item[0], str(item[1].node)))
+        return [match for _, match in ranked[:limit]]
+
+    def prefix(self, text, limit=20):
+        """Labels with a word where text starts (folded), as Match tuples"""
+        self._ensure_search()
+        key = " ".join(words(text))
+        if not key:
+            return []
+        scored = {}
+        for i in range(bisect_left(self._keys, (key,)), len(self._keys)):
+            folded, node, lang, label = self._keys[i]
+            if not folded.startswith(key):
+                break
+            scored[(node, lang, label)] = 0
+        return self._rank(scored, limit)
+
+    def _similar(self, word, last):
+        """
+        Indexed words within max_edits(word) of word, as {word: distance}.
+
+        The last word of a query may be unfinished, so it also matches
+        the words it starts (allowing typing errors once it is long
+        enough for the trigrams to narrow the candidates down).
+        """
+        limit = max_edits(word)
+        found = {}
+        if last:
+            for i in range(bisect_left(self._vocabulary, word), len(self._vocabulary)):
+                if not self._vocabulary[i].startswith(word):
+                    break
+                found[self._vocabulary[i]] = 0
+        if word in self._words:
+            found[word] = 0
+        if not limit:
+            return found
+        hits = Counter()
+        for gram in _grams(word):
+            hits.update(self._grams.get(gram, ()))
+        # Every edit breaks at most three trigrams
+        needed = len(_grams(word)) - 3 * limit
+        needed_prefix = len(_grams(word, end=False)) - 3 * limit
+        for candidate, shared in hits.items():
+            if candidate in found:
+                continue
+            if shared >= needed:
+                distance = edit_distance(word, candidate, limit)
+                if distance <= limit:
+                    found[candidate] = distance
+                    continue
+            if last and needed_prefix > 0 and shared >= needed_prefix and len(candidate) > len(word):
+                distance = min(edit_distance(word, candidate[:n], limit)
+                               for n in range(max(len(word) - limit, 1), len(word) + limit + 1))
+                if distance <= limit:
+                    found[candidate] = distance
+        return found
+
+    def search(self, text, limit=20):
+        """
+        Labels containing a match for every word of text, as Match
+        tuples; distance is the number of typing errors summed over the
+        words (0 for exact and prefix matches).
+        """
+        self._ensure_search()
+        query = words(text)
+        scored = None
+        for k, word in enumerate(query):
+            matches = {}
+            for candidate, distance in self._similar(word, last=k == len(query) - 1).items():
+                for entry in self._words[candidate]:
+                    if distance < matches.get(entry, distance + 1):
+                        matches[entry] = distance
+            if scored is None:
+                scored = matches
+            else:
+                scored = {entry: scored[entry] + distance for entry, distance in matches.items() if entry in scored}
+            if not scored:
+                return []
+        return self._rank(scored or {}, limit)
+
+    # State
+
+    def save(self, path):
+        data = {
+            "languages": list(self.languages),
+            "files": self.files,
+            "labels": [[str(node), lang, label, count] for (node, lang, label), count in self._count.items()],
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        index = cls(data["languages"])
+        index.files = data["files"]
+        for node, lang, label, count in data["labels"]:
+            node = URIRef(node)
+            index._count[(node, lang, label)] = count
+            index.labels.setdefault(node, {}).setdefault(lang, set()).add(label)
+        for node in index.labels:
+            index._refresh(node)
+        return index
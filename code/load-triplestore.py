@@ -5,9 +5,28 @@ Provides instructions for loading data into Fuseki or GraphDB
 
 Note: The easiest way is to use the Fuseki web UI.
 This script provides a programmatic alternative using Fuseki's HTTP API.
+
+For large files use the bulk mode: the data is split into N-Triples /
+N-Quads batches that are gzip-compressed and uploaded in parallel, with
+retries and a progress file so an interrupted load can be resumed:
+
+    python code/load-triplestore.py --bulk heritage-named=data/contested-claims-named.trig \
+        --bulk heritage-rdfstar=data/contested-claims-rdfstar.ttl [--url http://localhost:3030]
+        [--workers 4] [--batch-size 50000] [--retries 5] [--progress .load-progress.json]
+        [--metrics FILE]
 """
 
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 try:
@@ -17,6 +36,8 @@ except ImportError:
     print("Install it with: pip install requests")
     sys.exit(1)
 
+import instrumentation
+
 
 def load_to_fuseki(dataset_name: str, file_path: Path, fuseki_url: str = "http://localhost:3030"):
     """Load a TTL file into a Fuseki dataset"""
@@ -26,10 +47,12 @@ def load_to_fuseki(dataset_name: str, file_path: Path, fuseki_url: str = "http:/
     print(f"Upload URL: {upload_url}")
     
     try:
-        with open(file_path, 'rb') as f:
+        with instrumentation.stage("upload", dataset=dataset_name, file=file_path.name) as st, \
+                open(file_path, 'rb') as f:
             files = {'file': (file_path.name, f, 'text/turtle')}
             response = requests.post(upload_url, files=files, timeout=60)
             response.raise_for_status()
+            st.count(bytes=file_path.stat().st_size)
             print(f"✓ Successfully loaded {file_path.name}")
             return True
     except requests.exceptions.RequestException as e:
@@ -44,7 +67,324 @@ def load_to_fuseki(dataset_name: str, file_path: Path, fuseki_url: str = "http:/
         return False
 
 
+# Content types for the two batch serializations
+NTRIPLES = "application/n-triples"
+NQUADS = "application/n-quads"
+
+
+def file_digest(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Blank node label in an N-Triples / N-Quads line (a "_:" inside a
+# literal may match too, which only merges two groups needlessly)
+BNODE_LABEL = re.compile(r'_:([^\s<>"]+)')
+
+
+def _bnode_groups(lines):
+    """
+    Split statements with blank nodes into groups that share none: the
+    connected components of statements linked by common labels.
+
+    Blank node labels change every time a file is parsed, so the groups
+    are ordered by their statements with the labels masked, which keeps
+    batch numbers stable for resuming.
+    """
+    parent = {}
+
+    def find(label):
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    members = []
+    for line in lines:
+        labels = [label.rstrip(".") for label in BNODE_LABEL.findall(line)]
+        for label in labels:
+            parent.setdefault(label, label)
+        root = find(labels[0])
+        for label in labels[1:]:
+            other = find(label)
+            if other != root:
+                parent[other] = root
+        members.append((labels[0], line))
+
+    groups = defaultdict(list)
+    for label, line in members:
+        groups[find(label)].append(line)
+    return sorted(groups.values(), key=lambda group: sorted(BNODE_LABEL.sub("_:", line) for line in group))
+
+
+def _batches(lines, batch_size):
+    """
+    Group lines into batches of at most batch_size.
+
+    Each POST is parsed on its own, so blank node labels only keep their
+    identity if every statement using them arrives together. Statements
+    with blank nodes are held back until the input is read, then sent
+    as whole groups (see _bnode_groups) after the other batches; only a
+    group larger than batch_size makes a batch larger than that.
+    """
+    batch = []
+    bnode_lines = []
+    for line in lines:
+        if "_:" in line and BNODE_LABEL.search(line):
+            bnode_lines.append(line)
+            continue
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+    batch = []
+    for group in _bnode_groups(bnode_lines):
+        if batch and len(batch) + len(group) > batch_size:
+            yield batch
+            batch = []
+        batch.extend(group)
+    if batch:
+        yield batch
+
+
+def iter_batches(file_path: Path, batch_size: int):
+    """
+    Yield (content_type, lines) batches of at most batch_size statements
+    (see _batches for blank nodes).
+
+    .nt and .nq files are streamed line by line without parsing; only
+    their statements with blank nodes are held in memory. Other formats
+    are parsed (RDF-star Turtle is lowered, see rdfstar.py) and written
+    out as sorted N-Triples, or N-Quads if there are named graphs. That
+    holds the whole file in memory twice, as an rdflib Dataset and as
+    statement text: about 2 KB per triple. The sort is what keeps
+    batch numbers the same from run to run for resuming, since rdflib
+    returns the statements of a file in a different order in each
+    process. Convert large files to N-Triples or N-Quads first (e.g.
+    convert_owl_to_ttl.py --to nt) to stream them.
+    """
+    if file_path.suffix in (".nt", ".nq"):
+        content_type = NQUADS if file_path.suffix == ".nq" else NTRIPLES
+
+        def lines():
+            with open(file_path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        yield line
+
+        for batch in _batches(lines(), batch_size):
+            yield content_type, batch
+        return
+
+    from rdflib import Dataset
+    from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+    import sparql_engine
+    dataset = Dataset()
+    sparql_engine.parse_into(dataset, file_path)
+    has_graphs = False
+    statements = []
+    for s, p, o, g in dataset.quads((None, None, None, None)):
+        g = getattr(g, "identifier", g)
+        if g is None or g == DATASET_DEFAULT_GRAPH_ID:
+            statements.append(f"{s.n3()} {p.n3()} {o.n3()} .")
+        else:
+            has_graphs = True
+            statements.append(f"{s.n3()} {p.n3()} {o.n3()} {g.n3()} .")
+    statements.sort()
+    content_type = NQUADS if has_graphs else NTRIPLES
+    for batch in _batches(statements, batch_size):
+        yield content_type, batch
+
+
+class LoadProgress:
+    """Chunks already uploaded, persisted to a JSON file after every chunk"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        if path and path.exists():
+            self.done = {k: set(v) for k, v in json.loads(path.read_text(encoding="utf-8")).items()}
+
+    def is_done(self, job_key: str, index: int) -> bool:
+        with self.lock:
+            return index in self.done.get(job_key, ())
+
+    def mark_done(self, job_key: str, index: int):
+        with self.lock:
+            self.done.setdefault(job_key, set()).add(index)
+            if self.path:
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps({k: sorted(v) for k, v in self.done.items()}), encoding="utf-8")
+                os.replace(tmp, self.path)
+
+    def finish(self, job_key: str):
+        """Forget a job once it has loaded completely"""
+        with self.lock:
+            self.done.pop(job_key, None)
+            if self.path:
+                if self.done:
+                    self.path.write_text(json.dumps({k: sorted(v) for k, v in self.done.items()}), encoding="utf-8")
+                else:
+                    self.path.unlink(missing_ok=True)
+
+
+def upload_chunk(session, url: str, body: bytes, content_type: str, use_gzip: bool,
+                 retries: int = 5, timeout: float = 300):
+    """POST one chunk, retrying with exponential backoff on errors"""
+    headers = {"Content-Type": content_type}
+    if use_gzip:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    delay = 1.0
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, data=body, headers=headers, timeout=timeout)
+            if response.status_code < 500:
+                response.raise_for_status()
+                return
+            error = requests.exceptions.HTTPError(f"{response.status_code} {response.reason}", response=response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+        if attempt == retries:
+            raise error
+        time.sleep(delay)
+        delay = min(delay * 2, 30)
+
+
+def bulk_load(jobs, fuseki_url: str = "http://localhost:3030", workers: int = 4,
+              batch_size: int = 50000, retries: int = 5, use_gzip: bool = True,
+              progress_path: Path = None):
+    """
+    Load (dataset_name, file_path) jobs into Fuseki in parallel chunks.
+
+    Chunks of all jobs share one pool of `workers` upload threads.
+    Chunks recorded in the progress file from an earlier, interrupted
+    run are skipped. Returns True if every chunk was loaded.
+    """
+    progress = LoadProgress(progress_path)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    # Keep at most two chunks per worker in memory
+    slots = threading.BoundedSemaphore(workers * 2)
+    stats_lock = threading.Lock()
+    ok = True
+    total_triples = 0
+    start = time.perf_counter()
+
+    def send(url, body, content_type, job_key, index, count, stats):
+        try:
+            with instrumentation.stage("upload", dataset=stats["dataset"], file=stats["file"]) as st:
+                upload_chunk(session, url, body, content_type, use_gzip, retries)
+                st.count(triples=count, bytes=len(body))
+            progress.mark_done(job_key, index)
+            with stats_lock:
+                stats["triples"] += count
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Chunk {index} of {stats['name']} failed: {e}")
+            with stats_lock:
+                stats["failed"] += 1
+            return False
+        finally:
+            slots.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        all_stats = []
+        for dataset_name, file_path in jobs:
+            url = f"{fuseki_url}/{dataset_name}/data"
+            job_key = f"{dataset_name}|{file_digest(file_path)}|{batch_size}"
+            stats = {"name": f"{file_path.name} -> {dataset_name}", "job_key": job_key,
+                     "dataset": dataset_name, "file": file_path.name,
+                     "triples": 0, "skipped": 0, "failed": 0, "futures": [],
+                     "start": time.perf_counter()}
+            all_stats.append(stats)
+            print(f"Loading {file_path.name} into dataset: {dataset_name} ({url})")
+            if file_path.suffix not in (".nt", ".nq"):
+                print(f"  Parsing {file_path.name} in memory (N-Triples/N-Quads input is streamed instead)")
+
+            for index, (content_type, batch) in enumerate(iter_batches(file_path, batch_size)):
+                if progress.is_done(job_key, index):
+                    stats["skipped"] += len(batch)
+                    continue
+                body = ("\n".join(batch) + "\n").encode("utf-8")
+                slots.acquire()
+                stats["futures"].append(executor.submit(
+                    send, url, body, content_type, job_key, index, len(batch), stats))
+
+        for stats in all_stats:
+            for future in stats["futures"]:
+                future.result()
+            elapsed = time.perf_counter() - stats["start"]
+            rate = stats["triples"] / elapsed if elapsed > 0 else 0
+            total_triples += stats["triples"]
+            if stats["failed"]:
+                ok = False
+                print(f"✗ {stats['name']}: {stats['failed']} chunk(s) failed; re-run to resume")
+            else:
+                progress.finish(stats["job_key"])
+                print(f"✓ {stats['name']}: {stats['triples']} triples in {elapsed:.2f}s "
+                      f"({rate:,.0f} triples/s)")
+            if stats["skipped"]:
+                print(f"  ({stats['skipped']} triples already loaded by an earlier run)")
+
+    session.close()
+    elapsed = time.perf_counter() - start
+    rate = total_triples / elapsed if elapsed > 0 else 0
+    print(f"Total: {total_triples} triples in {elapsed:.2f}s ({rate:,.0f} triples/s)")
+    return ok
+
+
+def bulk_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="load-triplestore.py --bulk",
+        description="Bulk-load files into Fuseki in parallel, gzip-compressed N-Triples/N-Quads chunks.",
+    )
+    parser.add_argument("--bulk", action="append", required=True, metavar="DATASET=FILE",
+                        help="dataset name and file to load into it (repeatable)")
+    parser.add_argument("--url", default="http://localhost:3030", help="Fuseki base URL")
+    parser.add_argument("--workers", type=int, default=4, help="parallel uploads (default: 4)")
+    parser.add_argument("--batch-size", type=int, default=50000,
+                        help="statements per chunk (default: 50000)")
+    parser.add_argument("--retries", type=int, default=5, help="retries per chunk (default: 5)")
+    parser.add_argument("--no-gzip", action="store_true", help="send chunks uncompressed")
+    parser.add_argument("--progress", default=".load-progress.json",
+                        help="progress file for resuming (default: .load-progress.json)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    instrumentation.configure(args)
+
+    jobs = []
+    for spec in args.bulk:
+        dataset_name, sep, file_name = spec.partition("=")
+        file_path = Path(file_name)
+        if not sep or not dataset_name:
+            print(f"ERROR: expected DATASET=FILE, got: {spec}")
+            sys.exit(2)
+        if not file_path.exists():
+            print(f"ERROR: File not found: {file_path}")
+            sys.exit(1)
+        jobs.append((dataset_name, file_path))
+
+    ok = bulk_load(jobs, args.url.rstrip("/"), args.workers, args.batch_size,
+                   args.retries, not args.no_gzip, Path(args.progress))
+    sys.exit(0 if ok else 1)
+
+
 if __name__ == "__main__":
+    if "--bulk" in sys.argv[1:]:
+        bulk_main(sys.argv[1:])
+
     print("=" * 60)
     print("Triplestore Loading Helper")
     print("=" * 60)
@@ -85,3 +425,6 @@ if __name__ == "__main__":
         print()
         print("Example:")
         print("  python code/load-triplestore.py heritage-reification data/contested-claims-reification.ttl")
+        print()
+        print("Bulk loading (large files, parallel gzip-compressed chunks):")
+        print("  python code/load-triplestore.py --bulk heritage-named=data/contested-claims-named.trig [--workers 4]")
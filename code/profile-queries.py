@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Query Profiler
+Profiles the queries/ suite against the in-process rdflib engine and
+reports where each query spends its time (see query_profiler.py).
+
+Cardinality statistics are collected from the dataset once and used to
+estimate, before running, how many rows every operator of each query
+produces and how many triples each triple pattern looks at. Each query
+is then run once with every operator counted and timed: the report
+lists the dominant operators by self time with estimated against actual
+rows, the triple patterns with their lookups and matches, and warnings
+for plans that scale badly (cross products, per-row EXISTS checks,
+unselective patterns). A query still running after --timeout is
+stopped and reported as such.
+
+The profiled run is slowed down by the instrumentation, so each query
+is also timed --repeat times without it. These timings are kept in
+queries/.profile-history.json and compared with earlier runs of the
+same query text on the same data; a slowdown beyond --threshold is
+reported as a regression. The script exits with status 1 when any
+query regressed, failed or was stopped by --timeout.
+
+Usage:
+    python code/profile-queries.py <data_path> [--query NAME ...] [--repeat N]
+                                   [--timeout SECONDS] [--top N] [--tree]
+                                   [--estimate-only] [--history FILE]
+                                   [--no-history] [--threshold FRACTION]
+                                   [--min-delta MS] [--json FILE]
+
+Example:
+    python code/profile-queries.py data/heritage_complete.ttl
+    python code/profile-queries.py data/generated --query q25 --tree
+    python code/profile-queries.py data/heritage_complete.ttl --estimate-only --query q16
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import instrumentation
+import sparql_engine
+from query_profiler import DatasetStatistics, ProfileHistory, plan, profile, time_query
+from result_cache import file_fingerprint
+
+QUERIES_DIR = Path("queries")
+DEFAULT_HISTORY = QUERIES_DIR / ".profile-history.json"
+
+
+def select_queries(names):
+    """Query files of the suite, or those named (q25 matches q25_comprehensive_validation_check.rq)"""
+    files = sorted(QUERIES_DIR.glob("*.rq"))
+    if not names:
+        return files
+    chosen = [f for f in files if any(f.stem == n or f.stem.startswith((n + "_", n + "-")) or f.name == n
+                                       for n in names)]
+    return chosen
+
+
+def fmt_count(value):
+    return f"{value:,.0f}" if value >= 1 or value == 0 else f"{value:.2f}"
+
+
+def print_tree(result, measured):
+    print("    Plan:")
+    for node in result.operators():
+        indent = "  " * node.depth
+        line = f"      {indent}{node.label}  est {fmt_count(node.est_rows)} rows"
+        if measured:
+            line += f" | {node.rows:,} rows, {node.calls:,} calls, {node.self_seconds * 1000:.1f} ms self"
+        print(line)
+
+
+def print_profile(result, stats, top, tree):
+    measured = result.status != "estimated"
+    if tree:
+        print_tree(result, measured)
+
+    print(f"    Dominant operators ({'self time' if measured else 'estimated work'}):")
+    for node in result.dominant(top):
+        if measured:
+            share = node.self_seconds / result.seconds * 100 if result.seconds else 0
+            print(f"      {node.label:<32} {node.self_seconds * 1000:8.1f} ms {share:5.1f}%  "
+                  f"calls {node.calls:,}  rows {node.rows:,} (est {fmt_count(node.est_rows)})")
+        else:
+            print(f"      {node.label:<32} cost {fmt_count(node.est_cost):>10}  "
+                  f"calls {fmt_count(node.est_calls)}  rows {fmt_count(node.est_rows)}")
+
+    patterns = result.patterns()
+    if patterns:
+        key = (lambda p: -p.seconds) if measured else (lambda p: -p.est_matches)
+        print("    Triple patterns:")
+        for pattern in sorted(patterns, key=key)[:top * 2]:
+            if measured:
+                print(f"      {pattern.text:<60} lookups {pattern.lookups:,} (est {fmt_count(pattern.est_lookups)})  "
+                      f"matches {pattern.matches:,} (est {fmt_count(pattern.est_matches)})  "
+                      f"{pattern.seconds * 1000:.1f} ms")
+            else:
+                print(f"      {pattern.text:<60} lookups {fmt_count(pattern.est_lookups)}  "
+                      f"matches {fmt_count(pattern.est_matches)}")
+
+    for warning in result.warnings(stats):
+        print(f"    ⚠ {warning}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the SPARQL query suite against a local dataset")
+    parser.add_argument("data_path", help="RDF data file or directory")
+    parser.add_argument("--query", action="append", metavar="NAME",
+                        help="profile only this query (file name or prefix such as q25); may be repeated")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="unprofiled timing runs per query (default: 3)")
+    parser.add_argument("--timeout", type=float, default=30,
+                        help="stop a profiled query after SECONDS (default: 30)")
+    parser.add_argument("--top", type=int, default=3, help="operators to list per query (default: 3)")
+    parser.add_argument("--tree", action="store_true", help="print the whole operator tree of each query")
+    parser.add_argument("--estimate-only", action="store_true",
+                        help="only print the estimated plan costs; do not run the queries")
+    parser.add_argument("--history", default=str(DEFAULT_HISTORY), metavar="FILE",
+                        help=f"timing history file (default: {DEFAULT_HISTORY})")
+    parser.add_argument("--no-history", action="store_true", help="do not read or update the timing history")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown over the recent median reported as a regression (default: 0.25)")
+    parser.add_argument("--min-delta", type=float, default=10, metavar="MS",
+                        help="ignore differences below MS milliseconds (default: 10)")
+    parser.add_argument("--json", metavar="FILE", help="also write the profiles as JSON to FILE")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    if not Path(args.data_path).exists():
+        print(f"ERROR: Data path not found: {args.data_path}")
+        return 1
+    query_files = select_queries(args.query)
+    if not query_files:
+        print(f"ERROR: No queries found in {QUERIES_DIR}" + (f" matching {', '.join(args.query)}" if args.query else ""))
+        return 1
+
+    print("=" * 60)
+    print("SPARQL Query Profiler")
+    print("=" * 60)
+    print(f"Loading: {args.data_path}")
+    start = time.perf_counter()
+    with instrumentation.stage("load", source=Path(args.data_path).name):
+        dataset = sparql_engine.load_dataset(args.data_path)
+        data_hash = file_fingerprint(sparql_engine.data_files(args.data_path))[:16]
+    with instrumentation.stage("statistics") as st:
+        stats = DatasetStatistics(dataset)
+        st.count(triples=stats.triples, predicates=len(stats.predicates))
+    print(f"  ✓ {stats.triples:,} triples, {len(stats.predicates)} predicates, "
+          f"{stats.subjects:,} subjects ({time.perf_counter() - start:.2f}s)")
+
+    history = None if args.no_history or args.estimate_only else ProfileHistory(args.history)
+    cache = sparql_engine.QueryCache()
+    profiles, regressions, failed = [], [], []
+
+    for rq_file in query_files:
+        print(f"\n{rq_file.name}")
+        text = rq_file.read_text(encoding="utf-8")
+        query_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        try:
+            query = cache.get(text)
+        except Exception as e:
+            print(f"  ✗ Parse error: {e}")
+            failed.append(rq_file.stem)
+            continue
+
+        if args.estimate_only:
+            result = plan(query, stats, rq_file.stem)
+            print(f"  Estimated: {fmt_count(result.root.est_rows)} rows, cost {fmt_count(result.est_cost)}")
+            print_profile(result, stats, args.top, args.tree)
+            profiles.append(result.to_json())
+            continue
+
+        with instrumentation.stage("profile", query=rq_file.stem) as st:
+            result = profile(dataset, query, stats, rq_file.stem, timeout=args.timeout)
+            st.status = result.status
+        entry = result.to_json()
+
+        if result.status == "timeout":
+            print(f"  ✗ Stopped after {result.seconds:.1f}s (--timeout {args.timeout:g})")
+            failed.append(rq_file.stem)
+        elif result.status == "error":
+            print(f"  ✗ {result.error}")
+            failed.append(rq_file.stem)
+        else:
+            with instrumentation.stage("time", query=rq_file.stem) as st:
+                seconds, rows = time_query(dataset, query, args.repeat) if args.repeat > 0 else (result.seconds, result.rows)
+                st.count(rows=rows)
+            entry["unprofiled_ms"] = round(seconds * 1000, 3)
+            print(f"  ✓ {rows:,} rows in {seconds * 1000:.1f} ms "
+                  f"(profiled {result.seconds * 1000:.1f} ms, estimated {fmt_count(result.root.est_rows)} rows)")
+            if history is not None:
+                verdict, base = history.compare(rq_file.stem, seconds, query_hash, data_hash,
+                                                args.threshold, args.min_delta / 1000)
+                entry["history"] = {"verdict": verdict, "baseline_ms": round(base * 1000, 3) if base else None}
+                if verdict == "regression":
+                    print(f"  ✗ Regression: {seconds * 1000:.1f} ms vs {base * 1000:.1f} ms median of earlier runs")
+                    regressions.append(rq_file.stem)
+                elif verdict in ("same", "faster"):
+                    print(f"  ✓ {verdict.capitalize()}: {base * 1000:.1f} ms median of earlier runs")
+                else:
+                    print(f"  History: {verdict}")
+                history.add(rq_file.stem, seconds, rows, "ok", query_hash, data_hash)
+        if result.status != "ok" and history is not None:
+            history.add(rq_file.stem, result.seconds, None, result.status, query_hash, data_hash)
+        print_profile(result, stats, args.top, args.tree)
+        profiles.append(entry)
+
+    if history is not None:
+        history.save()
+
+    print("\n" + "=" * 60)
+    print(f"Profiled {len(query_files)} queries: {len(query_files) - len(failed)} ok, {len(failed)} failed"
+          + (f", {len(regressions)} regressions" if history is not None else ""))
+    if failed:
+        print(f"  ✗ Failed or stopped: {', '.join(failed)}")
+    if regressions:
+        print(f"  ✗ Regressions: {', '.join(regressions)}")
+    if history is not None:
+        print(f"  History: {args.history}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "data": args.data_path, "statistics": stats.to_json(), "queries": profiles,
+        }, indent=2), encoding="utf-8")
+        print(f"  Profiles written to: {args.json}")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
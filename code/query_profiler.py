@@ -0,0 +1,628 @@
+"""
+Cost estimates and measured profiles of the queries/ suite.
+
+A query compiled by rdflib is a tree of algebra operators (Project,
+Filter, Join, LeftJoin, Union, BGP ...). This module looks at that tree
+in two ways:
+
+    estimate    before running: DatasetStatistics holds per-predicate
+                triple counts, distinct subjects and objects, and the
+                count of every object of low-cardinality predicates
+                (rdf:type, access levels ...). Each triple pattern gets
+                an expected number of matches per lookup from them, in
+                the order rdflib evaluates the patterns, and every
+                operator an expected number of calls, output rows and
+                work (triples looked at plus rows passed on)
+    measure     while running: rdflib's evaluator is entered through
+                evaluate.evalPart, also for the per-row EXISTS / NOT
+                EXISTS checks, so profile() swaps in a version that
+                counts calls and rows and times every operator. Time
+                spent in an operator's children is subtracted to give
+                its self time, which is what singles out the dominant
+                operators. BGPs are evaluated by an equivalent of
+                rdflib's evalBGP that also counts the lookups, matches
+                and time of each triple pattern
+
+The measuring evaluator checks a deadline on every row, so a query
+that runs too long (q16 is a nine-way cross product) is stopped with
+QueryTimeout instead of hanging the run.
+
+ProfileHistory keeps the timings of every query per run in a JSON
+file. A run is compared with the earlier runs of the same query text on
+the same data, and a slowdown beyond a threshold is reported as a
+regression; a changed query or dataset starts a new baseline.
+
+Example:
+    dataset = sparql_engine.load_dataset("data/heritage_complete.ttl")
+    stats = DatasetStatistics(dataset)
+    query = sparql_engine.QueryCache().get(Path("queries/q25_comprehensive_validation_check.rq").read_text())
+    result = profile(dataset, query, stats, timeout=30)
+    for node in result.dominant(3):
+        print(node.label, node.self_seconds, node.calls)
+"""
+
+import json
+import math
+import os
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from rdflib import Literal, URIRef, Variable
+from rdflib.namespace import OWL, RDF, RDFS, XSD
+from rdflib.plugins.sparql import evaluate
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import AlreadyBound
+
+from sparql_engine import QueryTimeout
+
+NS = "http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/"
+
+PREFIXES = {NS: ":", str(RDF): "rdf:", str(RDFS): "rdfs:", str(XSD): "xsd:", str(OWL): "owl:"}
+
+# Predicates with at most this many distinct objects keep a count per object
+OBJECT_COUNT_LIMIT = 1000
+
+# Selectivity assumed for a FILTER condition the statistics say nothing about
+FILTER_SELECTIVITY = 0.5
+
+# A pattern matching more than this share of the triples per lookup is unselective
+UNSELECTIVE_SHARE = 0.05
+
+EXISTS = ("Builtin_EXISTS", "Builtin_NOTEXISTS")
+
+
+def term_text(term):
+    """Short SPARQL-like text of a term (?var, :local, rdfs:label, "literal")"""
+    if isinstance(term, Variable):
+        return f"?{term}"
+    if isinstance(term, URIRef):
+        for namespace, prefix in PREFIXES.items():
+            if term.startswith(namespace):
+                return prefix + term[len(namespace):]
+        return f"<{term}>"
+    if isinstance(term, Literal):
+        return term.n3()
+    return str(term)
+
+
+def pattern_text(triple):
+    return " ".join(term_text(t) for t in triple)
+
+
+class DatasetStatistics:
+    """Per-predicate cardinalities of a graph or dataset, from one pass over its triples"""
+
+    def __init__(self, graph):
+        counts = Counter()
+        subjects = defaultdict(set)
+        objects = defaultdict(set)
+        object_counts = defaultdict(Counter)
+        all_subjects, all_objects = set(), set()
+        triples = graph.quads((None, None, None, None)) if hasattr(graph, "quads") else graph.triples((None, None, None))
+        for quad in triples:
+            s, p, o = quad[:3]
+            counts[p] += 1
+            subjects[p].add(s)
+            objects[p].add(o)
+            object_counts[p][o] += 1
+            all_subjects.add(s)
+            all_objects.add(o)
+        self.triples = sum(counts.values())
+        self.predicates = dict(counts)
+        self.distinct_subjects = {p: len(v) for p, v in subjects.items()}
+        self.distinct_objects = {p: len(v) for p, v in objects.items()}
+        self.object_counts = {p: dict(c) for p, c in object_counts.items() if len(c) <= OBJECT_COUNT_LIMIT}
+        self.subjects = len(all_subjects)
+        self.objects = len(all_objects)
+
+    def matches(self, triple, bound):
+        """
+        Expected triples matching a pattern per lookup, with the variables
+        in bound (and every constant) already bound; predicates and
+        objects are assumed independent.
+        """
+        s, p, o = triple
+        s_bound = not isinstance(s, Variable) or s in bound
+        p_bound = not isinstance(p, Variable) or p in bound
+        o_bound = not isinstance(o, Variable) or o in bound
+        if p_bound and not isinstance(p, Variable):
+            count = self.predicates.get(p, 0)
+            if not count:
+                return 0.0
+            n_s, n_o = self.distinct_subjects[p], self.distinct_objects[p]
+            known = self.object_counts.get(p, {})
+        elif p_bound:
+            # A predicate bound at run time: an average predicate
+            count = self.triples / max(len(self.predicates), 1)
+            n_s = self.subjects / max(len(self.predicates), 1) or 1
+            n_o = self.objects / max(len(self.predicates), 1) or 1
+            known = {}
+        else:
+            count, n_s, n_o, known = self.triples, self.subjects or 1, self.objects or 1, {}
+        estimate = float(count)
+        if s_bound:
+            estimate /= n_s
+        if o_bound:
+            if not isinstance(o, Variable):
+                estimate *= known.get(o, 0 if known else count / n_o) / count
+            else:
+                estimate /= n_o
+        return estimate
+
+    def to_json(self):
+        return {
+            "triples": self.triples,
+            "subjects": self.subjects,
+            "objects": self.objects,
+            "predicates": {term_text(p): {"triples": n, "subjects": self.distinct_subjects[p],
+                                          "objects": self.distinct_objects[p]}
+                           for p, n in sorted(self.predicates.items(), key=lambda item: -item[1])},
+        }
+
+
+class PatternStats:
+    """Estimated and measured work of one triple pattern of a BGP"""
+
+    def __init__(self, triple):
+        self.triple = triple
+        self.est_lookups = 0.0
+        self.est_matches = 0.0
+        self.lookups = 0
+        self.matches = 0
+        self.seconds = 0.0
+
+    @property
+    def text(self):
+        return pattern_text(self.triple)
+
+
+class Operator:
+    """One algebra operator with its estimate and, after profile(), its measurements"""
+
+    def __init__(self, part, depth, role=None):
+        self.part = part
+        self.name = part.name
+        self.depth = depth
+        self.role = role
+        self.children = []
+        self.patterns = {}
+        self.est_calls = 0.0
+        self.est_rows = 0.0
+        self.est_cost = 0.0
+        self.calls = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+
+    @property
+    def label(self):
+        part, name = self.part, self.name
+        if name == "BGP":
+            n = len(part.triples)
+            text = f"BGP ({n} pattern{'s' if n != 1 else ''})"
+        elif name == "Extend":
+            text = f"Extend ?{part.var}"
+        elif name == "Graph":
+            text = f"Graph {term_text(part.term)}"
+        elif name == "Join":
+            text = "Join (nested loop)" if part.get("lazy") else "Join (hash)"
+        elif name == "Filter":
+            kinds = [e.name for e in _exists(part.expr)]
+            text = "Filter NOT EXISTS" if "Builtin_NOTEXISTS" in kinds else "Filter EXISTS" if kinds else "Filter"
+        else:
+            text = name
+        return f"[{self.role}] {text}" if self.role else text
+
+    @property
+    def variables(self):
+        return set(self.part.get("_vars") or ())
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _exists(expr):
+    """EXISTS / NOT EXISTS expressions inside a filter or bind expression"""
+    found = []
+    stack = [expr]
+    while stack:
+        e = stack.pop()
+        if isinstance(e, CompValue):
+            if e.name in EXISTS:
+                found.append(e)
+                continue
+            stack.extend(e.values())
+        elif isinstance(e, (list, tuple)):
+            stack.extend(e)
+    return found
+
+
+def operator_tree(algebra, depth=0, role=None):
+    """Operator tree of a compiled query's algebra"""
+    node = Operator(algebra, depth, role)
+    for key in ("p", "p1", "p2"):
+        child = algebra.get(key)
+        if isinstance(child, CompValue):
+            node.children.append(operator_tree(child, depth + 1))
+    for key in ("expr",):
+        for e in _exists(algebra.get(key)):
+            kind = "NOT EXISTS" if e.name == "Builtin_NOTEXISTS" else "EXISTS"
+            node.children.append(operator_tree(e.graph, depth + 1, kind))
+    if node.name == "BGP":
+        node.patterns = {t: PatternStats(t) for t in algebra.triples}
+    return node
+
+
+class QueryProfile:
+    """Operator tree of one query with its estimates and (unless estimate-only) measurements"""
+
+    def __init__(self, name, root):
+        self.name = name
+        self.root = root
+        self.seconds = None
+        self.rows = None
+        self.status = "estimated"
+        self.error = None
+
+    def operators(self):
+        return list(self.root.walk())
+
+    def patterns(self):
+        return [stats for node in self.root.walk() for stats in node.patterns.values()]
+
+    @property
+    def est_cost(self):
+        return sum(node.est_cost for node in self.root.walk())
+
+    def dominant(self, top=3):
+        """Operators with the most self time (or estimated work, before running)"""
+        nodes = [n for n in self.root.walk() if n.calls or self.status == "estimated"]
+        if self.status == "estimated":
+            return sorted(nodes, key=lambda n: -n.est_cost)[:top]
+        return sorted(nodes, key=lambda n: -n.self_seconds)[:top]
+
+    def warnings(self, stats):
+        """Plan shapes that are known to scale badly"""
+        found = []
+        for node in self.root.walk():
+            if node.name == "Join" and not node.part.get("lazy") and len(node.children) == 2:
+                left, right = node.children
+                if not (left.variables & right.variables) and min(left.est_rows, right.est_rows) > 1:
+                    found.append(f"{node.label}: no shared variables, a cross product of "
+                                 f"~{left.est_rows:,.0f} x {right.est_rows:,.0f} rows")
+            if node.role and max(node.calls, node.est_calls) > 100:
+                calls = node.calls if self.status != "estimated" else node.est_calls
+                found.append(f"{node.label}: evaluated once per row ({calls:,.0f} times)")
+            for pattern in node.patterns.values():
+                lookups = pattern.lookups if self.status != "estimated" else pattern.est_lookups
+                per_lookup = (pattern.matches / pattern.lookups if pattern.lookups
+                              else pattern.est_matches / pattern.est_lookups if pattern.est_lookups else 0)
+                if stats.triples and per_lookup > UNSELECTIVE_SHARE * stats.triples and lookups > 1:
+                    found.append(f"{pattern.text}: unselective, ~{per_lookup:,.0f} matches per lookup "
+                                 f"looked up {lookups:,.0f} times")
+        return found
+
+    def to_json(self):
+        def node_json(node):
+            data = {
+                "operator": node.label, "depth": node.depth,
+                "estimate": {"calls": round(node.est_calls, 2), "rows": round(node.est_rows, 2),
+                             "cost": round(node.est_cost, 2)},
+            }
+            if self.status != "estimated":
+                data["measured"] = {"calls": node.calls, "rows": node.rows,
+                                    "ms": round(node.seconds * 1000, 3),
+                                    "self_ms": round(node.self_seconds * 1000, 3)}
+            if node.patterns:
+                data["patterns"] = [{
+                    "pattern": p.text,
+                    "estimate": {"lookups": round(p.est_lookups, 2), "matches": round(p.est_matches, 2)},
+                    **({"measured": {"lookups": p.lookups, "matches": p.matches,
+                                     "ms": round(p.seconds * 1000, 3)}} if self.status != "estimated" else {}),
+                } for p in node.patterns.values()]
+            return data
+
+        return {
+            "query": self.name, "status": self.status, "error": self.error,
+            "ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "rows": self.rows, "estimated_cost": round(self.est_cost, 2),
+            "operators": [node_json(node) for node in self.root.walk()],
+        }
+
+
+def estimate(root, stats):
+    """Fill in the estimated calls, rows and work of every operator of the tree"""
+    _estimate(root, stats, frozenset(), 1.0)
+    return root
+
+
+def _estimate(node, stats, bound, calls):
+    """Expected output rows per call of node, given the variables bound on entry"""
+    part, name = node.part, node.name
+    children = {key: child for key, child in zip(
+        [k for k in ("p", "p1", "p2") if isinstance(part.get(k), CompValue)], node.children)}
+    cost = 0.0
+
+    if name == "BGP":
+        # rdflib evaluates the patterns with the fewest unbound terms first
+        order = sorted(part.triples, key=lambda t: sum(1 for n in t if isinstance(n, Variable) and n not in bound))
+        rows, now_bound = 1.0, set(bound)
+        for triple in order:
+            fan = stats.matches(triple, now_bound)
+            pattern = node.patterns[triple]
+            pattern.est_lookups += calls * rows
+            pattern.est_matches += calls * rows * fan
+            cost += rows * (1 + fan)
+            rows *= fan
+            now_bound.update(n for n in triple if isinstance(n, Variable))
+    elif name == "Join":
+        left, right = children["p1"], children["p2"]
+        r1 = _estimate(left, stats, bound, calls)
+        if part.get("lazy"):
+            # The right side runs once per left row with its variables bound
+            r2 = _estimate(right, stats, bound | left.variables, calls * r1)
+            rows = r1 * r2
+        else:
+            r2 = _estimate(right, stats, bound, calls)
+            shared = (left.variables & right.variables) - bound
+            rows = r1 * r2 / max(r1, r2, 1.0) if shared else r1 * r2
+            cost += r1 + r2
+    elif name == "LeftJoin":
+        left, right = children["p1"], children["p2"]
+        r1 = _estimate(left, stats, bound, calls)
+        r2 = _estimate(right, stats, bound | left.variables, calls * r1)
+        rows = r1 * max(r2, 1.0)
+    elif name in ("Union", "Minus"):
+        r1 = _estimate(children["p1"], stats, bound, calls)
+        r2 = _estimate(children["p2"], stats, bound, calls)
+        rows = r1 + r2 if name == "Union" else r1
+        cost += r1 + r2
+    elif name == "values":
+        rows = float(len(part.res))
+    else:
+        child = children.get("p")
+        rows = _estimate(child, stats, bound, calls) if child is not None else 1.0
+        if name == "Slice" and part.get("length") is not None:
+            rows = min(rows, float(part.length))
+        elif name == "AggregateJoin":
+            group_by = children["p"].part.get("expr")
+            rows = 1.0 if not group_by else max(1.0, math.sqrt(rows))
+        elif name == "OrderBy":
+            cost += rows * math.log2(rows) if rows > 1 else 0
+        cost += rows
+
+    # EXISTS / NOT EXISTS in a filter run once per row of the filtered input
+    selectivity = None
+    inner_bound = bound | node.variables
+    for child in node.children:
+        if child.role is None:
+            continue
+        found = _estimate(child, stats, inner_bound, calls * rows)
+        hit = min(found, 1.0)
+        chance = hit if child.role == "EXISTS" else 1.0 - hit
+        selectivity = chance if selectivity is None else selectivity * chance
+    if name == "Filter":
+        if selectivity is None:
+            selectivity = FILTER_SELECTIVITY
+        rows *= max(selectivity, 0.01)
+
+    node.est_calls += calls
+    node.est_rows += calls * rows
+    node.est_cost += calls * cost
+    return rows
+
+
+class _Profiler:
+    """rdflib's evalPart, counting and timing every operator of one query"""
+
+    def __init__(self, root, deadline):
+        self.nodes = {id(node.part): node for node in root.walk()}
+        self.deadline = deadline
+        self.stack = []
+        self.original = evaluate.evalPart
+
+    def _node(self, part):
+        node = self.nodes.get(id(part))
+        if node is None:
+            node = self.nodes[id(part)] = Operator(part, 0)
+        return node
+
+    def _enter(self):
+        frame = [0.0]
+        self.stack.append(frame)
+        return frame, time.perf_counter()
+
+    def _leave(self, frame, start, node):
+        elapsed = time.perf_counter() - start
+        self.stack.pop()
+        if node is not None:
+            node.seconds += elapsed
+            node.self_seconds += elapsed - frame[0]
+        if self.stack:
+            self.stack[-1][0] += elapsed
+        if start + elapsed > self.deadline:
+            raise QueryTimeout()
+
+    def _timed(self, node, rows, count):
+        """Iterate rows, adding the time spent producing each to node"""
+        rows = iter(rows)
+        while True:
+            frame, start = self._enter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            finally:
+                self._leave(frame, start, node)
+            count(node)
+            yield row
+
+    @staticmethod
+    def _count_row(node):
+        node.rows += 1
+
+    def _lookup(self, pattern, matches):
+        """Iterate the store's matches of a pattern, timing them as part of the BGP"""
+        matches = iter(matches)
+        while True:
+            start = time.perf_counter()
+            try:
+                match = next(matches)
+            except StopIteration:
+                return
+            finally:
+                end = time.perf_counter()
+                pattern.seconds += end - start
+                if end > self.deadline:
+                    raise QueryTimeout()
+            pattern.matches += 1
+            yield match
+
+    def eval_part(self, ctx, part):
+        node = self._node(part)
+        node.calls += 1
+        if part.name == "BGP":
+            # As rdflib: patterns with the fewest unbound terms first
+            triples = sorted(part.triples, key=lambda t: len([n for n in t if ctx[n] is None]))
+            return self._timed(node, self._bgp(ctx, triples, node), self._count_row)
+        frame, start = self._enter()
+        try:
+            result = self.original(ctx, part)
+        finally:
+            self._leave(frame, start, node)
+        if part.name.endswith("Query"):
+            return result
+        return self._timed(node, result, self._count_row)
+
+    def _bgp(self, ctx, bgp, node):
+        """rdflib's evalBGP, with lookups, matches and time per pattern"""
+        if not bgp:
+            yield ctx.solution()
+            return
+        s, p, o = bgp[0]
+        pattern = node.patterns.get(bgp[0])
+        if pattern is None:
+            pattern = node.patterns[bgp[0]] = PatternStats(bgp[0])
+        pattern.lookups += 1
+        _s, _p, _o = ctx[s], ctx[p], ctx[o]
+        for ss, sp, so in self._lookup(pattern, ctx.graph.triples((_s, _p, _o))):
+            c = ctx.push() if None in (_s, _p, _o) else ctx
+            if _s is None:
+                c[s] = ss
+            try:
+                if _p is None:
+                    c[p] = sp
+            except AlreadyBound:
+                continue
+            try:
+                if _o is None:
+                    c[o] = so
+            except AlreadyBound:
+                continue
+            yield from self._bgp(c, bgp[1:], node)
+
+
+_patch_lock = threading.Lock()
+
+
+def profile(dataset, query, stats, name="query", timeout=None):
+    """
+    Run a compiled query against dataset with every operator measured.
+
+    Returns a QueryProfile with estimates and measurements; its status
+    is "ok", "timeout" or "error". The evaluator is patched for the
+    duration of the run, so only one profile runs at a time.
+    """
+    root = estimate(operator_tree(query.algebra), stats)
+    result = QueryProfile(name, root)
+    with _patch_lock:
+        start = time.perf_counter()
+        profiler = _Profiler(root, start + timeout if timeout else math.inf)
+        for operator in profiler.nodes.values():
+            # Patterns keep their estimates; the counters start from zero
+            operator.calls = operator.rows = 0
+        evaluate.evalPart = profiler.eval_part
+        try:
+            result.rows = sum(1 for _ in dataset.query(query))
+            result.status = "ok"
+        except QueryTimeout:
+            result.status = "timeout"
+        except Exception as e:
+            result.status = "error"
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            evaluate.evalPart = profiler.original
+            result.seconds = time.perf_counter() - start
+    return result
+
+
+def plan(query, stats, name="query"):
+    """Estimates only, without running the query"""
+    return QueryProfile(name, estimate(operator_tree(query.algebra), stats))
+
+
+def time_query(dataset, query, repeat=3):
+    """Median wall time of running the query unprofiled, and its row count"""
+    times, rows = [], 0
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        rows = sum(1 for _ in dataset.query(query))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), rows
+
+
+class ProfileHistory:
+    """
+    Query timings over runs, in a JSON file.
+
+    Each query keeps its last KEEP runs as {"when", "seconds", "rows",
+    "status", "query", "data"}, where query and data are hashes of the
+    query text and the dataset.
+    """
+
+    KEEP = 50
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.runs = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+
+    def baseline(self, name, query_hash, data_hash, window=5):
+        """Median time of the last window ok runs of the same query on the same data"""
+        same = [run["seconds"] for run in self.runs.get(name, [])
+                if run["query"] == query_hash and run["data"] == data_hash and run["status"] == "ok"]
+        return statistics.median(same[-window:]) if same else None
+
+    def compare(self, name, seconds, query_hash, data_hash, threshold=0.25, min_delta=0.01):
+        """
+        (verdict, baseline) of a new timing: "new", "query changed",
+        "data changed", "regression", "faster" or "same". Differences
+        under min_delta seconds are timer noise, whatever the ratio.
+        """
+        runs = self.runs.get(name, [])
+        if not runs:
+            return "new", None
+        base = self.baseline(name, query_hash, data_hash)
+        if base is None:
+            return ("query changed" if runs[-1]["query"] != query_hash else "data changed"), None
+        if seconds > base * (1 + threshold) and seconds - base > min_delta:
+            return "regression", base
+        if seconds < base / (1 + threshold) and base - seconds > min_delta:
+            return "faster", base
+        return "same", base
+
+    def add(self, name, seconds, rows, status, query_hash, data_hash):
+        runs = self.runs.setdefault(name, [])
+        runs.append({"when": time.strftime("%Y-%m-%dT%H:%M:%S"), "seconds": seconds, "rows": rows,
+                     "status": status, "query": query_hash, "data": data_hash})
+        del runs[:-self.KEEP]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.runs, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
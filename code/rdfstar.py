@@ -0,0 +1,119 @@
+"""
+RDF-star support for rdflib.
+
+rdflib cannot parse Turtle-star data or SPARQL-star queries, so the
+contested-claims RDF-star file and q3/q5 would otherwise be unusable
+in-process. Both are lowered to plain RDF here: every quoted triple
+<< s p o >> becomes a blank node carrying rdf:subject / rdf:predicate /
+rdf:object (but no rdf:type rdf:Statement, so the reification queries
+do not pick these up), and the SPARQL-star pattern << ?s ?p ?o >> is
+rewritten to match that shape.
+
+The same quoted triple always lowers to the same blank node, as it is
+the same term in RDF-star.
+"""
+
+import hashlib
+import re
+
+RDF_SUBJECT = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#subject>"
+RDF_PREDICATE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#predicate>"
+RDF_OBJECT = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#object>"
+
+# Innermost << ... >>: IRIs, string literals and plain tokens, no nested <<
+_QUOTED = re.compile(r'<<((?:\s+|<[^<>\s]*>|"(?:[^"\\]|\\.)*"|[^\s<>"]+)+?)\s*>>')
+# Skips IRIs, strings and comments so "<<" inside them is left alone
+_SCAN = re.compile(r'<(?!<)[^<>\s]*>|"(?:[^"\\]|\\.)*"|#[^\n]*|<<')
+# Skips IRIs, strings and comments; group 1/2 mark a group or statement start
+_BOUNDARY = re.compile(r'<[^<>\s]*>|"(?:[^"\\]|\\.)*"|#[^\n]*|(\{)|(\.)(?=\s)')
+_TERM = re.compile(r'<[^<>\s]*>|"(?:[^"\\]|\\.)*"(?:@[\w-]+|\^\^\S+)?|[^\s]+')
+
+
+def _find_quoted(text: str):
+    """Match of the first innermost quoted triple outside comments/strings."""
+    for m in _SCAN.finditer(text):
+        if m.group() == "<<":
+            quoted = _QUOTED.match(text, m.start())
+            if quoted:
+                return quoted
+    return None
+
+
+def has_rdf_star(text: str) -> bool:
+    """True if the Turtle or SPARQL text contains a quoted triple."""
+    return _find_quoted(text) is not None
+
+
+def _terms(inner: str):
+    terms = _TERM.findall(inner.strip())
+    if len(terms) != 3:
+        raise ValueError(f"Cannot lower quoted triple: << {inner.strip()} >>")
+    return terms
+
+
+def lower_turtle(text: str, per_occurrence: bool = False) -> str:
+    """
+    Rewrite Turtle-star text into plain Turtle.
+
+    With per_occurrence, every occurrence of a quoted triple gets its own
+    blank node. Two annotation blocks on the same triple (two sources
+    making the same claim) then stay apart, which is what the claims
+    index needs; it is not the RDF-star reading, where they are one term.
+    """
+    triples = {}
+    seen = {}
+
+    # One pass per nesting level; each replaces every innermost quoted triple
+    while True:
+        parts = []
+        pos = 0
+        for m in _SCAN.finditer(text):
+            if m.group() != "<<" or m.start() < pos:
+                continue
+            match = _QUOTED.match(text, m.start())
+            if match is None:
+                continue
+            s, p, o = _terms(match.group(1))
+            label = "qt" + hashlib.sha1(f"{s} {p} {o}".encode("utf-8")).hexdigest()[:16]
+            if per_occurrence:
+                seen[label] = seen.get(label, 0) + 1
+                label = f"{label}n{seen[label]}"
+            triples[label] = (s, p, o)
+            parts.append(text[pos:match.start()])
+            parts.append(f"_:{label}")
+            pos = match.end()
+        if not parts:
+            break
+        parts.append(text[pos:])
+        text = "".join(parts)
+
+    lines = [text, "", "# Quoted triples (lowered from RDF-star)"]
+    for label, (s, p, o) in triples.items():
+        lines.append(f"_:{label} {RDF_SUBJECT} {s} ; {RDF_PREDICATE} {p} ; {RDF_OBJECT} {o} .")
+    return "\n".join(lines) + "\n"
+
+
+def _statement_start(query: str, pos: int) -> int:
+    """Index just after the last '{' or statement-ending '.' before pos."""
+    last = 0
+    for m in _BOUNDARY.finditer(query, 0, pos):
+        if m.group(1) or m.group(2):
+            last = m.end()
+    return last
+
+
+def lower_sparql(query: str) -> str:
+    """Rewrite SPARQL-star triple patterns into the lowered data shape."""
+    counter = 0
+    while True:
+        match = _find_quoted(query)
+        if match is None:
+            return query
+        s, p, o = _terms(match.group(1))
+        var = f"?__qt{counter}"
+        counter += 1
+        pattern = (f" {var} {RDF_SUBJECT} {s} . {var} {RDF_PREDICATE} {p} . "
+                   f"{var} {RDF_OBJECT} {o} . ")
+        start = _statement_start(query, match.start())
+        query = (query[:start] + pattern + query[start:match.start()]
+                 + var + query[match.end():])
@@ -0,0 +1,88 @@
+"""
+Content-addressed cache for SPARQL query results.
+
+An entry is keyed on a hash of the query text plus a fingerprint of the
+dataset it ran against, so a result is reused only while neither has
+changed. Entries are plain files in the cache directory; reading one
+refreshes its mtime, and the least recently used entries are evicted
+once the directory grows past its size budget.
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+
+def file_fingerprint(paths):
+    """Fingerprint of a set of data files, from their names and contents"""
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(chunk)
+        digest.update(path.name.encode("utf-8"))
+        digest.update(file_hash.digest())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded, LRU-evicted on-disk store of query results"""
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query_text, fingerprint, variant=""):
+        """Cache key for a query run against a dataset with the given fingerprint"""
+        digest = hashlib.sha256()
+        for part in (query_text, fingerprint, variant):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.result"
+
+    def get(self, key):
+        """Path of the cached result file, or None"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, src_path):
+        """Store a copy of a result file, then evict down to the size budget"""
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*.result"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        return total
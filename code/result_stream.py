@@ -0,0 +1,209 @@
+"""
+Streaming handling of SPARQL result bodies.
+
+Results are written to disk chunk by chunk as they arrive and their rows
+are counted on the fly, so a result set never has to be held in memory
+as a whole. Supported formats:
+
+    json    application/sparql-results+json, written as received
+    csv     text/csv, written as received
+    tsv     text/tab-separated-values, written as received
+    ndjson  one binding object per line, converted from the JSON stream
+"""
+
+import json
+import re
+
+# format -> (Accept header to request, result file suffix)
+FORMATS = {
+    "json": ("application/sparql-results+json", ".json"),
+    "csv": ("text/csv", ".csv"),
+    "tsv": ("text/tab-separated-values", ".tsv"),
+    "ndjson": ("application/sparql-results+json", ".ndjson"),
+}
+
+CHUNK_SIZE = 1 << 16
+
+_JSON_TOKENS = re.compile(rb'["\\{}\[\]:]')
+_STRING_END = re.compile(rb'["\\]')
+_CSV_TOKENS = re.compile(rb'["\n]')
+
+
+class BindingScanner:
+    """
+    Incremental scanner for the SPARQL JSON results format.
+
+    Counts the objects of the results.bindings array and, if on_binding
+    is given, passes the raw bytes of each one to it. Only the binding
+    currently being read is buffered.
+    """
+
+    def __init__(self, on_binding=None):
+        self.on_binding = on_binding
+        self.rows = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string = bytearray()       # current string, while it is short
+        self.last_string = None         # last complete string token
+        self.key = None                 # last string followed by ':'
+        self.bindings_depth = None      # depth of the bindings array
+        self.current = None             # bytes of the binding being read
+
+    def feed(self, chunk: bytes):
+        pos = 0
+        start = 0                       # start of this chunk's part of self.current
+        n = len(chunk)
+        if self.escape and n:
+            self.escape = False
+            pos = 1
+        while pos < n:
+            if self.in_string:
+                m = _STRING_END.search(chunk, pos)
+                if m is None:
+                    self._keep_string(chunk[pos:])
+                    break
+                c = m.group()
+                self._keep_string(chunk[pos:m.start()])
+                if c == b"\\":
+                    if m.end() >= n:
+                        self.escape = True
+                        break
+                    self._keep_string(chunk[m.start():m.end() + 1])
+                    pos = m.end() + 1
+                    continue
+                self.in_string = False
+                self.last_string = bytes(self.string) if self.string is not None else None
+                pos = m.end()
+                continue
+
+            m = _JSON_TOKENS.search(chunk, pos)
+            if m is None:
+                break
+            c = m.group()
+            pos = m.end()
+            if c == b'"':
+                self.in_string = True
+                self.string = bytearray()
+            elif c == b":":
+                self.key = self.last_string
+            elif c in (b"{", b"["):
+                if c == b"[" and self.key == b"bindings" and self.bindings_depth is None:
+                    self.bindings_depth = self.depth + 1
+                elif c == b"{" and self.bindings_depth is not None and self.depth == self.bindings_depth:
+                    self.current = bytearray() if self.on_binding else None
+                    start = m.start()
+                self.depth += 1
+                self.key = None
+            elif c in (b"}", b"]"):
+                self.depth -= 1
+                if self.bindings_depth is not None:
+                    if c == b"}" and self.depth == self.bindings_depth:
+                        self.rows += 1
+                        if self.on_binding:
+                            self.current += chunk[start:pos]
+                            self.on_binding(bytes(self.current))
+                            self.current = None
+                    elif c == b"]" and self.depth == self.bindings_depth - 1:
+                        self.bindings_depth = -1     # done; ignore later arrays
+        if self.current is not None:
+            self.current += chunk[start:]
+
+    def _keep_string(self, part):
+        if self.string is not None:
+            if len(self.string) + len(part) > 64:
+                self.string = None          # keys we care about are short
+            else:
+                self.string += part
+
+
+class CsvRowCounter:
+    """Counts CSV records (newlines outside quoted fields), minus the header"""
+
+    def __init__(self):
+        self.records = 0
+        self.in_quotes = False
+        self.pending = False            # data after the last record end
+
+    def feed(self, chunk: bytes):
+        for m in _CSV_TOKENS.finditer(chunk):
+            if m.group() == b'"':
+                self.in_quotes = not self.in_quotes
+            elif not self.in_quotes:
+                self.records += 1
+        if chunk:
+            self.pending = not chunk.endswith(b"\n")
+
+    @property
+    def rows(self):
+        return max(self.records + (1 if self.pending else 0) - 1, 0)
+
+
+class LineCounter:
+    """Counts lines, optionally minus a header line (TSV, NDJSON)"""
+
+    def __init__(self, header=True):
+        self.lines = 0
+        self.header = header
+        self.pending = False
+
+    def feed(self, chunk: bytes):
+        self.lines += chunk.count(b"\n")
+        if chunk:
+            self.pending = not chunk.endswith(b"\n")
+
+    @property
+    def rows(self):
+        total = self.lines + (1 if self.pending else 0)
+        return max(total - (1 if self.header else 0), 0)
+
+
+def make_counter(fmt):
+    if fmt == "json":
+        return BindingScanner()
+    if fmt == "csv":
+        return CsvRowCounter()
+    if fmt == "tsv":
+        return LineCounter(header=True)
+    if fmt == "ndjson":
+        return LineCounter(header=False)
+    raise ValueError(f"Unknown result format: {fmt}")
+
+
+class ResultSink:
+    """
+    Writes a result body to an open binary file as chunks arrive.
+
+    For ndjson the incoming body is SPARQL JSON and each binding is
+    re-emitted as one compact JSON line.
+    """
+
+    def __init__(self, out, fmt):
+        self.out = out
+        self.fmt = fmt
+        if fmt == "ndjson":
+            self.counter = BindingScanner(on_binding=self._write_line)
+        else:
+            self.counter = make_counter(fmt)
+
+    def _write_line(self, raw):
+        self.out.write(json.dumps(json.loads(raw), ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self.out.write(b"\n")
+
+    def write(self, chunk: bytes):
+        if self.fmt != "ndjson":
+            self.out.write(chunk)
+        self.counter.feed(chunk)
+
+    @property
+    def rows(self):
+        return self.counter.rows
+
+
+def count_rows(path, fmt):
+    """Count the rows of a stored result file without loading it"""
+    counter = make_counter(fmt)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            counter.feed(chunk)
+    return counter.rows
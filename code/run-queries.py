@@ -2,93 +2,422 @@
 """
 SPARQL Query Execution Script
 Runs SPARQL queries against a Fuseki endpoint and saves results as JSON
+(or CSV, TSV or NDJSON with --format)
+
+Queries can be run concurrently (--workers) over one shared keep-alive
+connection pool, against several endpoints at once. Results are always
+written and reported in the same order (endpoint, then query file name).
+
+Instead of an endpoint URL a local data file or directory can be given;
+the suite then runs in process against an rdflib Dataset (see
+sparql_engine.py), with every query compiled once and reused across
+datasets and --repeat runs. Local queries also run side by side, and
+--timeout stops one that is still evaluating (q16 on rdflib) in its
+worker thread.
+
+Results are cached under queries/.cache, keyed on the query text and a
+dataset fingerprint (content hash of local data files, or the
+--dataset-version given for endpoints). Only queries whose text or
+dataset changed are re-run, and result files are rewritten only when
+their content changed. --repeat is for timing the queries, so it turns
+the result cache off: every run executes every query.
+
+With --access-level N, local datasets are queried as a caller with
+access level N: people, cultural items and recordings above that level
+are left out of the data the queries see (see access_scope.py), and the
+results go to queries/results/access-level-N.
+
+Result bodies are streamed to disk in chunks as they arrive and rows are
+counted incrementally (see result_stream.py), so large result sets are
+never held in memory.
+
+--timeout bounds each query and --total-timeout the whole suite; a
+query still running at either is stopped and its partial result
+removed. The script exits with status 1 if any query failed or timed
+out.
 
 Usage:
-    python code/run-queries.py <endpoint_url>
-    
+    python code/run-queries.py <endpoint_url|data_path> [...] [--workers N]
+                               [--timeout SECONDS] [--total-timeout SECONDS]
+                               [--repeat N] [--dataset-version TAG]
+                               [--cache-dir DIR] [--cache-size MB] [--no-cache]
+                               [--format json|csv|tsv|ndjson] [--access-level N]
+                               [--metrics FILE] [--profile-stage query]
+
 Example:
     python code/run-queries.py http://localhost:3030/heritage-reification/sparql
+    python code/run-queries.py data/contested-claims-named.trig data/contested-claims-rdfstar.ttl
+    python code/run-queries.py --workers 8 \\
+        http://localhost:3030/heritage-reification/sparql \\
+        http://localhost:3030/heritage-named/sparql \\
+        http://localhost:3030/heritage-rdfstar/sparql
 """
 
-import json
+import argparse
+import filecmp
+import os
+import shutil
 import sys
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     print("ERROR: requests library not installed!")
     print("Install it with: pip install requests")
     sys.exit(1)
 
+import access_scope
+import instrumentation
+import result_stream
+import sparql_engine
+from result_cache import ResultCache, file_fingerprint
 
-def run_query(endpoint: str, rq_file: Path):
-    """Execute a SPARQL query against an endpoint"""
+
+def make_session(workers: int = 1):
+    """Create a keep-alive session whose connection pool fits `workers` threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max(workers, 1), pool_maxsize=max(workers, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def run_query(endpoint: str, rq_file: Path, out, fmt: str = "json", session=None, timeout: float = 60):
+    """
+    Execute a SPARQL query against an endpoint, streaming the result body
+    into the binary file out. Returns the row count, or None on error or
+    when the whole exchange takes longer than timeout seconds.
+    """
     query = rq_file.read_text(encoding="utf-8")
-    
-    print(f"Executing: {rq_file.name}")
-    
+    http = session or requests
+    accept = result_stream.FORMATS[fmt][0]
+    stop = time.monotonic() + timeout
+
     try:
-        response = requests.post(
+        with http.post(
             endpoint,
             data={"query": query},
-            headers={"Accept": "application/sparql-results+json"},
-            timeout=60,
-        )
-        response.raise_for_status()
-        return response.json()
+            headers={"Accept": accept},
+            timeout=timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            sink = result_stream.ResultSink(out, fmt)
+            for chunk in response.iter_content(chunk_size=result_stream.CHUNK_SIZE):
+                if time.monotonic() > stop:
+                    print(f"ERROR executing query {rq_file.name}: timed out after {timeout:g}s")
+                    return None
+                sink.write(chunk)
+            return sink.rows
     except requests.exceptions.RequestException as e:
         print(f"ERROR executing query {rq_file.name}: {e}")
         return None
 
 
+def is_endpoint(target: str) -> bool:
+    return target.startswith(("http://", "https://"))
+
+
+def dataset_name(endpoint: str) -> str:
+    """Dataset name of a Fuseki endpoint URL (.../<dataset>/sparql) or a data path"""
+    if not is_endpoint(endpoint):
+        return Path(endpoint).stem
+    parts = [p for p in endpoint.rstrip("/").split("/") if p]
+    if len(parts) >= 2 and parts[-1] in ("sparql", "query"):
+        return parts[-2]
+    return parts[-1] if parts else "default"
+
+
+class HttpBackend:
+    """Runs queries against a SPARQL endpoint over a shared session"""
+
+    def __init__(self, endpoint: str, session, timeout: float = 60, dataset_version: str = None):
+        self.target = endpoint
+        self.session = session
+        self.timeout = timeout
+        # The endpoint's content is unknown unless the caller vouches for a version
+        self.fingerprint = f"{endpoint}#{dataset_version}" if dataset_version else None
+
+    def run(self, rq_file: Path, out, fmt: str, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        return run_query(self.target, rq_file, out, fmt, session=self.session, timeout=timeout)
+
+
+class LocalBackend:
+    """
+    Runs queries in process against a Dataset loaded from a local path,
+    optionally scoped to what a caller with access_level may see
+    """
+
+    def __init__(self, data_path: str, cache, access_level: int = None, timeout: float = 60):
+        self.target = data_path
+        self.cache = cache
+        self.timeout = timeout
+        self.dataset = sparql_engine.load_dataset(data_path)
+        self.fingerprint = file_fingerprint(sparql_engine.data_files(data_path))
+        if access_level is not None:
+            partitions = access_scope.AccessPartitions(self.dataset)
+            self.dataset = partitions.scope(self.dataset, access_level)
+            self.fingerprint += f"#access-level={access_level}"
+
+    def run(self, rq_file: Path, out, fmt: str, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        query = rq_file.read_text(encoding="utf-8")
+        try:
+            # Queries only read the dataset, so they run side by side; the
+            # deadline stops one that runs too long (q16) in its own thread
+            with sparql_engine.evaluation_deadline(timeout):
+                result = self.dataset.query(self.cache.get(query))
+                return sparql_engine.write_result(result, out, fmt)
+        except sparql_engine.QueryTimeout:
+            print(f"ERROR executing query {rq_file.name}: timed out after {timeout:g}s")
+            return None
+        except Exception as e:
+            print(f"ERROR executing query {rq_file.name}: {e}")
+            return None
+
+
+def timed_query(backend, rq_file: Path, part_path: Path, fmt: str, deadline: float = None):
+    """
+    Run one query into part_path; returns (rows or None, seconds, timed_out).
+    The query is stopped at deadline (time.monotonic()) if that comes
+    before its own timeout.
+    """
+    timeout = backend.timeout
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            return None, 0.0, True
+    start = time.perf_counter()
+    with instrumentation.stage("query", query=rq_file.stem, dataset=dataset_name(backend.target)) as st:
+        with open(part_path, "wb") as out:
+            rows = backend.run(rq_file, out, fmt, timeout)
+        elapsed = time.perf_counter() - start
+        timed_out = rows is None and elapsed >= timeout
+        if rows is None:
+            st.status = "timeout" if timed_out else "error"
+        else:
+            st.count(rows=rows)
+    return rows, elapsed, timed_out
+
+
+def publish(src: Path, out_path: Path, keep_src: bool = False):
+    """Move (or copy) a finished result to out_path unless it is unchanged"""
+    if out_path.exists() and filecmp.cmp(src, out_path, shallow=False):
+        print(f"  ✓ Unchanged: {out_path}")
+        if not keep_src:
+            src.unlink()
+    else:
+        if keep_src:
+            shutil.copyfile(src, out_path)
+        else:
+            os.replace(src, out_path)
+        print(f"  ✓ Saved: {out_path}")
+
+
+def run_suite(jobs, workers: int = 1, total_timeout: float = None, cache=None, fmt: str = "json"):
+    """
+    Run (backend, rq_file, out_dir) jobs on a thread pool.
+
+    Jobs whose result is in the cache are not run at all. The rest are
+    started concurrently and stream their results into .part files, but
+    all results are published in job order, each as soon as it and all
+    jobs before it have finished. Once total_timeout seconds have
+    passed, unfinished jobs are reported as timed out: queued ones are
+    cancelled, running ones are stopped (every job runs with the total
+    deadline as well as its own timeout), and their .part files are
+    removed before returning.
+
+    Returns (succeeded, failed) counts.
+    """
+    deadline = time.monotonic() + total_timeout if total_timeout else None
+    suffix = result_stream.FORMATS[fmt][1]
+    succeeded = failed = 0
+
+    keys = []
+    cached = {}
+    for i, (backend, rq_file, out_dir) in enumerate(jobs):
+        key = None
+        if cache is not None and backend.fingerprint:
+            key = cache.key(rq_file.read_text(encoding="utf-8"), backend.fingerprint, fmt)
+            path = cache.get(key)
+            if path is not None:
+                cached[i] = path
+        keys.append(key)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    abandoned = []
+    try:
+        futures = {}
+        for i, (backend, rq_file, out_dir) in enumerate(jobs):
+            if i not in cached:
+                part_path = out_dir / (rq_file.stem + suffix + ".part")
+                futures[i] = (part_path, executor.submit(timed_query, backend, rq_file, part_path, fmt, deadline))
+
+        for i, (backend, rq_file, out_dir) in enumerate(jobs):
+            print(f"Executing: {rq_file.name} [{dataset_name(backend.target)}]")
+            out_path = out_dir / (rq_file.stem + suffix)
+            if i in cached:
+                print("    Cached: query and dataset unchanged")
+                publish(cached[i], out_path, keep_src=True)
+                print(f"    Results: {result_stream.count_rows(out_path, fmt)} rows")
+                succeeded += 1
+                print()
+                continue
+
+            part_path, future = futures[i]
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                rows, elapsed, timed_out = future.result(timeout=remaining)
+            except (FutureTimeoutError, CancelledError):
+                # Nothing queued is worth starting any more
+                executor.shutdown(wait=False, cancel_futures=True)
+                rows, timed_out = None, True
+
+            if rows is not None:
+                print(f"    Time: {elapsed:.2f}s")
+                if keys[i] is not None:
+                    cache.put(keys[i], part_path)
+                publish(part_path, out_path)
+                print(f"    Results: {rows} rows")
+                succeeded += 1
+            else:
+                # A stopped job may still hold its .part file open
+                abandoned.append(part_path)
+                if not timed_out:
+                    print(f"  ✗ Failed: {rq_file.name}")
+                elif deadline is not None and time.monotonic() >= deadline:
+                    print(f"  ✗ Timed out: {rq_file.name} (total timeout {total_timeout:g}s reached)")
+                else:
+                    print(f"  ✗ Timed out: {rq_file.name} (timeout {backend.timeout:g}s)")
+                failed += 1
+            print()
+    finally:
+        # Running jobs end at the deadline, so this does not wait long
+        executor.shutdown(wait=True, cancel_futures=True)
+        for part_path in abandoned:
+            part_path.unlink(missing_ok=True)
+
+    return succeeded, failed
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python code/run-queries.py <endpoint_url>")
-        print()
-        print("Examples:")
-        print("  python code/run-queries.py http://localhost:3030/heritage-reification/sparql")
-        print("  python code/run-queries.py http://localhost:3030/heritage-named/sparql")
-        print("  python code/run-queries.py http://localhost:3030/heritage-rdfstar/sparql")
-        sys.exit(2)
-    
-    endpoint = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="Run the queries/*.rq suite against one or more SPARQL endpoints.",
+        epilog="Examples:\n"
+               "  python code/run-queries.py http://localhost:3030/heritage-reification/sparql\n"
+               "  python code/run-queries.py http://localhost:3030/heritage-named/sparql\n"
+               "  python code/run-queries.py http://localhost:3030/heritage-rdfstar/sparql",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("endpoints", nargs="+", metavar="endpoint_url|data_path",
+                        help="SPARQL endpoint URL(s), or local data files/directories to query in process")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of queries to run concurrently (default: 1)")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="per-query timeout in seconds (default: 60)")
+    parser.add_argument("--total-timeout", type=float, default=None,
+                        help="stop all unfinished queries after this many seconds")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="run the whole suite this many times, without the result cache (default: 1)")
+    parser.add_argument("--dataset-version", default=None,
+                        help="version tag of the endpoint data; enables result caching for endpoints")
+    parser.add_argument("--cache-dir", default="queries/.cache",
+                        help="result cache directory (default: queries/.cache)")
+    parser.add_argument("--cache-size", type=float, default=256,
+                        help="result cache size budget in MB (default: 256)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always re-run every query")
+    parser.add_argument("--format", choices=sorted(result_stream.FORMATS), default="json",
+                        help="result format to request and save (default: json)")
+    parser.add_argument("--access-level", type=int, choices=access_scope.LEVELS, default=None,
+                        help="local data only: run every query as a caller with this access level")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    if args.access_level is not None and any(is_endpoint(target) for target in args.endpoints):
+        parser.error("--access-level needs local data paths (the access partitions are built in process)")
+
     queries_dir = Path("queries")
     out_dir = queries_dir / "results"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    
+    if args.access_level is not None:
+        out_dir = out_dir / f"access-level-{args.access_level}"
+
     if not queries_dir.exists():
         print(f"ERROR: Queries directory not found: {queries_dir}")
         sys.exit(1)
-    
-    print(f"Query endpoint: {endpoint}")
+
+    # One endpoint keeps the old layout; several get one sub-directory each
+    if len(args.endpoints) == 1:
+        out_dirs = {args.endpoints[0]: out_dir}
+    else:
+        out_dirs = {endpoint: out_dir / dataset_name(endpoint) for endpoint in args.endpoints}
+    for d in out_dirs.values():
+        d.mkdir(parents=True, exist_ok=True)
+
+    for endpoint in args.endpoints:
+        print(f"Query endpoint: {endpoint}")
     print(f"Queries directory: {queries_dir}")
     print(f"Results directory: {out_dir}")
+    print(f"Workers: {args.workers}")
+    if args.access_level is not None:
+        print(f"Access level: {args.access_level}")
     print("-" * 60)
-    
+
     # Find all .rq files
     query_files = sorted(queries_dir.glob("*.rq"))
-    
+
     if not query_files:
         print("No .rq files found in queries directory")
         sys.exit(1)
-    
-    for rq_file in query_files:
-        result = run_query(endpoint, rq_file)
-        
-        if result:
-            out_path = out_dir / (rq_file.stem + ".json")
-            out_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
-            print(f"  ✓ Saved: {out_path}")
-            
-            # Show result count
-            if "results" in result and "bindings" in result["results"]:
-                count = len(result["results"]["bindings"])
-                print(f"    Results: {count} rows")
+
+    session = make_session(args.workers)
+    cache = sparql_engine.QueryCache()
+    backends = {}
+    for target in args.endpoints:
+        if is_endpoint(target):
+            backends[target] = HttpBackend(target, session, args.timeout, args.dataset_version)
         else:
-            print(f"  ✗ Failed: {rq_file.name}")
+            print(f"Loading local dataset: {target}")
+            backends[target] = LocalBackend(target, cache, args.access_level, args.timeout)
+            print(f"  {len(backends[target].dataset)} triples in default graph")
+
+    result_cache = None
+    if args.repeat > 1 and not args.no_cache:
+        print("Result cache: off (--repeat runs every query)")
+    elif not args.no_cache:
+        result_cache = ResultCache(args.cache_dir, int(args.cache_size * 1024 * 1024))
+
+    jobs = [
+        (backends[target], rq_file, out_dirs[target])
+        for target in args.endpoints
+        for rq_file in query_files
+    ]
+
+    total_failed = 0
+    for run in range(1, args.repeat + 1):
+        if args.repeat > 1:
+            print(f"Run {run} of {args.repeat}")
+            print("-" * 60)
+        start = time.perf_counter()
+        succeeded, failed = run_suite(jobs, args.workers, args.total_timeout, result_cache, args.format)
+        elapsed = time.perf_counter() - start
+        total_failed += failed
+
+        print("=" * 60)
+        print("Query execution complete!")
+        print(f"Succeeded: {succeeded}, failed: {failed}, wall time: {elapsed:.2f}s")
+        if len(cache):
+            print(f"Compiled queries: {len(cache)} (cache hits: {cache.hits}, misses: {cache.misses})")
+        if result_cache is not None:
+            print(f"Result cache: {result_cache.hits} hits, {result_cache.misses} misses")
+        print(f"Results saved to: {out_dir}")
         print()
-    
-    print("=" * 60)
-    print("Query execution complete!")
-    print(f"Results saved to: {out_dir}")
+
+    session.close()
+    sys.exit(1 if total_failed else 0)
@@ -4,13 +4,49 @@ SHACL Validation Script
 Runs SHACL validation on data files and saves reports
 
 Usage:
-    python code/run-shacl-validation.py <data.ttl> <shapes.shacl> <report.txt>
+    python code/run-shacl-validation.py <data.ttl> <shapes.shacl> <report.txt> [--state DIR]
+                                        [--added FILE] [--removed FILE] [--depth N]
+                                        [--workers N] [--shard shapes|focus] [--vectorized]
+                                        [--metrics FILE] [--profile-stage validation]
     
 Example:
     python code/run-shacl-validation.py data/violations.ttl validation/temporal-constraints.shacl validation/validation-report-violations.txt
+
+Incremental mode:
+    With --state DIR the data graph and report are kept in DIR after each
+    run. The next run with the same shapes only re-validates the focus
+    nodes affected by what changed, and patches the previous report (see
+    shacl_incremental.py). The change is either given as Turtle files of
+    added and removed triples, in which case the data argument is not
+    read, or worked out by comparing the data file with the stored graph.
+
+    python code/run-shacl-validation.py data/fixed-data.ttl shapes/validation_shapes.ttl validation/report.txt --state .shacl-state
+    python code/run-shacl-validation.py - shapes/validation_shapes.ttl validation/report.txt --state .shacl-state --added edits.ttl
+
+Parallel mode:
+    With --workers N the validation is split across N worker processes,
+    by shape (--shard shapes, the default) or by chunks of each shape's
+    focus nodes (--shard focus). See shacl_parallel.py.
+
+    python code/run-shacl-validation.py data/heritage_complete.ttl shapes/validation_shapes.ttl validation/report.txt --workers 4
+
+Vectorized temporal check:
+    With --vectorized, :RecordingTemporalAccessShape is checked by the
+    NumPy engine in temporal_access.py and the other shapes by pyshacl;
+    the report is the same as a plain run (ill-typed dates and levels are
+    compared as rdflib compares them, see temporal_access.py).
+
+    python code/run-shacl-validation.py data/heritage_complete.ttl validation/temporal-constraints.shacl validation/report.txt --vectorized
+
+The data argument may also be a snapshot directory made by
+build-snapshot.py, which is loaded from its memory-mapped indexes
+instead of parsed. Parsed files go through the shared parse cache
+(graph_loader.py).
 """
 
+import argparse
 import sys
+import time
 from pathlib import Path
 
 try:
@@ -20,6 +56,9 @@ except ImportError:
     print("Install it with: pip install pyshacl")
     sys.exit(1)
 
+import graph_loader
+import instrumentation
+
 
 def run(data_path: str, shapes_path: str, out_path: str):
     """Run SHACL validation and save report"""
@@ -41,48 +80,23 @@ def run(data_path: str, shapes_path: str, out_path: str):
     print("-" * 60)
     
     try:
-        conforms, report_graph, report_text = validate(
-            data_graph=str(data_path),
-            shacl_graph=str(shapes_path),
-            inference="rdfs",          # Use RDFS inference
-            abort_on_first=False,
-            allow_infos=True,
-            allow_warnings=True,
-            meta_shacl=False,
-            advanced=True,
-            debug=False,
-        )
+        data_graph = graph_loader.load_graph(data_path, bind_namespaces="core")
+        shapes_graph = graph_loader.load_graph(shapes_path, format="turtle", bind_namespaces="core")
+        with instrumentation.stage("validation", mode="plain") as st:
+            conforms, report_graph, report_text = validate(
+                data_graph=data_graph,
+                shacl_graph=shapes_graph,
+                inference="rdfs",          # Use RDFS inference
+                abort_on_first=False,
+                allow_infos=True,
+                allow_warnings=True,
+                meta_shacl=False,
+                advanced=True,
+                debug=False,
+            )
+            count_results(st, report_graph)
         
-        # Save report
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(report_text, encoding="utf-8")
-        
-        print()
-        print("=" * 60)
-        print("VALIDATION RESULTS")
-        print("=" * 60)
-        print(f"Conforms: {'YES ✓' if conforms else 'NO ✗'}")
-        print(f"Report saved to: {out_path}")
-        print()
-        
-        if not conforms:
-            # Count violations
-            from rdflib.namespace import SH
-            violations = list(report_graph.subjects(
-                predicate=None,
-                object=SH.ValidationResult
-            ))
-            print(f"Total violations found: {len(violations)}")
-            print()
-            print("First 10 lines of report:")
-            print("-" * 60)
-            lines = report_text.split('\n')[:10]
-            for line in lines:
-                print(line)
-        else:
-            print("No violations found! ✓")
-        
-        return conforms
+        return save_report(conforms, report_graph, report_text, out_path)
         
     except Exception as e:
         print(f"ERROR during validation: {e}")
@@ -91,13 +105,234 @@ def run(data_path: str, shapes_path: str, out_path: str):
         sys.exit(1)
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python code/run-shacl-validation.py <data.ttl> <shapes.shacl> <report.txt>")
+def count_results(st, report_graph):
+    """Record the number of validation results on an instrumentation stage"""
+    if st.active:
+        from rdflib.namespace import RDF, SH
+        st.count(results=len(set(report_graph.subjects(RDF.type, SH.ValidationResult))))
+
+
+def save_report(conforms, report_graph, report_text, out_path):
+    """Write the report text and print a summary"""
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(report_text, encoding="utf-8")
+    
+    print()
+    print("=" * 60)
+    print("VALIDATION RESULTS")
+    print("=" * 60)
+    print(f"Conforms: {'YES ✓' if conforms else 'NO ✗'}")
+    print(f"Report saved to: {out_path}")
+    print()
+    
+    if not conforms:
+        # Count violations
+        from rdflib.namespace import SH
+        violations = list(report_graph.subjects(
+            predicate=None,
+            object=SH.ValidationResult
+        ))
+        print(f"Total violations found: {len(violations)}")
         print()
-        print("Examples:")
-        print("  python code/run-shacl-validation.py data/violations.ttl validation/temporal-constraints.shacl validation/validation-report-violations.txt")
-        print("  python code/run-shacl-validation.py data/fixed-data.ttl validation/temporal-constraints.shacl validation/validation-report-clean.txt")
-        sys.exit(2)
+        print("First 10 lines of report:")
+        print("-" * 60)
+        lines = report_text.split('\n')[:10]
+        for line in lines:
+            print(line)
+    else:
+        print("No violations found! ✓")
+    
+    return conforms
+
+
+def run_parallel(data_path, shapes_path, out_path, workers, shard="shapes"):
+    """Run SHACL validation across a pool of worker processes and save report"""
+    import shacl_parallel
+    
+    data_path = Path(data_path)
+    shapes_path = Path(shapes_path)
+    for path, kind in ((data_path, "Data"), (shapes_path, "Shapes")):
+        if not path.exists():
+            print(f"ERROR: {kind} file not found: {path}")
+            sys.exit(1)
+    
+    print(f"Loading data from: {data_path}")
+    data_graph = graph_loader.load_graph(data_path, bind_namespaces="core")
+    print(f"Loading shapes from: {shapes_path}")
+    shapes_graph = graph_loader.load_graph(shapes_path, format="turtle")
+    print(f"Running validation on {workers} workers (sharded by {shard})...")
+    print("-" * 60)
+    
+    start = time.perf_counter()
+    with instrumentation.stage("validation", mode=f"parallel-{shard}", workers=workers) as st:
+        conforms, report_graph, report_text = shacl_parallel.validate_parallel(
+            data_graph, shapes_graph, workers=workers, mode=shard,
+            inference="rdfs", allow_infos=True, allow_warnings=True,
+            meta_shacl=False, advanced=True, debug=False,
+        )
+        count_results(st, report_graph)
+    print(f"Validated in {time.perf_counter() - start:.2f}s")
     
-    run(sys.argv[1], sys.argv[2], sys.argv[3])
+    return save_report(conforms, report_graph, report_text, out_path)
+
+
+def run_vectorized(data_path, shapes_path, out_path):
+    """Run SHACL validation with the temporal access shape checked by temporal_access.py"""
+    import shacl_parallel
+    import shacl_report
+    import temporal_access
+    from rdflib import BNode
+    
+    data_path = Path(data_path)
+    shapes_path = Path(shapes_path)
+    for path, kind in ((data_path, "Data"), (shapes_path, "Shapes")):
+        if not path.exists():
+            print(f"ERROR: {kind} file not found: {path}")
+            sys.exit(1)
+    
+    print(f"Loading data from: {data_path}")
+    data_graph = graph_loader.load_graph(data_path, bind_namespaces="core")
+    print(f"Loading shapes from: {shapes_path}")
+    shapes_graph = graph_loader.load_graph(shapes_path, format="turtle")
+    shapes = shacl_parallel.targeted_shapes(shapes_graph)
+    if temporal_access.TEMPORAL_SHAPE not in shapes or any(isinstance(s, BNode) for s in shapes):
+        print("No separable :RecordingTemporalAccessShape in these shapes; running plain validation")
+        return run(data_path, shapes_path, out_path)
+    print(f"Running validation (temporal access shape vectorized)...")
+    print("-" * 60)
+    
+    start = time.perf_counter()
+    with instrumentation.stage("validation", mode="vectorized") as st:
+        shacl_parallel.run_inference(data_graph, "rdfs")
+        parts = []
+        others = [str(s) for s in shapes if s != temporal_access.TEMPORAL_SHAPE]
+        if others:
+            _, report_graph, report_text = validate(
+                data_graph, shacl_graph=shapes_graph, inference="none", use_shapes=others,
+                abort_on_first=False, allow_infos=True, allow_warnings=True,
+                meta_shacl=False, advanced=True, debug=False,
+            )
+            parts.append((report_graph, shacl_report.split_text(report_text)))
+        rows = temporal_access.find_violations(data_graph)
+        parts.append(temporal_access.shacl_report(rows, data_graph, shapes_graph))
+        conforms, report_graph, report_text = shacl_report.merge(parts)
+        count_results(st, report_graph)
+    print(f"Validated in {time.perf_counter() - start:.2f}s ({len(rows)} temporal access violations)")
+    
+    return save_report(conforms, report_graph, report_text, out_path)
+
+
+def run_incremental(data_path, shapes_path, out_path, state_dir,
+                    added_path=None, removed_path=None, depth=None):
+    """Validate against a stored state, re-validating only what changed"""
+    import shacl_incremental
+    from rdflib import Graph
+    
+    shapes_path = Path(shapes_path)
+    if not shapes_path.exists():
+        print(f"ERROR: Shapes file not found: {shapes_path}")
+        sys.exit(1)
+    explicit_delta = added_path is not None or removed_path is not None
+    if not explicit_delta and not Path(data_path).exists():
+        print(f"ERROR: Data file not found: {data_path}")
+        sys.exit(1)
+    depth = depth or shacl_incremental.DEFAULT_DEPTH
+    
+    print(f"Loading shapes from: {shapes_path}")
+    shapes_graph = graph_loader.load_graph(shapes_path, format="turtle")
+    shapes_digest = shacl_incremental.file_digest(shapes_path)
+    
+    state = None
+    if shacl_incremental.ValidationState.exists(state_dir):
+        print(f"Loading validation state from: {state_dir}")
+        state = shacl_incremental.ValidationState.load(state_dir)
+        if state.shapes_digest != shapes_digest:
+            print("Shapes changed since the stored run; validating everything")
+            state = None
+    
+    start = time.perf_counter()
+    if state is None:
+        if explicit_delta:
+            print("ERROR: --added/--removed need a stored state from a previous run")
+            sys.exit(1)
+        print(f"Loading data from: {data_path}")
+        data_graph = graph_loader.load_graph(data_path, bind_namespaces="core")
+        print(f"Running full validation...")
+        print("-" * 60)
+        with instrumentation.stage("validation", mode="full") as st:
+            conforms, report_graph, report_text = shacl_incremental.full_validation(data_graph, shapes_graph)
+            count_results(st, report_graph)
+        state = shacl_incremental.ValidationState(data_graph, report_graph, report_text, shapes_digest)
+        affected = None
+    else:
+        if explicit_delta:
+            added = graph_loader.load_graph(added_path) if added_path else Graph()
+            removed = graph_loader.load_graph(removed_path) if removed_path else Graph()
+        else:
+            print(f"Comparing {data_path} with the stored data graph")
+            new_graph = graph_loader.load_graph(data_path, bind_namespaces="core")
+            added = new_graph - state.data_graph
+            removed = state.data_graph - new_graph
+        print(f"Delta: +{len(added)} / -{len(removed)} triples")
+        print(f"Running incremental validation...")
+        print("-" * 60)
+        with instrumentation.stage("validation", mode="incremental") as st:
+            conforms, report_graph, report_text, affected = shacl_incremental.validate_incremental(
+                state, shapes_graph, added, removed, depth=depth
+            )
+            count_results(st, report_graph)
+            st.count(affected_nodes=len(affected))
+    elapsed = time.perf_counter() - start
+    
+    if affected is None:
+        print(f"Validated all focus nodes in {elapsed:.2f}s")
+    else:
+        print(f"Re-validated {len(affected)} affected nodes in {elapsed:.2f}s")
+    state.save(state_dir)
+    print(f"Validation state saved to: {state_dir}")
+    
+    return save_report(conforms, report_graph, report_text, out_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run SHACL validation on a data file and save the report",
+        epilog="Examples:\n"
+               "  python code/run-shacl-validation.py data/violations.ttl validation/temporal-constraints.shacl validation/validation-report-violations.txt\n"
+               "  python code/run-shacl-validation.py data/fixed-data.ttl validation/temporal-constraints.shacl validation/validation-report-clean.txt",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("data", help="data file (ignored with --added/--removed)")
+    parser.add_argument("shapes", help="SHACL shapes file")
+    parser.add_argument("report", help="where to write the report text")
+    parser.add_argument("--state", metavar="DIR",
+                        help="keep validation state in DIR and validate incrementally against it")
+    parser.add_argument("--added", metavar="FILE", help="triples added since the stored state")
+    parser.add_argument("--removed", metavar="FILE", help="triples removed since the stored state")
+    parser.add_argument("--depth", type=int,
+                        help="how many triples away from its focus node a shape reads (default: 2)")
+    parser.add_argument("--workers", type=int,
+                        help="validate in parallel on N worker processes")
+    parser.add_argument("--shard", choices=["shapes", "focus"], default="shapes",
+                        help="how to split the work between workers (default: shapes)")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="check the temporal access shape with the NumPy engine")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+    
+    if sum(map(bool, (args.state, args.workers, args.vectorized))) > 1:
+        parser.error("--state, --workers and --vectorized cannot be combined")
+    if args.state:
+        run_incremental(args.data, args.shapes, args.report, args.state,
+                        args.added, args.removed, args.depth)
+    else:
+        if args.added or args.removed:
+            parser.error("--added/--removed need --state")
+        if args.vectorized:
+            run_vectorized(args.data, args.shapes, args.report)
+        elif args.workers:
+            run_parallel(args.data, args.shapes, args.report, args.workers, args.shard)
+        else:
+            run(args.data, args.shapes, args.report)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Label Search
+Finds heritage entities by their English or Azerbaijani labels, as the
+curator search box does: matching ignores case and diacritics (ə, ş, ç,
+ğ, ı, ö, ü ...), the last word may be unfinished, and a few typing
+errors are allowed (see label_index.py). With --prefix only labels with
+a word starting with the query are listed.
+
+With --state the label index is kept in a JSON file between runs.
+Unchanged data files are not read again; for changed ones only the
+labels that differ are added to or removed from the index.
+
+Usage:
+    python code/search-labels.py <query> [--data FILE ...] [--prefix]
+                                 [--lang LANGS] [--limit N] [--json]
+                                 [--state FILE]
+
+Example:
+    python code/search-labels.py "susa"
+    python code/search-labels.py "Asiq Cemiyy" --state .label-index.json
+    python code/search-labels.py "gən" --prefix --lang az
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import instrumentation
+from label_index import DEFAULT_LANGUAGES, LabelIndex
+
+DEFAULT_DATA = "data/heritage_complete.ttl"
+
+
+def load_index(paths, state, languages):
+    """The label index of paths, read from and kept up to date in state"""
+    index = None
+    if state and Path(state).exists():
+        index = LabelIndex.load(state)
+        if index.languages != languages:
+            print(f"  Languages changed ({','.join(index.languages)} -> {','.join(languages)}), rebuilding")
+            index = None
+    if index is None:
+        index = LabelIndex(languages)
+    changed = False
+    for path in paths:
+        start = time.perf_counter()
+        with instrumentation.stage("labels", file=Path(path).name) as st:
+            touched = index.add_file(path)
+            if touched is None:
+                st.status = "unchanged"
+            else:
+                st.count(nodes=len(touched))
+        if touched is None:
+            print(f"  ✓ Unchanged: {path}")
+        else:
+            changed = True
+            print(f"  ✓ Indexed: {path} ({len(touched)} nodes changed, {time.perf_counter() - start:.2f}s)")
+    if state and changed:
+        index.save(state)
+        print(f"  Index saved to: {state}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search heritage entities by label")
+    parser.add_argument("query", help="text to search for")
+    parser.add_argument("--data", action="append", metavar="FILE",
+                        help=f"RDF data file to index; may be repeated (default: {DEFAULT_DATA})")
+    parser.add_argument("--prefix", action="store_true", help="only labels with a word starting with the query")
+    parser.add_argument("--lang", default=",".join(DEFAULT_LANGUAGES), metavar="LANGS",
+                        help="label languages in fallback order, comma separated; an empty entry "
+                             "is an untagged label (default: en,,az)")
+    parser.add_argument("--limit", type=int, default=20, help="maximum number of results (default: 20)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--state", metavar="FILE", help="keep the label index in FILE between runs")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    paths = args.data or [DEFAULT_DATA]
+    missing = [p for p in paths if not Path(p).exists()]
+    if missing:
+        print(f"ERROR: Data file not found: {', '.join(missing)}")
+        return 1
+    languages = tuple(lang.strip().lower() for lang in args.lang.split(","))
+
+    log = sys.stderr if args.json else sys.stdout
+    stdout, sys.stdout = sys.stdout, log
+    try:
+        print("Loading label index...")
+        index = load_index(paths, args.state, languages)
+        print(f"  {len(index)} labelled nodes")
+        start = time.perf_counter()
+        with instrumentation.stage("search", mode="prefix" if args.prefix else "fuzzy") as st:
+            matches = index.prefix(args.query, args.limit) if args.prefix else index.search(args.query, args.limit)
+            st.count(results=len(matches))
+        elapsed = time.perf_counter() - start
+    finally:
+        sys.stdout = stdout
+
+    if args.json:
+        print(json.dumps([
+            {"uri": str(m.node), "label": m.label, "lang": m.lang or None,
+             "preferred": index.label(m.node), "distance": m.distance}
+            for m in matches
+        ], indent=2, ensure_ascii=False))
+        return 0
+
+    if not matches:
+        print(f"\n✗ No labels match {args.query!r}")
+        return 0
+    print(f"\n✓ {len(matches)} matches for {args.query!r} ({elapsed * 1000:.1f} ms):")
+    for m in matches:
+        preferred = index.label(m.node)
+        also = f"  ({preferred})" if preferred != m.label else ""
+        typos = f"  [{m.distance} typo{'s' if m.distance != 1 else ''}]" if m.distance else ""
+        print(f"  {m.label} @{m.lang or '-'}{also}{typos}")
+        print(f"      {m.node}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Incremental SHACL validation.
+
+A validation state keeps the data graph and the report of the last run.
+Given a delta of added and removed triples, only the focus nodes whose
+validation can depend on a changed triple are validated again, and the
+report is patched with the new results.
+
+A shape that reads at most `depth` triples away from its focus node (in
+either direction, so sh:inversePath :caresFor counts as one hop, and the
+SPARQL constraints such as $this :performedBy ?p . ?p :hasAccessLevel ?l
+count as two) can only change its verdict on nodes within depth - 1 hops
+of a subject or object of a changed triple. Those nodes are validated on
+the subgraph within depth hops of them plus the RDFS schema triples, so
+RDFS inference runs over that subgraph only. rdf:type links are not
+followed, since every instance of a class is one hop from the class.
+
+Changes to schema triples, and changes near blank nodes that shapes
+target, fall back to a full validation.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from pyshacl import validate
+from pyshacl.rdfutil import stringify_node
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, SH
+
+import shacl_report
+
+# Triples that change what RDFS inference derives everywhere
+SCHEMA_PREDICATES = {RDFS.subClassOf, RDFS.subPropertyOf, RDFS.domain, RDFS.range}
+
+VALIDATE_OPTIONS = dict(
+    inference="rdfs",
+    abort_on_first=False,
+    allow_infos=True,
+    allow_warnings=True,
+    meta_shacl=False,
+    advanced=True,
+    debug=False,
+)
+
+DEFAULT_DEPTH = 2
+
+
+def file_digest(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class ValidationState:
+    """Data graph and report of the last validation, stored in a directory"""
+
+    def __init__(self, data_graph, report_graph, report_text, shapes_digest):
+        self.data_graph = data_graph
+        self.report_graph = report_graph
+        self.report_text = report_text
+        self.shapes_digest = shapes_digest
+
+    @staticmethod
+    def exists(state_dir):
+        return (Path(state_dir) / "state.json").exists()
+
+    def save(self, state_dir):
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        self.data_graph.serialize(state_dir / "data.nt", format="nt", encoding="utf-8")
+        self.report_graph.serialize(state_dir / "report.ttl", format="turtle")
+        (state_dir / "report.txt").write_text(self.report_text, encoding="utf-8")
+        meta = {
+            "shapes": self.shapes_digest,
+            "namespaces": {p: str(n) for p, n in self.data_graph.namespace_manager.namespaces()},
+        }
+        # state.json last: a state directory without it is incomplete
+        (state_dir / "state.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, state_dir):
+        state_dir = Path(state_dir)
+        meta = json.loads((state_dir / "state.json").read_text(encoding="utf-8"))
+        data_graph = Graph(bind_namespaces="core")
+        for prefix, namespace in meta["namespaces"].items():
+            data_graph.bind(prefix, namespace, override=True, replace=True)
+        data_graph.parse(state_dir / "data.nt", format="nt")
+        report_graph = Graph()
+        report_graph.parse(state_dir / "report.ttl", format="turtle")
+        report_text = (state_dir / "report.txt").read_text(encoding="utf-8")
+        return cls(data_graph, report_graph, report_text, meta["shapes"])
+
+
+def _neighbours(graph, node):
+    """Nodes one triple away from node, not following rdf:type or schema links"""
+    for p, o in graph.predicate_objects(node):
+        if p != RDF.type and p not in SCHEMA_PREDICATES and not isinstance(o, Literal):
+            yield o
+    for s, p in graph.subject_predicates(node):
+        if p != RDF.type and p not in SCHEMA_PREDICATES:
+            yield s
+
+
+def ball(graph, nodes, radius):
+    """nodes and every node within radius hops of them, in either direction"""
+    seen = set(nodes)
+    frontier = list(seen)
+    for _ in range(radius):
+        next_frontier = []
+        for node in frontier:
+            for n in _neighbours(graph, node):
+                if n not in seen:
+                    seen.add(n)
+                    next_frontier.append(n)
+        frontier = next_frontier
+    return seen
+
+
+def changed_nodes(added, removed):
+    """Subjects and non-literal objects of the changed triples (not classes)"""
+    nodes = set()
+    for s, p, o in list(added) + list(removed):
+        nodes.add(s)
+        if p != RDF.type and not isinstance(o, Literal):
+            nodes.add(o)
+    return nodes
+
+
+def validation_subgraph(graph, focus_nodes, depth=DEFAULT_DEPTH):
+    """Triples within depth hops of focus_nodes, plus the schema triples"""
+    sub = Graph(bind_namespaces="core")
+    for prefix, namespace in graph.namespace_manager.namespaces():
+        sub.bind(prefix, namespace, override=True, replace=True)
+    for node in ball(graph, focus_nodes, depth - 1):
+        for triple in graph.triples((node, None, None)):
+            sub.add(triple)
+        for triple in graph.triples((None, None, node)):
+            sub.add(triple)
+    for p in SCHEMA_PREDICATES:
+        for triple in graph.triples((None, p, None)):
+            sub.add(triple)
+    return sub
+
+
+def full_validation(data_graph, shapes_graph, **options):
+    """Validate the whole data graph; returns (conforms, report_graph, report_text)"""
+    return validate(data_graph, shacl_graph=shapes_graph, **{**VALIDATE_OPTIONS, **options})
+
+
+def validate_incremental(state, shapes_graph, added, removed, depth=DEFAULT_DEPTH, **options):
+    """
+    Apply a triple delta to state and re-validate the affected focus nodes.
+
+    added and removed are iterables of triples. The state is updated in
+    place. Returns (conforms, report_graph, report_text, affected), where
+    affected is the set of re-validated nodes, or None if the delta
+    needed a full validation.
+    """
+    options = {**VALIDATE_OPTIONS, **options}
+    added = [t for t in added if t not in state.data_graph]
+    removed = [t for t in removed if t in state.data_graph]
+    graph = state.data_graph
+
+    schema_change = any(p in SCHEMA_PREDICATES for _, p, _ in added + removed)
+    changed = changed_nodes(added, removed)
+    affected = ball(graph, changed, depth - 1)
+    for triple in removed:
+        graph.remove(triple)
+    for triple in added:
+        graph.add(triple)
+    affected |= ball(graph, changed, depth - 1)
+
+    # Blank node labels do not survive a save and reload of the state, so
+    # results about blank nodes cannot be matched up with the data
+    old_focus = {state.report_graph.value(r, SH.focusNode) for r in shacl_report.result_nodes(state.report_graph)}
+    blank_focus = any(isinstance(n, BNode) for n in old_focus)
+    blank_targets = any(
+        isinstance(n, BNode) and (blank_focus or graph.value(n, RDF.type) is not None)
+        for n in affected
+    )
+    if schema_change or blank_targets:
+        conforms, report_graph, report_text = full_validation(graph, shapes_graph, **options)
+        state.report_graph, state.report_text = report_graph, report_text
+        return conforms, report_graph, report_text, None
+
+    shacl_report.remove_results(state.report_graph, affected)
+    affected_text = {stringify_node(graph, n) for n in affected}
+    kept = [b for b in shacl_report.split_text(state.report_text) if shacl_report.block_focus(b) not in affected_text]
+    parts = [(state.report_graph, kept)]
+
+    focus = sorted(n for n in affected if isinstance(n, URIRef))
+    if focus:
+        sub = validation_subgraph(graph, focus, depth)
+        _, new_graph, new_text = validate(sub, shacl_graph=shapes_graph, focus_nodes=focus, **options)
+        parts.append((new_graph, shacl_report.split_text(new_text)))
+
+    conforms, report_graph, report_text = shacl_report.merge(
+        parts, options["allow_warnings"], options["allow_infos"]
+    )
+    state.report_graph, state.report_text = report_graph, report_text
+    return conforms, report_graph, report_text, affected
@@ -0,0 +1,206 @@
+"""
+Parallel SHACL validation over a process pool.
+
+RDFS inference runs once in the parent. The inferred data graph and the
+shapes graph are then written to a pickled snapshot of their triples,
+which every worker loads once instead of re-parsing Turtle. The work is
+split into shards of one of two kinds:
+
+    shapes  each shard validates a subset of the targeted shapes
+    focus   each targeted shape's focus nodes are split into one chunk
+            per worker, validated with use_shapes + focus_nodes
+
+The shard reports are merged with shacl_report.merge(), which gives the
+same report text and conformance verdict as a single pyshacl run.
+
+Shapes whose targets cannot be named to pyshacl (blank node shapes, or
+SHACL-AF sh:target) are not split; a blank node shape makes the whole
+run fall back to a single shard.
+"""
+
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from pyshacl import validate
+from rdflib import BNode, Graph, URIRef
+from rdflib.namespace import OWL, RDF, RDFS, SH
+
+import shacl_report
+
+TARGET_PREDICATES = (SH.targetClass, SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf, SH.target)
+
+SHARD_MODES = ("shapes", "focus")
+
+_worker = {}
+
+
+def write_snapshot(path, data_graph, shapes_graph):
+    """Pickle the triples and namespaces of the data and shapes graphs"""
+    snapshot = {
+        name: {
+            "namespaces": list(graph.namespace_manager.namespaces()),
+            "triples": list(graph),
+        }
+        for name, graph in (("data", data_graph), ("shapes", shapes_graph))
+    }
+    with open(path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_snapshot(path):
+    """(data_graph, shapes_graph) from a snapshot written by write_snapshot()"""
+    with open(path, "rb") as f:
+        snapshot = pickle.load(f)
+    graphs = []
+    for name in ("data", "shapes"):
+        graph = Graph(bind_namespaces="core")
+        for prefix, namespace in snapshot[name]["namespaces"]:
+            graph.bind(prefix, namespace, override=True, replace=True)
+        graph.addN((s, p, o, graph) for s, p, o in snapshot[name]["triples"])
+        graphs.append(graph)
+    return tuple(graphs)
+
+
+def run_inference(graph, inference):
+    """Expand graph in place, as pyshacl's pre-inference step would"""
+    if not inference or inference == "none":
+        return
+    import owlrl
+    from pyshacl.inference import CustomRDFSOWLRLSemantics, CustomRDFSSemantics
+
+    semantics = {
+        "rdfs": CustomRDFSSemantics,
+        "owlrl": owlrl.OWLRL_Semantics,
+        "both": CustomRDFSOWLRLSemantics,
+    }.get(inference)
+    if semantics is None:
+        raise ValueError(f"Unknown inference option: {inference}")
+    owlrl.DeductiveClosure(semantics).expand(graph)
+
+
+def targeted_shapes(shapes_graph):
+    """Shapes that select their own focus nodes"""
+    shapes = set()
+    for p in TARGET_PREDICATES:
+        shapes.update(shapes_graph.subjects(p, None))
+    for cls in (RDFS.Class, OWL.Class):
+        for shape in shapes_graph.subjects(RDF.type, cls):
+            if (shape, RDF.type, SH.NodeShape) in shapes_graph or (shape, RDF.type, SH.PropertyShape) in shapes_graph:
+                shapes.add(shape)
+    return sorted(shapes)
+
+
+def target_nodes(data_graph, shapes_graph, shape):
+    """Focus nodes of a shape's core SHACL targets in an (inferred) data graph"""
+    nodes = set(shapes_graph.objects(shape, SH.targetNode))
+    classes = set(shapes_graph.objects(shape, SH.targetClass))
+    if (shape, RDF.type, RDFS.Class) in shapes_graph or (shape, RDF.type, OWL.Class) in shapes_graph:
+        classes.add(shape)
+    for cls in classes:
+        for sub in data_graph.transitive_subjects(RDFS.subClassOf, cls):
+            nodes.update(data_graph.subjects(RDF.type, sub))
+    for p in shapes_graph.objects(shape, SH.targetSubjectsOf):
+        nodes.update(data_graph.subjects(p, None))
+    for p in shapes_graph.objects(shape, SH.targetObjectsOf):
+        nodes.update(data_graph.objects(None, p))
+    return nodes
+
+
+def plan_shards(data_graph, shapes_graph, workers, mode="shapes"):
+    """
+    Split validation into (shapes, focus_nodes) tasks.
+
+    shapes is a list of shape IRIs, or None for all shapes; focus_nodes
+    is a list of node IRIs, or None for the shapes' own targets.
+    """
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {mode}")
+    shapes = targeted_shapes(shapes_graph)
+    if workers <= 1 or not shapes or any(isinstance(s, BNode) for s in shapes):
+        return [(None, None)]
+
+    if mode == "focus":
+        tasks = []
+        for shape in shapes:
+            nodes = target_nodes(data_graph, shapes_graph, shape)
+            if (shape, SH.target, None) in shapes_graph or any(not isinstance(n, URIRef) for n in nodes):
+                tasks.append(([shape], None))
+                continue
+            nodes = sorted(nodes)
+            chunk = -(-len(nodes) // workers)
+            for i in range(0, len(nodes), chunk or 1):
+                tasks.append(([shape], nodes[i:i + chunk]))
+        return tasks
+
+    # Largest shapes first, each onto the least loaded shard
+    sizes = {s: len(target_nodes(data_graph, shapes_graph, s)) for s in shapes}
+    shards = [[] for _ in range(min(workers, len(shapes)))]
+    load = [0] * len(shards)
+    for shape in sorted(shapes, key=lambda s: (-sizes[s], s)):
+        i = load.index(min(load))
+        shards[i].append(shape)
+        load[i] += sizes[shape] + 1
+    return [(shard, None) for shard in shards]
+
+
+def _init_worker(snapshot_path, options):
+    data_graph, shapes_graph = read_snapshot(snapshot_path)
+    _worker.update(data=data_graph, shapes=shapes_graph, options=options)
+
+
+def _validate_shard(shapes, focus_nodes):
+    options = dict(_worker["options"])
+    if shapes is not None:
+        options["use_shapes"] = shapes
+    if focus_nodes is not None:
+        options["focus_nodes"] = focus_nodes
+    # Inference already ran in the parent; the worker's graph copy is its own
+    _, report_graph, report_text = validate(
+        _worker["data"], shacl_graph=_worker["shapes"], inference="none",
+        inplace=(SH.rule, None, None) not in _worker["shapes"], **options
+    )
+    namespaces = list(report_graph.namespace_manager.namespaces())
+    return namespaces, list(report_graph), shacl_report.split_text(report_text)
+
+
+def validate_parallel(data_graph, shapes_graph, workers=None, mode="shapes",
+                      inference="rdfs", snapshot_dir=None, **options):
+    """
+    Validate data_graph across a pool of worker processes.
+
+    data_graph is expanded in place by the inference step. Returns
+    (conforms, report_graph, report_text) like pyshacl's validate().
+    """
+    workers = workers or os.cpu_count() or 1
+    options.setdefault("abort_on_first", False)
+    options.setdefault("allow_infos", False)
+    options.setdefault("allow_warnings", False)
+    if options["abort_on_first"]:
+        raise ValueError("abort_on_first cannot be combined with parallel validation")
+
+    run_inference(data_graph, inference)
+    tasks = plan_shards(data_graph, shapes_graph, workers, mode)
+    if len(tasks) == 1:
+        return validate(data_graph, shacl_graph=shapes_graph, inference="none", **options)
+
+    fd, snapshot_path = tempfile.mkstemp(suffix=".pickle", dir=snapshot_dir)
+    os.close(fd)
+    try:
+        write_snapshot(snapshot_path, data_graph, shapes_graph)
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                                 initargs=(snapshot_path, options)) as pool:
+            futures = [pool.submit(_validate_shard, shapes, focus) for shapes, focus in tasks]
+            results = [f.result() for f in futures]
+    finally:
+        os.unlink(snapshot_path)
+
+    parts = []
+    for namespaces, triples, blocks in results:
+        graph = Graph(bind_namespaces="core")
+        for prefix, namespace in namespaces:
+            graph.bind(prefix, namespace, override=True, replace=True)
+        graph.addN((s, p, o, graph) for s, p, o in triples)
+        parts.append((graph, blocks))
+    return shacl_report.merge(parts, options["allow_warnings"], options["allow_infos"])
@@ -0,0 +1,143 @@
+"""
+Helpers for combining pyshacl validation reports.
+
+pyshacl returns every report twice: as an sh:ValidationReport graph and
+as text, one block per result, sorted by the block contents. Both are
+built from the same results, so reports over parts of a data graph (a
+subset of focus nodes, or a subset of shapes) can be merged by uniting
+their result graphs and re-sorting their text blocks. The merged report
+reads exactly as a single run over the whole graph would.
+"""
+
+import re
+
+from rdflib import BNode, Graph, Literal
+from rdflib.namespace import RDF, SH
+
+from sparql_engine import term_to_json
+
+_BLOCK_START = re.compile(r"^(?:Constraint Violation|Validation Result) in ", re.M)
+_FOCUS_LINE = re.compile(r"^\tFocus Node: (.*)$", re.M)
+
+
+def split_text(report_text):
+    """The per-result blocks of a pyshacl report text"""
+    starts = [m.start() for m in _BLOCK_START.finditer(report_text)]
+    ends = starts[1:] + [len(report_text)]
+    return [report_text[a:b] for a, b in zip(starts, ends)]
+
+
+def block_focus(block):
+    """The focus node of a text block, as pyshacl printed it"""
+    m = _FOCUS_LINE.search(block)
+    return m.group(1) if m else None
+
+
+def render_text(conforms, blocks):
+    """Report text in pyshacl's layout"""
+    text = f"Validation Report\nConforms: {conforms}\n"
+    if blocks:
+        text += f"Results ({len(blocks)}):\n" + "".join(sorted(blocks))
+    return text
+
+
+def report_node(report_graph):
+    return report_graph.value(predicate=RDF.type, object=SH.ValidationReport)
+
+
+def result_nodes(report_graph):
+    """The sh:ValidationResult nodes of a report"""
+    return list(report_graph.objects(report_node(report_graph), SH.result))
+
+
+def is_conformant(report_graph, allow_warnings=True, allow_infos=True):
+    """Conformance verdict of a report, by pyshacl's rules for allowed severities"""
+    for result in result_nodes(report_graph):
+        severity = report_graph.value(result, SH.resultSeverity)
+        if severity == SH.Info and (allow_infos or allow_warnings):
+            continue
+        if severity == SH.Warning and allow_warnings:
+            continue
+        return False
+    return True
+
+
+def _prune(report_graph, root):
+    """Remove blank nodes no longer reachable from the report node"""
+    reachable = {root}
+    stack = [root]
+    while stack:
+        for o in report_graph.objects(stack.pop(), None):
+            if isinstance(o, BNode) and o not in reachable:
+                reachable.add(o)
+                stack.append(o)
+    for s in set(report_graph.subjects()):
+        if isinstance(s, BNode) and s not in reachable:
+            report_graph.remove((s, None, None))
+
+
+def remove_results(report_graph, focus_nodes):
+    """Drop the results about any of focus_nodes from a report graph, in place"""
+    root = report_node(report_graph)
+    removed = 0
+    for result in result_nodes(report_graph):
+        if report_graph.value(result, SH.focusNode) in focus_nodes:
+            report_graph.remove((root, SH.result, result))
+            report_graph.remove((result, None, None))
+            removed += 1
+    if removed:
+        _prune(report_graph, root)
+    return removed
+
+
+def merge(parts, allow_warnings=True, allow_infos=True):
+    """
+    Merge partial reports into one.
+
+    parts is an iterable of (report_graph, text_blocks) pairs. Returns
+    (conforms, report_graph, report_text) like pyshacl's validate().
+    """
+    merged = Graph(bind_namespaces="core")
+    root = BNode()
+    merged.add((root, RDF.type, SH.ValidationReport))
+    blocks = []
+    for graph, part_blocks in parts:
+        for prefix, namespace in graph.namespace_manager.namespaces():
+            merged.namespace_manager.bind(prefix, namespace, override=False)
+        part_root = report_node(graph)
+        for s, p, o in graph:
+            if s == part_root:
+                if p == SH.result:
+                    merged.add((root, SH.result, o))
+            else:
+                merged.add((s, p, o))
+        blocks.extend(part_blocks)
+    conforms = is_conformant(merged, allow_warnings, allow_infos)
+    merged.add((root, SH.conforms, Literal(conforms)))
+    return conforms, merged, render_text(conforms, blocks)
+
+
+RESULT_FIELDS = {
+    "focusNode": SH.focusNode,
+    "resultPath": SH.resultPath,
+    "value": SH.value,
+    "severity": SH.resultSeverity,
+    "sourceShape": SH.sourceShape,
+    "sourceConstraintComponent": SH.sourceConstraintComponent,
+    "message": SH.resultMessage,
+}
+
+
+def report_to_json(report_graph):
+    """A report as plain JSON data, results in the SPARQL JSON term form"""
+    results = []
+    for result in result_nodes(report_graph):
+        entry = {}
+        for name, predicate in RESULT_FIELDS.items():
+            term = report_graph.value(result, predicate)
+            if term is not None:
+                entry[name] = term_to_json(term)
+        results.append(entry)
+    results.sort(key=lambda r: [r.get(name, {}).get("value", "") for name in RESULT_FIELDS])
+    conforms = report_graph.value(report_node(report_graph), SH.conforms)
+    return {"conforms": bool(conforms.toPython()) if conforms is not None else None, "results": results}
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Embedded SPARQL Server
+A small stand-in for Fuseki that serves the routes load-triplestore.py
+and run-queries.py use, over in-memory rdflib Datasets, so the query
+suite and the loaders can run where no Fuseki server is available:
+
+    GET/POST /{dataset}/sparql   SPARQL query (also /{dataset}/query):
+                                 ?query=..., a form-encoded POST or an
+                                 application/sparql-query body; results
+                                 as SPARQL JSON, CSV or TSV by Accept
+                                 header or ?format=
+    GET      /{dataset}/data     the dataset as N-Quads (or TriG,
+                                 Turtle, N-Triples by Accept header)
+    POST     /{dataset}/data     add RDF: a raw body of any supported
+                                 content type (gzip Content-Encoding
+                                 allowed) or a multipart file upload
+    PUT      /{dataset}/data     replace the graph with the body
+    DELETE   /{dataset}/data     clear the graph
+    GET      /$/ping             liveness check
+    GET      /$/datasets         the datasets, their sizes and request
+                                 counts
+
+The data routes take ?graph=<IRI> to address one named graph (default:
+the default graph). RDF-star Turtle/TriG is lowered to reification as
+sparql_engine.py does.
+
+Connections are HTTP/1.1 keep-alive, one thread each; at most --workers
+queries and uploads run at a time. Each dataset has a readers-writer
+lock: queries on a dataset run side by side, an upload is parsed
+outside the lock and waits only for the running queries to finish
+before its triples are added. Compiled queries are cached across
+requests and datasets. rdflib evaluates queries in Python, so
+concurrent queries share one core; the pool keeps slow queries from
+blocking fast ones and connections from queueing behind each other.
+A query is stopped after --query-timeout seconds (q16 on rdflib never
+finishes) with 503, as Fuseki does, which frees its slot and its read
+lock. An upload waits at most --write-timeout seconds for the running
+queries and is otherwise refused with 503 and Retry-After, which
+load-triplestore.py retries with backoff; with --write-timeout above
+--query-timeout every upload outlasts the queries it waits for.
+
+Datasets are given as NAME=PATH (a data file, a directory of data files
+or a snapshot directory from build-snapshot.py) or as NAME for an empty
+dataset to upload into. Without --dataset the three Question 2 datasets
+are served.
+
+Usage:
+    python code/sparql-server.py [--dataset NAME[=PATH] ...] [--host HOST]
+                                 [--port PORT] [--workers N]
+                                 [--query-timeout SECONDS]
+                                 [--write-timeout SECONDS] [--verbose]
+
+Example:
+    python code/sparql-server.py --port 3030 &
+    python code/run-queries.py http://localhost:3030/heritage-named/sparql
+    python code/sparql-server.py --dataset heritage=data/heritage_complete.snap --dataset scratch
+    python code/load-triplestore.py --bulk scratch=data/fixed-data.ttl
+"""
+
+import argparse
+import email.parser
+import email.policy
+import gzip
+import io
+import json
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from rdflib import Dataset, Graph, URIRef
+from rdflib.graph import DATASET_DEFAULT_GRAPH_ID
+
+import graph_snapshot
+import instrumentation
+import rdfstar
+import result_stream
+import sparql_engine
+
+DEFAULT_DATASETS = [
+    "heritage-reification=data/contested-claims-reification.ttl",
+    "heritage-named=data/contested-claims-named.trig",
+    "heritage-rdfstar=data/contested-claims-rdfstar.ttl",
+]
+
+# Media type -> rdflib format of an uploaded body
+RDF_TYPES = {
+    "text/turtle": "turtle",
+    "application/x-turtle": "turtle",
+    "application/n-triples": "nt",
+    "text/plain": "nt",
+    "application/n-quads": "nquads",
+    "application/trig": "trig",
+    "application/rdf+xml": "xml",
+    "application/ld+json": "json-ld",
+}
+
+# rdflib format -> media type of a downloaded graph
+DUMP_TYPES = {
+    "nquads": "application/n-quads",
+    "trig": "application/trig",
+    "turtle": "text/turtle",
+    "nt": "application/n-triples",
+}
+
+# Accepted result media type -> result format
+RESULT_TYPES = {
+    "application/sparql-results+json": "json",
+    "application/json": "json",
+    "text/csv": "csv",
+    "text/tab-separated-values": "tsv",
+}
+
+QUAD_FORMATS = ("nquads", "trig")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds off new readers"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self, timeout=None):
+        """Returns False if the lock was not free within timeout seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writing or self._readers:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self._writing = True
+                return True
+            finally:
+                self._writers_waiting -= 1
+                if not self._writing:
+                    self._cond.notify_all()
+
+    def release_write(self):
+        with self._cond:
+            self._writing = False
+            self._cond.notify_all()
+
+
+def parse_rdf(body, fmt, graph_id=None):
+    """A Dataset holding body parsed as fmt, into graph_id for triple formats"""
+    parsed = Dataset()
+    if fmt in ("turtle", "trig"):
+        text = body.decode("utf-8")
+        if rdfstar.has_rdf_star(text):
+            text = rdfstar.lower_turtle(text)
+        body = text.encode("utf-8")
+    target = parsed if fmt in QUAD_FORMATS else parsed.graph(graph_id or DATASET_DEFAULT_GRAPH_ID)
+    try:
+        target.parse(data=body, format=fmt)
+    except Exception as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Parse error ({fmt}): {e}")
+    return parsed
+
+
+class HostedDataset:
+    """One named in-memory dataset with its lock and request counters"""
+
+    def __init__(self, name, write_timeout=None, query_timeout=None):
+        self.name = name
+        self.write_timeout = write_timeout
+        self.query_timeout = query_timeout
+        self.dataset = Dataset()
+        self.lock = ReadWriteLock()
+        self.sources = []
+        self.stats_lock = threading.Lock()
+        self.stats = {"queries": 0, "uploads": 0, "errors": 0, "query_ms": 0.0}
+
+    def load(self, path):
+        """Load a data file, a directory of data files or a snapshot"""
+        if graph_snapshot.is_snapshot(path):
+            with graph_snapshot.Snapshot(path) as snapshot:
+                snapshot.to_graph(self.dataset.default_graph)
+        else:
+            for file_path in sparql_engine.data_files(path):
+                sparql_engine.parse_into(self.dataset, file_path)
+        self.sources.append(str(path))
+
+    def __len__(self):
+        return sum(1 for _ in self.dataset.quads((None, None, None, None)))
+
+    def count(self, name, ms=None):
+        with self.stats_lock:
+            self.stats[name] += 1
+            if ms is not None:
+                self.stats["query_ms"] += ms
+
+    def query(self, text, fmt, cache):
+        """Run a query; returns (body bytes, row count)"""
+        try:
+            compiled = cache.get(text)
+        except Exception as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Parse error: {e}")
+        out = io.BytesIO()
+        self.lock.acquire_read()
+        try:
+            # Results are evaluated lazily, so the whole body is written under the lock
+            with sparql_engine.evaluation_deadline(self.query_timeout):
+                rows = sparql_engine.write_result(self.dataset.query(compiled), out, fmt)
+        except sparql_engine.QueryTimeout:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, f"Query timed out after {self.query_timeout:g}s")
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        finally:
+            self.lock.release_read()
+        return out.getvalue(), rows
+
+    def _lock_write(self):
+        if not self.lock.acquire_write(self.write_timeout):
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE,
+                            f"Dataset {self.name} is busy with queries, try again later",
+                            {"Retry-After": "5"})
+
+    def graph(self, graph_id):
+        return self.dataset.graph(graph_id) if graph_id else self.dataset.default_graph
+
+    def add(self, parsed, graph_id=None, replace=False):
+        """Add the quads of a parsed Dataset; returns the number added"""
+        quads = []
+        for s, p, o, g in parsed.quads((None, None, None, None)):
+            g_id = getattr(g, "identifier", g)
+            if g_id is None or g_id == DATASET_DEFAULT_GRAPH_ID:
+                g_id = graph_id
+            quads.append((s, p, o, self.graph(g_id)))
+        self._lock_write()
+        try:
+            if replace:
+                self.graph(graph_id).remove((None, None, None))
+            self.dataset.addN(quads)
+        finally:
+            self.lock.release_write()
+        return len(quads)
+
+    def clear(self, graph_id=None):
+        self._lock_write()
+        try:
+            graph = self.graph(graph_id)
+            removed = len(graph)
+            graph.remove((None, None, None))
+            if graph_id:
+                self.dataset.remove_graph(graph)
+        finally:
+            self.lock.release_write()
+        return removed
+
+    def dump(self, fmt, graph_id=None):
+        self.lock.acquire_read()
+        try:
+            if graph_id or fmt not in QUAD_FORMATS:
+                source = self.graph(graph_id)
+                copy = Graph()
+                for prefix, namespace in self.dataset.namespaces():
+                    copy.bind(prefix, namespace)
+                copy += source
+                return copy.serialize(format=fmt, encoding="utf-8")
+            return self.dataset.serialize(format=fmt, encoding="utf-8")
+        finally:
+            self.lock.release_read()
+
+    def describe(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        self.lock.acquire_read()
+        try:
+            triples = len(self)
+        finally:
+            self.lock.release_read()
+        return {
+            "ds.name": f"/{self.name}",
+            "ds.state": True,
+            "ds.services": [
+                {"srv.type": "query", "srv.endpoints": ["sparql", "query"]},
+                {"srv.type": "gsp-rw", "srv.endpoints": ["data"]},
+            ],
+            "sources": self.sources,
+            "triples": triples,
+            "stats": {**stats, "query_ms": round(stats["query_ms"], 1)},
+        }
+
+
+class SPARQLServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, datasets, workers=8, verbose=False):
+        super().__init__(address, Handler)
+        self.datasets = datasets
+        self.slots = threading.BoundedSemaphore(max(workers, 1))
+        self.cache = sparql_engine.QueryCache()
+        self.verbose = verbose
+
+
+def _media_types(header):
+    """Media types of an Accept header, best first"""
+    ranked = []
+    for k, item in enumerate((header or "").split(",")):
+        media, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media and q > 0:
+            ranked.append((-q, k, media.strip().lower()))
+    return [media for _, _, media in sorted(ranked)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "HeritageSPARQL/1.0"
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 60
+    # Headers and body go out in separate writes; without TCP_NODELAY the
+    # second one waits for the client's delayed ACK (~40 ms per request)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{self.address_string()} - {format % args}\n")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # Request plumbing
+
+    def _body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if not size:
+                    # Skip trailers up to the blank line
+                    while self.rfile.readline().strip():
+                        pass
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            try:
+                body = gzip.decompress(body)
+            except OSError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Bad gzip body: {e}")
+        return body
+
+    def _send(self, status, body=b"", content_type="text/plain; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        parts = [p for p in url.path.split("/") if p]
+        # The body is read before anything can fail, so the connection stays in step
+        body = self._body() if method in ("POST", "PUT") else b""
+        try:
+            if parts and parts[0] == "$":
+                self._admin(method, parts[1:])
+                return
+            if len(parts) != 2:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No such route: {url.path}")
+            hosted = self.server.datasets.get(parts[0])
+            if hosted is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No such dataset: {parts[0]}")
+            try:
+                if parts[1] in ("sparql", "query"):
+                    self._query(hosted, method, params, body)
+                elif parts[1] == "data":
+                    self._data(hosted, method, params, body)
+                else:
+                    raise HTTPError(HTTPStatus.NOT_FOUND, f"No such service: {parts[1]}")
+            except HTTPError:
+                hosted.count("errors")
+                raise
+        except HTTPError as e:
+            self._send(e.status, (str(e) + "\n").encode("utf-8"), headers=e.headers)
+        except Exception as e:
+            print(f"✗ {method} {self.path}: {e}", file=sys.stderr)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}\n".encode("utf-8"))
+
+    def _admin(self, method, parts):
+        if method != "GET":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed")
+        if parts == ["ping"]:
+            self._send(HTTPStatus.OK, time.strftime("%Y-%m-%dT%H:%M:%S%z\n").encode("utf-8"))
+        elif parts == ["datasets"]:
+            datasets = [hosted.describe() for hosted in self.server.datasets.values()]
+            self._send(HTTPStatus.OK, json.dumps({"datasets": datasets}, indent=2).encode("utf-8"),
+                       "application/json")
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such route: /$/{'/'.join(parts)}")
+
+    # Services
+
+    def _query(self, hosted, method, params, body):
+        if method == "GET":
+            text = params.get("query")
+        elif method == "POST":
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type == "application/sparql-query":
+                text = body.decode("utf-8")
+            else:
+                form = {k: v[-1] for k, v in parse_qs(body.decode("utf-8"), keep_blank_values=True).items()}
+                text = form.get("query", params.get("query"))
+        else:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on a query service")
+        if not text:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No query given")
+
+        fmt = params.get("format")
+        if fmt is None:
+            fmt = next((RESULT_TYPES[m] for m in _media_types(self.headers.get("Accept"))
+                        if m in RESULT_TYPES), "json")
+        elif fmt not in ("json", "csv", "tsv"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown result format: {fmt}")
+
+        start = time.perf_counter()
+        with self.server.slots, instrumentation.stage("query", dataset=hosted.name) as st:
+            result, rows = hosted.query(text, fmt, self.server.cache)
+            st.count(rows=rows)
+        hosted.count("queries", (time.perf_counter() - start) * 1000)
+        content_type = result_stream.FORMATS[fmt][0]
+        if fmt != "json":
+            content_type += "; charset=utf-8"
+        self._send(HTTPStatus.OK, result, content_type)
+
+    def _graph_param(self, params):
+        graph = params.get("graph")
+        if graph in (None, "", "default"):
+            return None
+        return URIRef(graph)
+
+    def _data(self, hosted, method, params, body):
+        graph_id = None if "default" in params else self._graph_param(params)
+        if method == "GET":
+            fmt = next((RDF_TYPES[m] for m in _media_types(self.headers.get("Accept"))
+                        if RDF_TYPES.get(m) in DUMP_TYPES), "nquads")
+            if graph_id and fmt == "nquads":
+                fmt = "nt"
+            self._send(HTTPStatus.OK, hosted.dump(fmt, graph_id), f"{DUMP_TYPES[fmt]}; charset=utf-8")
+            return
+        if method == "DELETE":
+            removed = hosted.clear(graph_id)
+            self._send(HTTPStatus.OK, json.dumps({"count": removed}).encode("utf-8"), "application/json")
+            return
+
+        start = time.perf_counter()
+        with self.server.slots, instrumentation.stage("upload", dataset=hosted.name) as st:
+            parsed = [parse_rdf(data, fmt, graph_id) for data, fmt in self._uploads(body)]
+            if method == "PUT" and not parsed:
+                parsed = [Dataset()]
+            added = 0
+            for k, part in enumerate(parsed):
+                added += hosted.add(part, graph_id, replace=method == "PUT" and k == 0)
+            st.count(triples=added, bytes=len(body))
+        hosted.count("uploads")
+        self.log_message("loaded %d triples into %s in %.3fs", added, hosted.name, time.perf_counter() - start)
+        reply = {"count": added, "tripleCount": added, "quadCount": added}
+        self._send(HTTPStatus.OK, json.dumps(reply).encode("utf-8"), "application/json")
+
+    def _uploads(self, body):
+        """(bytes, rdflib format) of each RDF document in the request body"""
+        content_type = self.headers.get("Content-Type", "text/turtle")
+        media = content_type.split(";")[0].strip().lower()
+        if media != "multipart/form-data":
+            fmt = RDF_TYPES.get(media)
+            if fmt is None:
+                raise HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"Unsupported content type: {media}")
+            return [(body, fmt)]
+        header = f"Content-Type: {content_type}\r\n\r\n".encode("latin-1")
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + body)
+        uploads = []
+        for part in message.iter_parts():
+            filename = part.get_filename()
+            if not filename:
+                continue
+            fmt = sparql_engine.FORMATS.get(Path(filename).suffix) or RDF_TYPES.get(part.get_content_type())
+            if fmt is None:
+                raise HTTPError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"Unsupported file type: {filename}")
+            uploads.append((part.get_payload(decode=True), fmt))
+        return uploads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedded SPARQL server with the Fuseki query and data routes")
+    parser.add_argument("--dataset", action="append", metavar="NAME[=PATH]",
+                        help="serve PATH (data file, directory or snapshot) as NAME, or an empty NAME; "
+                             "repeatable (default: the three Question 2 datasets)")
+    parser.add_argument("--host", default="localhost", help="interface to listen on (default: localhost)")
+    parser.add_argument("--port", type=int, default=3030, help="port to listen on (default: 3030)")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="queries and uploads running at once (default: 8)")
+    parser.add_argument("--query-timeout", type=float, default=20, metavar="SECONDS",
+                        help="stop a query after this long and answer 503 (default: 20)")
+    parser.add_argument("--write-timeout", type=float, default=30, metavar="SECONDS",
+                        help="how long an upload waits for running queries before it is "
+                             "refused with 503 (default: 30)")
+    parser.add_argument("--verbose", action="store_true", help="log every request to stderr")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    datasets = {}
+    for spec in args.dataset or DEFAULT_DATASETS:
+        name, sep, path = spec.partition("=")
+        if not name or "/" in name or name.startswith("$"):
+            parser.error(f"invalid dataset name: {name!r}")
+        if sep and not Path(path).exists():
+            print(f"ERROR: Data not found: {path}")
+            return 1
+        hosted = datasets.setdefault(name, HostedDataset(name, args.write_timeout, args.query_timeout))
+        if not sep:
+            print(f"  ✓ {name}: empty")
+            continue
+        start = time.perf_counter()
+        with instrumentation.stage("load", dataset=name) as st:
+            hosted.load(path)
+            st.count(triples=len(hosted))
+        print(f"  ✓ {name}: {len(hosted)} triples from {path} ({time.perf_counter() - start:.2f}s)")
+
+    server = SPARQLServer((args.host, args.port), datasets, args.workers, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Serving {len(datasets)} datasets on http://{host}:{port}/ ({args.workers} workers)")
+    for name in datasets:
+        print(f"  http://{host}:{port}/{name}/sparql")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print("Server stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
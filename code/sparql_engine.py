@@ -0,0 +1,344 @@
+"""
+In-process SPARQL engine for the queries/ suite.
+
+Loads data files into an rdflib Dataset (Turtle, TriG, N-Triples,
+N-Quads, RDF/XML and Turtle-star) and runs queries against it without a
+triplestore. Queries are parsed and compiled to SPARQL algebra once and
+cached by their text, so the same compiled query is reused across
+datasets and repeated runs. Results come back as the SPARQL 1.1 JSON
+results structure Fuseki returns, built directly from the result rows.
+
+A query can be given a deadline (evaluation_deadline()): rdflib's
+evaluator is then checked on every row an operator produces and every
+triple pattern match, so a runaway query such as q16 stops with
+QueryTimeout instead of running on in its thread.
+"""
+
+import csv
+import functools
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from rdflib import BNode, Dataset, Literal, URIRef
+from rdflib.plugins.sparql import prepareQuery
+
+import graph_loader
+import rdfstar
+
+# File suffix -> rdflib parser format
+FORMATS = {
+    ".ttl": "turtle",
+    ".trig": "trig",
+    ".nt": "nt",
+    ".nq": "nquads",
+    ".rdf": "xml",
+    ".owl": "xml",
+    ".xml": "xml",
+}
+
+
+def data_files(path):
+    """Supported RDF files at path (a file, or every file under a directory)"""
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.suffix in FORMATS)
+    return [path]
+
+
+def parse_into(dataset, file_path):
+    """
+    Parse one data file into dataset, lowering RDF-star Turtle if needed.
+
+    Files without named graphs go into the default graph through the
+    shared parse cache (graph_loader.py).
+    """
+    file_path = Path(file_path)
+    fmt = FORMATS.get(file_path.suffix)
+    if fmt is None:
+        raise ValueError(f"Unsupported data file type: {file_path}")
+    if fmt in graph_loader.TRIPLE_FORMATS:
+        graph_loader.load_into(dataset.default_graph, file_path, fmt)
+    else:
+        graph_loader.parse_file(dataset, file_path, fmt)
+
+
+def load_dataset(path):
+    """Load a data file or directory into a new Dataset"""
+    dataset = Dataset()
+    files = data_files(path)
+    if not files:
+        raise ValueError(f"No RDF data files found in: {path}")
+    for file_path in files:
+        parse_into(dataset, file_path)
+    return dataset
+
+
+_compile_lock = threading.Lock()
+
+# Compiled queries kept per cache; older ones are compiled again when needed
+COMPILED_QUERIES = 1024
+
+
+class QueryCache:
+    """
+    Parsed and algebra-compiled queries, keyed by a hash of the query
+    text. The least recently used ones are dropped past max_size, so a
+    server taking arbitrary queries does not grow without bound.
+    """
+
+    def __init__(self, max_size=COMPILED_QUERIES):
+        self.max_size = max_size
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query_text):
+        key = hashlib.sha256(query_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        # rdflib's query grammar (pyparsing) is not safe to run on several
+        # threads at once, so queries are compiled one at a time
+        with _compile_lock:
+            compiled = self._compiled.get(key)
+            if compiled is None:
+                if rdfstar.has_rdf_star(query_text):
+                    query_text = rdfstar.lower_sparql(query_text)
+                compiled = prepareQuery(query_text)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.max_size:
+                self._compiled.popitem(last=False)
+        return compiled
+
+    def __len__(self):
+        return len(self._compiled)
+
+
+class QueryTimeout(Exception):
+    """A query ran past its evaluation_deadline()"""
+
+
+# Deadline (time.monotonic()) of the query being evaluated on each thread
+_deadline = threading.local()
+_deadline_lock = threading.Lock()
+_deadline_installed = False
+
+
+def _check_deadline():
+    at = getattr(_deadline, "at", None)
+    if at is not None and time.monotonic() > at:
+        raise QueryTimeout()
+
+
+def _checked_rows(rows):
+    for row in rows:
+        _check_deadline()
+        yield row
+
+
+def _install_deadline_checks():
+    """
+    Route rdflib's evaluator through deadline checks.
+
+    Every operator, including the per-row EXISTS checks, is evaluated
+    through evaluate.evalPart, and evalBGP recurses once per match of a
+    triple pattern, both looked up as module globals. The wrappers only
+    add the checks while the current thread has a deadline.
+    """
+    global _deadline_installed
+    from rdflib.plugins.sparql import evaluate
+
+    with _deadline_lock:
+        if _deadline_installed:
+            return
+        eval_part = evaluate.evalPart
+        eval_bgp = evaluate.evalBGP
+
+        def evalPart(ctx, part):
+            result = eval_part(ctx, part)
+            if getattr(_deadline, "at", None) is None or part.name.endswith("Query"):
+                return result
+            return _checked_rows(result)
+
+        def evalBGP(ctx, bgp):
+            _check_deadline()
+            return eval_bgp(ctx, bgp)
+
+        evaluate.evalPart = evalPart
+        evaluate.evalBGP = evalBGP
+        _deadline_installed = True
+
+
+@contextmanager
+def evaluation_deadline(seconds):
+    """
+    Stop queries evaluated on this thread within the block after seconds.
+
+    Evaluation is lazy, so the block should cover reading the result
+    rows, not just the query() call. A query past the deadline raises
+    QueryTimeout from the next row or match; nested deadlines keep the
+    earliest. seconds=None sets no deadline.
+    """
+    previous = getattr(_deadline, "at", None)
+    if seconds is None:
+        yield
+        return
+    _install_deadline_checks()
+    at = time.monotonic() + max(seconds, 0)
+    _deadline.at = at if previous is None else min(at, previous)
+    try:
+        yield
+    finally:
+        _deadline.at = previous
+
+
+_memo_lock = threading.Lock()
+_memo_installed = False
+
+
+def memoize_sparql_parsing():
+    """
+    Make every rdflib query in this process reuse compiled query text.
+
+    pyshacl runs a SPARQL-based constraint once per focus node with the
+    same text and $this passed as an initial binding, and rdflib parses
+    and translates that text again on each call. This wraps rdflib's
+    SPARQL processor so each distinct (text, base, namespaces) is
+    compiled once and kept while it is among the COMPILED_QUERIES most
+    recently used. Meant for long-running processes such as the
+    validation daemon.
+    """
+    global _memo_installed
+    from rdflib.plugins.sparql import processor
+
+    with _memo_lock:
+        if _memo_installed:
+            return
+        original = processor.SPARQLProcessor.query
+
+        @functools.lru_cache(maxsize=COMPILED_QUERIES)
+        def compile_query(text, base, namespaces):
+            with _compile_lock:
+                return processor.translateQuery(processor.parseQuery(text), base, dict(namespaces))
+
+        def query(self, strOrQuery, initBindings=None, initNs=None, base=None, DEBUG=False):
+            if isinstance(strOrQuery, str):
+                strOrQuery = compile_query(strOrQuery, base, tuple(sorted((initNs or {}).items())))
+            return original(self, strOrQuery, initBindings, initNs, base, DEBUG)
+
+        processor.SPARQLProcessor.query = query
+        _memo_installed = True
+
+
+def term_to_json(term):
+    """One RDF term in SPARQL JSON results form"""
+    if isinstance(term, URIRef):
+        return {"type": "uri", "value": str(term)}
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    if isinstance(term, Literal):
+        value = {"type": "literal", "value": str(term)}
+        if term.language:
+            value["xml:lang"] = term.language
+        elif term.datatype:
+            value["datatype"] = str(term.datatype)
+        return value
+    raise TypeError(f"Cannot encode term in results: {term!r}")
+
+
+def result_to_json(result):
+    """Build the SPARQL JSON results structure for an rdflib Result"""
+    if result.type == "ASK":
+        return {"head": {}, "boolean": bool(result.askAnswer)}
+    if result.type != "SELECT":
+        raise ValueError(f"Only SELECT and ASK queries are supported, got {result.type}")
+    names = [str(v) for v in result.vars]
+    bindings = []
+    for row in result:
+        binding = {}
+        for name, term in zip(names, row):
+            if term is not None:
+                binding[name] = term_to_json(term)
+        bindings.append(binding)
+    return {"head": {"vars": names}, "results": {"bindings": bindings}}
+
+
+def _csv_value(term):
+    if term is None:
+        return ""
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    return str(term)
+
+
+def write_result(result, out, fmt="json"):
+    """
+    Stream an rdflib Result to the binary file out, one row at a time.
+
+    fmt is one of json, csv, tsv or ndjson (see result_stream.py).
+    Returns the number of rows written.
+    """
+    if result.type == "ASK":
+        if fmt == "json":
+            out.write(json.dumps({"head": {}, "boolean": bool(result.askAnswer)}).encode("utf-8"))
+        else:
+            out.write(b"true\n" if result.askAnswer else b"false\n")
+        return 0
+    if result.type != "SELECT":
+        raise ValueError(f"Only SELECT and ASK queries are supported, got {result.type}")
+
+    names = [str(v) for v in result.vars]
+    rows = 0
+    if fmt == "json":
+        out.write(json.dumps({"head": {"vars": names}})[:-1].encode("utf-8"))
+        out.write(b', "results": {"bindings": [')
+    elif fmt == "csv":
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+        writer = csv.writer(text, lineterminator="\r\n")
+        writer.writerow(names)
+    elif fmt == "tsv":
+        out.write(("\t".join(f"?{name}" for name in names) + "\n").encode("utf-8"))
+    elif fmt != "ndjson":
+        raise ValueError(f"Unknown result format: {fmt}")
+
+    for row in result:
+        if fmt == "csv":
+            writer.writerow([_csv_value(term) for term in row])
+        elif fmt == "tsv":
+            line = "\t".join("" if term is None else term.n3() for term in row)
+            out.write((line + "\n").encode("utf-8"))
+        else:
+            binding = {name: term_to_json(term) for name, term in zip(names, row) if term is not None}
+            data = json.dumps(binding, ensure_ascii=False).encode("utf-8")
+            if fmt == "json":
+                out.write(b",\n" if rows else b"\n")
+                out.write(data)
+            else:
+                out.write(data + b"\n")
+        rows += 1
+
+    if fmt == "json":
+        out.write(b"\n]}}\n")
+    elif fmt == "csv":
+        text.detach()
+    return rows
+
+
+def execute(dataset, query_text, cache=None):
+    """Run a query against dataset and return SPARQL JSON results"""
+    if cache is None:
+        cache = QueryCache()
+    compiled = cache.get(query_text)
+    return result_to_json(dataset.query(compiled))
@@ -0,0 +1,296 @@
+"""
+Vectorized check of the temporal access rule.
+
+The rule (":RecordingTemporalAccessShape" in
+validation/temporal-constraints.shacl, and branch 6 of q25): a recording
+made after its instrument's restriction effective date violates access
+if its performer's access level is below the level the instrument
+requires.
+
+    ?recording :performedBy ?performer ; :usesInstrument ?instrument ;
+               :recordingDate ?recordingDate .
+    ?instrument :restrictionEffectiveDate ?restrictionDate ;
+                :requiresAccessLevel ?itemAccess .
+    ?performer :hasAccessLevel ?performerAccess .
+    FILTER (?recordingDate > ?restrictionDate && ?performerAccess < ?itemAccess)
+
+Instead of evaluating that join per recording, the six properties are
+pulled into integer-coded NumPy columns in one pass each, and the joins
+and filters run as sort/searchsorted operations over whole columns.
+Comparisons give what rdflib's SPARQL engine, which pyshacl runs, gives
+for the FILTER: pairs of xsd:date or timezone-less xsd:dateTime values,
+and pairs of numeric levels, compare in NumPy. Every other pair (a date
+given as a plain string, a date against a dateTime, a level that is not
+a number ...) is compared row by row with rdflib's own operator, which
+falls back on its term order for such values instead of failing.
+
+Matches come back as rows of RDF terms, which can be turned into a
+SPARQL JSON result set or into validation results identical to the ones
+pyshacl produces for the shape.
+"""
+
+import re
+from datetime import datetime
+
+import numpy as np
+from pyshacl.rdfutil import clone_blank_node, stringify_node
+from rdflib import BNode, Graph, Literal, Namespace
+from rdflib.namespace import RDF, RDFS, SH, XSD
+from rdflib.plugins.sparql.operators import RelationalExpression
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import SPARQLError
+
+from sparql_engine import term_to_json
+
+NS = Namespace("http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/")
+
+TEMPORAL_SHAPE = NS.RecordingTemporalAccessShape
+
+# Output columns, named as in the shape's SELECT (with $this as recording)
+VARS = ["recording", "performer", "instrument", "recordingDate", "restrictionDate",
+        "performerAccess", "itemAccess"]
+
+NUMERIC_TYPES = {
+    XSD.integer, XSD.int, XSD.long, XSD.short, XSD.byte, XSD.decimal, XSD.float, XSD.double,
+    XSD.nonNegativeInteger, XSD.positiveInteger, XSD.nonPositiveInteger, XSD.negativeInteger,
+    XSD.unsignedLong, XSD.unsignedInt, XSD.unsignedShort, XSD.unsignedByte,
+}
+
+# Date kinds; values of different kinds are compared by rdflib
+DATE, DATETIME = 1, 2
+
+NAT = np.datetime64("NaT", "s")
+
+
+def _date_value(term):
+    """
+    (datetime64[s], kind) of a date literal that NumPy compares the way
+    rdflib does, or (NaT, 0)
+    """
+    if not isinstance(term, Literal) or term.datatype not in (XSD.date, XSD.dateTime):
+        return NAT, 0
+    value = term.toPython()
+    if term.datatype == XSD.date:
+        if isinstance(value, str):
+            return NAT, 0
+        return np.datetime64(value.isoformat(), "s"), DATE
+    # rdflib orders timezone-aware dateTimes apart from naive ones
+    if not isinstance(value, datetime) or value.tzinfo is not None:
+        return NAT, 0
+    return np.datetime64(value.isoformat(), "s"), DATETIME
+
+
+def _number_value(term):
+    """float value of a numeric literal, or NaN"""
+    if isinstance(term, Literal) and term.datatype in NUMERIC_TYPES:
+        try:
+            return float(term.toPython())
+        except (TypeError, ValueError):
+            pass
+    return np.nan
+
+
+class TemporalColumns:
+    """The rule's six properties as integer-coded column arrays"""
+
+    def __init__(self, graph):
+        self.terms = []
+        self.ids = {}
+        self.performed_by = self._pairs(graph, NS.performedBy)
+        self.uses_instrument = self._pairs(graph, NS.usesInstrument)
+        self.recording_date = self._dates(graph, NS.recordingDate)
+        self.restriction_date = self._dates(graph, NS.restrictionEffectiveDate)
+        self.item_access = self._numbers(graph, NS.requiresAccessLevel)
+        self.performer_access = self._numbers(graph, NS.hasAccessLevel)
+
+    def _id(self, term):
+        i = self.ids.get(term)
+        if i is None:
+            i = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return i
+
+    def _pairs(self, graph, predicate):
+        s_ids, o_ids = [], []
+        for s, o in graph.subject_objects(predicate):
+            s_ids.append(self._id(s))
+            o_ids.append(self._id(o))
+        return np.array(s_ids, dtype=np.int64), np.array(o_ids, dtype=np.int64)
+
+    def _dates(self, graph, predicate):
+        s_ids, t_ids, values, kinds = [], [], [], []
+        for s, o in graph.subject_objects(predicate):
+            value, kind = _date_value(o)
+            s_ids.append(self._id(s))
+            t_ids.append(self._id(o))
+            values.append(value)
+            kinds.append(kind)
+        return (np.array(s_ids, dtype=np.int64), np.array(t_ids, dtype=np.int64),
+                np.array(values, dtype="datetime64[s]"), np.array(kinds, dtype=np.int8))
+
+    def _numbers(self, graph, predicate):
+        s_ids, t_ids, values = [], [], []
+        for s, o in graph.subject_objects(predicate):
+            s_ids.append(self._id(s))
+            t_ids.append(self._id(o))
+            values.append(_number_value(o))
+        return (np.array(s_ids, dtype=np.int64), np.array(t_ids, dtype=np.int64),
+                np.array(values, dtype=np.float64))
+
+    def instances(self, graph, cls):
+        """Boolean mask over term ids: instances of cls or its subclasses"""
+        mask = np.zeros(len(self.terms), dtype=bool)
+        for sub in graph.transitive_subjects(RDFS.subClassOf, cls):
+            for s in graph.subjects(RDF.type, sub):
+                i = self.ids.get(s)
+                if i is not None:
+                    mask[i] = True
+        return mask
+
+
+def sparql_compare(op, left, right):
+    """left op right as rdflib's SPARQL engine evaluates it; an error is False"""
+    try:
+        return bool(RelationalExpression(CompValue("RelationalExpression", expr=left, op=op, other=right), None))
+    except SPARQLError:
+        return False
+
+
+def _compare(op, left_value, right_value, typed, left_term, right_term, terms):
+    """
+    Boolean mask of left op right: in NumPy where typed, otherwise per
+    row with sparql_compare on the terms
+    """
+    keep = typed & (left_value > right_value if op == ">" else left_value < right_value)
+    for k in np.nonzero(~typed)[0]:
+        keep[k] = sparql_compare(op, terms[left_term[k]], terms[right_term[k]])
+    return keep
+
+
+def join(left, right):
+    """Index arrays (i, j) of every pair with left[i] == right[j]"""
+    order = np.argsort(right, kind="stable")
+    sorted_right = right[order]
+    lo = np.searchsorted(sorted_right, left, "left")
+    hi = np.searchsorted(sorted_right, left, "right")
+    counts = hi - lo
+    li = np.repeat(np.arange(len(left)), counts)
+    starts = np.repeat(lo, counts)
+    offsets = np.arange(len(li)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return li, order[starts + offsets]
+
+
+def find_violations(graph, focus_class=NS.Recording, columns=None):
+    """
+    Rows of RDF terms, one per solution of the rule, in VARS order.
+
+    Only recordings that are instances of focus_class (through
+    rdfs:subClassOf in graph) are kept; pass None to skip that test.
+    """
+    c = columns or TemporalColumns(graph)
+
+    # (recording, instrument) with the instrument's restriction date
+    rec, inst = c.uses_instrument
+    i, j = join(inst, c.restriction_date[0])
+    rec, inst = rec[i], inst[i]
+    restr_term, restr_value, restr_kind = (a[j] for a in c.restriction_date[1:])
+
+    # ... recorded after it
+    i, j = join(rec, c.recording_date[0])
+    rec, inst, restr_term, restr_value, restr_kind = (a[i] for a in (rec, inst, restr_term, restr_value, restr_kind))
+    date_term, date_value, date_kind = (a[j] for a in c.recording_date[1:])
+    typed = (date_kind == restr_kind) & (date_kind != 0)
+    keep = _compare(">", date_value, restr_value, typed, date_term, restr_term, c.terms)
+    rec, inst, restr_term, date_term = rec[keep], inst[keep], restr_term[keep], date_term[keep]
+
+    # ... with the level the instrument requires
+    i, j = join(inst, c.item_access[0])
+    rec, inst, restr_term, date_term = (a[i] for a in (rec, inst, restr_term, date_term))
+    item_term, item_value = c.item_access[1][j], c.item_access[2][j]
+
+    # ... against each performer's level
+    i, j = join(rec, c.performed_by[0])
+    rec, inst, restr_term, date_term, item_term, item_value = (
+        a[i] for a in (rec, inst, restr_term, date_term, item_term, item_value))
+    perf = c.performed_by[1][j]
+    i, j = join(perf, c.performer_access[0])
+    rec, inst, restr_term, date_term, item_term, item_value, perf = (
+        a[i] for a in (rec, inst, restr_term, date_term, item_term, item_value, perf))
+    perf_term, perf_value = c.performer_access[1][j], c.performer_access[2][j]
+    typed = ~np.isnan(perf_value) & ~np.isnan(item_value)
+    keep = _compare("<", perf_value, item_value, typed, perf_term, item_term, c.terms)
+
+    if focus_class is not None:
+        keep &= c.instances(graph, focus_class)[rec]
+
+    table = np.stack([rec, perf, inst, date_term, restr_term, perf_term, item_term], axis=1)[keep]
+    table = np.unique(table, axis=0) if len(table) else table
+    return [tuple(c.terms[k] for k in row) for row in table]
+
+
+def to_sparql_json(rows, names=VARS):
+    """SPARQL 1.1 JSON results for rows"""
+    bindings = [{name: term_to_json(term) for name, term in zip(names, row)} for row in rows]
+    return {"head": {"vars": list(names)}, "results": {"bindings": bindings}}
+
+
+def _format_message(message, bound):
+    for var, value in bound.items():
+        message = re.sub("{{[?$]{}}}".format(var), str(value), message)
+    return message
+
+
+def shacl_report(rows, data_graph, shapes_graph, shape=TEMPORAL_SHAPE):
+    """
+    Validation results for rows as pyshacl would report them for shape.
+
+    Returns (report_graph, text_blocks) for shacl_report.merge(). Like
+    pyshacl, each solution row gives one result, with the recording as
+    both focus and value node.
+    """
+    constraint = shapes_graph.value(shape, SH.sparql)
+    severity = shapes_graph.value(shape, SH.severity) or SH.Violation
+    messages = sorted(shapes_graph.objects(constraint, SH.message), key=str)
+    component = SH.SPARQLConstraintComponent
+
+    report = Graph(bind_namespaces="core")
+    for prefix, namespace in shapes_graph.namespace_manager.namespaces():
+        report.namespace_manager.bind(prefix, namespace)
+    root = BNode()
+    report.add((root, RDF.type, SH.ValidationReport))
+    source_constraint = clone_blank_node(shapes_graph, constraint, report, keepid=True) \
+        if isinstance(constraint, BNode) else constraint
+
+    header = "{} in {} ({}):\n\tSeverity: {}\n\tSource Shape: {}\n".format(
+        "Constraint Violation" if severity == SH.Violation else "Validation Result",
+        "SPARQLConstraintComponent",
+        str(component),
+        stringify_node(shapes_graph, severity),
+        stringify_node(shapes_graph, shape),
+    )
+    constraint_text = "\tSource Constraint: {}\n".format(stringify_node(shapes_graph, constraint))
+
+    blocks = []
+    for row in rows:
+        focus = row[0]
+        bound = dict(zip(VARS[1:], row[1:]))
+        bound["this"] = focus
+        focus_text = stringify_node(data_graph, focus)
+        block = header + f"\tFocus Node: {focus_text}\n\tValue Node: {focus_text}\n" + constraint_text
+
+        result = BNode()
+        report.add((root, SH.result, result))
+        report.add((result, RDF.type, SH.ValidationResult))
+        report.add((result, SH.sourceConstraintComponent, component))
+        report.add((result, SH.sourceShape, shape))
+        report.add((result, SH.resultSeverity, severity))
+        report.add((result, SH.focusNode, focus))
+        report.add((result, SH.value, focus))
+        report.add((result, SH.sourceConstraint, source_constraint))
+        for message in messages:
+            text = _format_message(str(message.value), bound)
+            report.add((result, SH.resultMessage, Literal(text)))
+            block += f"\tMessage: {text}\n"
+        blocks.append(block)
+    report.add((root, SH.conforms, Literal(not rows or severity != SH.Violation)))
+    return report, blocks
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+SHACL Validation Daemon
+Keeps the shapes graphs, the ontology and the compiled SPARQL constraints
+loaded between runs, and validates data graphs sent to it over a Unix
+socket or stdin.
+
+Usage:
+    python code/validation-daemon.py --shapes <shapes.ttl> [--shapes ...] [--ontology <onto.ttl>]
+                                     (--socket <path> | --stdio)
+    python code/validation-daemon.py --socket <path> --send <data.ttl> [--use <shapes>] [--report text|turtle|json]
+    python code/validation-daemon.py --socket <path> --stats
+
+Example:
+    python code/validation-daemon.py --shapes shapes/validation_shapes.ttl --shapes validation/temporal-constraints.shacl --socket /tmp/shacl.sock &
+    python code/validation-daemon.py --socket /tmp/shacl.sock --send data/fixed-data.ttl --use temporal-constraints --report text
+
+Protocol:
+    One JSON object per line in each direction. A request carries the
+    data inline or as a path readable by the daemon:
+
+        {"id": 1, "data": "<RDF text>", "format": "turtle", "shapes": "validation_shapes", "report": "json"}
+        {"id": 2, "data_path": "data/fixed-data.ttl", "report": "turtle"}
+        {"command": "stats"}
+        {"command": "shutdown"}
+
+    "shapes" names a loaded shapes file by its stem and defaults to the
+    first one; "report" is json (default), turtle or text. A response is
+
+        {"id": 1, "ok": true, "conforms": false, "results": 16, "report": ...,
+         "timings_ms": {"parse": 2.1, "validate": 180.4, "serialize": 3.0, "total": 185.6}}
+
+    or {"id": 1, "ok": false, "error": "..."}. "stats" returns request
+    counts and per-stage latency counters (count, mean, p50, p95, max).
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+try:
+    from pyshacl import validate
+    from rdflib import Graph
+except ImportError:
+    print("ERROR: pyshacl not installed!")
+    print("Install it with: pip install pyshacl")
+    sys.exit(1)
+
+from graph_loader import load_graph, load_into
+import instrumentation
+import shacl_report
+import sparql_engine
+
+REPORT_FORMATS = ("json", "turtle", "text")
+
+STAGES = ("parse", "validate", "serialize", "total")
+
+
+class LatencyCounters:
+    """Per-stage request latencies: running totals plus a window for percentiles"""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.stages = {
+            stage: {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=window)}
+            for stage in STAGES
+        }
+
+    def record(self, timings, ok=True):
+        with self.lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            for stage, seconds in timings.items():
+                counter = self.stages[stage]
+                counter["count"] += 1
+                counter["total"] += seconds
+                counter["max"] = max(counter["max"], seconds)
+                counter["recent"].append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            stages = {}
+            for stage, counter in self.stages.items():
+                recent = sorted(counter["recent"])
+                stages[stage] = {
+                    "count": counter["count"],
+                    "mean_ms": round(1000 * counter["total"] / counter["count"], 3) if counter["count"] else None,
+                    "p50_ms": round(1000 * recent[len(recent) // 2], 3) if recent else None,
+                    "p95_ms": round(1000 * recent[min(len(recent) - 1, int(len(recent) * 0.95))], 3) if recent else None,
+                    "max_ms": round(1000 * counter["max"], 3),
+                }
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "requests": self.requests,
+                "errors": self.errors,
+                "latency": stages,
+            }
+
+
+class ValidationService:
+    """Shapes and ontology loaded once; validates one request at a time"""
+
+    def __init__(self, shapes_paths, ontology_path=None, inference="rdfs"):
+        self.shapes = {}
+        for path in shapes_paths:
+            path = Path(path)
+            self.shapes[path.stem] = load_graph(path, format="turtle")
+            print(f"✓ Loaded {len(self.shapes[path.stem])} triples of shapes as '{path.stem}'", file=sys.stderr)
+        self.default_shapes = next(iter(self.shapes))
+        self.ontology = None
+        if ontology_path:
+            self.ontology = load_graph(ontology_path)
+            print(f"✓ Loaded {len(self.ontology)} triples of ontology", file=sys.stderr)
+        self.inference = inference
+        self.counters = LatencyCounters()
+        self.lock = threading.Lock()
+        sparql_engine.memoize_sparql_parsing()
+        # One run on an empty graph imports the inference and SPARQL
+        # machinery now rather than on the first real request
+        for shapes_graph in self.shapes.values():
+            self._validate(Graph(), shapes_graph)
+
+    def _validate(self, data_graph, shapes_graph):
+        return validate(
+            data_graph,
+            shacl_graph=shapes_graph,
+            ont_graph=self.ontology,
+            inference=self.inference,
+            abort_on_first=False,
+            allow_infos=True,
+            allow_warnings=True,
+            meta_shacl=False,
+            advanced=True,
+            debug=False,
+        )
+
+    def handle(self, request):
+        """Answer one request object with one response object"""
+        response = {"id": request.get("id")}
+        command = request.get("command", "validate")
+        if command == "stats":
+            response.update(ok=True, stats=self.counters.snapshot())
+            return response
+        if command != "validate":
+            response.update(ok=False, error=f"Unknown command: {command}")
+            return response
+
+        timings = {}
+        start = time.perf_counter()
+        try:
+            shapes_name = request.get("shapes", self.default_shapes)
+            if shapes_name not in self.shapes:
+                raise ValueError(f"Unknown shapes '{shapes_name}', loaded: {', '.join(self.shapes)}")
+            report_format = request.get("report", "json")
+            if report_format not in REPORT_FORMATS:
+                raise ValueError(f"Unknown report format: {report_format}")
+
+            data_graph = Graph()
+            if "data" in request:
+                data_graph.parse(data=request["data"], format=request.get("format", "turtle"))
+            elif "data_path" in request:
+                load_into(data_graph, request["data_path"], request.get("format"))
+            else:
+                raise ValueError("Request needs 'data' or 'data_path'")
+            t_parse = time.perf_counter()
+            timings["parse"] = t_parse - start
+
+            with self.lock, instrumentation.stage("validation", mode="daemon", shapes=shapes_name) as st:
+                conforms, report_graph, report_text = self._validate(data_graph, self.shapes[shapes_name])
+                st.count(triples=len(data_graph))
+            t_validate = time.perf_counter()
+            timings["validate"] = t_validate - t_parse
+
+            if report_format == "json":
+                report = shacl_report.report_to_json(report_graph)["results"]
+            elif report_format == "turtle":
+                report = report_graph.serialize(format="turtle")
+            else:
+                report = report_text
+            timings["serialize"] = time.perf_counter() - t_validate
+            response.update(
+                ok=True,
+                conforms=conforms,
+                results=len(shacl_report.result_nodes(report_graph)),
+                report=report,
+            )
+            ok = True
+        except Exception as e:
+            response.update(ok=False, error=f"{type(e).__name__}: {e}")
+            ok = False
+        timings["total"] = time.perf_counter() - start
+        self.counters.record(timings, ok)
+        response["timings_ms"] = {stage: round(1000 * s, 3) for stage, s in timings.items()}
+        return response
+
+    def handle_line(self, line):
+        """Answer one request line; returns (response line, shutdown requested)"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": f"Bad request: {e}"}), False
+        if request.get("command") == "shutdown":
+            return json.dumps({"id": request.get("id"), "ok": True}), True
+        return json.dumps(self.handle(request), ensure_ascii=False), False
+
+
+def serve_stdio(service):
+    print("Reading requests from stdin", file=sys.stderr)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        reply, stop = service.handle_line(line)
+        sys.stdout.write(reply + "\n")
+        sys.stdout.flush()
+        if stop:
+            break
+
+
+def serve_socket(service, socket_path):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                reply, stop = service.handle_line(line.decode("utf-8"))
+                self.wfile.write(reply.encode("utf-8") + b"\n")
+                self.wfile.flush()
+                if stop:
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        server.daemon_threads = True
+        print(f"Listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+    print("Daemon stopped", file=sys.stderr)
+
+
+def send(socket_path, request):
+    """Send one request to a running daemon and return its response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def client_main(args):
+    if args.stats:
+        response = send(args.socket, {"command": "stats"})
+        print(json.dumps(response.get("stats", response), indent=2))
+        return 0
+    if args.shutdown:
+        send(args.socket, {"command": "shutdown"})
+        print("✓ Daemon shutting down")
+        return 0
+
+    request = {"data_path": str(Path(args.send).resolve()), "report": args.report}
+    if args.use:
+        request["shapes"] = args.use
+    response = send(args.socket, request)
+    if not response.get("ok"):
+        print(f"✗ {response.get('error')}")
+        return 2
+    report = response["report"]
+    print(report if isinstance(report, str) else json.dumps(report, indent=2))
+    print(f"Conforms: {'YES ✓' if response['conforms'] else 'NO ✗'}  "
+          f"({response['results']} results, {response['timings_ms']['total']:.1f} ms)", file=sys.stderr)
+    return 0 if response["conforms"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SHACL validation daemon and client")
+    parser.add_argument("--shapes", action="append", default=[], metavar="FILE",
+                        help="shapes file to keep loaded (repeatable)")
+    parser.add_argument("--ontology", metavar="FILE", help="ontology graph mixed into each data graph")
+    parser.add_argument("--inference", default="rdfs", choices=["none", "rdfs", "owlrl", "both"])
+    parser.add_argument("--socket", metavar="PATH", help="Unix socket to listen on, or to send to")
+    parser.add_argument("--stdio", action="store_true", help="serve requests from stdin to stdout")
+    parser.add_argument("--send", metavar="DATA", help="client: validate DATA with a running daemon")
+    parser.add_argument("--use", metavar="SHAPES", help="client: shapes name (file stem) to validate against")
+    parser.add_argument("--report", default="text", choices=REPORT_FORMATS, help="client: report format")
+    parser.add_argument("--stats", action="store_true", help="client: print the daemon's latency counters")
+    parser.add_argument("--shutdown", action="store_true", help="client: stop the daemon")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation.configure(args)
+
+    if args.send or args.stats or args.shutdown:
+        if not args.socket:
+            parser.error("--send/--stats/--shutdown need --socket")
+        sys.exit(client_main(args))
+
+    if not args.shapes:
+        parser.error("--shapes is required to start the daemon")
+    if bool(args.socket) == args.stdio:
+        parser.error("give exactly one of --socket or --stdio")
+    for path in args.shapes + ([args.ontology] if args.ontology else []):
+        if not Path(path).exists():
+            print(f"ERROR: File not found: {path}")
+            sys.exit(1)
+
+    service = ValidationService(args.shapes, args.ontology, args.inference)
+    if args.stdio:
+        serve_stdio(service)
+    else:
+        serve_socket(service, args.socket)
@@ -2,11 +2,64 @@
 """
 Script to convert OWL ontology file to TTL (Turtle) format.
 This script uses rdflib to parse the OWL file and serialize it as Turtle.
+
+Batch mode converts every RDF file under one or more directories to
+several formats at once, one input file per worker process. N-Triples
+and N-Quads are written triple by triple, without the subject sorting
+and prefix compaction of the Turtle serializer, so they are the fast
+targets for large graphs. Inputs whose content has not changed since
+the last run (by SHA-256, recorded in <output>/.convert-state.json) are
+skipped as long as their outputs are still there.
+
+None of rdflib's serializers can write RDF-star, so Turtle-star inputs
+are converted from their lowered form (see code/rdfstar.py): every
+quoted triple becomes a blank node with rdf:subject, rdf:predicate and
+rdf:object. Batch mode warns about each such input and the targets it
+was written to, since reading the output back gives plain triples and
+not quoted ones.
+
+OWL functional syntax (.ofn) and OWL/XML (.owx) are not RDF
+serializations and rdflib cannot read them; batch mode lists them as
+skipped. Convert them with an OWL API tool (e.g. ROBOT) instead.
+
+Usage:
+    python convert_owl_to_ttl.py <owl_file> [ttl_file]
+    python convert_owl_to_ttl.py --batch <dir> [<dir> ...] --output <dir>
+                                 [--to ttl,nt,nq,xml,trig,jsonld] [--workers N] [--force]
+
+Example:
+    python convert_owl_to_ttl.py ontology/s2024700102heritage.rdf
+    python convert_owl_to_ttl.py --batch ontology data --output build/rdf --to ttl,nt --workers 4
 """
 
-from rdflib import Graph
+import argparse
+import json
 import sys
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "code"))
+from graph_loader import load_graph, guess_format, parse_file, file_hash, TRIPLE_FORMATS
+import rdfstar
+import sparql_engine
+
+# Target name -> (rdflib serializer, file suffix, carries named graphs)
+TARGETS = {
+    "ttl": ("turtle", ".ttl", False),
+    "nt": ("nt", ".nt", False),
+    "nq": ("nquads", ".nq", True),
+    "xml": ("xml", ".rdf", False),
+    "trig": ("trig", ".trig", True),
+    "jsonld": ("json-ld", ".jsonld", True),
+}
+
+# OWL syntaxes that are not RDF
+NON_RDF_SUFFIXES = {".ofn": "OWL functional syntax", ".owx": "OWL/XML"}
+
+STATE_FILE = ".convert-state.json"
+
 
 def convert_owl_to_ttl(owl_file_path, ttl_file_path=None):
     """
@@ -25,11 +78,9 @@ def convert_owl_to_ttl(owl_file_path, ttl_file_path=None):
         ttl_file_path = f"{base_name}.ttl"
     
     print(f"Loading OWL file: {owl_file_path}")
-    g = Graph()
-    
     try:
-        # Parse the OWL file
-        g.parse(owl_file_path, format="xml")
+        # Parse the OWL file (or reuse the cached parse)
+        g = load_graph(owl_file_path, format="xml")
         print(f"Successfully parsed OWL file. Found {len(g)} triples.")
         
         # Serialize to Turtle format
@@ -42,13 +93,208 @@ def convert_owl_to_ttl(owl_file_path, ttl_file_path=None):
         print(f"Error during conversion: {e}")
         sys.exit(1)
 
+
+def find_inputs(roots):
+    """(root, path) for every file under roots, RDF or not, sorted"""
+    found = []
+    for root in roots:
+        root = Path(root)
+        paths = [root] if root.is_file() else sorted(p for p in root.rglob("*") if p.is_file())
+        found.extend((root if root.is_dir() else root.parent, p) for p in paths
+                     if p.suffix in sparql_engine.FORMATS or p.suffix in NON_RDF_SUFFIXES)
+    return found
+
+
+def output_paths(inputs, output_dir, targets):
+    """
+    Output file of each (input, target) pair.
+
+    Outputs mirror the input tree under output_dir. An input is not
+    converted to its own format, and inputs that share a stem in one
+    directory (heritage.rdf, heritage.ttl) keep their suffix in the
+    output name (heritage.rdf.nt) so they do not overwrite each other.
+    """
+    stems = {}
+    for root, path in inputs:
+        key = (path.parent, path.stem)
+        stems[key] = stems.get(key, 0) + 1
+    plan = {}
+    for root, path in inputs:
+        if path.suffix in NON_RDF_SUFFIXES:
+            continue
+        relative = path.relative_to(root)
+        name = path.name if stems[(path.parent, path.stem)] > 1 else path.stem
+        source_format = guess_format(path)
+        outputs = {}
+        for target in targets:
+            serializer, suffix, _ = TARGETS[target]
+            if serializer == source_format:
+                continue
+            outputs[target] = str(Path(output_dir) / root.name / relative.parent / (name + suffix))
+        plan[str(path)] = outputs
+    return plan
+
+
+def convert_file(path, outputs):
+    """
+    Parse one file and write it in every target format (runs in a worker).
+
+    Returns (path, triples, {target: seconds}, lowered), where lowered
+    is true for RDF-star Turtle written in its lowered, reified form.
+    """
+    from rdflib import Dataset, Graph
+
+    start = time.perf_counter()
+    source_format = guess_format(path)
+    lowered = (source_format in ("turtle", "trig")
+               and rdfstar.has_rdf_star(Path(path).read_text(encoding="utf-8")))
+    if source_format in TRIPLE_FORMATS:
+        graph = load_graph(path, format=source_format)
+        dataset = None
+    else:
+        dataset = parse_file(Dataset(), path, source_format)
+        graph = None
+    timings = {"parse": time.perf_counter() - start}
+
+    for target, out_path in outputs.items():
+        serializer, _, quads = TARGETS[target]
+        start = time.perf_counter()
+        if quads and dataset is None:
+            dataset = Dataset()
+            for prefix, namespace in graph.namespace_manager.namespaces():
+                dataset.bind(prefix, namespace)
+            dataset.default_graph.addN((s, p, o, dataset.default_graph) for s, p, o in graph)
+        elif not quads and graph is None:
+            # Named graphs cannot be kept; their triples are merged
+            graph = Graph()
+            for prefix, namespace in dataset.namespace_manager.namespaces():
+                graph.bind(prefix, namespace)
+            graph.addN((s, p, o, graph) for s, p, o, _ in dataset.quads())
+        source = dataset if quads else graph
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{out_path}.{os.getpid()}.tmp"
+        source.serialize(destination=tmp, format=serializer, encoding="utf-8")
+        os.replace(tmp, out_path)
+        timings[target] = time.perf_counter() - start
+
+    triples = len(graph) if graph is not None else sum(1 for _ in dataset.quads())
+    return str(path), triples, timings, lowered
+
+
+class ConvertState:
+    """Content hashes of the inputs converted by earlier runs"""
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / STATE_FILE
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def digest(self, path):
+        """SHA-256 of path, reusing the recorded one while mtime and size match"""
+        st = Path(path).stat()
+        known = self.entries.get(str(path))
+        if known and known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size:
+            return known["sha256"]
+        return file_hash(path)
+
+    def is_current(self, path, digest, outputs):
+        known = self.entries.get(str(path))
+        return (known is not None and known["sha256"] == digest
+                and known["outputs"] == outputs and all(Path(p).exists() for p in outputs.values()))
+
+    def record(self, path, digest, outputs):
+        st = Path(path).stat()
+        self.entries[str(path)] = {"sha256": digest, "mtime_ns": st.st_mtime_ns,
+                                   "size": st.st_size, "outputs": outputs}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def convert_tree(roots, output_dir, targets, workers=None, force=False):
+    """Convert every RDF file under roots; returns the number of failures"""
+    inputs = find_inputs(roots)
+    plan = output_paths(inputs, output_dir, targets)
+    state = ConvertState(output_dir)
+
+    for root, path in inputs:
+        if path.suffix in NON_RDF_SUFFIXES:
+            print(f"  - Skipped {path}: {NON_RDF_SUFFIXES[path.suffix]} is not RDF (convert it with an OWL API tool)")
+
+    pending = {}
+    for path, outputs in plan.items():
+        digest = state.digest(path)
+        if not outputs:
+            continue
+        if not force and state.is_current(path, digest, outputs):
+            print(f"  ✓ Unchanged: {path}")
+            continue
+        pending[path] = digest
+
+    print(f"Converting {len(pending)} of {len(plan)} files to {', '.join(targets)} "
+          f"on {workers or os.cpu_count()} workers...")
+    failures = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {path: executor.submit(convert_file, path, plan[path]) for path in pending}
+        for path, future in futures.items():
+            try:
+                _, triples, timings, lowered = future.result()
+            except Exception as e:
+                print(f"  ✗ {path}: {e}")
+                failures += 1
+                continue
+            state.record(path, pending[path], plan[path])
+            detail = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+            print(f"  ✓ {path}: {triples} triples ({detail})")
+            if lowered:
+                print(f"  ⚠ {path}: RDF-star quoted triples written as rdf:subject/predicate/object "
+                      f"blank nodes to {', '.join(plan[path])} (no target format keeps them quoted)")
+    state.save()
+    print(f"Done in {time.perf_counter() - start:.2f}s; outputs in {output_dir}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert an OWL (RDF/XML) file to Turtle, or a tree of RDF files to several formats",
+        epilog="Example: python convert_owl_to_ttl.py ontology/my_ontology.owl",
+    )
+    parser.add_argument("owl_file", nargs="?", help="OWL file to convert to Turtle")
+    parser.add_argument("ttl_file", nargs="?", help="output Turtle file (default: <owl_file>.ttl)")
+    parser.add_argument("--batch", nargs="+", metavar="DIR", help="convert every RDF file under these directories")
+    parser.add_argument("--output", metavar="DIR", help="batch: output directory (required)")
+    parser.add_argument("--to", default="ttl,nt",
+                        help=f"batch: comma-separated target formats from {', '.join(TARGETS)} (default: ttl,nt)")
+    parser.add_argument("--workers", type=int, help="batch: worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="batch: convert unchanged inputs too")
+    args = parser.parse_args()
+
+    if not args.batch:
+        if not args.owl_file:
+            parser.print_usage()
+            print("Example: python convert_owl_to_ttl.py ontology/my_ontology.owl")
+            sys.exit(1)
+        convert_owl_to_ttl(args.owl_file, args.ttl_file)
+        return
+
+    if not args.output:
+        parser.error("--batch needs --output")
+    targets = [t.strip() for t in args.to.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown target formats: {', '.join(unknown)}")
+    for root in args.batch:
+        if not os.path.exists(root):
+            print(f"Error: Not found: {root}")
+            sys.exit(1)
+    sys.exit(1 if convert_tree(args.batch, args.output, targets, args.workers, args.force) else 0)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python convert_owl_to_ttl.py <owl_file> [ttl_file]")
-        print("Example: python convert_owl_to_ttl.py ontology/my_ontology.owl")
-        sys.exit(1)
-    
-    owl_file = sys.argv[1]
-    ttl_file = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    convert_owl_to_ttl(owl_file, ttl_file)
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Bulk Load Test Script
+Runs load-triplestore.py's bulk mode against a local stand-in for
+Fuseki's data route and checks what arrives: every statement exactly
+once, blank nodes intact, gzip bodies, retries after 503 and resuming
+an interrupted load from the progress file.
+
+Usage:
+    python test_bulk_load.py
+"""
+
+import gzip
+import importlib.util
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from rdflib import BNode, Dataset, Graph, Literal, Namespace, RDF, RDFS
+from rdflib.compare import isomorphic
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "code"))
+spec = importlib.util.spec_from_file_location(
+    "load_triplestore", Path(__file__).resolve().parent / "code" / "load-triplestore.py")
+load_triplestore = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(load_triplestore)
+
+NS = Namespace("http://www.semanticweb.org/ubuntu/ontologies/2026/0/s2024700102heritage/")
+FORMATS = {"application/n-triples": "nt", "application/n-quads": "nquads"}
+
+
+class StandIn(ThreadingHTTPServer):
+    """Accepts POST /{dataset}/data like Fuseki, parsing each body on its own"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("localhost", 0), StandInHandler)
+        self.lock = threading.Lock()
+        self.datasets = {}
+        self.requests = 0
+        self.gzipped = 0
+        self.largest = 0
+        # Request numbers answered with 503 once, and a limit on accepted chunks
+        self.fail_once = set()
+        self.accept_limit = None
+        self.accepted = 0
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.server_address[1]}"
+
+    def dataset(self, name):
+        with self.lock:
+            return self.datasets.setdefault(name, Dataset())
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            number = server.requests
+            if number in server.fail_once:
+                server.fail_once.discard(number)
+                self._reply(503)
+                return
+            if server.accept_limit is not None and server.accepted >= server.accept_limit:
+                self._reply(400, b"stand-in refuses further chunks")
+                return
+            server.accepted += 1
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+            with server.lock:
+                server.gzipped += 1
+        name = self.path.strip("/").split("/")[0]
+        statements = [line for line in body.decode("utf-8").splitlines() if line.strip()]
+        with server.lock:
+            server.largest = max(server.largest, len(statements))
+        # Parsed apart from the dataset so blank nodes are scoped to this body, as in Fuseki
+        chunk = Dataset()
+        chunk.parse(data=body, format=FORMATS[self.headers["Content-Type"]])
+        target = server.dataset(name)
+        with server.lock:
+            for s, p, o, g in quads(chunk):
+                target.graph(g).add((s, p, o))
+        self._reply(200, b'{"count": %d}' % len(statements))
+
+
+def make_data(path):
+    """N-Triples with plain statements and blank node structures of several sizes"""
+    graph = Graph()
+    for i in range(300):
+        person = NS[f"Person{i}"]
+        graph.add((person, RDF.type, NS.Person))
+        graph.add((person, RDFS.label, Literal(f"Person {i}")))
+    for i in range(40):
+        # A chain of i % 5 + 1 blank nodes hanging off a person
+        node = BNode()
+        graph.add((NS[f"Person{i}"], NS.hasRecord, node))
+        for k in range(i % 5):
+            nxt = BNode()
+            graph.add((node, NS.next, nxt))
+            graph.add((node, RDFS.label, Literal(f"record {i}.{k}")))
+            node = nxt
+    # One structure larger than a batch
+    node = BNode()
+    for k in range(60):
+        nxt = BNode()
+        graph.add((node, NS.next, nxt))
+        node = nxt
+    graph.serialize(path, format="nt", encoding="utf-8")
+    return graph
+
+
+def quads(dataset):
+    return [(s, p, o, getattr(g, "identifier", g)) for s, p, o, g in dataset.quads((None, None, None, None))]
+
+
+def loaded_graph(server, name):
+    return server.dataset(name).default_graph
+
+
+def check(label, ok, detail=""):
+    print(f"{'✓' if ok else '✗'} {label}" + (f" ({detail})" if detail else ""))
+    return ok
+
+
+def main():
+    print("=" * 60)
+    print("Bulk Load Test")
+    print("=" * 60)
+    print()
+
+    server = StandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = make_data(tmp / "records.nt")
+        progress = tmp / "progress.json"
+
+        print("N-Triples with blank nodes, 50 statements per chunk, two 503s")
+        server.fail_once = {2, 5}
+        ok = load_triplestore.bulk_load([("nt", tmp / "records.nt")], server.url, workers=3,
+                                        batch_size=50, retries=3, progress_path=progress)
+        results.append(check("load reported success", ok))
+        results.append(check("graph arrived intact, blank nodes included",
+                             isomorphic(loaded_graph(server, "nt"), source),
+                             f"{len(loaded_graph(server, 'nt'))} of {len(source)} triples"))
+        results.append(check("chunks were gzip-compressed", server.gzipped == server.accepted,
+                             f"{server.gzipped} of {server.accepted}"))
+        results.append(check("503s were retried", not server.fail_once))
+        results.append(check("only the oversized blank node structure exceeds a chunk",
+                             server.largest == 60, f"largest chunk {server.largest} statements"))
+        results.append(check("progress file removed after a complete load", not progress.exists()))
+        print()
+
+        print("TriG with named graphs, interrupted after 2 chunks and resumed")
+        trig = Path("data/contested-claims-named.trig")
+        expected = Dataset()
+        expected.parse(trig, format="trig")
+        server.accepted, server.accept_limit = 0, 2
+        ok = load_triplestore.bulk_load([("named", trig)], server.url, workers=1,
+                                        batch_size=10, retries=0, progress_path=progress)
+        results.append(check("interrupted load reported failure", not ok))
+        results.append(check("progress file kept for resuming", progress.exists()))
+        first = server.accepted
+        server.accept_limit = None
+        ok = load_triplestore.bulk_load([("named", trig)], server.url, workers=2,
+                                        batch_size=10, retries=0, progress_path=progress)
+        results.append(check("resumed load reported success", ok))
+        got = sorted(quads(server.dataset("named")))
+        want = sorted(quads(expected))
+        results.append(check("every quad arrived exactly once", got == want,
+                             f"{len(got)} of {len(want)} quads, {first} chunks before the interruption"))
+        results.append(check("progress file removed after resuming", not progress.exists()))
+
+    server.shutdown()
+    print()
+    print("-" * 60)
+    if all(results):
+        print(f"✓ All {len(results)} checks passed")
+        return 0
+    print(f"✗ {results.count(False)} of {len(results)} checks failed")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
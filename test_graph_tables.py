@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Graph Tables Test Script
+Writes the node and edge tables of export-to-gephi.py in every format
+and reads them back: row counts, columns and ids must match the
+extracted graph, Parquet and Arrow must keep their schema across
+several batches, and two exports run under different hash seeds must
+be identical. The Parquet and Arrow checks need pyarrow and are
+skipped without it.
+
+Usage:
+    python test_graph_tables.py
+"""
+
+import csv
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "code"))
+spec = importlib.util.spec_from_file_location("export_to_gephi", ROOT / "code" / "export-to-gephi.py")
+gephi = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gephi)
+
+import graph_analytics
+import graph_tables
+from graph_loader import load_graph
+
+DATA = ROOT / "data" / "heritage_complete.ttl"
+
+# Small enough that every table is written in several batches
+BATCH_SIZE = 40
+
+
+def check(label, ok, detail=""):
+    print(f"{'✓' if ok else '✗'} {label}" + (f" ({detail})" if detail else ""))
+    return ok
+
+
+def check_csv(ex, out):
+    graph_tables.write_tables(ex, out, "csv", batch_size=BATCH_SIZE)
+    with open(out / "nodes.csv", encoding="utf-8", newline="") as f:
+        nodes = list(csv.DictReader(f))
+    with open(out / "edges.csv", encoding="utf-8", newline="") as f:
+        edges = list(csv.DictReader(f))
+    return [
+        check("CSV node rows", len(nodes) == len(ex), f"{len(nodes)} of {len(ex)}"),
+        check("CSV edge rows", len(edges) == ex.edge_count, f"{len(edges)} of {ex.edge_count}"),
+        check("CSV ids follow URI order",
+              [row["uri"] for row in nodes] == sorted(str(uri) for uri in ex.uris)
+              and [int(row["id"]) for row in nodes] == list(range(len(ex)))),
+    ]
+
+
+def check_graphml(ex, out):
+    path = out / "network.graphml"
+    graph_tables.write_graphml(ex, path, batch_size=BATCH_SIZE)
+    ns = {"g": graph_tables.GRAPHML_NS}
+    graph = ET.parse(path).getroot().find("g:graph", ns)
+    nodes = graph.findall("g:node", ns)
+    edges = graph.findall("g:edge", ns)
+    return [
+        check("GraphML nodes", len(nodes) == len(ex), f"{len(nodes)} of {len(ex)}"),
+        check("GraphML edges", len(edges) == ex.edge_count, f"{len(edges)} of {ex.edge_count}"),
+    ]
+
+
+def check_arrow(ex, metrics, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    results = []
+    node_schema, edge_schema = graph_tables._arrow_schemas(ex, metrics, None)
+    for fmt in ("parquet", "arrow"):
+        nodes_path, edges_path = graph_tables.write_tables(ex, out / fmt, fmt, metrics, batch_size=BATCH_SIZE)
+        if fmt == "parquet":
+            nodes, edges = pq.read_table(nodes_path), pq.read_table(edges_path)
+            batches = pq.ParquetFile(nodes_path).num_row_groups
+        else:
+            with pa.memory_map(str(nodes_path)) as source:
+                reader = pa.ipc.open_file(source)
+                batches = reader.num_record_batches
+                nodes = reader.read_all()
+            with pa.memory_map(str(edges_path)) as source:
+                edges = pa.ipc.open_file(source).read_all()
+        results += [
+            check(f"{fmt} node schema", nodes.schema.equals(node_schema), str(nodes.schema.names)),
+            check(f"{fmt} edge schema", edges.schema.equals(edge_schema)),
+            check(f"{fmt} rows", (nodes.num_rows, edges.num_rows) == (len(ex), ex.edge_count),
+                  f"{nodes.num_rows} nodes, {edges.num_rows} edges"),
+            check(f"{fmt} written in several batches", batches > 1, f"{batches} batches"),
+            check(f"{fmt} uri column in id order",
+                  nodes.column("uri").to_pylist() == [str(uri) for uri in ex.uris]),
+        ]
+    return results
+
+
+def export_csv(out, hash_seed):
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed), GRAPH_CACHE="0")
+    subprocess.run([sys.executable, str(ROOT / "code" / "export-to-gephi.py"), str(DATA), str(out),
+                    "--format", "csv", "--analytics"],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    return [(out / name).read_bytes() for name in ("nodes.csv", "edges.csv")]
+
+
+def main():
+    print("=" * 60)
+    print("Graph Tables Test")
+    print("=" * 60)
+    print()
+
+    ex = gephi.extract_graph(load_graph(DATA))
+    metrics = graph_analytics.network_metrics(ex)
+    print(f"Extracted {len(ex)} nodes and {ex.edge_count} edges from {DATA.name}")
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        results += check_csv(ex, tmp / "csv")
+        results += check_graphml(ex, tmp)
+        if graph_tables.pa is None:
+            print("- Parquet and Arrow skipped: pyarrow not installed")
+        else:
+            results += check_arrow(ex, metrics, tmp)
+        first = export_csv(tmp / "seed1", 1)
+        second = export_csv(tmp / "seed2", 2)
+        results.append(check("exports under different hash seeds are identical", first == second))
+
+    print()
+    print("-" * 60)
+    if all(results):
+        print(f"✓ All {len(results)} checks passed")
+        return 0
+    print(f"✗ {results.count(False)} of {len(results)} checks failed")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,15 +5,18 @@ Tests data against validation shapes
 """
 
 import sys
+from pathlib import Path
 
 try:
     import pyshacl
-    from rdflib import Graph
 except ImportError:
     print("ERROR: pyshacl not installed!")
     print("Install it with: pip install pyshacl")
     sys.exit(1)
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "code"))
+from graph_loader import load_graph
+
 def main():
     print("=" * 60)
     print("SHACL Validation Test")
@@ -22,9 +25,8 @@ def main():
     
     # Load shapes
     print("Loading SHACL shapes...")
-    shapes_graph = Graph()
     try:
-        shapes_graph.parse("shapes/validation_shapes.ttl", format="turtle")
+        shapes_graph = load_graph("shapes/validation_shapes.ttl", format="turtle")
         print(f"✓ Loaded {len(shapes_graph)} triples from validation shapes")
     except Exception as e:
         print(f"✗ Error loading shapes: {e}")
@@ -32,9 +34,8 @@ def main():
     
     # Load data
     print("Loading data...")
-    data_graph = Graph()
     try:
-        data_graph.parse("data/heritage_base_dataset.ttl", format="turtle")
+        data_graph = load_graph("data/heritage_base_dataset.ttl", format="turtle")
         print(f"✓ Loaded {len(data_graph)} triples from data")
     except Exception as e:
         print(f"✗ Error loading data: {e}")